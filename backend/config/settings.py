@@ -118,3 +118,133 @@ TRACCAR_BASE_URL = os.getenv('TRACCAR_BASE_URL', 'http://traccar:8082')
 TRACCAR_USER = os.getenv('TRACCAR_USER', '')
 TRACCAR_PASSWORD = os.getenv('TRACCAR_PASSWORD', '')
 TRACCAR_TOKEN = os.getenv('TRACCAR_TOKEN', '')
+
+# Carte: duree de vie (s) des clusters mis en cache par version d'entreprise
+MAP_CLUSTERS_CACHE_TTL = int(os.getenv('MAP_CLUSTERS_CACHE_TTL', '60'))
+
+# Traccar: duree de vie (s) du cache des positions partage entre requetes concurrentes
+TRACCAR_POSITION_CACHE_TTL = float(os.getenv('TRACCAR_POSITION_CACHE_TTL', '5'))
+
+# GPS: intervalle adaptatif entre deux verifications d'un meme capteur (secondes)
+GPS_CHECK_MIN_INTERVAL_SECONDS = int(os.getenv('GPS_CHECK_MIN_INTERVAL_SECONDS', '300'))
+GPS_CHECK_MAX_INTERVAL_SECONDS = int(os.getenv('GPS_CHECK_MAX_INTERVAL_SECONDS', '3600'))
+GPS_CHECK_RECENT_ALERT_HOURS = int(os.getenv('GPS_CHECK_RECENT_ALERT_HOURS', '24'))
+
+# Capteurs hors ligne: minutes sans communication par type, delai avant nouvelle alerte (heures)
+CAPTEUR_HORS_LIGNE_MINUTES = {
+    'Poids': int(os.getenv('CAPTEUR_HORS_LIGNE_MINUTES_POIDS', '180')),
+    'Temperature': int(os.getenv('CAPTEUR_HORS_LIGNE_MINUTES_TEMPERATURE', '120')),
+    'Humidite': int(os.getenv('CAPTEUR_HORS_LIGNE_MINUTES_HUMIDITE', '120')),
+    'GPS': int(os.getenv('CAPTEUR_HORS_LIGNE_MINUTES_GPS', '720')),
+    'CO2': int(os.getenv('CAPTEUR_HORS_LIGNE_MINUTES_CO2', '120')),
+    'Son': int(os.getenv('CAPTEUR_HORS_LIGNE_MINUTES_SON', '180')),
+    'Batterie': int(os.getenv('CAPTEUR_HORS_LIGNE_MINUTES_BATTERIE', '720')),
+}
+CAPTEUR_HORS_LIGNE_REALERT_HOURS = int(os.getenv('CAPTEUR_HORS_LIGNE_REALERT_HOURS', '24'))
+
+# Chute de poids (CUSUM): baisse cumulee declenchant l'alerte, tolerance par mesure (kg)
+CHUTE_POIDS_SEUIL_KG = float(os.getenv('CHUTE_POIDS_SEUIL_KG', '2.0'))
+CHUTE_POIDS_TOLERANCE_KG = float(os.getenv('CHUTE_POIDS_TOLERANCE_KG', '0.2'))
+CHUTE_POIDS_LOOKBACK_HOURS = int(os.getenv('CHUTE_POIDS_LOOKBACK_HOURS', '48'))
+
+# Prevision de poids: jours complets lus, jours de tendance, horizon (jours), cache (s) et notification de pose de hausse
+PREVISION_POIDS_JOURS = int(os.getenv('PREVISION_POIDS_JOURS', '21'))
+PREVISION_POIDS_TENDANCE_JOURS = int(os.getenv('PREVISION_POIDS_TENDANCE_JOURS', '7'))
+PREVISION_POIDS_HORIZON_JOURS = int(os.getenv('PREVISION_POIDS_HORIZON_JOURS', '7'))
+PREVISION_POIDS_CACHE_TTL = int(os.getenv('PREVISION_POIDS_CACHE_TTL', '3600'))
+PREVISION_POIDS_NOTIFICATIONS = os.getenv('PREVISION_POIDS_NOTIFICATIONS', 'True').lower() in ('true', '1', 'yes')
+# Miellee: hausse journaliere minimale (kg) sur MIELLEE_JOURS jours; gain prevu (kg) depuis la derniere hausse
+MIELLEE_GAIN_JOURNALIER_KG = float(os.getenv('MIELLEE_GAIN_JOURNALIER_KG', '0.5'))
+MIELLEE_JOURS = int(os.getenv('MIELLEE_JOURS', '3'))
+HAUSSE_GAIN_KG = float(os.getenv('HAUSSE_GAIN_KG', '8.0'))
+
+# Score de sante des ruches: jours sans intervention toleres, jours de poids lus, perte toleree (kg/jour)
+SANTE_VISITE_JOURS = int(os.getenv('SANTE_VISITE_JOURS', '30'))
+SANTE_POIDS_JOURS = int(os.getenv('SANTE_POIDS_JOURS', '7'))
+SANTE_PERTE_POIDS_KG_JOUR = float(os.getenv('SANTE_PERTE_POIDS_KG_JOUR', '0.3'))
+
+# Tableau de bord (vue dashboard_entreprise): delai minimal (s) entre deux rafraichissements
+DASHBOARD_REFRESH_MIN_SECONDS = int(os.getenv('DASHBOARD_REFRESH_MIN_SECONDS', '60'))
+
+# Deduplication des alertes: nombre de cles gardees en memoire par processus
+ALERT_SUPPRESSION_LRU_SIZE = int(os.getenv('ALERT_SUPPRESSION_LRU_SIZE', '10000'))
+
+# Regles de seuil: profondeur (heures) relue pour un capteur jamais evalue
+REGLES_SEUIL_LOOKBACK_HOURS = int(os.getenv('REGLES_SEUIL_LOOKBACK_HOURS', '24'))
+
+# Ingestion des trames capteurs: cle partagee attendue dans l'en-tete X-Ingest-Key
+INGEST_API_KEY = os.getenv('INGEST_API_KEY', '')
+
+# LoRaWAN: fenetre (ms) et taille max des lots d'uplinks, cache devEUI (s), ecart entre mesures d'une trame (s)
+LORAWAN_BATCH_WINDOW_MS = int(os.getenv('LORAWAN_BATCH_WINDOW_MS', '500'))
+LORAWAN_BATCH_MAX_ROWS = int(os.getenv('LORAWAN_BATCH_MAX_ROWS', '500'))
+LORAWAN_DEVEUI_CACHE_TTL = int(os.getenv('LORAWAN_DEVEUI_CACHE_TTL', '300'))
+LORAWAN_READING_INTERVAL_SECONDS = int(os.getenv('LORAWAN_READING_INTERVAL_SECONDS', '600'))
+
+# Controle de plausibilite a l'ingestion: fenetre glissante (mesures) et seuil du filtre de pic (x MAD),
+# nombre de mesures consecutives concordantes pour accepter un nouveau niveau
+MESURES_VALIDATION_ENABLED = os.getenv('MESURES_VALIDATION_ENABLED', 'True').lower() in ('true', '1', 'yes')
+VALIDATION_WINDOW = int(os.getenv('VALIDATION_WINDOW', '20'))
+VALIDATION_MAD_THRESHOLD = float(os.getenv('VALIDATION_MAD_THRESHOLD', '6'))
+VALIDATION_CONFIRMATION = int(os.getenv('VALIDATION_CONFIRMATION', '3'))
+
+# Capteurs Son: bornes des bandes (Hz) des ratios d'energie, bandes de l'indice d'essaimage, taille du spectre reduit
+SON_BANDES_HZ = [float(b) for b in os.getenv('SON_BANDES_HZ', '0,100,200,300,400,500,600,1000,2000').split(',')]
+SON_BANDE_PIPING_HZ = (400.0, 600.0)
+SON_BANDE_BOURDONNEMENT_HZ = (100.0, 300.0)
+SON_SPECTRE_BINS = int(os.getenv('SON_SPECTRE_BINS', '64'))
+
+# Pont MQTT des passerelles (commande mqtt_ingest): broker, filtre de topic, lots (lectures, ms) et file bornee
+MQTT_HOST = os.getenv('MQTT_HOST', 'localhost')
+MQTT_PORT = int(os.getenv('MQTT_PORT', '1883'))
+MQTT_USERNAME = os.getenv('MQTT_USERNAME', '')
+MQTT_PASSWORD = os.getenv('MQTT_PASSWORD', '')
+MQTT_CLIENT_ID = os.getenv('MQTT_CLIENT_ID', '')
+MQTT_TOPIC = os.getenv('MQTT_TOPIC', 'ruchers/+/capteurs/+')
+MQTT_BATCH_SIZE = int(os.getenv('MQTT_BATCH_SIZE', '500'))
+MQTT_FLUSH_MS = int(os.getenv('MQTT_FLUSH_MS', '1000'))
+MQTT_QUEUE_SIZE = int(os.getenv('MQTT_QUEUE_SIZE', '10000'))
+
+# Serveur d'ingestion UDP/TCP (commande run_ingest_server): ecoute, lots, file bornee, rechargement des capteurs (s)
+# INGEST_SERVER_ALLOWED_NETWORKS: reseaux sources autorises (CIDR separes par des virgules). Le protocole
+# n'est pas authentifie: ecoute locale par defaut, liste obligatoire pour une adresse non locale (0.0.0.0...)
+INGEST_SERVER_HOST = os.getenv('INGEST_SERVER_HOST', '127.0.0.1')
+INGEST_SERVER_UDP_PORT = int(os.getenv('INGEST_SERVER_UDP_PORT', '5683'))
+INGEST_SERVER_TCP_PORT = int(os.getenv('INGEST_SERVER_TCP_PORT', '5684'))
+INGEST_SERVER_BATCH_SIZE = int(os.getenv('INGEST_SERVER_BATCH_SIZE', '2000'))
+INGEST_SERVER_FLUSH_MS = int(os.getenv('INGEST_SERVER_FLUSH_MS', '200'))
+INGEST_SERVER_QUEUE_SIZE = int(os.getenv('INGEST_SERVER_QUEUE_SIZE', '1000'))
+INGEST_SERVER_REFRESH_SECONDS = int(os.getenv('INGEST_SERVER_REFRESH_SECONDS', '60'))
+INGEST_SERVER_ALLOWED_NETWORKS = os.getenv('INGEST_SERVER_ALLOWED_NETWORKS', '')
+
+# Historique des mesures: age (jours) avant compaction en blocs, compression (zstd|zlib|raw, vide = auto)
+MESURES_COMPACTION_DAYS = int(os.getenv('MESURES_COMPACTION_DAYS', '30'))
+MESURES_CHUNK_CODEC = os.getenv('MESURES_CHUNK_CODEC', '')
+
+# Archivage des blocs de mesures: age (jours) avant deplacement vers des fichiers locaux
+MESURES_ARCHIVE_DAYS = int(os.getenv('MESURES_ARCHIVE_DAYS', '365'))
+MESURES_ARCHIVE_ROOT = os.getenv('MESURES_ARCHIVE_ROOT', os.path.join(BASE_DIR, 'archives'))
+
+# Metriques internes: si defini, requis dans l'en-tete X-Metrics-Secret
+METRICS_SECRET = os.getenv('METRICS_SECRET', '')
+
+# Dependances externes: disjoncteur + nombre d'appels simultanes par dependance
+# (disjoncteur surchargeable par dependance, ex: TRACCAR_CIRCUIT_BREAKER_FAILURE_THRESHOLD; vide = valeur globale)
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_BREAKER_FAILURE_THRESHOLD', '5'))
+CIRCUIT_BREAKER_RESET_SECONDS = float(os.getenv('CIRCUIT_BREAKER_RESET_SECONDS', '30'))
+TRACCAR_CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(
+    os.getenv('TRACCAR_CIRCUIT_BREAKER_FAILURE_THRESHOLD') or CIRCUIT_BREAKER_FAILURE_THRESHOLD
+)
+TRACCAR_CIRCUIT_BREAKER_RESET_SECONDS = float(
+    os.getenv('TRACCAR_CIRCUIT_BREAKER_RESET_SECONDS') or CIRCUIT_BREAKER_RESET_SECONDS
+)
+BREVO_CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(
+    os.getenv('BREVO_CIRCUIT_BREAKER_FAILURE_THRESHOLD') or CIRCUIT_BREAKER_FAILURE_THRESHOLD
+)
+BREVO_CIRCUIT_BREAKER_RESET_SECONDS = float(
+    os.getenv('BREVO_CIRCUIT_BREAKER_RESET_SECONDS') or CIRCUIT_BREAKER_RESET_SECONDS
+)
+BULKHEAD_ACQUIRE_TIMEOUT = float(os.getenv('BULKHEAD_ACQUIRE_TIMEOUT', '0.5'))
+TRACCAR_MAX_CONCURRENCY = int(os.getenv('TRACCAR_MAX_CONCURRENCY', '8'))
+BREVO_MAX_CONCURRENCY = int(os.getenv('BREVO_MAX_CONCURRENCY', '4'))
+BREVO_TIMEOUT = float(os.getenv('BREVO_TIMEOUT', '5'))
@@ -0,0 +1,226 @@
+"""
+Archivage des blocs de mesures froids sur disque local.
+
+Les blocs (mesures_chunks) plus vieux que MESURES_ARCHIVE_DAYS sont
+regroupes par capteur et par mois dans un fichier sous
+MESURES_ARCHIVE_ROOT (un montage S3 compatible convient): les blobs
+compresses y sont concatenes tels quels et `mesures_archives` garde,
+pour chaque jour, leur position dans le fichier. La relecture ouvre le
+fichier en memoire partagee (mmap) et ne decompresse que les jours
+demandes.
+
+Un fichier n'est jamais reecrit: une archive completee produit un
+nouveau fichier, l'ancien est supprime apres commit. Un lecteur qui
+tenait encore l'ancienne ligne relit alors l'archive et son nouveau
+fichier.
+"""
+import logging
+import mmap
+import os
+import uuid
+from datetime import date, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from core.models import MesureArchive, MesureChunk
+from core.timeseries import from_ms, pack, unpack
+
+logger = logging.getLogger(__name__)
+
+
+def archive_root():
+    return getattr(settings, "MESURES_ARCHIVE_ROOT", None) or os.path.join(settings.BASE_DIR, "archives")
+
+
+def _path(chemin):
+    return os.path.join(archive_root(), chemin)
+
+
+def _read_entries(chemin, entries):
+    """Decode les jours `entries` d'un fichier d'archive: [(ms, valeurs)]."""
+    with open(_path(chemin), "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        decoded = []
+        for entry in entries:
+            offset = entry["offset"]
+            ts_end = offset + entry["tsLength"]
+            decoded.append(unpack(entry["codec"], mm[offset:ts_end], mm[ts_end:ts_end + entry["valLength"]]))
+        return decoded
+
+
+def read_points(archive, start_ms=None, end_ms=None):
+    """(ms, valeurs) de l'archive dans [start_ms, end_ms], tries par date."""
+    while True:
+        entries = [
+            e for e in archive.index
+            if (start_ms is None or e["dateFin"] >= start_ms) and (end_ms is None or e["dateDebut"] <= end_ms)
+        ]
+        try:
+            parts = _read_entries(archive.chemin, entries)
+            break
+        except FileNotFoundError:
+            # Archive completee entre-temps: l'ancien fichier a ete supprime
+            # au commit, la ligne pointe vers le nouveau.
+            reloaded = MesureArchive.objects.filter(pk=archive.pk).only("chemin", "index").first()
+            if reloaded is None or reloaded.chemin == archive.chemin:
+                logger.error("Archive de mesures introuvable: %s", archive.chemin)
+                parts = []
+                break
+            archive = reloaded
+    if not parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    ms = np.concatenate([p[0] for p in parts])
+    values = np.concatenate([p[1] for p in parts])
+    mask = np.ones(ms.shape, dtype=bool)
+    if start_ms is not None:
+        mask &= ms >= start_ms
+    if end_ms is not None:
+        mask &= ms <= end_ms
+    return ms[mask], values[mask]
+
+
+def archives_for(capteur_id, start=None, end=None):
+    archives = MesureArchive.objects.filter(capteur_id=capteur_id).order_by("mois")
+    if start is not None:
+        archives = archives.filter(dateFin__gte=start)
+    if end is not None:
+        archives = archives.filter(dateDebut__lte=end)
+    return archives
+
+
+def _write_file(capteur_id, mois, days):
+    """
+    Ecrit `days` {jour: (codec, ts_blob, val_blob, n, premier ms, dernier ms)}
+    dans un nouveau fichier. Retourne (chemin, taille, index).
+    """
+    chemin = os.path.join(str(capteur_id), f"{mois:%Y-%m}-{uuid.uuid4().hex[:8]}.bin")
+    path = _path(chemin)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    index = []
+    offset = 0
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as handle:
+        for jour in sorted(days):
+            codec, ts_blob, val_blob, n, first_ms, last_ms = days[jour]
+            handle.write(ts_blob)
+            handle.write(val_blob)
+            index.append({
+                "jour": jour.isoformat(),
+                "offset": offset,
+                "tsLength": len(ts_blob),
+                "valLength": len(val_blob),
+                "codec": codec,
+                "nbMesures": n,
+                "dateDebut": first_ms,
+                "dateFin": last_ms,
+            })
+            offset += len(ts_blob) + len(val_blob)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+    return chemin, offset, index
+
+
+def _remove_file(chemin):
+    try:
+        os.remove(_path(chemin))
+    except FileNotFoundError:
+        pass
+
+
+def _merge_days(archive, chunks):
+    """Jours de l'archive existante completes par les blocs: {jour: (ms, valeurs)}."""
+    days = {}
+    if archive is not None:
+        try:
+            stored = _read_entries(archive.chemin, archive.index)
+        except FileNotFoundError:
+            raise RuntimeError(f"archive file missing: {archive.chemin}")
+        for entry, (ms, values) in zip(archive.index, stored):
+            days[date.fromisoformat(entry["jour"])] = (ms, values)
+    for chunk in chunks:
+        ms, values = unpack(chunk.codec, chunk.timestamps, chunk.valeurs)
+        if chunk.jour in days:
+            # Bloc tardif pour un jour deja archive: le bloc l'emporte.
+            points = dict(zip(*(a.tolist() for a in days[chunk.jour])))
+            points.update(zip(ms.tolist(), values.tolist()))
+            ms = np.array(sorted(points), dtype=np.int64)
+            values = np.array([points[m] for m in ms.tolist()])
+        days[chunk.jour] = (ms, values)
+    return days
+
+
+def _archive_month(capteur_id, mois, chunks):
+    chemin = None
+    try:
+        with transaction.atomic():
+            archive = (
+                MesureArchive.objects.select_for_update()
+                .filter(capteur_id=capteur_id, mois=mois)
+                .first()
+            )
+            by_day = {c.jour: c for c in chunks}
+            packed = {}
+            for jour, (ms, values) in _merge_days(archive, chunks).items():
+                chunk = by_day.get(jour)
+                if chunk is not None and chunk.nbMesures == len(ms):
+                    # Bloc deplace tel quel, sans recompression.
+                    blobs = (chunk.codec, bytes(chunk.timestamps), bytes(chunk.valeurs))
+                else:
+                    blobs = pack(ms, values)
+                packed[jour] = (*blobs, len(ms), int(ms[0]), int(ms[-1]))
+
+            chemin, taille, index = _write_file(capteur_id, mois, packed)
+            MesureArchive.objects.update_or_create(
+                capteur_id=capteur_id,
+                mois=mois,
+                defaults={
+                    "dateDebut": from_ms(min(e["dateDebut"] for e in index)),
+                    "dateFin": from_ms(max(e["dateFin"] for e in index)),
+                    "nbMesures": sum(e["nbMesures"] for e in index),
+                    "chemin": chemin,
+                    "taille": taille,
+                    "index": index,
+                },
+            )
+            MesureChunk.objects.filter(id__in=[c.id for c in chunks]).delete()
+            if archive is not None:
+                old_chemin = archive.chemin
+                transaction.on_commit(lambda: _remove_file(old_chemin))
+    except Exception:
+        # Le nouveau fichier n'est reference par aucune archive.
+        if chemin:
+            _remove_file(chemin)
+        raise
+
+
+def archive_capteur(capteur_id, before):
+    """
+    Archive les blocs du capteur dont le jour est anterieur a `before`
+    (tronque au mois), un mois par transaction.
+    Retourne (blocs archives, mois ecrits).
+    """
+    cutoff = before.astimezone(dt_timezone.utc).date().replace(day=1)
+    chunks = (
+        MesureChunk.objects.filter(capteur_id=capteur_id, jour__lt=cutoff)
+        .order_by("jour")
+        .only("id", "jour", "codec", "nbMesures", "timestamps", "valeurs")
+    )
+    archived = months = 0
+    current = None
+    pending = []
+    for chunk in chunks.iterator(chunk_size=31):
+        mois = chunk.jour.replace(day=1)
+        if mois != current and pending:
+            _archive_month(capteur_id, current, pending)
+            archived += len(pending)
+            months += 1
+            pending = []
+        current = mois
+        pending.append(chunk)
+    if pending:
+        _archive_month(capteur_id, current, pending)
+        archived += len(pending)
+        months += 1
+    return archived, months
@@ -0,0 +1,70 @@
+"""
+Tableau de bord par entreprise.
+
+La vue materialisee dashboard_entreprise (migration 0045) regroupe en une
+ligne par entreprise les compteurs de l'accueil: ruches par statut et par
+maladie, capteurs actifs par type, alertes ouvertes, reines par statut et
+taches d'elevage a faire. Hasura la lit par son index unique
+(entreprise_id); elle est rafraichie CONCURRENTLY (les lectures ne sont
+pas bloquees) par la commande refresh_dashboard ou le cron Hasura.
+"""
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+# Cle de verrou consultatif PostgreSQL propre au rafraichissement ("DASH").
+ADVISORY_LOCK_KEY = 0x44415348
+
+# Colonnes jsonb: le curseur Django les retourne en texte.
+_JSON_COLUMNS = {"ruchesParStatut", "ruchesParMaladie", "capteursParType", "reinesParStatut"}
+_COLUMNS = (
+    "nbRuchers", "nbRuches", "ruchesParStatut", "ruchesParMaladie", "nbCapteurs", "capteursParType",
+    "alertesOuvertes", "reinesParStatut", "tachesAFaire", "tachesEnRetard", "refreshedAt",
+)
+
+
+def last_refresh():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT max("refreshedAt") FROM dashboard_entreprise')
+        return cursor.fetchone()[0]
+
+
+def refresh(min_interval=None, now=None):
+    """
+    Rafraichit la vue si le dernier rafraichissement date de plus de
+    `min_interval` secondes (defaut: DASHBOARD_REFRESH_MIN_SECONDS).
+    Retourne False si ignore (trop recent ou deja en cours ailleurs).
+    """
+    if min_interval is None:
+        min_interval = int(getattr(settings, "DASHBOARD_REFRESH_MIN_SECONDS", 60))
+    now = now or timezone.now()
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", [ADVISORY_LOCK_KEY])
+            if not cursor.fetchone()[0]:
+                return False
+            last = last_refresh()
+            if min_interval > 0 and last is not None and now - last < timedelta(seconds=min_interval):
+                return False
+            cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY dashboard_entreprise")
+    return True
+
+
+def summary(entreprise_id):
+    """Ligne du tableau de bord d'une entreprise (dict), ou None avant le premier rafraichissement."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT " + ", ".join(f'"{c}"' for c in _COLUMNS)
+            + " FROM dashboard_entreprise WHERE entreprise_id = %s",
+            [entreprise_id],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return {
+        column: json.loads(value) if column in _JSON_COLUMNS and isinstance(value, str) else value
+        for column, value in zip(_COLUMNS, row)
+    }
@@ -0,0 +1,138 @@
+"""
+Outils communs aux detecteurs incrementaux sur les mesures.
+
+Chaque detecteur memorise, par capteur, la date de la derniere mesure
+traitee et son etat (DetectionWatermark): une execution ne lit que les
+mesures arrivees depuis la precedente.
+"""
+from collections import defaultdict
+
+from django.db.models import Q
+
+from core.models import (
+    Alerte,
+    Capteur,
+    DetectionWatermark,
+    Mesure,
+    Notification,
+    RoleUtilisateur,
+    TypeNotification,
+    UtilisateurEntreprise,
+)
+from core.suppression import claim_many
+
+
+def load_states(detecteur, capteur_ids):
+    """{capteur_id: state} pour les capteurs deja vus par le detecteur."""
+    return dict(
+        DetectionWatermark.objects.filter(
+            detecteur=detecteur, capteur_id__in=capteur_ids
+        ).values_list("capteur_id", "state")
+    )
+
+
+def new_readings(detecteur, capteur_ids, until, default_since):
+    """
+    Mesures (capteur_id, date, valeur) posterieures au watermark de chaque
+    capteur, triees par capteur puis par date. `default_since` borne la
+    lecture pour un capteur jamais traite.
+
+    Les watermarks sont lus d'abord; chaque capteur devient un intervalle
+    (capteur_id, date) borne des deux cotes, que l'index (capteur_id, date)
+    parcourt directement au lieu d'une sous-requete correlee par ligne.
+    """
+    watermarks = dict(
+        DetectionWatermark.objects.filter(
+            detecteur=detecteur, capteur_id__in=capteur_ids
+        ).values_list("capteur_id", "lastDate")
+    )
+    by_since = defaultdict(list)
+    for capteur_id in capteur_ids:
+        by_since[watermarks.get(capteur_id) or default_since].append(capteur_id)
+    if not by_since:
+        return Mesure.objects.none().values_list("capteur_id", "date", "valeur")
+    ranges = Q()
+    for since, ids in by_since.items():
+        ranges |= Q(capteur_id__in=ids, date__gt=since)
+    return (
+        Mesure.objects.filter(ranges, date__gt=min(by_since), date__lte=until)
+        .order_by("capteur_id", "date")
+        .values_list("capteur_id", "date", "valeur")
+    )
+
+
+def save_watermarks(detecteur, entries):
+    """Upsert des watermarks: entries = [(capteur_id, lastDate, state)]."""
+    if not entries:
+        return
+    DetectionWatermark.objects.bulk_create(
+        [
+            DetectionWatermark(detecteur=detecteur, capteur_id=capteur_id, lastDate=last_date, state=state)
+            for capteur_id, last_date, state in entries
+        ],
+        update_conflicts=True,
+        unique_fields=["detecteur", "capteur"],
+        update_fields=["lastDate", "state", "updated_at"],
+    )
+
+
+def capteurs_context(capteur_ids):
+    """{capteur_id: (identifiant, ruche_id, immatriculation, entreprise_id)}."""
+    return {
+        row[0]: row[1:]
+        for row in Capteur.objects.filter(id__in=set(capteur_ids)).values_list(
+            "id", "identifiant", "ruche_id", "ruche__immatriculation", "ruche__rucher__entreprise_id"
+        )
+    }
+
+
+def _deduplicate(items):
+    """Une alerte par (type, capteur) et par jour, reservee dans le store de suppression."""
+    by_type = defaultdict(list)
+    for item in items:
+        by_type[item[1]].append(item[0])
+    claimed = {type_alerte: claim_many(type_alerte, ids) for type_alerte, ids in by_type.items()}
+    out = []
+    for item in items:
+        key = str(item[0])
+        if key in claimed[item[1]]:
+            claimed[item[1]].discard(key)
+            out.append(item)
+    return out
+
+
+def create_alerts(items, context):
+    """
+    Cree les alertes et les notifications des administrateurs en masse,
+    sans doublon dans la journee pour un meme capteur et un meme type.
+    items = [(capteur_id, type_alerte, titre, message)], context = capteurs_context(...).
+    """
+    items = _deduplicate(items)
+    if not items:
+        return
+    admins = defaultdict(list)
+    for entreprise_id, utilisateur_id in UtilisateurEntreprise.objects.filter(
+        entreprise_id__in={context[item[0]][3] for item in items if context[item[0]][3]},
+        role=RoleUtilisateur.ADMIN_ENTREPRISE.value,
+    ).values_list("entreprise_id", "utilisateur_id"):
+        admins[entreprise_id].append(utilisateur_id)
+
+    alertes = []
+    notifications = []
+    for capteur_id, type_alerte, titre, message in items:
+        _, ruche_id, _, entreprise_id = context[capteur_id]
+        alertes.append(Alerte(type=type_alerte, message=message, capteur_id=capteur_id))
+        for utilisateur_id in admins.get(entreprise_id, []):
+            notifications.append(
+                Notification(
+                    type=TypeNotification.ALERTE_CAPTEUR.value,
+                    titre=titre,
+                    message=message,
+                    utilisateur_id=utilisateur_id,
+                    entreprise_id=entreprise_id,
+                    ruche_id=ruche_id,
+                )
+            )
+    Alerte.objects.bulk_create(alertes)
+    if notifications:
+        Notification.objects.bulk_create(notifications)
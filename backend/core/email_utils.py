@@ -4,6 +4,8 @@ from django.conf import settings
 import sib_api_v3_sdk
 from sib_api_v3_sdk.rest import ApiException
 
+from core.resilience import BulkheadFullError, CircuitOpenError, get_dependency
+
 
 def get_brevo_client():
     """Crée et retourne une instance du client Brevo configurée."""
@@ -12,6 +14,23 @@ def get_brevo_client():
     return sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
 
 
+def _is_brevo_failure(exc):
+    """Seules les erreurs serveur / reseau comptent pour le disjoncteur (pas les 4xx)."""
+    if isinstance(exc, ApiException):
+        return (exc.status or 0) >= 500
+    return True
+
+
+def _send_transac_email(api_instance, send_smtp_email):
+    """Envoi via le disjoncteur et la cloison "brevo", avec un timeout borne."""
+    return get_dependency("brevo").call(
+        api_instance.send_transac_email,
+        send_smtp_email,
+        _request_timeout=getattr(settings, "BREVO_TIMEOUT", 5),
+        exception_is_failure=_is_brevo_failure,
+    )
+
+
 def send_email(
     to_email: str,
     to_name: str,
@@ -56,7 +75,7 @@ def send_email(
         )
         
         # Envoi de l'email
-        api_response = api_instance.send_transac_email(send_smtp_email)
+        api_response = _send_transac_email(api_instance, send_smtp_email)
         
         return {
             "success": True,
@@ -64,6 +83,18 @@ def send_email(
             "message": "Email envoyé avec succès"
         }
         
+    except CircuitOpenError:
+        return {
+            "success": False,
+            "error": "brevo_circuit_open",
+            "message": "Service email temporairement indisponible"
+        }
+    except BulkheadFullError:
+        return {
+            "success": False,
+            "error": "brevo_busy",
+            "message": "Service email sature, reessayer plus tard"
+        }
     except ApiException as e:
         return {
             "success": False,
@@ -116,7 +147,7 @@ def send_template_email(
         )
         
         # Envoi de l'email
-        api_response = api_instance.send_transac_email(send_smtp_email)
+        api_response = _send_transac_email(api_instance, send_smtp_email)
         
         return {
             "success": True,
@@ -124,6 +155,18 @@ def send_template_email(
             "message": "Email template envoyé avec succès"
         }
         
+    except CircuitOpenError:
+        return {
+            "success": False,
+            "error": "brevo_circuit_open",
+            "message": "Service email temporairement indisponible"
+        }
+    except BulkheadFullError:
+        return {
+            "success": False,
+            "error": "brevo_busy",
+            "message": "Service email sature, reessayer plus tard"
+        }
     except ApiException as e:
         return {
             "success": False,
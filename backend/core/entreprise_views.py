@@ -26,6 +26,7 @@ from django.views.decorators.http import require_POST, require_GET
 from core.auth_views import _json_body, _get_user_from_request, _make_access_token
 from core.email_utils import send_email
 from core.email_templates import generate_invitation_email_content
+from core.usage import usage as entreprise_usage
 
 logger = logging.getLogger(__name__)
 
@@ -548,6 +549,33 @@ def get_entreprise_offre_status(request, entreprise_id):
     )
 
 
+@require_GET
+def get_entreprise_usage(request, entreprise_id):
+    """GET /api/entreprises/{id}/usage - Ruchers, capteurs et reines utilises au regard des limites de l'offre."""
+    user, err = _get_user_from_request(request)
+    if err:
+        return err
+
+    try:
+        entreprise = Entreprise.objects.get(id=entreprise_id)
+    except Entreprise.DoesNotExist:
+        return JsonResponse({"error": "entreprise_not_found"}, status=404)
+
+    if not UtilisateurEntreprise.objects.filter(utilisateur=user, entreprise=entreprise).exists():
+        return JsonResponse(
+            {"error": "forbidden", "detail": "Vous n'êtes pas membre de cette entreprise"},
+            status=403,
+        )
+
+    return JsonResponse(
+        {
+            "entreprise_id": str(entreprise.id),
+            **entreprise_usage(entreprise.id),
+        },
+        status=200,
+    )
+
+
 @require_GET
 def list_type_profiles(request):
     """GET /api/profiles - Liste des profils entreprise."""
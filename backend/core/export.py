@@ -0,0 +1,212 @@
+"""
+Export de l'historique des mesures en Parquet ou Arrow IPC.
+
+Les mesures sont lues capteur par capteur avec des curseurs serveur
+(archives, blocs compactes et lignes brutes fusionnes a la volee), accumulees en
+colonnes et ecrites par lots de `batch_size` lignes: un lot correspond
+a un row group Parquet ou a un record batch Arrow. La memoire reste
+bornee par la taille d'un lot quelle que soit la periode exportee.
+"""
+import heapq
+
+import numpy as np
+
+from core.archive import archives_for, read_points
+from core.models import Mesure, MesureChunk
+from core.timeseries import to_ms, unpack
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optionnel
+    pa = pq = None
+
+FORMAT_PARQUET = "parquet"
+FORMAT_ARROW = "arrow"
+FORMATS = (FORMAT_PARQUET, FORMAT_ARROW)
+CONTENT_TYPES = {
+    FORMAT_PARQUET: "application/vnd.apache.parquet",
+    FORMAT_ARROW: "application/vnd.apache.arrow.stream",
+}
+DEFAULT_BATCH_SIZE = 100_000
+
+
+def available():
+    return pa is not None
+
+
+def schema(details=False):
+    fields = [
+        pa.field("capteur_id", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("date", pa.timestamp("ms", tz="UTC")),
+        pa.field("valeur", pa.float64()),
+    ]
+    if details:
+        fields += [
+            pa.field("capteur_type", pa.dictionary(pa.int32(), pa.string())),
+            pa.field("ruche_immatriculation", pa.dictionary(pa.int32(), pa.string())),
+        ]
+    return pa.schema(fields)
+
+
+def _archive_points(capteur_id, start_ms, end_ms, start, end):
+    for archive in archives_for(capteur_id, start, end):
+        ms, values = read_points(archive, start_ms, end_ms)
+        for m, v in zip(ms.tolist(), values.tolist()):
+            yield m, 0, v
+
+
+def _chunk_points(capteur_id, start_ms, end_ms, start, end):
+    chunks = MesureChunk.objects.filter(capteur_id=capteur_id).order_by("jour")
+    if start is not None:
+        chunks = chunks.filter(dateFin__gte=start)
+    if end is not None:
+        chunks = chunks.filter(dateDebut__lte=end)
+    for codec, ts_blob, val_blob in chunks.values_list("codec", "timestamps", "valeurs").iterator(chunk_size=50):
+        ms, values = unpack(codec, ts_blob, val_blob)
+        for m, v in zip(ms.tolist(), values.tolist()):
+            if (start_ms is None or m >= start_ms) and (end_ms is None or m <= end_ms):
+                yield m, 1, v
+
+
+def _raw_points(capteur_id, start, end):
+    rows = Mesure.objects.filter(capteur_id=capteur_id).order_by("date")
+    if start is not None:
+        rows = rows.filter(date__gte=start)
+    if end is not None:
+        rows = rows.filter(date__lte=end)
+    for date, valeur in rows.values_list("date", "valeur").iterator(chunk_size=5000):
+        yield to_ms(date), 2, valeur
+
+
+def iter_points(capteur_id, start=None, end=None):
+    """(epoch ms, valeur) tries; a date egale, brut > bloc > archive."""
+    start_ms = to_ms(start) if start is not None else None
+    end_ms = to_ms(end) if end is not None else None
+    merged = heapq.merge(
+        _archive_points(capteur_id, start_ms, end_ms, start, end),
+        _chunk_points(capteur_id, start_ms, end_ms, start, end),
+        _raw_points(capteur_id, start, end),
+    )
+    previous = None
+    for m, _, v in merged:
+        if previous is not None and previous[0] != m:
+            yield previous
+        previous = (m, v)
+    if previous is not None:
+        yield previous
+
+
+def iter_record_batches(capteurs, start=None, end=None, details=False, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    RecordBatch successifs pour un queryset de capteurs. Les colonnes
+    capteur sont encodees en dictionnaire (une entree par capteur).
+    """
+    target = schema(details)
+    rows = capteurs.order_by("id").values_list("id", "type", "ruche__immatriculation")
+    ids, types, immatriculations = [], [], []
+    buffers = {"capteur": [], "ms": [], "valeur": []}
+
+    def flush():
+        codes = pa.array(np.asarray(buffers["capteur"], dtype=np.int32))
+        columns = [
+            pa.DictionaryArray.from_arrays(codes, pa.array(ids, pa.string())),
+            pa.array(np.asarray(buffers["ms"], dtype=np.int64)).cast(pa.timestamp("ms", tz="UTC")),
+            pa.array(np.asarray(buffers["valeur"], dtype=np.float64)),
+        ]
+        if details:
+            columns += [
+                pa.DictionaryArray.from_arrays(codes, pa.array(types, pa.string())),
+                pa.DictionaryArray.from_arrays(codes, pa.array(immatriculations, pa.string())),
+            ]
+        for values in buffers.values():
+            values.clear()
+        return pa.RecordBatch.from_arrays(columns, schema=target)
+
+    for capteur_id, type_, immatriculation in rows.iterator(chunk_size=1000):
+        code = len(ids)
+        ids.append(str(capteur_id))
+        types.append(type_)
+        immatriculations.append(immatriculation)
+        for m, v in iter_points(capteur_id, start, end):
+            buffers["capteur"].append(code)
+            buffers["ms"].append(m)
+            buffers["valeur"].append(v)
+            if len(buffers["ms"]) >= batch_size:
+                yield flush()
+    if buffers["ms"]:
+        yield flush()
+
+
+class _Sink:
+    """Flux inscriptible dont on recupere le contenu au fil de l'ecriture."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _writer(sink, fmt, target):
+    stream = pa.PythonFile(sink, mode="w")
+    if fmt == FORMAT_PARQUET:
+        return pq.ParquetWriter(stream, target, compression="zstd")
+    return pa.ipc.new_stream(stream, target)
+
+
+def stream_export(capteurs, fmt=FORMAT_PARQUET, start=None, end=None, details=False,
+                  batch_size=DEFAULT_BATCH_SIZE):
+    """Genere le fichier exporte par morceaux (un par lot), pour StreamingHttpResponse."""
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {FORMATS}")
+    sink = _Sink()
+    writer = _writer(sink, fmt, schema(details))
+    for batch in iter_record_batches(capteurs, start, end, details, batch_size):
+        writer.write_batch(batch)
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+def write_export(path, capteurs, fmt=FORMAT_PARQUET, start=None, end=None, details=False,
+                 batch_size=DEFAULT_BATCH_SIZE):
+    """Ecrit l'export dans `path`; retourne le nombre de lignes."""
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {FORMATS}")
+    target = schema(details)
+    total = 0
+    with pa.OSFile(path, "wb") as sink:
+        if fmt == FORMAT_PARQUET:
+            writer = pq.ParquetWriter(sink, target, compression="zstd")
+        else:
+            writer = pa.ipc.new_stream(sink, target)
+        try:
+            for batch in iter_record_batches(capteurs, start, end, details, batch_size):
+                writer.write_batch(batch)
+                total += batch.num_rows
+        finally:
+            writer.close()
+    return total
+
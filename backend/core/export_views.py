@@ -0,0 +1,64 @@
+import uuid
+
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from core import export
+from core.auth_views import _get_user_from_request
+from core.iot_views import _entreprise_id_from_request, _ensure_user_in_entreprise, _normalize_type, _parse_date
+from core.models import Capteur
+
+
+@require_GET
+def export_mesures(request):
+    """GET /api/mesures/export?format=parquet|arrow - Export en flux de l'historique des mesures."""
+    user, err = _get_user_from_request(request)
+    if err:
+        return err
+
+    entreprise_id = _entreprise_id_from_request(request)
+    err = _ensure_user_in_entreprise(user, entreprise_id)
+    if err:
+        return err
+
+    if not export.available():
+        return JsonResponse({"error": "export_unavailable"}, status=501)
+
+    fmt = (request.GET.get("format") or export.FORMAT_PARQUET).lower()
+    if fmt not in export.FORMATS:
+        return JsonResponse({"error": "invalid_format"}, status=400)
+
+    start = end = None
+    if request.GET.get("from"):
+        start = _parse_date(request.GET.get("from"))
+        if start is None:
+            return JsonResponse({"error": "invalid_date"}, status=400)
+    if request.GET.get("to"):
+        end = _parse_date(request.GET.get("to"))
+        if end is None:
+            return JsonResponse({"error": "invalid_date"}, status=400)
+
+    capteurs = Capteur.objects.filter(ruche__rucher__entreprise_id=entreprise_id)
+    try:
+        capteur_ids = [uuid.UUID(value) for value in request.GET.getlist("capteurId")]
+    except ValueError:
+        return JsonResponse({"error": "invalid_capteur_id"}, status=400)
+    if capteur_ids:
+        capteurs = capteurs.filter(id__in=capteur_ids)
+    if request.GET.get("type"):
+        capteur_type = _normalize_type(request.GET.get("type"))
+        if not capteur_type:
+            return JsonResponse({"error": "invalid_type"}, status=400)
+        capteurs = capteurs.filter(type=capteur_type)
+    details = request.GET.get("details") in ("1", "true")
+
+    response = StreamingHttpResponse(
+        export.stream_export(capteurs, fmt=fmt, start=start, end=end, details=details),
+        content_type=export.CONTENT_TYPES[fmt],
+    )
+    extension = "parquet" if fmt == export.FORMAT_PARQUET else "arrows"
+    response["Content-Disposition"] = (
+        f'attachment; filename="mesures-{timezone.now():%Y%m%d}.{extension}"'
+    )
+    return response
@@ -0,0 +1,154 @@
+"""
+Trames compactes envoyees par les capteurs sur batterie.
+
+Trame binaire (little-endian), plusieurs trames pouvant se suivre dans
+un meme corps de requete:
+
+    magic     2s   b"BZ"
+    version   u8   1
+    flags     u8   bit 0: valeurs float16 (sinon float32), bit 1: batterie presente
+    shortId   u32  Capteur.shortId
+    base      u32  epoch en secondes
+    count     u16  nombre de mesures
+    batterie  u8   pourcentage, si flag bit 1
+    deltas    u16 * count  secondes depuis la mesure precedente (la premiere depuis base)
+    valeurs   f16/f32 * count
+
+Soit 14 octets d'en-tete puis 4 octets par mesure en float16. Les memes
+champs peuvent etre envoyes en CBOR ou MessagePack sous forme de liste
+de trames {"c": shortId, "t": base, "d": [deltas], "v": [valeurs], "b": batterie}.
+Les colonnes sont decodees sans copie (np.frombuffer sur un memoryview).
+"""
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+try:
+    import cbor2
+except ImportError:  # optionnel
+    cbor2 = None
+
+try:
+    import msgpack
+except ImportError:  # optionnel
+    msgpack = None
+
+MAGIC = b"BZ"
+VERSION = 1
+FLAG_FLOAT16 = 0x01
+FLAG_BATTERIE = 0x02
+
+CONTENT_TYPE_BINARY = "application/octet-stream"
+CONTENT_TYPE_CBOR = "application/cbor"
+CONTENT_TYPES_MSGPACK = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+_HEADER = struct.Struct("<2sBBIIH")
+_DELTA_DTYPE = np.dtype("<u2")
+_FLOAT16_DTYPE = np.dtype("<f2")
+_FLOAT32_DTYPE = np.dtype("<f4")
+
+Frame = namedtuple("Frame", ["short_id", "seconds", "valeurs", "batterie"])
+
+
+class FrameError(ValueError):
+    pass
+
+
+class UnsupportedFormat(FrameError):
+    pass
+
+
+def encode_frame(short_id, base, deltas, valeurs, batterie=None, float16=True):
+    """Trame binaire de reference (tests, firmware)."""
+    flags = (FLAG_FLOAT16 if float16 else 0) | (FLAG_BATTERIE if batterie is not None else 0)
+    parts = [_HEADER.pack(MAGIC, VERSION, flags, short_id, base, len(deltas))]
+    if batterie is not None:
+        parts.append(struct.pack("<B", int(batterie)))
+    parts.append(np.asarray(deltas, dtype=_DELTA_DTYPE).tobytes())
+    parts.append(np.asarray(valeurs, dtype=_FLOAT16_DTYPE if float16 else _FLOAT32_DTYPE).tobytes())
+    return b"".join(parts)
+
+
+def decode_binary(data):
+    """Decode une suite de trames binaires."""
+    view = memoryview(data)
+    frames = []
+    offset = 0
+    while offset < len(view):
+        if len(view) - offset < _HEADER.size:
+            raise FrameError("truncated header")
+        magic, version, flags, short_id, base, count = _HEADER.unpack_from(view, offset)
+        if magic != MAGIC or version != VERSION:
+            raise FrameError("bad magic or version")
+        offset += _HEADER.size
+        batterie = None
+        if flags & FLAG_BATTERIE:
+            if offset >= len(view):
+                raise FrameError("truncated frame")
+            batterie = view[offset]
+            offset += 1
+        value_dtype = _FLOAT16_DTYPE if flags & FLAG_FLOAT16 else _FLOAT32_DTYPE
+        end = offset + count * (_DELTA_DTYPE.itemsize + value_dtype.itemsize)
+        if end > len(view):
+            raise FrameError("truncated frame")
+        deltas = np.frombuffer(view, dtype=_DELTA_DTYPE, count=count, offset=offset)
+        offset += count * _DELTA_DTYPE.itemsize
+        valeurs = np.frombuffer(view, dtype=value_dtype, count=count, offset=offset)
+        offset = end
+        frames.append(Frame(short_id, base + np.cumsum(deltas, dtype=np.int64), valeurs, batterie))
+    return frames
+
+
+_U16_MAX = 0xFFFF
+_U32_MAX = 0xFFFFFFFF
+
+
+def _from_mapping(items):
+    """Memes bornes que la trame binaire: c et t en u32, d en u16, b entier de 0 a 100."""
+    if not isinstance(items, list):
+        raise FrameError("expected a list of frames")
+    frames = []
+    for item in items:
+        try:
+            short_id = item["c"]
+            base = item["t"]
+            deltas = np.asarray(item.get("d") or [], dtype=np.int64)
+            valeurs = np.asarray(item.get("v") or [], dtype=np.float64)
+            batterie = item.get("b")
+        except (KeyError, TypeError, ValueError, OverflowError, AttributeError):
+            raise FrameError("invalid frame")
+        if not _is_uint(short_id, _U32_MAX) or not _is_uint(base, _U32_MAX):
+            raise FrameError("invalid frame")
+        if deltas.shape != valeurs.shape or deltas.ndim != 1:
+            raise FrameError("invalid frame")
+        if (deltas < 0).any() or (deltas > _U16_MAX).any():
+            raise FrameError("invalid frame")
+        if batterie is not None and not _is_uint(batterie, 100):
+            raise FrameError("invalid frame")
+        frames.append(Frame(short_id, base + np.cumsum(deltas), valeurs, batterie))
+    return frames
+
+
+def _is_uint(value, maximum):
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= maximum
+
+
+def decode(data, content_type):
+    """Trames du corps `data` selon son Content-Type."""
+    content_type = (content_type or "").lower()
+    if content_type == CONTENT_TYPE_BINARY:
+        return decode_binary(data)
+    if content_type == CONTENT_TYPE_CBOR and cbor2 is not None:
+        try:
+            items = cbor2.loads(data)
+        except Exception:
+            raise FrameError("invalid cbor")
+        return _from_mapping(items)
+    if content_type in CONTENT_TYPES_MSGPACK and msgpack is not None:
+        try:
+            items = msgpack.unpackb(data, raw=False)
+        except Exception:
+            raise FrameError("invalid msgpack")
+        return _from_mapping(items)
+    raise UnsupportedFormat(content_type)
@@ -0,0 +1,76 @@
+"""
+Planification adaptative des verifications GPS.
+
+Chaque capteur GPS porte sa prochaine date de verification (gpsNextCheckAt).
+Un tracker qui bouge, qui s'approche de son seuil ou qui a declenche une
+alerte recemment est reverifie a l'intervalle minimal; un tracker immobile
+voit son intervalle doubler a chaque verification, jusqu'au maximum.
+La file de priorite est l'index sur gpsNextCheckAt: les capteurs les plus
+en retard sont traites en premier.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+
+
+def _min_interval():
+    return int(getattr(settings, "GPS_CHECK_MIN_INTERVAL_SECONDS", 300))
+
+
+def _max_interval():
+    return max(_min_interval(), int(getattr(settings, "GPS_CHECK_MAX_INTERVAL_SECONDS", 3600)))
+
+
+def _recent_alert_window():
+    return timedelta(hours=int(getattr(settings, "GPS_CHECK_RECENT_ALERT_HOURS", 24)))
+
+
+def _movement_tolerance(capteur):
+    """Variation de distance consideree comme un mouvement (bruit GPS exclu)."""
+    return max(10.0, (capteur.gpsThresholdMeters or 0) * 0.1)
+
+
+def next_check_interval(capteur, distance, now):
+    """Intervalle (s) avant la prochaine verification, d'apres la distance mesuree."""
+    min_s = _min_interval()
+    previous_distance = capteur.gpsLastDistanceMeters
+    moved = previous_distance is None or abs(distance - previous_distance) > _movement_tolerance(capteur)
+    near_threshold = distance > (capteur.gpsThresholdMeters or 0) * 0.5
+    recently_alerted = bool(
+        capteur.gpsLastAlertAt and now - capteur.gpsLastAlertAt < _recent_alert_window()
+    )
+    if moved or near_threshold or recently_alerted:
+        return min_s
+    previous = capteur.gpsCheckIntervalSeconds or min_s
+    return min(_max_interval(), previous * 2)
+
+
+def apply_check_result(capteur, distance, now):
+    """Met a jour la planification apres une mesure; retourne les champs modifies."""
+    interval = next_check_interval(capteur, distance, now)
+    capteur.gpsLastDistanceMeters = distance
+    capteur.gpsCheckIntervalSeconds = interval
+    capteur.gpsNextCheckAt = now + timedelta(seconds=interval)
+    return ["gpsLastDistanceMeters", "gpsCheckIntervalSeconds", "gpsNextCheckAt"]
+
+
+def apply_check_failure(capteur, now):
+    """Position indisponible: on reessaie a l'intervalle minimal sans toucher au backoff."""
+    capteur.gpsNextCheckAt = now + timedelta(seconds=_min_interval())
+    return ["gpsNextCheckAt"]
+
+
+def reset_schedule(capteur, now):
+    """A utiliser quand la reference change: verification rapide et backoff remis a zero."""
+    capteur.gpsLastDistanceMeters = None
+    capteur.gpsCheckIntervalSeconds = None
+    capteur.gpsNextCheckAt = now
+    return ["gpsLastDistanceMeters", "gpsCheckIntervalSeconds", "gpsNextCheckAt"]
+
+
+def due_capteurs(queryset, now):
+    """Capteurs a verifier maintenant, les plus en retard d'abord (jamais planifies en tete)."""
+    return queryset.filter(
+        Q(gpsNextCheckAt__isnull=True) | Q(gpsNextCheckAt__lte=now)
+    ).order_by(F("gpsNextCheckAt").asc(nulls_first=True))
@@ -0,0 +1,205 @@
+"""
+Score de sante des ruches ("quelles ruches demandent attention").
+
+Le score part de 100 et perd des points par composante:
+- statut (Faible, Malade, Morte) et maladie declaree;
+- anciennete de la derniere intervention au-dela de SANTE_VISITE_JOURS;
+- alertes non acquittees sur les capteurs de la ruche;
+- perte de poids: pente robuste (core.weight_forecast) des poids
+  journaliers sur SANTE_POIDS_JOURS jours, sous SANTE_PERTE_POIDS_KG_JOUR.
+
+Par lot de ruches, chaque source est lue en une requete puis rangee dans
+des tableaux numpy alignes sur l'ordre des ruches; les penalites sont
+calculees sur ces colonnes. Les scores sont stockes dans ruches_sante.
+
+Recalcul incremental: les triggers de ruches, interventions, alertes et
+capteurs renseignent ruches_sante.invalideAt; refresh() ne recalcule que
+les ruches sans score, invalidees depuis leur calcul ou calculees avant
+le jour UTC courant (anciennete de visite et poids journaliers).
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from core.models import (
+    Alerte,
+    Capteur,
+    Ruche,
+    RucheSante,
+    StatutRuche,
+    TypeAlerte,
+    TypeCapteur,
+    TypeMaladie,
+)
+from core.weight_forecast import daily_matrix, robust_trend
+
+PENALITES_STATUT = {
+    StatutRuche.ACTIVE.value: 0.0,
+    StatutRuche.FAIBLE.value: 25.0,
+    StatutRuche.MALADE.value: 40.0,
+    StatutRuche.MORTE.value: 100.0,
+}
+PENALITE_MALADIE = 25.0
+PENALITES_MALADIE = {
+    TypeMaladie.AUCUNE: 0.0,
+    TypeMaladie.LOQUE_AMERICAINE: 40.0,
+    TypeMaladie.LOQUE_EUROPEENNE: 40.0,
+}
+# Visite: 0 point a SANTE_VISITE_JOURS jours, le maximum au double (ou sans intervention).
+PENALITE_VISITE_MAX = 20.0
+PENALITE_ALERTE = 10.0
+PENALITE_ALERTE_GRAVE = 20.0
+PENALITE_ALERTES_MAX = 40.0
+ALERTES_GRAVES = (TypeAlerte.VOL.value, TypeAlerte.CHUTE_POIDS.value, TypeAlerte.TEMPERATURE_CRITIQUE.value)
+# Points retires par kg/jour de perte au-dela du seuil.
+PENALITE_POIDS_PAR_KG = 20.0
+PENALITE_POIDS_MAX = 20.0
+
+COMPOSANTES = ("statut", "maladie", "visite", "alertes", "poids")
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _load_ruches(ruche_ids):
+    return list(
+        Ruche.objects.filter(id__in=ruche_ids)
+        .order_by("id")
+        .values_list("id", "rucher__entreprise_id", "statut", "maladie", "derniereVisiteAt")
+    )
+
+
+def _open_alerts(ruche_ids):
+    return {
+        row["capteur__ruche_id"]: (row["n"], row["graves"])
+        for row in Alerte.objects.filter(acquittee=False, capteur__ruche_id__in=ruche_ids)
+        .values("capteur__ruche_id")
+        .annotate(n=Count("id"), graves=Count("id", filter=Q(type__in=ALERTES_GRAVES)))
+    }
+
+
+def _weight_slopes(ruche_ids, index, today):
+    """Pente de poids la plus basse (kg/jour) des capteurs Poids de chaque ruche, NaN sans donnees."""
+    slopes = np.full(len(index), np.nan)
+    capteurs = list(
+        Capteur.objects.filter(actif=True, type=TypeCapteur.POIDS.value, ruche_id__in=ruche_ids)
+        .values_list("id", "ruche_id")
+    )
+    if not capteurs:
+        return slopes
+    n_days = int(_setting("SANTE_POIDS_JOURS", 7))
+    matrix = daily_matrix([c[0] for c in capteurs], today - timedelta(days=n_days), n_days)
+    capteur_slopes, _ = robust_trend(matrix)
+    rows = np.array([index[ruche_id] for _, ruche_id in capteurs])
+    valid = ~np.isnan(capteur_slopes)
+    # fmin ignore NaN: une ruche garde la pente la plus defavorable de ses capteurs.
+    np.fmin.at(slopes, rows[valid], capteur_slopes[valid])
+    return slopes
+
+
+def penalites(statut, maladie, jours_visite, alertes, alertes_graves, pente_poids,
+              visite_jours=30, perte_poids=0.3):
+    """Penalites par composante (tableaux numpy, une valeur par ruche) et score 0-100."""
+    statut_pts = np.array([PENALITES_STATUT.get(s, 0.0) for s in statut])
+    maladie_pts = np.array([PENALITES_MALADIE.get(m, PENALITE_MALADIE) for m in maladie])
+    jours = np.asarray(jours_visite, dtype=np.float64)
+    # Sans intervention (NaN): penalite maximale.
+    visite_pts = np.where(
+        np.isnan(jours),
+        PENALITE_VISITE_MAX,
+        np.clip((jours - visite_jours) / visite_jours, 0.0, 1.0) * PENALITE_VISITE_MAX,
+    )
+    alertes_pts = np.minimum(
+        PENALITE_ALERTE * (np.asarray(alertes) - np.asarray(alertes_graves))
+        + PENALITE_ALERTE_GRAVE * np.asarray(alertes_graves),
+        PENALITE_ALERTES_MAX,
+    )
+    perte = -np.nan_to_num(np.asarray(pente_poids, dtype=np.float64), nan=0.0) - perte_poids
+    poids_pts = np.clip(perte * PENALITE_POIDS_PAR_KG, 0.0, PENALITE_POIDS_MAX)
+    composantes = np.column_stack([statut_pts, maladie_pts, visite_pts, alertes_pts, poids_pts])
+    score = np.clip(100.0 - composantes.sum(axis=1), 0.0, 100.0)
+    return composantes, score
+
+
+def compute(ruche_ids, now=None):
+    """RucheSante (non enregistrees) pour les ruches donnees: une requete par source."""
+    now = now or timezone.now()
+    ruches = _load_ruches(ruche_ids)
+    if not ruches:
+        return []
+    ids = [r[0] for r in ruches]
+    index = {ruche_id: i for i, ruche_id in enumerate(ids)}
+
+    alerts = _open_alerts(ids)
+    slopes = _weight_slopes(ids, index, now.date())
+
+    last = [r[4] for r in ruches]
+    jours_visite = np.array([np.nan if d is None else (now - d).total_seconds() / 86400 for d in last])
+    counts = np.array([alerts.get(ruche_id, (0, 0)) for ruche_id in ids]).reshape(-1, 2)
+    composantes, score = penalites(
+        [r[2] for r in ruches],
+        [r[3] for r in ruches],
+        jours_visite,
+        counts[:, 0],
+        counts[:, 1],
+        slopes,
+        visite_jours=int(_setting("SANTE_VISITE_JOURS", 30)),
+        perte_poids=float(_setting("SANTE_PERTE_POIDS_KG_JOUR", 0.3)),
+    )
+
+    return [
+        RucheSante(
+            ruche_id=ruche_id,
+            entreprise_id=entreprise_id,
+            score=round(float(score[i]), 1),
+            penalites={
+                nom: round(float(points), 1)
+                for nom, points in zip(COMPOSANTES, composantes[i]) if points > 0
+            },
+            derniereInterventionAt=last[i],
+            alertesOuvertes=int(counts[i, 0]),
+            tendancePoidsKgJour=None if np.isnan(slopes[i]) else round(float(slopes[i]), 3),
+            calculeAt=now,
+        )
+        for i, (ruche_id, entreprise_id, _, _, _) in enumerate(ruches)
+    ]
+
+
+def save(objects):
+    RucheSante.objects.bulk_create(
+        objects,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["ruche"],
+        update_fields=[
+            "entreprise", "score", "penalites", "derniereInterventionAt", "alertesOuvertes",
+            "tendancePoidsKgJour", "calculeAt", "updated_at",
+        ],
+    )
+
+
+def stale_ruche_ids(now=None, all_ruches=False):
+    """Ruches sans score, invalidees depuis le dernier calcul ou calculees avant aujourd'hui (UTC)."""
+    ruches = Ruche.objects.order_by("id")
+    if not all_ruches:
+        now = now or timezone.now()
+        day_start = datetime.combine(now.astimezone(dt_timezone.utc).date(), time.min, tzinfo=dt_timezone.utc)
+        ruches = ruches.filter(
+            Q(sante__isnull=True)
+            | Q(sante__calculeAt__lt=day_start)
+            | Q(sante__invalideAt__gt=F("sante__calculeAt"))
+        )
+    return list(ruches.values_list("id", flat=True))
+
+
+def refresh(batch_size=1000, all_ruches=False, now=None):
+    """Recalcule les scores perimes par lots; retourne le nombre de ruches recalculees."""
+    now = now or timezone.now()
+    ruche_ids = stale_ruche_ids(now, all_ruches)
+    for start in range(0, len(ruche_ids), batch_size):
+        save(compute(ruche_ids[start:start + batch_size], now))
+    return len(ruche_ids)
@@ -0,0 +1,319 @@
+"""
+Serveur d'ingestion UDP/TCP pour les passerelles a format fixe.
+
+Formats acceptes:
+- lignes texte `identifiant valeur [date] [batterie]` (separateur espace,
+  `;` ou `,`; date en epoch secondes ou ISO 8601, maintenant par defaut),
+  une par ligne en TCP, une ou plusieurs par datagramme en UDP;
+- trames binaires `BZ` (core.frames) en UDP, un datagramme pouvant
+  contenir plusieurs trames.
+
+Les identifiants et shortId sont resolus dans une table en memoire
+rechargee toutes les `refresh_seconds`; les lignes passent par une file
+bornee vers une tache d'ecriture qui les ecrit par lots (write_mesures)
+dans un thread dedie a la base. Quand la file est pleine, les connexions
+TCP cessent d'etre lues et les datagrammes UDP sont comptes comme perdus.
+Seules les erreurs transitoires de la base sont reessayees: les lignes
+refusees (capteur supprime entre deux rechargements...) sont ecartees.
+
+Le protocole n'est pas authentifie: la commande ecoute par defaut sur
+127.0.0.1 et exige INGEST_SERVER_ALLOWED_NETWORKS pour une autre adresse.
+"""
+import asyncio
+import ipaddress
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import frames
+from core.ingestion import ON_CONFLICT_IGNORE, TRANSIENT_DB_ERRORS, write_mesures_isolating
+from core.models import Capteur
+
+logger = logging.getLogger(__name__)
+
+MAX_LINE = 256
+
+
+class LineError(ValueError):
+    pass
+
+
+def parse_line(line):
+    """(identifiant, date ou None, valeur, batterie ou None) d'une ligne texte."""
+    fields = line.replace(";", " ").replace(",", " ").split()
+    if len(fields) < 2 or len(fields) > 4:
+        raise LineError("expected 2 to 4 fields")
+    identifiant = fields[0]
+    try:
+        valeur = float(fields[1])
+    except ValueError:
+        raise LineError("invalid valeur")
+    if not math.isfinite(valeur):
+        raise LineError("invalid valeur")
+    date = None
+    if len(fields) > 2:
+        try:
+            date = datetime.fromtimestamp(float(fields[2]), tz=dt_timezone.utc)
+        except (ValueError, OverflowError, OSError):
+            date = parse_datetime(fields[2])
+            if date is None:
+                raise LineError("invalid date")
+            if timezone.is_naive(date):
+                date = timezone.make_aware(date, dt_timezone.utc)
+    batterie = None
+    if len(fields) > 3:
+        try:
+            batterie = int(fields[3])
+        except ValueError:
+            raise LineError("invalid batterie")
+        if not 0 <= batterie <= 100:
+            batterie = None
+    return identifiant, date, valeur, batterie
+
+
+class CapteurMap:
+    """identifiant et shortId -> capteur_id des capteurs actifs, recharge periodiquement."""
+
+    def __init__(self):
+        self.by_identifiant = {}
+        self.by_short_id = {}
+
+    def load(self):
+        by_identifiant = {}
+        by_short_id = {}
+        for capteur_id, identifiant, short_id in Capteur.objects.filter(actif=True).values_list(
+            "id", "identifiant", "shortId"
+        ).iterator(chunk_size=5000):
+            by_identifiant[identifiant] = capteur_id
+            if short_id is not None:
+                by_short_id[short_id] = capteur_id
+        # Remplacement d'un bloc: les lecteurs voient l'ancienne ou la nouvelle table.
+        self.by_identifiant, self.by_short_id = by_identifiant, by_short_id
+        return len(by_identifiant)
+
+
+class IngestServer:
+    def __init__(self, batch_size=2000, flush_ms=200, queue_size=1000, refresh_seconds=60,
+                 on_conflict=ON_CONFLICT_IGNORE, allowed_networks=()):
+        self.batch_size = batch_size
+        self.flush_delay = flush_ms / 1000.0
+        self.refresh_seconds = refresh_seconds
+        self.on_conflict = on_conflict
+        self.allowed_networks = [ipaddress.ip_network(n, strict=False) for n in allowed_networks]
+        self.capteurs = CapteurMap()
+        # File de listes de lignes (une par datagramme ou par lot de lignes TCP).
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.stats = {
+            "received": 0, "rejected": 0, "unknown": 0, "dropped": 0,
+            "inserted": 0, "updated": 0, "duplicates": 0, "quarantined": 0, "invalid": 0,
+        }
+        self.addresses = {}
+        self.ready = asyncio.Event()
+        # Un seul thread pour la base: connexion Django reutilisee d'un lot a l'autre.
+        self._db = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-db")
+
+    def allowed(self, host):
+        if not self.allowed_networks:
+            return True
+        address = ipaddress.ip_address(host)
+        return any(address in network for network in self.allowed_networks)
+
+    def _line_row(self, line, now):
+        try:
+            identifiant, date, valeur, batterie = parse_line(line)
+        except LineError:
+            self.stats["rejected"] += 1
+            return None
+        capteur_id = self.capteurs.by_identifiant.get(identifiant)
+        if capteur_id is None:
+            self.stats["unknown"] += 1
+            return None
+        return capteur_id, date or now, valeur, batterie
+
+    def rows_from_lines(self, lines):
+        now = timezone.now()
+        rows = []
+        for line in lines:
+            line = line.strip()
+            if line:
+                row = self._line_row(line, now)
+                if row is not None:
+                    rows.append(row)
+        return rows
+
+    def rows_from_frames(self, data):
+        try:
+            decoded = frames.decode_binary(data)
+        except frames.FrameError:
+            self.stats["rejected"] += 1
+            return []
+        rows = []
+        for frame in decoded:
+            capteur_id = self.capteurs.by_short_id.get(frame.short_id)
+            if capteur_id is None:
+                self.stats["unknown"] += len(frame.valeurs)
+                continue
+            batterie = frame.batterie if frame.batterie is not None and 0 <= frame.batterie <= 100 else None
+            for seconds, valeur in zip(frame.seconds.tolist(), frame.valeurs.tolist()):
+                if math.isfinite(valeur):
+                    rows.append((capteur_id, datetime.fromtimestamp(seconds, tz=dt_timezone.utc), valeur, batterie))
+        return rows
+
+    def rows_from_datagram(self, data):
+        if data[:len(frames.MAGIC)] == frames.MAGIC:
+            return self.rows_from_frames(data)
+        try:
+            text = data.decode("ascii")
+        except UnicodeDecodeError:
+            self.stats["rejected"] += 1
+            return []
+        return self.rows_from_lines(text.splitlines())
+
+    def offer(self, rows):
+        """Depot sans attente (UDP): les lignes sont perdues si la file est pleine."""
+        if not rows:
+            return
+        try:
+            self.queue.put_nowait(rows)
+            self.stats["received"] += len(rows)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += len(rows)
+
+    async def put(self, rows):
+        """Depot avec attente (TCP): suspend la lecture de la connexion si la file est pleine."""
+        if rows:
+            await self.queue.put(rows)
+            self.stats["received"] += len(rows)
+
+    def _write(self, rows):
+        try:
+            return write_mesures_isolating(rows, on_conflict=self.on_conflict)
+        except TRANSIENT_DB_ERRORS:
+            connections.close_all()
+            raise
+
+    async def _run_db(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._db, func, *args)
+
+    async def refresh(self):
+        return await self._run_db(self.capteurs.load)
+
+    async def refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Rechargement des capteurs impossible")
+
+    async def flush(self, rows, retry=True):
+        delay = 0.5
+        while True:
+            try:
+                result, invalid = await self._run_db(self._write, rows)
+                break
+            except TRANSIENT_DB_ERRORS:
+                if not retry:
+                    raise
+                logger.exception("Ecriture de %d mesure(s) impossible, nouvel essai dans %.1fs", len(rows), delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+        for key, value in result.items():
+            self.stats[key] += value
+        if invalid:
+            # Capteurs supprimes ou desactives depuis le dernier rechargement.
+            logger.warning("%d mesure(s) ecartee(s) par la base, rechargement des capteurs", len(invalid))
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Rechargement des capteurs impossible")
+
+    async def writer(self):
+        """Regroupe les lignes de la file en lots de batch_size ou flush_ms, jusqu'a la sentinelle None."""
+        pending = []
+        first_at = None
+        while True:
+            timeout = None if first_at is None else max(0.0, self.flush_delay - (time.monotonic() - first_at))
+            try:
+                rows = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                rows = []
+            if rows is None:
+                if pending:
+                    await self.flush(pending, retry=False)
+                return
+            pending.extend(rows)
+            if pending and first_at is None:
+                first_at = time.monotonic()
+            if pending and (len(pending) >= self.batch_size or time.monotonic() - first_at >= self.flush_delay):
+                await self.flush(pending)
+                pending, first_at = [], None
+
+    async def handle_tcp(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        if peer and not self.allowed(peer[0]):
+            writer.close()
+            return
+        buffer = b""
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                *lines, buffer = (buffer + chunk).split(b"\n")
+                if len(buffer) > MAX_LINE:
+                    self.stats["rejected"] += 1
+                    return
+                # Attend tant que la file est pleine: la connexion n'est plus lue.
+                await self.put(self.rows_from_lines(line.decode("ascii", "replace") for line in lines))
+            await self.put(self.rows_from_lines([buffer.decode("ascii", "replace")]))
+        finally:
+            writer.close()
+
+    async def serve(self, host="0.0.0.0", udp_port=None, tcp_port=None, stop=None):
+        """Demarre les ecoutes et la tache d'ecriture jusqu'a `stop` (asyncio.Event)."""
+        loop = asyncio.get_running_loop()
+        stop = stop or asyncio.Event()
+        await self.refresh()
+        writer = asyncio.create_task(self.writer())
+        refresher = asyncio.create_task(self.refresh_loop())
+        servers = []
+        transport = None
+        try:
+            if udp_port is not None:
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda: _DatagramProtocol(self), local_addr=(host, udp_port)
+                )
+                self.addresses["udp"] = transport.get_extra_info("sockname")
+            if tcp_port is not None:
+                servers.append(await asyncio.start_server(self.handle_tcp, host, tcp_port))
+                self.addresses["tcp"] = servers[0].sockets[0].getsockname()
+            self.ready.set()
+            await stop.wait()
+        finally:
+            if transport is not None:
+                transport.close()
+            for server in servers:
+                server.close()
+                await server.wait_closed()
+            refresher.cancel()
+            # Sentinelle plutot qu'une annulation: le lot en cours et la file sont ecrits.
+            await self.queue.put(None)
+            await asyncio.gather(writer, refresher, return_exceptions=True)
+            await self._run_db(connections.close_all)
+            self._db.shutdown(wait=True)
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        if self.server.allowed(addr[0]):
+            self.server.offer(self.server.rows_from_datagram(data))
@@ -0,0 +1,220 @@
+import hmac
+import math
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+
+from core import frames, lorawan, spectres
+from core.auth_views import _get_user_from_request, _json_body
+from core.ingestion import (
+    ON_CONFLICT_CHOICES,
+    ON_CONFLICT_IGNORE,
+    ON_CONFLICT_UPDATE,
+    TRANSIENT_DB_ERRORS,
+    write_mesures,
+)
+from core.iot_views import _entreprise_id_from_request, _ensure_user_in_entreprise, _parse_date
+from core.models import Capteur, TypeCapteur
+
+MAX_MESURES_PER_REQUEST = 5000
+
+
+def _parse_valeur(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        valeur = float(value)
+    except (TypeError, ValueError):
+        return None
+    return valeur if math.isfinite(valeur) else None
+
+
+def _capteur_ref(item):
+    """('id', UUID) ou ('identifiant', str) selon la cle fournie."""
+    capteur_id = item.get("capteurId") or item.get("capteur_id")
+    if capteur_id:
+        try:
+            return "id", uuid.UUID(str(capteur_id))
+        except ValueError:
+            return None
+    identifiant = item.get("identifiant")
+    if isinstance(identifiant, str) and identifiant.strip():
+        return "identifiant", identifiant.strip()
+    return None
+
+
+@require_POST
+def ingest_mesures(request):
+    """POST /api/mesures/ingest - Ingestion groupee et idempotente de mesures (capteur + date)."""
+    user, err = _get_user_from_request(request)
+    if err:
+        return err
+
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({"error": "invalid_json"}, status=400)
+
+    entreprise_id = _entreprise_id_from_request(request)
+    err = _ensure_user_in_entreprise(user, entreprise_id)
+    if err:
+        return err
+
+    on_conflict = data.get("onConflict") or ON_CONFLICT_IGNORE
+    if on_conflict not in ON_CONFLICT_CHOICES:
+        return JsonResponse({"error": "invalid_on_conflict"}, status=400)
+
+    items = data.get("mesures")
+    if not isinstance(items, list) or not items:
+        return JsonResponse({"error": "missing_mesures"}, status=400)
+    if len(items) > MAX_MESURES_PER_REQUEST:
+        return JsonResponse(
+            {"error": "too_many_mesures", "max": MAX_MESURES_PER_REQUEST}, status=413
+        )
+
+    parsed = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            return JsonResponse({"error": "invalid_mesure", "index": index}, status=400)
+        ref = _capteur_ref(item)
+        date = _parse_date(item.get("date"))
+        valeur = _parse_valeur(item.get("valeur"))
+        batterie = None
+        if item.get("batteriePct") is not None:
+            batterie = _parse_valeur(item.get("batteriePct"))
+            if batterie is None or not 0 <= batterie <= 100:
+                return JsonResponse({"error": "invalid_mesure", "index": index}, status=400)
+        if ref is None or date is None or valeur is None:
+            return JsonResponse({"error": "invalid_mesure", "index": index}, status=400)
+        try:
+            vecteur = spectres.parse_vecteur(item)
+        except spectres.SpectreError as exc:
+            return JsonResponse({"error": "invalid_spectre", "index": index, "detail": str(exc)}, status=400)
+        parsed.append((ref, date, valeur, batterie, vecteur))
+
+    ids = {ref[1] for ref, *_ in parsed if ref[0] == "id"}
+    identifiants = {ref[1] for ref, *_ in parsed if ref[0] == "identifiant"}
+    by_id = {}
+    by_identifiant = {}
+    types = {}
+    for capteur_id, identifiant, capteur_type in Capteur.objects.filter(
+        Q(id__in=ids) | Q(identifiant__in=identifiants),
+        ruche__rucher__entreprise_id=entreprise_id,
+    ).values_list("id", "identifiant", "type"):
+        by_id[capteur_id] = capteur_id
+        by_identifiant[identifiant] = capteur_id
+        types[capteur_id] = capteur_type
+
+    rows = []
+    spectre_rows = []
+    for index, (ref, date, valeur, batterie, vecteur) in enumerate(parsed):
+        capteur_id = (by_id if ref[0] == "id" else by_identifiant).get(ref[1])
+        if capteur_id is None:
+            return JsonResponse({"error": "capteur_not_found", "index": index}, status=404)
+        rows.append((capteur_id, date, valeur, batterie))
+        if vecteur is not None:
+            if types[capteur_id] != TypeCapteur.SON:
+                return JsonResponse(
+                    {"error": "invalid_spectre", "index": index, "detail": "not a Son capteur"}, status=400
+                )
+            spectre_rows.append((capteur_id, date, vecteur))
+
+    stats = write_mesures(rows, on_conflict=on_conflict)
+    if spectre_rows:
+        stats["spectres"] = spectres.write_spectres(
+            spectre_rows,
+            keep_spectre=bool(data.get("conserverSpectre")),
+            update=on_conflict == ON_CONFLICT_UPDATE,
+        )
+    return JsonResponse({"received": len(rows), **stats}, status=200)
+
+
+def _verify_ingest_key(request):
+    expected = getattr(settings, "INGEST_API_KEY", "")
+    if not expected:
+        return False
+    return hmac.compare_digest(request.headers.get("X-Ingest-Key", ""), expected)
+
+
+def _frame_rows(decoded):
+    """Lignes pour write_mesures et nombre de mesures de capteurs inconnus ou inactifs."""
+    short_ids = {frame.short_id for frame in decoded}
+    capteurs = dict(
+        Capteur.objects.filter(shortId__in=short_ids, actif=True).values_list("shortId", "id")
+    )
+    rows = []
+    unknown = 0
+    for frame in decoded:
+        capteur_id = capteurs.get(frame.short_id)
+        if capteur_id is None:
+            unknown += len(frame.valeurs)
+            continue
+        batterie = frame.batterie if frame.batterie is not None and 0 <= frame.batterie <= 100 else None
+        for seconds, valeur in zip(frame.seconds.tolist(), frame.valeurs.tolist()):
+            if math.isfinite(valeur):
+                rows.append((capteur_id, datetime.fromtimestamp(seconds, tz=dt_timezone.utc), valeur, batterie))
+    return rows, unknown
+
+
+@require_POST
+def ingest_mesures_binary(request):
+    """POST /api/mesures/ingest/binary - Trames compactes des capteurs (binaire, CBOR ou MessagePack)."""
+    if not _verify_ingest_key(request):
+        return JsonResponse({"error": "Unauthorized"}, status=401)
+
+    try:
+        decoded = frames.decode(request.body, request.content_type)
+    except frames.UnsupportedFormat:
+        return JsonResponse({"error": "unsupported_media_type"}, status=415)
+    except frames.FrameError as exc:
+        return JsonResponse({"error": "invalid_frame", "detail": str(exc)}, status=400)
+
+    rows, unknown = _frame_rows(decoded)
+    if len(rows) > MAX_MESURES_PER_REQUEST:
+        return JsonResponse(
+            {"error": "too_many_mesures", "max": MAX_MESURES_PER_REQUEST}, status=413
+        )
+    stats = write_mesures(rows)
+    return JsonResponse({"received": len(rows), "unknown": unknown, **stats}, status=200)
+
+
+@require_POST
+def lorawan_uplink(request):
+    """
+    POST /api/lorawan/uplink - Uplinks LoRaWAN relayes par le serveur reseau (TTS, ChirpStack).
+
+    La reponse attend l'ecriture du lot (BatchBuffer): 200 signifie que les
+    mesures sont stockees, une erreur de base donne 503 pour que le serveur
+    reseau renvoie l'uplink.
+    """
+    if not _verify_ingest_key(request):
+        return JsonResponse({"error": "Unauthorized"}, status=401)
+
+    # ChirpStack poste aussi les evenements join, status, ack... sur la meme URL.
+    event = request.GET.get("event")
+    if event and event != "up":
+        return JsonResponse({"status": "ignored"}, status=200)
+
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({"error": "invalid_json"}, status=400)
+
+    uplinks = []
+    for item in data if isinstance(data, list) else [data]:
+        try:
+            uplinks.append(lorawan.parse_uplink(item))
+        except lorawan.UplinkError as exc:
+            return JsonResponse({"error": "invalid_uplink", "detail": str(exc)}, status=400)
+
+    rows, ignored = lorawan.uplink_rows(uplinks)
+    if not rows:
+        return JsonResponse({"status": "written", "mesures": 0, "ignored": ignored}, status=200)
+    try:
+        stats = lorawan.buffer().add(rows)
+    except TRANSIENT_DB_ERRORS:
+        # Le serveur reseau renvoie l'uplink; l'ecriture est idempotente.
+        return JsonResponse({"error": "database_unavailable"}, status=503)
+    return JsonResponse({"status": "written", "mesures": len(rows), "ignored": ignored, **stats}, status=200)
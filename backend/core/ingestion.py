@@ -0,0 +1,376 @@
+"""
+Ecriture groupee des mesures.
+
+Les capteurs retransmettent souvent apres une perte de connexion: la
+contrainte unique (capteur, date) rend l'ingestion idempotente, chaque
+lot est insere en une requete INSERT ... ON CONFLICT. L'etat courant de
+chaque capteur (capteur_state) est ensuite rafraichi en une requete par lot.
+Les mesures implausibles sont ecartees avant l'ecriture (core.validation).
+"""
+import logging
+import threading
+import time
+import uuid
+
+from django.db import DataError, IntegrityError, InterfaceError, OperationalError, connection, transaction
+from django.utils import timezone
+
+from core import validation
+from core.models import Capteur
+
+logger = logging.getLogger(__name__)
+
+ON_CONFLICT_IGNORE = "ignore"
+ON_CONFLICT_UPDATE = "update"
+ON_CONFLICT_CHOICES = (ON_CONFLICT_IGNORE, ON_CONFLICT_UPDATE)
+
+INSERT_BATCH_SIZE = 1000
+# Erreurs a reessayer (base indisponible, connexion perdue); les autres
+# erreurs d'un lot viennent de ses lignes et se reproduiraient a l'identique.
+TRANSIENT_DB_ERRORS = (OperationalError, InterfaceError)
+# Poids de la derniere observation dans la cadence moyenne de capteur_state.
+STATE_INTERVAL_ALPHA = 0.2
+
+# Conserve la premiere mesure recue pour chaque (capteur, date).
+_DEDUPE_SQL = """
+    DELETE FROM mesures m
+    USING (
+        SELECT id, row_number() OVER (
+            PARTITION BY capteur_id, date ORDER BY created_at, id
+        ) AS rn
+        FROM mesures
+        WHERE capteur_id = ANY(%s)
+    ) d
+    WHERE m.id = d.id AND d.rn > 1
+"""
+
+
+def _unique_rows(rows):
+    """
+    Une seule ligne par (capteur, date) dans un lot: la derniere recue l'emporte.
+    Chaque ligne vaut (capteur_id, date, valeur) ou (capteur_id, date, valeur, batterie_pct).
+    """
+    latest = {}
+    for row in rows:
+        capteur_id, date, valeur = row[:3]
+        batterie = row[3] if len(row) > 3 else None
+        latest[(str(capteur_id), date)] = (valeur, batterie)
+    return [
+        (capteur_id, date, valeur, batterie)
+        for (capteur_id, date), (valeur, batterie) in latest.items()
+    ]
+
+
+def write_mesures(rows, on_conflict=ON_CONFLICT_IGNORE, validate=None):
+    """
+    Insere [(capteur_id, date, valeur[, batterie_pct])] par lots.
+
+    on_conflict="ignore" garde la mesure deja stockee (retransmission),
+    "update" la remplace. Les mesures implausibles (core.validation) vont
+    en quarantaine sans bloquer le lot. Les lignes effectivement ecrites
+    mettent a jour capteur_state et le capteur.
+    Retourne {"inserted", "updated", "duplicates", "quarantined"}.
+    """
+    if on_conflict not in ON_CONFLICT_CHOICES:
+        raise ValueError(f"on_conflict must be one of {ON_CONFLICT_CHOICES}")
+    rows = _unique_rows(rows)
+    stats = {"inserted": 0, "updated": 0, "duplicates": 0, "quarantined": 0}
+    if validate is None:
+        validate = validation.enabled()
+    if validate and rows:
+        rows, rejects = validation.validate(rows)
+        stats["quarantined"] = validation.quarantine(rejects)
+    if not rows:
+        return stats
+
+    if on_conflict == ON_CONFLICT_UPDATE:
+        conflict_sql = (
+            "ON CONFLICT (capteur_id, date) DO UPDATE "
+            "SET valeur = EXCLUDED.valeur, updated_at = EXCLUDED.updated_at "
+            "WHERE mesures.valeur IS DISTINCT FROM EXCLUDED.valeur "
+            "RETURNING capteur_id, date, (xmax = 0)"
+        )
+    else:
+        conflict_sql = "ON CONFLICT (capteur_id, date) DO NOTHING RETURNING capteur_id, date, true"
+
+    now = timezone.now()
+    written = set()
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            batch = rows[start:start + INSERT_BATCH_SIZE]
+            params = []
+            for capteur_id, date, valeur, _ in batch:
+                params.extend([uuid.uuid4(), date, valeur, capteur_id, now, now])
+            cursor.execute(
+                "INSERT INTO mesures (id, date, valeur, capteur_id, created_at, updated_at) VALUES "
+                + ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(batch))
+                + " "
+                + conflict_sql,
+                params,
+            )
+            returned = cursor.fetchall()
+            inserted = sum(1 for _, _, is_insert in returned if is_insert)
+            stats["inserted"] += inserted
+            stats["updated"] += len(returned) - inserted
+            stats["duplicates"] += len(batch) - len(returned)
+            written.update((str(capteur_id), date) for capteur_id, date, _ in returned)
+
+    refresh_capteur_state([row for row in rows if (row[0], row[1]) in written], now=now)
+    return stats
+
+
+def write_mesures_isolating(rows, on_conflict=ON_CONFLICT_IGNORE, validate=None):
+    """
+    write_mesures pour les ecritures en continu (MQTT, serveur UDP/TCP): sur
+    IntegrityError ou DataError (capteur supprime depuis la resolution des
+    identifiants, valeur invalide), les lignes des capteurs disparus sont
+    ecartees puis le lot est coupe en deux jusqu'a isoler les lignes
+    fautives, au lieu de bloquer l'ecriture. Les erreurs transitoires
+    (TRANSIENT_DB_ERRORS) sont propagees pour un nouvel essai.
+    Retourne (stats avec "invalid", lignes ecartees).
+    """
+    try:
+        with transaction.atomic():
+            # Cles etrangeres verifiees a chaque requete plutot qu'au commit
+            # (contraintes DEFERRABLE de Django): l'erreur survient dans ce bloc.
+            with connection.cursor() as cursor:
+                cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            stats = write_mesures(rows, on_conflict=on_conflict, validate=validate)
+        return {**stats, "invalid": 0}, []
+    except (IntegrityError, DataError):
+        pass
+
+    existing = {
+        str(capteur_id)
+        for capteur_id in Capteur.objects.filter(id__in={row[0] for row in rows}).values_list("id", flat=True)
+    }
+    invalid = [row for row in rows if str(row[0]) not in existing]
+    kept = [row for row in rows if str(row[0]) in existing]
+    if invalid:
+        parts = [kept] if kept else []
+    elif len(rows) == 1:
+        parts = []
+        invalid = list(rows)
+    else:
+        parts = [rows[:len(rows) // 2], rows[len(rows) // 2:]]
+
+    stats = {"inserted": 0, "updated": 0, "duplicates": 0, "quarantined": 0, "invalid": 0}
+    for part in parts:
+        part_stats, part_invalid = write_mesures_isolating(part, on_conflict=on_conflict, validate=validate)
+        for key, value in part_stats.items():
+            stats[key] += value
+        invalid.extend(part_invalid)
+    stats["invalid"] = len(invalid)
+    return stats, invalid
+
+
+def _summarize(rows):
+    """Par capteur: derniere date et valeur, derniere batterie connue, nombre et etendue des mesures."""
+    summary = {}
+    for capteur_id, date, valeur, batterie in rows:
+        s = summary.get(capteur_id)
+        if s is None:
+            s = summary[capteur_id] = {
+                "date": date, "valeur": valeur, "first": date, "n": 0,
+                "batterie": None, "batterieDate": None,
+            }
+        s["n"] += 1
+        if date >= s["date"]:
+            s["date"], s["valeur"] = date, valeur
+        s["first"] = min(s["first"], date)
+        if batterie is not None and (s["batterieDate"] is None or date >= s["batterieDate"]):
+            s["batterie"], s["batterieDate"] = batterie, date
+    return summary
+
+
+# Cree les lignes manquantes et suit un capteur deplace vers une autre entreprise.
+_STATE_INSERT_SQL = """
+    INSERT INTO capteur_state (capteur_id, entreprise_id, "nbMesures", created_at, updated_at)
+    SELECT c.id, r.entreprise_id, 0, %s, %s
+    FROM capteurs c
+    JOIN ruches ru ON ru.id = c.ruche_id
+    JOIN ruchers r ON r.id = ru.rucher_id
+    WHERE c.id = ANY(%s::uuid[])
+    ON CONFLICT (capteur_id) DO UPDATE SET entreprise_id = EXCLUDED.entreprise_id
+    WHERE capteur_state.entreprise_id IS DISTINCT FROM EXCLUDED.entreprise_id
+"""
+
+# Une mesure en retard ne remplace pas la derniere valeur; la cadence est
+# une moyenne exponentielle de l'intervalle entre mesures.
+_STATE_UPDATE_SQL = """
+    UPDATE capteur_state s SET
+        "derniereValeur" = CASE
+            WHEN s."derniereDate" IS NULL OR v.date >= s."derniereDate" THEN v.valeur
+            ELSE s."derniereValeur" END,
+        "derniereDate" = GREATEST(s."derniereDate", v.date),
+        "batteriePct" = CASE
+            WHEN v.batterie IS NOT NULL AND (s."derniereDate" IS NULL OR v.batterie_date >= s."derniereDate")
+            THEN v.batterie ELSE s."batteriePct" END,
+        "intervalleMoyenSecondes" = CASE
+            WHEN s."derniereDate" IS NULL THEN
+                COALESCE(EXTRACT(EPOCH FROM v.date - v.first) / NULLIF(v.n - 1, 0), s."intervalleMoyenSecondes")
+            WHEN v.date <= s."derniereDate" THEN s."intervalleMoyenSecondes"
+            ELSE COALESCE(
+                s."intervalleMoyenSecondes" * (1 - %(alpha)s)
+                    + %(alpha)s * EXTRACT(EPOCH FROM v.date - s."derniereDate") / v.n,
+                EXTRACT(EPOCH FROM v.date - s."derniereDate") / v.n
+            ) END,
+        "nbMesures" = s."nbMesures" + v.n,
+        updated_at = %(now)s
+    FROM (VALUES {values}) AS v(capteur_id, date, valeur, batterie, batterie_date, n, first)
+    WHERE s.capteur_id = v.capteur_id
+"""
+
+_CAPTEUR_UPDATE_SQL = """
+    UPDATE capteurs c SET
+        "derniereCommunication" = GREATEST(c."derniereCommunication", v.date),
+        "batteriePct" = CASE
+            WHEN v.batterie IS NOT NULL
+                AND (c."derniereCommunication" IS NULL OR v.batterie_date >= c."derniereCommunication")
+            THEN v.batterie ELSE c."batteriePct" END
+    FROM (VALUES {values}) AS v(capteur_id, date, batterie, batterie_date)
+    WHERE c.id = v.capteur_id
+"""
+
+def refresh_capteur_state(rows, now=None):
+    """
+    Met a jour capteur_state et capteurs (derniereCommunication, batteriePct)
+    avec une requete UPDATE ... FROM (VALUES ...) par lot, quel que soit le
+    nombre de capteurs concernes.
+    """
+    summary = _summarize(rows)
+    if not summary:
+        return
+    now = now or timezone.now()
+    items = sorted(summary.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), INSERT_BATCH_SIZE):
+            batch = items[start:start + INSERT_BATCH_SIZE]
+            cursor.execute(_STATE_INSERT_SQL, [now, now, [capteur_id for capteur_id, _ in batch]])
+
+            params = {"alpha": STATE_INTERVAL_ALPHA, "now": now}
+            values = []
+            for i, (capteur_id, s) in enumerate(batch):
+                values.append(
+                    f"(%(c{i})s::uuid, %(d{i})s::timestamptz, %(v{i})s::double precision, "
+                    f"%(b{i})s::double precision, %(bd{i})s::timestamptz, %(n{i})s::integer, "
+                    f"%(f{i})s::timestamptz)"
+                )
+                params.update({
+                    f"c{i}": capteur_id, f"d{i}": s["date"], f"v{i}": s["valeur"],
+                    f"b{i}": s["batterie"], f"bd{i}": s["batterieDate"], f"n{i}": s["n"],
+                    f"f{i}": s["first"],
+                })
+            cursor.execute(_STATE_UPDATE_SQL.format(values=", ".join(values)), params)
+
+            params = []
+            for capteur_id, s in batch:
+                params.extend([capteur_id, s["date"], s["batterie"], s["batterieDate"]])
+            cursor.execute(
+                _CAPTEUR_UPDATE_SQL.format(values=", ".join(
+                    ["(%s::uuid, %s::timestamptz, %s::double precision, %s::timestamptz)"] * len(batch)
+                )),
+                params,
+            )
+
+
+class _Lot:
+    """Lot en cours de constitution et resultat de son ecriture."""
+
+    def __init__(self):
+        self.rows = []
+        self.done = threading.Event()
+        self.stats = None
+        self.error = None
+
+
+class BatchBuffer:
+    """
+    Ecriture groupee (group commit) des mesures recues par des requetes
+    concurrentes: la premiere requete d'une fenetre attend `max_delay`
+    secondes (ou `max_rows` lignes), puis ecrit le lot entier dans son
+    propre thread. Chaque requete attend l'ecriture du lot qui contient
+    ses lignes: une reponse n'est donnee qu'une fois les mesures stockees,
+    et une erreur remonte a toutes les requetes du lot. Avec
+    max_delay <= 0, chaque ajout est ecrit immediatement.
+
+    Les lignes de capteurs supprimes entre-temps sont ecartees
+    (write_mesures_isolating) pour ne pas faire echouer tout le lot.
+    """
+
+    def __init__(self, max_delay=0.5, max_rows=500, on_conflict=ON_CONFLICT_IGNORE):
+        self.max_delay = max_delay
+        self.max_rows = max_rows
+        self.on_conflict = on_conflict
+        self._cond = threading.Condition()
+        self._lot = None
+
+    def add(self, rows):
+        """Ajoute des lignes et attend leur ecriture; retourne les stats du lot qui les contient."""
+        rows = list(rows)
+        if not rows:
+            return None
+        if self.max_delay <= 0:
+            return self._write(rows)
+        with self._cond:
+            lot = self._lot
+            leader = lot is None
+            if leader:
+                lot = self._lot = _Lot()
+            lot.rows.extend(rows)
+            if len(lot.rows) >= self.max_rows:
+                self._cond.notify_all()
+            if leader:
+                deadline = time.monotonic() + self.max_delay
+                while len(lot.rows) < self.max_rows:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._lot = None
+        if not leader:
+            lot.done.wait()
+            if lot.error is not None:
+                raise lot.error
+            return lot.stats
+        try:
+            lot.stats = self._write(lot.rows)
+        except Exception as exc:
+            lot.error = exc
+            raise
+        finally:
+            lot.done.set()
+        return lot.stats
+
+    def _write(self, batch):
+        try:
+            stats, invalid = write_mesures_isolating(batch, on_conflict=self.on_conflict)
+        except Exception:
+            logger.exception("Ecriture d'un lot de %d mesure(s) impossible", len(batch))
+            raise
+        if invalid:
+            logger.warning("%d mesure(s) ecartee(s) par la base", len(invalid))
+        return stats
+
+
+def dedupe_mesures(capteur_chunk_size=200, stdout=None):
+    """
+    Supprime les doublons (capteur, date) existants, capteur par capteur,
+    par paquets de `capteur_chunk_size` capteurs pour borner la memoire.
+    Retourne le nombre de lignes supprimees.
+    """
+    deleted = 0
+    last_id = None
+    while True:
+        capteurs = Capteur.objects.order_by("id")
+        if last_id is not None:
+            capteurs = capteurs.filter(id__gt=last_id)
+        chunk = list(capteurs.values_list("id", flat=True)[:capteur_chunk_size])
+        if not chunk:
+            return deleted
+        with connection.cursor() as cursor:
+            cursor.execute(_DEDUPE_SQL, [chunk])
+            deleted += cursor.rowcount
+        last_id = chunk[-1]
+        if stdout is not None:
+            stdout.write(f"dedupe: {deleted} doublon(s) supprime(s) (jusqu'au capteur {last_id})")
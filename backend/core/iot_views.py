@@ -1,12 +1,15 @@
 import math
+from datetime import timedelta, timezone as dt_timezone
 from django.db import transaction
 from django.http import JsonResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.http import require_POST, require_GET, require_http_methods
 
 from core.auth_views import _get_user_from_request, _json_body, _get_bearer_token, _decode_token
 from core.models import (
     Capteur,
+    CapteurState,
     Rucher,
     Ruche,
     TypeCapteur,
@@ -16,10 +19,27 @@ from core.models import (
     Notification,
     TypeNotification,
     RoleUtilisateur,
+    SonSpectre,
+)
+from core.traccar_client import (
+    TraccarError,
+    create_device,
+    update_device,
+    delete_device,
+    get_latest_position,
+    get_latest_position_cached,
 )
-from core.traccar_client import TraccarError, create_device, update_device, delete_device, get_latest_position
 from core.email_utils import send_email
 from core.email_templates import generate_gps_alert_email_content
+from core.gps_scheduler import apply_check_result, reset_schedule
+from core.lorawan import forget_dev_eui
+from core.suppression import claim
+from core.spectres import bandes_hz, decode_spectre
+from core.timeseries import read_series
+from core import weight_forecast
+
+DEFAULT_SERIES_HOURS = 24
+MAX_SERIES_DAYS = 366
 
 
 def _entreprise_id_from_request(request):
@@ -47,6 +67,17 @@ def _normalize_type(value):
     return None
 
 
+def _parse_date(value):
+    if not isinstance(value, str):
+        return None
+    date = parse_datetime(value)
+    if date is None:
+        return None
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date, dt_timezone.utc)
+    return date
+
+
 def _capteur_belongs_to_entreprise(capteur, entreprise_id):
     ruche = getattr(capteur, "ruche", None)
     rucher = getattr(ruche, "rucher", None)
@@ -66,6 +97,7 @@ def _serialize_capteur(capteur):
         "id": str(capteur.id),
         "type": capteur.type,
         "identifiant": capteur.identifiant,
+        "shortId": capteur.shortId,
         "actif": capteur.actif,
         "batteriePct": capteur.batteriePct,
         "derniereCommunication": capteur.derniereCommunication.isoformat() if capteur.derniereCommunication else None,
@@ -86,7 +118,7 @@ def _distance_meters(lat1, lng1, lat2, lng2):
 
 def _get_latest_gps_or_error(capteur):
     try:
-        pos = get_latest_position(capteur.identifiant)
+        pos = get_latest_position_cached(capteur.identifiant, fetch=get_latest_position)
     except TraccarError as e:
         return None, JsonResponse({"error": str(e)}, status=502)
     if not pos or pos.get("latitude") is None or pos.get("longitude") is None:
@@ -203,6 +235,124 @@ def list_capteurs(request):
     return JsonResponse({"capteurs": [_serialize_capteur(c) for c in capteurs]}, status=200)
 
 
+def _serialize_capteur_state(state):
+    interval = state.intervalleMoyenSecondes
+    return {
+        "capteurId": str(state.capteur_id),
+        "identifiant": state.capteur.identifiant,
+        "type": state.capteur.type,
+        "derniereValeur": state.derniereValeur,
+        "derniereDate": state.derniereDate.isoformat() if state.derniereDate else None,
+        "batteriePct": state.batteriePct,
+        "mesuresParHeure": round(3600.0 / interval, 2) if interval else None,
+        "nbMesures": state.nbMesures,
+    }
+
+
+@require_GET
+def list_capteur_states(request):
+    """GET /api/capteurs/states - Derniere valeur, batterie et cadence des capteurs de l'entreprise courante."""
+    user, err = _get_user_from_request(request)
+    if err:
+        return err
+
+    entreprise_id = _entreprise_id_from_request(request)
+    err = _ensure_user_in_entreprise(user, entreprise_id)
+    if err:
+        return err
+
+    states = (
+        CapteurState.objects.select_related("capteur")
+        .filter(entreprise_id=entreprise_id)
+        .order_by("-derniereDate")
+    )
+    if request.GET.get("type"):
+        capteur_type = _normalize_type(request.GET.get("type"))
+        if not capteur_type:
+            return JsonResponse({"error": "invalid_type"}, status=400)
+        states = states.filter(capteur__type=capteur_type)
+    return JsonResponse({"states": [_serialize_capteur_state(s) for s in states]}, status=200)
+
+
+@require_GET
+def get_previsions_poids(request):
+    """GET /api/capteurs/poids/previsions - Tendance, miellee et conseil de pose de hausse des capteurs Poids."""
+    user, err = _get_user_from_request(request)
+    if err:
+        return err
+
+    entreprise_id = _entreprise_id_from_request(request)
+    err = _ensure_user_in_entreprise(user, entreprise_id)
+    if err:
+        return err
+
+    return JsonResponse(weight_forecast.previsions(entreprise_id), status=200)
+
+
+def _serialize_spectre(row, with_spectre=False):
+    data = {
+        "date": row.date.isoformat(),
+        "frequenceDominante": row.frequenceDominante,
+        "centroide": row.centroide,
+        "energieTotale": row.energieTotale,
+        "ratiosBandes": row.ratiosBandes,
+        "indiceEssaimage": row.indiceEssaimage,
+    }
+    if with_spectre:
+        data["spectre"] = None
+        if row.spectre is not None:
+            _, energies = decode_spectre(row.spectre, row.spectreFrequenceMax)
+            data["spectre"] = {"frequenceMax": row.spectreFrequenceMax, "valeurs": energies.round(4).tolist()}
+    return data
+
+
+@require_GET
+def get_capteur_mesures(request, capteur_id):
+    """GET /api/capteurs/{id}/mesures?from=&to=&spectre= - Serie de mesures (et spectres des capteurs Son)."""
+    user, err = _get_user_from_request(request)
+    if err:
+        return err
+
+    entreprise_id = _entreprise_id_from_request(request)
+    err = _ensure_user_in_entreprise(user, entreprise_id)
+    if err:
+        return err
+
+    try:
+        capteur = Capteur.objects.select_related("ruche", "ruche__rucher").get(id=capteur_id)
+    except Capteur.DoesNotExist:
+        return JsonResponse({"error": "capteur_not_found"}, status=404)
+    if not _capteur_belongs_to_entreprise(capteur, entreprise_id):
+        return JsonResponse({"error": "forbidden"}, status=403)
+
+    end = timezone.now()
+    if request.GET.get("to"):
+        end = _parse_date(request.GET.get("to"))
+    start = end - timedelta(hours=DEFAULT_SERIES_HOURS) if end else None
+    if request.GET.get("from"):
+        start = _parse_date(request.GET.get("from"))
+    if start is None or end is None:
+        return JsonResponse({"error": "invalid_date"}, status=400)
+    if start > end or end - start > timedelta(days=MAX_SERIES_DAYS):
+        return JsonResponse({"error": "invalid_range"}, status=400)
+
+    series = read_series(capteur.id, start, end)
+    payload = {
+        "capteurId": str(capteur.id),
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "mesures": [{"date": date.isoformat(), "valeur": valeur} for date, valeur in series],
+    }
+    if capteur.type == TypeCapteur.SON:
+        with_spectre = request.GET.get("spectre") in ("1", "true")
+        rows = SonSpectre.objects.filter(capteur=capteur, date__gte=start, date__lte=end).order_by("date")
+        if not with_spectre:
+            rows = rows.defer("spectre")
+        payload["bandesHz"] = bandes_hz()
+        payload["spectres"] = [_serialize_spectre(row, with_spectre) for row in rows]
+    return JsonResponse(payload, status=200)
+
+
 @require_http_methods(["PATCH", "PUT"])
 def update_capteur(request, capteur_id):
     """PATCH /api/capteurs/{id} - Met a jour un capteur et le device Traccar."""
@@ -257,6 +407,7 @@ def update_capteur(request, capteur_id):
         capteur.derniereCommunication = new_derniere
 
     capteur.save()
+    forget_dev_eui(old_identifiant)
 
     try:
         if new_identifiant or new_name:
@@ -297,6 +448,7 @@ def delete_capteur(request, capteur_id):
         return JsonResponse({"error": str(e)}, status=502)
 
     capteur.delete()
+    forget_dev_eui(capteur.identifiant)
     return JsonResponse({"status": "deleted"}, status=200)
 
 
@@ -350,7 +502,10 @@ def activate_gps_alert(request, capteur_id):
     capteur.gpsReferenceLng = ref_lng
     if threshold is not None:
         capteur.gpsThresholdMeters = threshold
-    capteur.gpsLastCheckedAt = timezone.now()
+    now = timezone.now()
+    capteur.gpsLastCheckedAt = now
+    # Nouvelle reference: le cron reprend la surveillance a l'intervalle minimal.
+    schedule_fields = reset_schedule(capteur, now)
     capteur.save(
         update_fields=[
             "gpsAlertActive",
@@ -358,6 +513,7 @@ def activate_gps_alert(request, capteur_id):
             "gpsReferenceLng",
             "gpsThresholdMeters",
             "gpsLastCheckedAt",
+            *schedule_fields,
         ]
     )
 
@@ -429,8 +585,10 @@ def check_gps_alert(request, capteur_id):
         pos.get("longitude"),
     )
 
-    capteur.gpsLastCheckedAt = timezone.now()
-    capteur.save(update_fields=["gpsLastCheckedAt", "gpsThresholdMeters"])
+    now = timezone.now()
+    capteur.gpsLastCheckedAt = now
+    schedule_fields = apply_check_result(capteur, distance, now)
+    capteur.save(update_fields=["gpsLastCheckedAt", "gpsThresholdMeters", *schedule_fields])
 
     if distance <= capteur.gpsThresholdMeters:
         return JsonResponse(
@@ -443,18 +601,32 @@ def check_gps_alert(request, capteur_id):
         f"Distance: {distance:.1f}m (seuil {capteur.gpsThresholdMeters:.1f}m)."
     )
 
-    alerte = Alerte.objects.create(
-        type=TypeAlerte.DEPLACEMENT_GPS.value,
-        message=message,
-        capteur=capteur,
-    )
+    with transaction.atomic():
+        if not claim(TypeAlerte.DEPLACEMENT_GPS.value, capteur.id, now=now):
+            return JsonResponse(
+                {
+                    "status": "already_alerted",
+                    "distanceMeters": distance,
+                    "thresholdMeters": capteur.gpsThresholdMeters,
+                },
+                status=200,
+            )
 
-    _create_iot_notifications(
-        entreprise_id=entreprise_id,
-        ruche=capteur.ruche,
-        title="Alerte deplacement GPS",
-        message=message,
-    )
+        alerte = Alerte.objects.create(
+            type=TypeAlerte.DEPLACEMENT_GPS.value,
+            message=message,
+            capteur=capteur,
+        )
+
+        _create_iot_notifications(
+            entreprise_id=entreprise_id,
+            ruche=capteur.ruche,
+            title="Alerte deplacement GPS",
+            message=message,
+        )
+
+        capteur.gpsLastAlertAt = now
+        capteur.save(update_fields=["gpsLastAlertAt"])
 
     email_result = send_email(
         to_email=user.email,
@@ -469,9 +641,6 @@ def check_gps_alert(request, capteur_id):
         ),
     )
 
-    capteur.gpsLastAlertAt = timezone.now()
-    capteur.save(update_fields=["gpsLastAlertAt"])
-
     response = {
         "status": "alert_sent",
         "distanceMeters": distance,
@@ -0,0 +1,219 @@
+"""
+Reception des uplinks LoRaWAN (The Things Stack v3, ChirpStack v3/v4).
+
+Le serveur reseau POSTe chaque uplink en JSON avec la charge utile en
+base64. Le devEUI est rapproche de Capteur.identifiant via un index mis
+en cache, la charge utile est decodee par le codec du type de capteur,
+puis les mesures rejoignent un BatchBuffer commun: les uplinks recus
+dans la meme fenetre sont ecrits en une seule requete, avant la reponse
+au serveur reseau.
+"""
+import base64
+import binascii
+import struct
+import threading
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.ingestion import BatchBuffer
+from core.models import Capteur, TypeCapteur
+
+_CACHE_PREFIX = "lorawan_deveui:"
+_UNKNOWN = "-"
+
+
+class UplinkError(ValueError):
+    pass
+
+
+def _scaled(fmt, scale):
+    """Codec `fmt` (valeur, batterie %) en big-endian, valeur multipliee par `scale`."""
+    layout = struct.Struct(fmt)
+
+    def decode(payload):
+        if len(payload) < layout.size or len(payload) % layout.size:
+            raise UplinkError("payload size")
+        readings = []
+        batterie = None
+        for valeur, batterie in layout.iter_unpack(payload):
+            readings.append(valeur * scale)
+        return readings, batterie
+
+    return decode
+
+
+# Une trame = un ou plusieurs enregistrements (valeur, batterie); plusieurs
+# enregistrements correspondent a des mesures espacees de LORAWAN_READING_INTERVAL_SECONDS.
+CODECS = {
+    TypeCapteur.POIDS.value: _scaled(">hB", 0.01),          # dizaines de grammes -> kg
+    TypeCapteur.TEMPERATURE.value: _scaled(">hB", 0.01),    # centiemes de degre
+    TypeCapteur.HUMIDITE.value: _scaled(">HB", 0.01),       # centiemes de %
+    TypeCapteur.CO2.value: _scaled(">HB", 1),               # ppm
+    TypeCapteur.SON.value: _scaled(">HB", 0.01),            # centiemes de dB
+    TypeCapteur.BATTERIE.value: _scaled(">HB", 0.001),      # mV -> V
+}
+
+
+def normalize_dev_eui(value):
+    """devEUI en hexadecimal majuscule (ChirpStack v3 l'envoie en base64)."""
+    if not isinstance(value, str) or not value:
+        return None
+    value = value.strip().replace("-", "").replace(":", "")
+    if len(value) == 16:
+        try:
+            bytes.fromhex(value)
+            return value.upper()
+        except ValueError:
+            pass
+    try:
+        raw = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return raw.hex().upper() if len(raw) == 8 else None
+
+
+def parse_uplink(body):
+    """
+    (dev_eui, date de reception, f_port, payload, decoded) depuis le JSON
+    d'un uplink TTS v3, ChirpStack v4 ou ChirpStack v3. `decoded` est le
+    resultat du formateur du serveur reseau s'il existe.
+    """
+    if not isinstance(body, dict):
+        raise UplinkError("invalid uplink")
+    if "end_device_ids" in body:  # The Things Stack v3
+        message = body.get("uplink_message") or {}
+        dev_eui = (body.get("end_device_ids") or {}).get("dev_eui")
+        received = message.get("received_at") or body.get("received_at")
+        payload, f_port = message.get("frm_payload"), message.get("f_port")
+        decoded = message.get("decoded_payload")
+    elif "deviceInfo" in body:  # ChirpStack v4
+        dev_eui = (body.get("deviceInfo") or {}).get("devEui")
+        received, payload, f_port = body.get("time"), body.get("data"), body.get("fPort")
+        decoded = body.get("object")
+    else:  # ChirpStack v3
+        dev_eui = body.get("devEUI")
+        received, payload, f_port = body.get("time") or body.get("publishedAt"), body.get("data"), body.get("fPort")
+        decoded = body.get("object")
+
+    dev_eui = normalize_dev_eui(dev_eui)
+    if dev_eui is None:
+        raise UplinkError("missing devEUI")
+    try:
+        payload = base64.b64decode(payload or "", validate=True)
+    except (binascii.Error, ValueError):
+        raise UplinkError("invalid payload")
+    date = parse_datetime(received) if isinstance(received, str) else None
+    if date is None:
+        date = timezone.now()
+    elif timezone.is_naive(date):
+        date = timezone.make_aware(date, dt_timezone.utc)
+    return dev_eui, date, f_port, payload, decoded if isinstance(decoded, dict) else None
+
+
+def resolve_dev_euis(dev_euis):
+    """{devEUI: (capteur_id, type)} pour les capteurs actifs, via le cache."""
+    dev_euis = set(dev_euis)
+    cached = cache.get_many([_CACHE_PREFIX + eui for eui in dev_euis])
+    found = {}
+    missing = set()
+    for eui in dev_euis:
+        value = cached.get(_CACHE_PREFIX + eui)
+        if value is None:
+            missing.add(eui)
+        elif value != _UNKNOWN:
+            found[eui] = value
+
+    if missing:
+        variants = {v for eui in missing for v in (eui, eui.lower())}
+        loaded = {}
+        for capteur_id, identifiant, type_ in Capteur.objects.filter(
+            identifiant__in=variants, actif=True
+        ).values_list("id", "identifiant", "type"):
+            loaded[identifiant.upper()] = (str(capteur_id), type_)
+        found.update(loaded)
+        cache.set_many(
+            {_CACHE_PREFIX + eui: loaded[eui] for eui in loaded},
+            getattr(settings, "LORAWAN_DEVEUI_CACHE_TTL", 300),
+        )
+        # Un devEUI inconnu est retente rapidement (capteur associe entre-temps).
+        cache.set_many({_CACHE_PREFIX + eui: _UNKNOWN for eui in missing - set(loaded)}, 60)
+    return found
+
+
+def forget_dev_eui(identifiant):
+    eui = normalize_dev_eui(identifiant)
+    if eui:
+        cache.delete(_CACHE_PREFIX + eui)
+
+
+def _decoded_readings(decoded):
+    valeur = decoded.get("valeur", decoded.get("value"))
+    batterie = decoded.get("batteriePct", decoded.get("battery"))
+    if isinstance(valeur, bool) or not isinstance(valeur, (int, float)):
+        return None
+    if isinstance(batterie, bool) or not isinstance(batterie, (int, float)):
+        batterie = None
+    return [float(valeur)], batterie
+
+
+def uplink_rows(uplinks):
+    """
+    Lignes (capteur_id, date, valeur, batterie) pour une liste d'uplinks
+    deja analyses, et le nombre d'uplinks ignores (devEUI inconnu,
+    charge utile illisible).
+    """
+    capteurs = resolve_dev_euis(u[0] for u in uplinks)
+    interval = getattr(settings, "LORAWAN_READING_INTERVAL_SECONDS", 600)
+    rows = []
+    ignored = 0
+    for dev_eui, date, _f_port, payload, decoded in uplinks:
+        capteur = capteurs.get(dev_eui)
+        if capteur is None:
+            ignored += 1
+            continue
+        capteur_id, type_ = capteur
+        result = _decoded_readings(decoded) if decoded else None
+        if result is None:
+            codec = CODECS.get(type_)
+            try:
+                result = codec(payload) if codec else None
+            except UplinkError:
+                result = None
+        if not result or not result[0]:
+            ignored += 1
+            continue
+        readings, batterie = result
+        if batterie is not None and not 0 <= batterie <= 100:
+            batterie = None
+        # Les enregistrements d'une trame sont du plus ancien au plus recent.
+        count = len(readings)
+        for i, valeur in enumerate(readings):
+            rows.append((capteur_id, date - timedelta(seconds=interval * (count - 1 - i)), valeur, batterie))
+    return rows, ignored
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def buffer():
+    """BatchBuffer partage par les requetes du processus."""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = BatchBuffer(
+                max_delay=getattr(settings, "LORAWAN_BATCH_WINDOW_MS", 500) / 1000.0,
+                max_rows=getattr(settings, "LORAWAN_BATCH_MAX_ROWS", 500),
+            )
+        return _buffer
+
+
+def reset_buffer():
+    """Oublie le buffer (tests, changement de reglages); les lots en cours sont ecrits par leurs requetes."""
+    global _buffer
+    with _buffer_lock:
+        _buffer = None
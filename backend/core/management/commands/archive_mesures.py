@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.archive import archive_capteur, archive_root
+from core.models import MesureChunk
+
+
+class Command(BaseCommand):
+    help = "Move cold compacted mesures (mesures_chunks) into monthly files under MESURES_ARCHIVE_ROOT."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=None,
+            help="Age minimal (jours) des blocs archives (defaut: MESURES_ARCHIVE_DAYS).",
+        )
+        parser.add_argument(
+            "--capteur",
+            default=None,
+            help="Limiter l'archivage a un capteur (id).",
+        )
+
+    def handle(self, *args, **options):
+        days = options["older_than_days"]
+        if days is None:
+            days = int(getattr(settings, "MESURES_ARCHIVE_DAYS", 365))
+        if days < 1:
+            raise CommandError("--older-than-days doit etre >= 1")
+        before = timezone.now() - timedelta(days=days)
+
+        capteur_ids = (
+            MesureChunk.objects.filter(jour__lt=before.date())
+            .order_by("capteur_id")
+            .values_list("capteur_id", flat=True)
+            .distinct()
+        )
+        if options["capteur"]:
+            capteur_ids = capteur_ids.filter(capteur_id=options["capteur"])
+
+        total_chunks = total_months = 0
+        for capteur_id in list(capteur_ids):
+            chunks, months = archive_capteur(capteur_id, before)
+            total_chunks += chunks
+            total_months += months
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archivage: {total_chunks} bloc(s) jour dans {total_months} fichier(s) mensuel(s) ({archive_root()})"
+            )
+        )
@@ -0,0 +1,185 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import (
+    Capteur,
+    TypeCapteur,
+    UtilisateurEntreprise,
+    RoleUtilisateur,
+    Alerte,
+    TypeAlerte,
+    Notification,
+    TypeNotification,
+)
+from core.suppression import claim_many
+
+DEFAULT_THRESHOLD_MINUTES = 180
+# Nombre de capteurs cites dans la notification de synthese.
+NOTIFICATION_MAX_LISTED = 10
+
+
+def _thresholds():
+    """Seuil (minutes) sans communication au-dela duquel un capteur est hors ligne, par type."""
+    configured = getattr(settings, "CAPTEUR_HORS_LIGNE_MINUTES", None) or {}
+    return {
+        t.value: int(configured.get(t.value, DEFAULT_THRESHOLD_MINUTES))
+        for t in TypeCapteur
+    }
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = "Detect capteurs that stopped communicating and create HorsLigne alerts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Nombre de capteurs traites par transaction.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size doit etre >= 1")
+
+        now = timezone.now()
+        realert_after = timedelta(hours=int(getattr(settings, "CAPTEUR_HORS_LIGNE_REALERT_HOURS", 24)))
+        offline_by_entreprise = defaultdict(list)
+        marked = alerted = recovered = 0
+
+        # Un capteur desactive n'est plus surveille: on oublie son etat.
+        recovered += Capteur.objects.filter(actif=False, horsLigneDepuis__isnull=False).update(
+            horsLigneDepuis=None
+        )
+
+        for type_value, minutes in _thresholds().items():
+            threshold = timedelta(minutes=minutes)
+            # Hysteresis: hors ligne apres `threshold`, de retour seulement si la
+            # derniere communication date de moins de threshold / 2.
+            recovered += Capteur.objects.filter(
+                actif=True,
+                type=type_value,
+                horsLigneDepuis__isnull=False,
+                derniereCommunication__gte=now - threshold / 2,
+            ).update(horsLigneDepuis=None)
+
+            stale_ids = (
+                Capteur.objects.filter(
+                    actif=True,
+                    type=type_value,
+                    derniereCommunication__lt=now - threshold,
+                    horsLigneDepuis__isnull=True,
+                )
+                .values_list("id", flat=True)
+                .iterator(chunk_size=batch_size)
+            )
+            for ids in _batches(stale_ids, batch_size):
+                n_marked, n_alerted = self._mark_offline(
+                    ids, now, minutes, realert_after, offline_by_entreprise
+                )
+                marked += n_marked
+                alerted += n_alerted
+
+        notified = self._notify_admins(offline_by_entreprise)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Capteurs hors ligne: {marked} marque(s), {alerted} alerte(s), "
+                f"{recovered} retour(s) en ligne, {notified} notification(s)"
+            )
+        )
+
+    def _mark_offline(self, ids, now, minutes, realert_after, offline_by_entreprise):
+        with transaction.atomic():
+            # Une execution concurrente qui traite deja ces capteurs les tient verrouilles.
+            rows = list(
+                Capteur.objects.select_for_update(skip_locked=True, of=("self",))
+                .filter(id__in=ids, horsLigneDepuis__isnull=True)
+                .values_list(
+                    "id",
+                    "identifiant",
+                    "derniereCommunication",
+                    "horsLigneLastAlertAt",
+                    "ruche__rucher__entreprise_id",
+                )
+            )
+            if not rows:
+                return 0, 0
+
+            Capteur.objects.filter(id__in=[row[0] for row in rows]).update(horsLigneDepuis=now)
+
+            # Un capteur qui oscille ne realerte qu'apres `realert_after`.
+            to_alert = [
+                row for row in rows
+                if row[3] is None or now - row[3] >= realert_after
+            ]
+            claimed = claim_many(
+                TypeAlerte.HORS_LIGNE.value, [row[0] for row in to_alert], window=realert_after, now=now
+            )
+            to_alert = [row for row in to_alert if str(row[0]) in claimed]
+            Alerte.objects.bulk_create(
+                [
+                    Alerte(
+                        type=TypeAlerte.HORS_LIGNE.value,
+                        message=(
+                            f"Capteur {identifiant} hors ligne: derniere communication "
+                            f"le {last_comm:%d/%m/%Y %H:%M} (seuil {minutes} min)."
+                        ),
+                        capteur_id=capteur_id,
+                    )
+                    for capteur_id, identifiant, last_comm, _, _ in to_alert
+                ]
+            )
+            Capteur.objects.filter(id__in=[row[0] for row in to_alert]).update(
+                horsLigneLastAlertAt=now
+            )
+
+        for _, identifiant, _, _, entreprise_id in to_alert:
+            if entreprise_id:
+                offline_by_entreprise[entreprise_id].append(identifiant)
+        return len(rows), len(to_alert)
+
+    def _notify_admins(self, offline_by_entreprise):
+        """Une notification de synthese par administrateur et par entreprise."""
+        if not offline_by_entreprise:
+            return 0
+        admins = UtilisateurEntreprise.objects.filter(
+            entreprise_id__in=list(offline_by_entreprise),
+            role=RoleUtilisateur.ADMIN_ENTREPRISE.value,
+        ).values_list("entreprise_id", "utilisateur_id")
+
+        notifications = []
+        for entreprise_id, utilisateur_id in admins:
+            identifiants = sorted(offline_by_entreprise[entreprise_id])
+            listed = ", ".join(identifiants[:NOTIFICATION_MAX_LISTED])
+            extra = len(identifiants) - NOTIFICATION_MAX_LISTED
+            if extra > 0:
+                listed += f" (+{extra})"
+            notifications.append(
+                Notification(
+                    type=TypeNotification.ALERTE_CAPTEUR.value,
+                    titre="Capteurs hors ligne",
+                    message=f"{len(identifiants)} capteur(s) ne communiquent plus: {listed}.",
+                    utilisateur_id=utilisateur_id,
+                    entreprise_id=entreprise_id,
+                )
+            )
+        Notification.objects.bulk_create(notifications, batch_size=1000)
+        return len(notifications)
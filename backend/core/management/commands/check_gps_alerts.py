@@ -1,5 +1,9 @@
 import math
-from django.core.management.base import BaseCommand
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from django.db.models.functions import Abs, Cast, Mod
 from django.utils import timezone
 
 from core.email_utils import send_email
@@ -14,8 +18,13 @@ from core.models import (
     Notification,
     TypeNotification,
 )
+from core.gps_scheduler import apply_check_failure, apply_check_result, due_capteurs
+from core.suppression import claim
 from core.traccar_client import TraccarError, get_latest_position
 
+# Cle de verrou consultatif PostgreSQL propre a cette commande ("GPSA").
+ADVISORY_LOCK_NAMESPACE = 0x47505341
+
 
 def _distance_meters(lat1, lng1, lat2, lng2):
     r = 6371000.0
@@ -28,11 +37,86 @@ def _distance_meters(lat1, lng1, lat2, lng2):
     return r * c
 
 
+def _parse_shard(value):
+    """'i/N' -> (i, N) avec 0 <= i < N."""
+    try:
+        index, total = (int(part) for part in (value or "").split("/"))
+    except ValueError:
+        raise CommandError("--shard doit etre de la forme i/N (ex: 0/4)")
+    if total < 1 or index < 0 or index >= total:
+        raise CommandError("--shard doit verifier 0 <= i < N")
+    return index, total
+
+
+class _HashText(models.Func):
+    function = "hashtext"
+    output_field = models.IntegerField()
+
+
+def _filter_shard(queryset, index, total):
+    """Partitionne les capteurs par hash de leur id (stable entre executions)."""
+    if total == 1:
+        return queryset
+    return queryset.annotate(
+        _shard=Mod(
+            Abs(Cast(_HashText(Cast("id", models.TextField())), models.BigIntegerField())),
+            total,
+        )
+    ).filter(_shard=index)
+
+
+@contextmanager
+def _shard_lock(index, total):
+    """Verrou consultatif de session: un seul processus par shard."""
+    key = total * 1000 + index
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s, %s)", [ADVISORY_LOCK_NAMESPACE, key])
+        acquired = cursor.fetchone()[0]
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s, %s)", [ADVISORY_LOCK_NAMESPACE, key])
+
+
 class Command(BaseCommand):
     help = "Check GPS capteurs and send alerts if moved beyond threshold."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--shard",
+            default="0/1",
+            help="Ne traiter que la partition i/N des capteurs (hash de l'id), ex: --shard 0/4.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Ignorer la planification adaptative et verifier tous les capteurs.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Nombre maximal d'appels Traccar pour cette execution (les plus en retard d'abord).",
+        )
+
     def handle(self, *args, **options):
-        capteurs = (
+        index, total = _parse_shard(options["shard"])
+        limit = options.get("limit")
+        if limit is not None and limit < 1:
+            raise CommandError("--limit doit etre >= 1")
+
+        with _shard_lock(index, total) as acquired:
+            if not acquired:
+                self.stdout.write(
+                    self.style.WARNING(f"GPS alert cron: shard {index}/{total} already running, skipped")
+                )
+                return
+            self._run(index, total, check_all=options.get("all", False), limit=limit)
+
+    def _run(self, index, total, check_all=False, limit=None):
+        capteurs = _filter_shard(
             Capteur.objects.select_related("ruche", "ruche__rucher")
             .filter(
                 actif=True,
@@ -40,62 +124,85 @@ class Command(BaseCommand):
                 gpsAlertActive=True,
                 gpsReferenceLat__isnull=False,
                 gpsReferenceLng__isnull=False,
-            )
+            ),
+            index,
+            total,
         )
+        if not check_all:
+            capteurs = due_capteurs(capteurs, timezone.now())
+        if limit is not None:
+            capteurs = capteurs[:limit]
 
-        self.stdout.write(self.style.NOTICE(f"GPS alert cron: {capteurs.count()} capteur(s) to check"))
+        shard_label = f" (shard {index}/{total})" if total > 1 else ""
+        self.stdout.write(
+            self.style.NOTICE(f"GPS alert cron: {capteurs.count()} capteur(s) to check{shard_label}")
+        )
 
         for capteur in capteurs:
-            try:
-                pos = get_latest_position(capteur.identifiant)
-            except TraccarError as e:
-                self.stdout.write(self.style.WARNING(f"{capteur.identifiant}: {e}"))
-                continue
+            self._check_capteur(capteur)
 
-            if not pos or pos.get("latitude") is None or pos.get("longitude") is None:
-                self.stdout.write(
-                    self.style.WARNING(f"{capteur.identifiant}: position_unavailable")
-                )
-                continue
+    def _check_capteur(self, capteur):
+        try:
+            pos = get_latest_position(capteur.identifiant)
+        except TraccarError as e:
+            self.stdout.write(self.style.WARNING(f"{capteur.identifiant}: {e}"))
+            capteur.save(update_fields=apply_check_failure(capteur, timezone.now()))
+            return
 
-            distance = _distance_meters(
-                capteur.gpsReferenceLat,
-                capteur.gpsReferenceLng,
-                pos.get("latitude"),
-                pos.get("longitude"),
+        if not pos or pos.get("latitude") is None or pos.get("longitude") is None:
+            self.stdout.write(
+                self.style.WARNING(f"{capteur.identifiant}: position_unavailable")
             )
+            capteur.save(update_fields=apply_check_failure(capteur, timezone.now()))
+            return
 
-            capteur.gpsLastCheckedAt = timezone.now()
-            capteur.save(update_fields=["gpsLastCheckedAt"])
+        distance = _distance_meters(
+            capteur.gpsReferenceLat,
+            capteur.gpsReferenceLng,
+            pos.get("latitude"),
+            pos.get("longitude"),
+        )
 
-            if distance <= capteur.gpsThresholdMeters:
-                self.stdout.write(
-                    self.style.NOTICE(
-                        f"{capteur.identifiant}: ok distance {distance:.1f}m <= threshold {capteur.gpsThresholdMeters:.1f}m"
-                    )
+        now = timezone.now()
+        capteur.gpsLastCheckedAt = now
+        schedule_fields = apply_check_result(capteur, distance, now)
+        capteur.save(update_fields=["gpsLastCheckedAt", *schedule_fields])
+
+        if distance <= capteur.gpsThresholdMeters:
+            self.stdout.write(
+                self.style.NOTICE(
+                    f"{capteur.identifiant}: ok distance {distance:.1f}m <= threshold {capteur.gpsThresholdMeters:.1f}m"
                 )
-                continue
+            )
+            return
 
-            now = timezone.now()
-            if capteur.gpsLastAlertAt and capteur.gpsLastAlertAt.date() == now.date():
+        self._alert(capteur, pos, distance)
+
+    def _alert(self, capteur, pos, distance):
+        now = timezone.now()
+        message = (
+            f"Deplacement GPS detecte pour le capteur {capteur.identifiant}. "
+            f"Distance: {distance:.1f}m (seuil {capteur.gpsThresholdMeters:.1f}m)."
+        )
+        entreprise_id = getattr(capteur.ruche.rucher, "entreprise_id", None)
+        recipients = []
+
+        with transaction.atomic():
+            # Reservation atomique: un seul worker emet l'alerte du jour pour ce capteur.
+            if not claim(TypeAlerte.DEPLACEMENT_GPS.value, capteur.id, now=now):
                 self.stdout.write(
                     self.style.NOTICE(
                         f"{capteur.identifiant}: alert skipped (already sent today)"
                     )
                 )
-                continue
+                return
 
-            message = (
-                f"Deplacement GPS detecte pour le capteur {capteur.identifiant}. "
-                f"Distance: {distance:.1f}m (seuil {capteur.gpsThresholdMeters:.1f}m)."
-            )
             alerte = Alerte.objects.create(
                 type=TypeAlerte.DEPLACEMENT_GPS.value,
                 message=message,
                 capteur=capteur,
             )
 
-            entreprise_id = getattr(capteur.ruche.rucher, "entreprise_id", None)
             if entreprise_id:
                 admins = UtilisateurEntreprise.objects.select_related("utilisateur").filter(
                     entreprise_id=entreprise_id,
@@ -106,6 +213,7 @@ class Command(BaseCommand):
                     user = ue.utilisateur
                     if not user.email:
                         continue
+                    recipients.append(user)
                     notifications.append(
                         Notification(
                             type=TypeNotification.ALERTE_GPS.value,
@@ -116,31 +224,33 @@ class Command(BaseCommand):
                             ruche=capteur.ruche,
                         )
                     )
-                    html_content = generate_gps_alert_email_content(
-                        recipient_name=f"{user.prenom} {user.nom}".strip() or user.email,
-                        capteur_identifiant=capteur.identifiant,
-                        distance_meters=distance,
-                        threshold_meters=capteur.gpsThresholdMeters,
-                        ruche_immatriculation=getattr(capteur.ruche, "immatriculation", ""),
-                        reference_lat=capteur.gpsReferenceLat,
-                        reference_lng=capteur.gpsReferenceLng,
-                        current_lat=pos.get("latitude"),
-                        current_lng=pos.get("longitude"),
-                    )
-                    send_email(
-                        to_email=user.email,
-                        to_name=f"{user.prenom} {user.nom}".strip(),
-                        subject="Alerte deplacement GPS",
-                        html_content=html_content,
-                    )
                 if notifications:
                     Notification.objects.bulk_create(notifications)
 
             capteur.gpsLastAlertAt = now
             capteur.save(update_fields=["gpsLastAlertAt"])
 
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f"Alerte {alerte.id} capteur {capteur.identifiant} distance {distance:.1f}m"
-                )
+        for user in recipients:
+            html_content = generate_gps_alert_email_content(
+                recipient_name=f"{user.prenom} {user.nom}".strip() or user.email,
+                capteur_identifiant=capteur.identifiant,
+                distance_meters=distance,
+                threshold_meters=capteur.gpsThresholdMeters,
+                ruche_immatriculation=getattr(capteur.ruche, "immatriculation", ""),
+                reference_lat=capteur.gpsReferenceLat,
+                reference_lng=capteur.gpsReferenceLng,
+                current_lat=pos.get("latitude"),
+                current_lng=pos.get("longitude"),
+            )
+            send_email(
+                to_email=user.email,
+                to_name=f"{user.prenom} {user.nom}".strip(),
+                subject="Alerte deplacement GPS",
+                html_content=html_content,
             )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Alerte {alerte.id} capteur {capteur.identifiant} distance {distance:.1f}m"
+            )
+        )
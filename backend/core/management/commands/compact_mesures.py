@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Capteur, CodecChunk
+from core.timeseries import compact_capteur, default_codec
+
+
+class Command(BaseCommand):
+    help = "Move cold Mesure rows into packed per-day chunks (mesures_chunks)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=None,
+            help="Age minimal (jours) des mesures compactees (defaut: MESURES_COMPACTION_DAYS).",
+        )
+        parser.add_argument(
+            "--codec",
+            choices=[c.value for c in CodecChunk],
+            default=None,
+            help="Compression des blocs (defaut: zstd si disponible, sinon zlib).",
+        )
+        parser.add_argument(
+            "--capteur",
+            default=None,
+            help="Limiter la compaction a un capteur (id).",
+        )
+
+    def handle(self, *args, **options):
+        days = options["older_than_days"]
+        if days is None:
+            days = int(getattr(settings, "MESURES_COMPACTION_DAYS", 30))
+        if days < 1:
+            raise CommandError("--older-than-days doit etre >= 1")
+        codec = options["codec"] or default_codec()
+        before = timezone.now() - timedelta(days=days)
+
+        capteurs = Capteur.objects.order_by("id")
+        if options["capteur"]:
+            capteurs = capteurs.filter(id=options["capteur"])
+
+        total_rows = total_days = 0
+        for capteur_id in capteurs.values_list("id", flat=True).iterator(chunk_size=1000):
+            rows, chunk_days = compact_capteur(capteur_id, before, codec=codec)
+            total_rows += rows
+            total_days += chunk_days
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Compaction ({codec}): {total_rows} mesure(s) deplacee(s) dans {total_days} bloc(s) jour"
+            )
+        )
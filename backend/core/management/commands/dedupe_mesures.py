@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.ingestion import dedupe_mesures
+
+
+class Command(BaseCommand):
+    help = "Remove duplicate Mesure rows on (capteur, date), keeping the first one received."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=200,
+            help="Nombre de capteurs traites par requete.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size doit etre >= 1")
+        deleted = dedupe_mesures(capteur_chunk_size=chunk_size, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Mesures: {deleted} doublon(s) supprime(s)"))
@@ -0,0 +1,98 @@
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.detection import capteurs_context, create_alerts, load_states, new_readings, save_watermarks
+from core.models import Capteur, TypeAlerte, TypeCapteur
+from core.weight_detection import DETECTEUR_CHUTE_POIDS, cusum_drops
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Command(BaseCommand):
+    help = "Detect sudden weight drops (ChutePoids) on Poids capteurs since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Nombre de capteurs dont les mesures sont lues par requete.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size doit etre >= 1")
+
+        self.slack = float(getattr(settings, "CHUTE_POIDS_TOLERANCE_KG", 0.2))
+        self.threshold = float(getattr(settings, "CHUTE_POIDS_SEUIL_KG", 2.0))
+        self.now = timezone.now()
+        # Premiere execution pour un capteur: on ne relit pas tout l'historique.
+        self.first_since = self.now - timedelta(hours=int(getattr(settings, "CHUTE_POIDS_LOOKBACK_HOURS", 48)))
+
+        capteur_ids = list(
+            Capteur.objects.filter(actif=True, type=TypeCapteur.POIDS.value)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        readings = alerts = 0
+        for ids in _batches(capteur_ids, batch_size):
+            n_readings, n_alerts = self._process(ids)
+            readings += n_readings
+            alerts += n_alerts
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Chute de poids: {len(capteur_ids)} capteur(s), {readings} mesure(s) lue(s), {alerts} alerte(s)"
+            )
+        )
+
+    def _process(self, ids):
+        states = load_states(DETECTEUR_CHUTE_POIDS, ids)
+        readings = new_readings(DETECTEUR_CHUTE_POIDS, ids, self.now, self.first_since)
+        watermarks = []
+        drops = []
+        n_readings = 0
+        for capteur_id, rows in groupby(readings.iterator(), key=itemgetter(0)):
+            rows = list(rows)
+            n_readings += len(rows)
+            values = [row[2] for row in rows]
+            state = states.get(capteur_id) or {}
+            alarms, cusum = cusum_drops(
+                values,
+                previous=state.get("lastValue"),
+                cusum=state.get("cusum", 0.0),
+                slack=self.slack,
+                threshold=self.threshold,
+            )
+            for index, drop in alarms:
+                drops.append((capteur_id, rows[index][1], drop))
+            watermarks.append((capteur_id, rows[-1][1], {"lastValue": values[-1], "cusum": cusum}))
+
+        with transaction.atomic():
+            self._create_alerts(drops)
+            save_watermarks(DETECTEUR_CHUTE_POIDS, watermarks)
+        return n_readings, len(drops)
+
+    def _create_alerts(self, drops):
+        if not drops:
+            return
+        context = capteurs_context(d[0] for d in drops)
+        items = []
+        for capteur_id, date, drop in drops:
+            identifiant, _, immatriculation, _ = context[capteur_id]
+            message = (
+                f"Chute de poids de {drop:.1f} kg detectee sur la ruche {immatriculation} "
+                f"(capteur {identifiant}) le {date:%d/%m/%Y %H:%M}."
+            )
+            items.append((capteur_id, TypeAlerte.CHUTE_POIDS.value, "Chute de poids detectee", message))
+        create_alerts(items, context)
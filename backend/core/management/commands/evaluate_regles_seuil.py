@@ -0,0 +1,122 @@
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.detection import capteurs_context, create_alerts, load_states, new_readings, save_watermarks
+from core.models import Capteur, CibleRegle, TypeAlerte
+from core.threshold_rules import (
+    DETECTEUR_REGLES_BATTERIE,
+    DETECTEUR_REGLES_MESURE,
+    breach_message,
+    compile_rules,
+    evaluate,
+    rules_for,
+)
+
+TITRES = {
+    TypeAlerte.TEMPERATURE_CRITIQUE.value: "Temperature critique",
+    TypeAlerte.BATTERIE_FAIBLE.value: "Batterie faible",
+}
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Command(BaseCommand):
+    help = "Evaluate entreprise threshold rules on new Mesure rows and capteur battery levels."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Nombre de capteurs dont les mesures sont lues par requete.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size doit etre >= 1")
+
+        self.now = timezone.now()
+        self.first_since = self.now - timedelta(hours=int(getattr(settings, "REGLES_SEUIL_LOOKBACK_HOURS", 24)))
+
+        compiled = compile_rules()
+        mesure_rules = rules_for(compiled, CibleRegle.MESURE.value)
+        batterie_rules = rules_for(compiled, CibleRegle.BATTERIE.value)
+
+        readings = alerts = 0
+        for ids in _batches(sorted(mesure_rules), batch_size):
+            n_readings, n_alerts = self._process_mesures(ids, mesure_rules)
+            readings += n_readings
+            alerts += n_alerts
+        for ids in _batches(sorted(batterie_rules), batch_size):
+            alerts += self._process_batterie(ids, batterie_rules)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Regles de seuil: {len(compiled)} capteur(s) couvert(s), "
+                f"{readings} mesure(s) evaluee(s), {alerts} alerte(s)"
+            )
+        )
+
+    def _process_mesures(self, ids, rules):
+        states = load_states(DETECTEUR_REGLES_MESURE, ids)
+        rows = new_readings(DETECTEUR_REGLES_MESURE, ids, self.now, self.first_since)
+        breaches = []
+        watermarks = []
+        n_readings = 0
+        for capteur_id, group in groupby(rows.iterator(), key=itemgetter(0)):
+            group = [(date, valeur) for _, date, valeur in group]
+            n_readings += len(group)
+            state = states.get(capteur_id) or {}
+            breaches.extend((capteur_id, b) for b in evaluate(rules[capteur_id], group, state))
+            watermarks.append((capteur_id, group[-1][0], state))
+
+        with transaction.atomic():
+            self._alert(breaches)
+            save_watermarks(DETECTEUR_REGLES_MESURE, watermarks)
+        return n_readings, len(breaches)
+
+    def _process_batterie(self, ids, rules):
+        """batteriePct n'a pas d'historique: on evalue la derniere valeur connue."""
+        states = load_states(DETECTEUR_REGLES_BATTERIE, ids)
+        levels = Capteur.objects.filter(id__in=ids, batteriePct__isnull=False).values_list(
+            "id", "batteriePct", "derniereCommunication"
+        )
+        breaches = []
+        watermarks = []
+        for capteur_id, pct, last_comm in levels:
+            state = states.get(capteur_id) or {}
+            date = last_comm or self.now
+            breaches.extend((capteur_id, b) for b in evaluate(rules[capteur_id], [(date, pct)], state))
+            watermarks.append((capteur_id, date, state))
+
+        with transaction.atomic():
+            self._alert(breaches)
+            save_watermarks(DETECTEUR_REGLES_BATTERIE, watermarks)
+        return len(breaches)
+
+    def _alert(self, breaches):
+        if not breaches:
+            return
+        context = capteurs_context(capteur_id for capteur_id, _ in breaches)
+        items = []
+        for capteur_id, breach in breaches:
+            identifiant, _, immatriculation, _ = context[capteur_id]
+            items.append(
+                (
+                    capteur_id,
+                    breach.rule.type_alerte,
+                    TITRES.get(breach.rule.type_alerte, breach.rule.type_alerte),
+                    breach_message(breach, identifiant, immatriculation),
+                )
+            )
+        create_alerts(items, context)
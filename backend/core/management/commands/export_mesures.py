@@ -0,0 +1,69 @@
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from core import export
+from core.models import Capteur
+
+
+class Command(BaseCommand):
+    help = "Export Mesure history (raw rows and compacted chunks) to Parquet or Arrow IPC."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Fichier de sortie.")
+        parser.add_argument("--format", choices=export.FORMATS, default=export.FORMAT_PARQUET)
+        parser.add_argument("--entreprise", default=None, help="Limiter a une entreprise (id).")
+        parser.add_argument("--capteur", action="append", default=[], help="Capteur a exporter (repetable).")
+        parser.add_argument("--from", dest="start", default=None, help="Date de debut ISO 8601.")
+        parser.add_argument("--to", dest="end", default=None, help="Date de fin ISO 8601.")
+        parser.add_argument(
+            "--details",
+            action="store_true",
+            help="Ajouter le type de capteur et l'immatriculation de la ruche.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=export.DEFAULT_BATCH_SIZE,
+            help="Lignes par row group / record batch.",
+        )
+
+    def _date(self, value, option):
+        if value is None:
+            return None
+        date = parse_datetime(value)
+        if date is None or date.tzinfo is None:
+            raise CommandError(f"{option} doit etre une date ISO 8601 avec fuseau")
+        return date
+
+    def _uuid(self, value, option):
+        try:
+            return uuid.UUID(value)
+        except ValueError:
+            raise CommandError(f"{option} doit etre un identifiant (UUID): {value}")
+
+    def handle(self, *args, **options):
+        if not export.available():
+            raise CommandError("pyarrow n'est pas installe")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size doit etre >= 1")
+        start = self._date(options["start"], "--from")
+        end = self._date(options["end"], "--to")
+
+        capteurs = Capteur.objects.all()
+        if options["entreprise"]:
+            capteurs = capteurs.filter(ruche__rucher__entreprise_id=self._uuid(options["entreprise"], "--entreprise"))
+        if options["capteur"]:
+            capteurs = capteurs.filter(id__in=[self._uuid(value, "--capteur") for value in options["capteur"]])
+
+        total = export.write_export(
+            options["output"],
+            capteurs,
+            fmt=options["format"],
+            start=start,
+            end=end,
+            details=options["details"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Export {options['format']}: {total} mesure(s) -> {options['output']}"))
@@ -0,0 +1,100 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import mqtt
+from core.ingestion import ON_CONFLICT_CHOICES, ON_CONFLICT_IGNORE
+
+
+class Command(BaseCommand):
+    help = "Subscribe to gateway MQTT topics and write readings to mesures in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default=None, help="Broker MQTT (defaut: MQTT_HOST).")
+        parser.add_argument("--port", type=int, default=None, help="Port du broker (defaut: MQTT_PORT).")
+        parser.add_argument("--topic", default=None, help="Filtre de topic (defaut: MQTT_TOPIC).")
+        parser.add_argument("--qos", type=int, choices=(0, 1, 2), default=1)
+        parser.add_argument(
+            "--client-id",
+            default=None,
+            help="Identifiant client; non vide = session persistante cote broker (defaut: MQTT_CLIENT_ID).",
+        )
+        parser.add_argument("--batch-size", type=int, default=None, help="Lectures par ecriture (defaut: MQTT_BATCH_SIZE).")
+        parser.add_argument("--flush-ms", type=int, default=None, help="Delai max avant ecriture (defaut: MQTT_FLUSH_MS).")
+        parser.add_argument(
+            "--queue-size",
+            type=int,
+            default=None,
+            help="Lectures en attente avant de bloquer la reception (defaut: MQTT_QUEUE_SIZE).",
+        )
+        parser.add_argument("--on-conflict", choices=ON_CONFLICT_CHOICES, default=ON_CONFLICT_IGNORE)
+
+    def _option(self, options, name, setting, default):
+        value = options[name]
+        return value if value is not None else getattr(settings, setting, default)
+
+    def handle(self, *args, **options):
+        if not mqtt.available():
+            raise CommandError("paho-mqtt n'est pas installe")
+        batch_size = int(self._option(options, "batch_size", "MQTT_BATCH_SIZE", 500))
+        flush_ms = int(self._option(options, "flush_ms", "MQTT_FLUSH_MS", 1000))
+        queue_size = int(self._option(options, "queue_size", "MQTT_QUEUE_SIZE", 10000))
+        if batch_size < 1 or flush_ms < 1 or queue_size < batch_size:
+            raise CommandError("--batch-size et --flush-ms doivent etre >= 1, --queue-size >= --batch-size")
+
+        host = self._option(options, "host", "MQTT_HOST", "localhost")
+        port = int(self._option(options, "port", "MQTT_PORT", 1883))
+        topic = self._option(options, "topic", "MQTT_TOPIC", mqtt.DEFAULT_TOPIC)
+        bridge = mqtt.MqttBridge(
+            batch_size=batch_size,
+            flush_ms=flush_ms,
+            queue_size=queue_size,
+            on_conflict=options["on_conflict"],
+        )
+        client = mqtt.client(
+            bridge,
+            topic=topic,
+            qos=options["qos"],
+            client_id=self._option(options, "client_id", "MQTT_CLIENT_ID", ""),
+            username=getattr(settings, "MQTT_USERNAME", ""),
+            password=getattr(settings, "MQTT_PASSWORD", ""),
+        )
+
+        stop = threading.Event()
+
+        def shutdown(signum, frame):
+            stop.set()
+            client.disconnect()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        client.connect_async(host, port)
+        client.loop_start()
+        self.stdout.write(f"Ecoute de {topic} sur {host}:{port} (lots de {batch_size}, {flush_ms} ms)")
+        try:
+            bridge.run(stop)
+        finally:
+            stop.set()
+            client.disconnect()
+            # Le thread reseau peut etre bloque sur une file pleine: on continue
+            # de la vider pendant qu'il s'arrete.
+            stopper = threading.Thread(target=client.loop_stop)
+            stopper.start()
+            while stopper.is_alive():
+                bridge.run(stop)
+                stopper.join(0.1)
+            bridge.run(stop)
+
+        stats = bridge.stats
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"MQTT: {stats['received']} lecture(s) recue(s), {stats['inserted']} inseree(s), "
+                f"{stats['duplicates']} doublon(s), {stats['quarantined']} en quarantaine, "
+                f"{stats['invalid']} ecartee(s) par la base, "
+                f"{stats['unknown']} capteur(s) inconnu(s), "
+                f"{stats['rejected']} message(s) rejete(s)"
+            )
+        )
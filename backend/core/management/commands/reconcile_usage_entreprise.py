@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.usage import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recount ruchers, capteurs and reines per entreprise into usage_entreprise."
+
+    def handle(self, *args, **options):
+        corrected = reconcile()
+        for entreprise_id in corrected:
+            self.stdout.write(f"Compteurs corriges: {entreprise_id}")
+        self.stdout.write(self.style.SUCCESS(f"{len(corrected)} entreprise(s) corrigee(s)"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.dashboard import refresh
+
+
+class Command(BaseCommand):
+    help = "Refresh the dashboard_entreprise materialized view concurrently."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-interval",
+            type=int,
+            default=None,
+            help="Ne rien faire si le dernier rafraichissement date de moins de N secondes "
+                 "(defaut: DASHBOARD_REFRESH_MIN_SECONDS, 0 pour forcer).",
+        )
+
+    def handle(self, *args, **options):
+        min_interval = options["min_interval"]
+        if min_interval is not None and min_interval < 0:
+            raise CommandError("--min-interval doit etre >= 0")
+        if refresh(min_interval=min_interval):
+            self.stdout.write(self.style.SUCCESS("Tableau de bord rafraichi"))
+        else:
+            self.stdout.write("Tableau de bord deja a jour ou rafraichissement en cours")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.health_scores import refresh
+
+
+class Command(BaseCommand):
+    help = "Recompute stale hive health scores (ruches_sante) in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Nombre de ruches calculees par lot (une requete par source et par lot).",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recalculer toutes les ruches, pas seulement les scores perimes.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size doit etre >= 1")
+        count = refresh(batch_size=batch_size, all_ruches=options["all"])
+        self.stdout.write(self.style.SUCCESS(f"Sante des ruches: {count} score(s) recalcule(s)"))
@@ -0,0 +1,95 @@
+import asyncio
+import ipaddress
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.ingest_server import IngestServer
+from core.ingestion import ON_CONFLICT_CHOICES, ON_CONFLICT_IGNORE
+
+
+def _is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class Command(BaseCommand):
+    help = "Run the asyncio UDP/TCP server receiving fixed-format readings from sensor gateways."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default=None, help="Adresse d'ecoute (defaut: INGEST_SERVER_HOST).")
+        parser.add_argument("--udp-port", type=int, default=None, help="Port UDP, 0 = desactive (defaut: INGEST_SERVER_UDP_PORT).")
+        parser.add_argument("--tcp-port", type=int, default=None, help="Port TCP, 0 = desactive (defaut: INGEST_SERVER_TCP_PORT).")
+        parser.add_argument("--batch-size", type=int, default=None, help="Lignes par ecriture (defaut: INGEST_SERVER_BATCH_SIZE).")
+        parser.add_argument("--flush-ms", type=int, default=None, help="Delai max avant ecriture (defaut: INGEST_SERVER_FLUSH_MS).")
+        parser.add_argument(
+            "--queue-size",
+            type=int,
+            default=None,
+            help="Paquets de lignes en attente d'ecriture (defaut: INGEST_SERVER_QUEUE_SIZE).",
+        )
+        parser.add_argument(
+            "--refresh-seconds",
+            type=int,
+            default=None,
+            help="Intervalle de rechargement des capteurs (defaut: INGEST_SERVER_REFRESH_SECONDS).",
+        )
+        parser.add_argument("--on-conflict", choices=ON_CONFLICT_CHOICES, default=ON_CONFLICT_IGNORE)
+
+    def _option(self, options, name, setting, default):
+        value = options[name]
+        return value if value is not None else getattr(settings, setting, default)
+
+    def handle(self, *args, **options):
+        host = self._option(options, "host", "INGEST_SERVER_HOST", "127.0.0.1")
+        udp_port = int(self._option(options, "udp_port", "INGEST_SERVER_UDP_PORT", 5683)) or None
+        tcp_port = int(self._option(options, "tcp_port", "INGEST_SERVER_TCP_PORT", 5684)) or None
+        if udp_port is None and tcp_port is None:
+            raise CommandError("Au moins un port UDP ou TCP est requis")
+        batch_size = int(self._option(options, "batch_size", "INGEST_SERVER_BATCH_SIZE", 2000))
+        flush_ms = int(self._option(options, "flush_ms", "INGEST_SERVER_FLUSH_MS", 200))
+        queue_size = int(self._option(options, "queue_size", "INGEST_SERVER_QUEUE_SIZE", 1000))
+        refresh_seconds = int(self._option(options, "refresh_seconds", "INGEST_SERVER_REFRESH_SECONDS", 60))
+        if min(batch_size, flush_ms, queue_size, refresh_seconds) < 1:
+            raise CommandError("--batch-size, --flush-ms, --queue-size et --refresh-seconds doivent etre >= 1")
+        networks = [n.strip() for n in getattr(settings, "INGEST_SERVER_ALLOWED_NETWORKS", "").split(",") if n.strip()]
+        if not networks and not _is_loopback(host):
+            # Protocole sans authentification: pas d'ecoute publique sans liste de sources.
+            raise CommandError(f"INGEST_SERVER_ALLOWED_NETWORKS est requis pour ecouter sur {host}")
+
+        async def main():
+            server = IngestServer(
+                batch_size=batch_size,
+                flush_ms=flush_ms,
+                queue_size=queue_size,
+                refresh_seconds=refresh_seconds,
+                on_conflict=options["on_conflict"],
+                allowed_networks=networks,
+            )
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, stop.set)
+            self.stdout.write(
+                f"Ingestion sur {host} (UDP {udp_port or '-'}, TCP {tcp_port or '-'}), lots de {batch_size}"
+            )
+            await server.serve(host, udp_port=udp_port, tcp_port=tcp_port, stop=stop)
+            return server.stats
+
+        try:
+            stats = asyncio.run(main())
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Ingestion: {stats['received']} lecture(s) recue(s), {stats['inserted']} inseree(s), "
+                f"{stats['duplicates']} doublon(s), {stats['quarantined']} en quarantaine, {stats['unknown']} inconnue(s), "
+                f"{stats['invalid']} ecartee(s) par la base, "
+                f"{stats['rejected']} rejetee(s), {stats['dropped']} perdue(s)"
+            )
+        )
@@ -0,0 +1,220 @@
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, FloatField, Max, Q, Value
+from django.db.models.functions import Coalesce, Floor
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from core.auth_views import _get_user_from_request
+from core.iot_views import _entreprise_id_from_request, _ensure_user_in_entreprise
+from core.models import Capteur, Rucher, TypeCapteur
+
+MAX_ZOOM = 22
+# Nombre de cellules par tuile (256px) et par axe: ~64px par cellule a l'ecran.
+CELLS_PER_TILE = 4
+
+
+def _parse_bbox(value):
+    """Parse 'minLng,minLat,maxLng,maxLat' ou retourne None."""
+    parts = (value or "").split(",")
+    if len(parts) != 4:
+        return None
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(p) for p in parts)
+    except ValueError:
+        return None
+    if not all(math.isfinite(v) for v in (min_lng, min_lat, max_lng, max_lat)):
+        return None
+    if min_lng > max_lng or min_lat > max_lat:
+        return None
+    if min_lat < -90 or max_lat > 90 or min_lng < -180 or max_lng > 180:
+        return None
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def _parse_zoom(value):
+    try:
+        zoom = int(value)
+    except (TypeError, ValueError):
+        return None
+    if zoom < 0 or zoom > MAX_ZOOM:
+        return None
+    return zoom
+
+
+def _cell_size(zoom):
+    return 360.0 / (2 ** zoom) / CELLS_PER_TILE
+
+
+def _snap_bbox(bbox, cell):
+    """Etend la bbox aux bords de la grille pour partager le cache entre vues proches."""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    return (
+        math.floor(min_lng / cell) * cell,
+        math.floor(min_lat / cell) * cell,
+        (math.floor(max_lng / cell) + 1) * cell,
+        (math.floor(max_lat / cell) + 1) * cell,
+    )
+
+
+def _entreprise_map_version(entreprise_id):
+    """Version peu couteuse des donnees carto de l'entreprise (change a chaque ajout/modif)."""
+    ruchers = Rucher.objects.filter(entreprise_id=entreprise_id).aggregate(
+        n=Count("id"), last=Max("updated_at")
+    )
+    capteurs = Capteur.objects.filter(
+        ruche__rucher__entreprise_id=entreprise_id,
+        type=TypeCapteur.GPS.value,
+    ).aggregate(
+        n=Count("id"),
+        alerts=Count("id", filter=Q(gpsAlertActive=True)),
+        last=Max("updated_at"),
+    )
+    parts = [
+        ruchers["n"],
+        ruchers["last"].timestamp() if ruchers["last"] else 0,
+        capteurs["n"],
+        capteurs["alerts"],
+        capteurs["last"].timestamp() if capteurs["last"] else 0,
+    ]
+    return ":".join(str(p) for p in parts)
+
+
+def _rucher_cells(entreprise_id, bbox, cell):
+    min_lng, min_lat, max_lng, max_lat = bbox
+    return (
+        Rucher.objects.filter(
+            entreprise_id=entreprise_id,
+            latitude__gte=min_lat,
+            latitude__lt=max_lat,
+            longitude__gte=min_lng,
+            longitude__lt=max_lng,
+        )
+        .annotate(
+            cx=Floor(F("longitude") / Value(cell)),
+            cy=Floor(F("latitude") / Value(cell)),
+        )
+        .values("cx", "cy")
+        .annotate(n=Count("id"), lat=Avg("latitude"), lng=Avg("longitude"))
+        .order_by()
+    )
+
+
+def _capteur_cells(entreprise_id, bbox, cell):
+    """Capteurs GPS positionnes sur leur reference, a defaut sur leur rucher."""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    return (
+        Capteur.objects.filter(
+            ruche__rucher__entreprise_id=entreprise_id,
+            type=TypeCapteur.GPS.value,
+        )
+        .annotate(
+            pos_lat=Coalesce("gpsReferenceLat", "ruche__rucher__latitude", output_field=FloatField()),
+            pos_lng=Coalesce("gpsReferenceLng", "ruche__rucher__longitude", output_field=FloatField()),
+        )
+        .filter(
+            pos_lat__gte=min_lat,
+            pos_lat__lt=max_lat,
+            pos_lng__gte=min_lng,
+            pos_lng__lt=max_lng,
+        )
+        .annotate(
+            cx=Floor(F("pos_lng") / Value(cell)),
+            cy=Floor(F("pos_lat") / Value(cell)),
+        )
+        .values("cx", "cy")
+        .annotate(
+            n=Count("id"),
+            alerts=Count("id", filter=Q(gpsAlertActive=True)),
+            lat=Avg("pos_lat"),
+            lng=Avg("pos_lng"),
+        )
+        .order_by()
+    )
+
+
+def _build_clusters(entreprise_id, bbox, zoom):
+    cell = _cell_size(zoom)
+    cells = {}
+
+    def _cell(cx, cy):
+        key = (int(cx), int(cy))
+        if key not in cells:
+            cells[key] = {
+                "ruchersCount": 0,
+                "capteursCount": 0,
+                "activeAlertsCount": 0,
+                "_lat": 0.0,
+                "_lng": 0.0,
+            }
+        return cells[key]
+
+    for row in _rucher_cells(entreprise_id, bbox, cell):
+        c = _cell(row["cx"], row["cy"])
+        c["ruchersCount"] += row["n"]
+        c["_lat"] += row["lat"] * row["n"]
+        c["_lng"] += row["lng"] * row["n"]
+
+    for row in _capteur_cells(entreprise_id, bbox, cell):
+        c = _cell(row["cx"], row["cy"])
+        c["capteursCount"] += row["n"]
+        c["activeAlertsCount"] += row["alerts"]
+        c["_lat"] += row["lat"] * row["n"]
+        c["_lng"] += row["lng"] * row["n"]
+
+    clusters = []
+    for (cx, cy), c in sorted(cells.items()):
+        total = c["ruchersCount"] + c["capteursCount"]
+        clusters.append(
+            {
+                "cell": [cx, cy],
+                "bounds": [cx * cell, cy * cell, (cx + 1) * cell, (cy + 1) * cell],
+                "latitude": c["_lat"] / total,
+                "longitude": c["_lng"] / total,
+                "count": total,
+                "ruchersCount": c["ruchersCount"],
+                "capteursCount": c["capteursCount"],
+                "activeAlertsCount": c["activeAlertsCount"],
+                "hasActiveAlert": c["activeAlertsCount"] > 0,
+            }
+        )
+    return {
+        "zoom": zoom,
+        "cellSize": cell,
+        "bbox": list(bbox),
+        "clusters": clusters,
+    }
+
+
+@require_GET
+def get_map_clusters(request):
+    """GET /api/map/clusters?bbox=minLng,minLat,maxLng,maxLat&zoom=z - Ruchers et capteurs GPS agreges par cellule."""
+    user, err = _get_user_from_request(request)
+    if err:
+        return err
+
+    entreprise_id = _entreprise_id_from_request(request)
+    err = _ensure_user_in_entreprise(user, entreprise_id)
+    if err:
+        return err
+
+    bbox = _parse_bbox(request.GET.get("bbox"))
+    if bbox is None:
+        return JsonResponse({"error": "invalid_bbox"}, status=400)
+    zoom = _parse_zoom(request.GET.get("zoom"))
+    if zoom is None:
+        return JsonResponse({"error": "invalid_zoom"}, status=400)
+
+    bbox = _snap_bbox(bbox, _cell_size(zoom))
+    version = _entreprise_map_version(entreprise_id)
+    cache_key = "map_clusters:{}:{}:{}:{}".format(
+        entreprise_id, version, zoom, ",".join(f"{v:.6f}" for v in bbox)
+    )
+    data = cache.get(cache_key)
+    if data is None:
+        data = _build_clusters(entreprise_id, bbox, zoom)
+        cache.set(cache_key, data, getattr(settings, "MAP_CLUSTERS_CACHE_TTL", 60))
+
+    return JsonResponse(data, status=200)
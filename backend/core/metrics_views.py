@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from core.resilience import dependencies_snapshot
+from core.traccar_client import position_cache_stats
+
+
+def _verify_metrics_secret(request):
+    expected = getattr(settings, "METRICS_SECRET", "")
+    if not expected:
+        return True
+    return request.headers.get("X-Metrics-Secret", "") == expected
+
+
+@require_GET
+def get_metrics(request):
+    """GET /api/metrics - Etat des disjoncteurs et compteurs internes des dependances externes."""
+    if not _verify_metrics_secret(request):
+        return JsonResponse({"error": "Unauthorized"}, status=401)
+
+    return JsonResponse(
+        {
+            "dependencies": dependencies_snapshot(),
+            "traccar": {"positionCache": position_cache_stats()},
+        },
+        status=200,
+    )
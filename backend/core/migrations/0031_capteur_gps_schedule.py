@@ -0,0 +1,28 @@
+# Generated by Django 5.0 on 2026-10-19 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_merge_20260210_1130'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='capteur',
+            name='gpsCheckIntervalSeconds',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='capteur',
+            name='gpsLastDistanceMeters',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='capteur',
+            name='gpsNextCheckAt',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0 on 2026-10-19 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_capteur_gps_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='capteur',
+            name='horsLigneDepuis',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='capteur',
+            name='horsLigneLastAlertAt',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='type',
+            field=models.CharField(choices=[('RappelVisite', 'RappelVisite'), ('RappelTraitement', 'RappelTraitement'), ('Equipe', 'Equipe'), ('Saisonnier', 'Saisonnier'), ('AlerteSanitaire', 'AlerteSanitaire'), ('AlerteGPS', 'AlerteGPS'), ('AlerteCapteur', 'AlerteCapteur')], max_length=30),
+        ),
+        migrations.AddIndex(
+            model_name='capteur',
+            index=models.Index(fields=['actif', 'type', 'derniereCommunication'], name='capteurs_actif_type_comm_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0 on 2026-10-19 18:22
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_capteur_hors_ligne'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DetectionWatermark',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('detecteur', models.CharField(max_length=50)),
+                ('lastDate', models.DateTimeField(blank=True, null=True)),
+                ('state', models.JSONField(blank=True, default=dict)),
+                ('capteur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='detection_watermarks', to='core.capteur')),
+            ],
+            options={
+                'verbose_name': 'Watermark de detection',
+                'verbose_name_plural': 'Watermarks de detection',
+                'db_table': 'detection_watermarks',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='detectionwatermark',
+            constraint=models.UniqueConstraint(fields=('detecteur', 'capteur'), name='detection_watermark_unique'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0 on 2026-10-19 18:24
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0033_detection_watermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegleSeuil',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('typeCapteur', models.CharField(blank=True, choices=[('Poids', 'Poids'), ('Temperature', 'Temperature'), ('Humidite', 'Humidite'), ('GPS', 'GPS'), ('CO2', 'CO2'), ('Son', 'Son'), ('Batterie', 'Batterie')], max_length=20, null=True)),
+                ('typeAlerte', models.CharField(choices=[('Vol', 'Vol'), ('ChutePoids', 'ChutePoids'), ('TemperatureCritique', 'TemperatureCritique'), ('BatterieFaible', 'BatterieFaible'), ('DeplacementGPS', 'DeplacementGPS'), ('HorsLigne', 'HorsLigne')], max_length=30)),
+                ('cible', models.CharField(choices=[('Mesure', 'Mesure'), ('Batterie', 'Batterie')], default='Mesure', max_length=20)),
+                ('valeurMin', models.FloatField(blank=True, null=True)),
+                ('valeurMax', models.FloatField(blank=True, null=True)),
+                ('dureeMinutes', models.IntegerField(default=0)),
+                ('actif', models.BooleanField(default=True)),
+                ('entreprise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='regles_seuil', to='core.entreprise')),
+            ],
+            options={
+                'verbose_name': 'Regle de seuil',
+                'verbose_name_plural': 'Regles de seuil',
+                'db_table': 'regles_seuil',
+                'indexes': [models.Index(fields=['entreprise', 'actif'], name='regles_seui_entrepr_ff9c59_idx')],
+            },
+        ),
+    ]
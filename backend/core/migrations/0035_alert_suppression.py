@@ -0,0 +1,65 @@
+# Generated by Django 5.0 on 2026-10-19 18:27
+
+import uuid
+from datetime import datetime, time, timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_today(apps, schema_editor):
+    """Reprend les envois du jour pour ne pas les renvoyer au deploiement."""
+    Capteur = apps.get_model("core", "Capteur")
+    Notification = apps.get_model("core", "Notification")
+    AlerteSuppression = apps.get_model("core", "AlerteSuppression")
+
+    now = timezone.now()
+    today = now.date()
+    expire = datetime.combine(today + timedelta(days=2), time.min, tzinfo=now.tzinfo)
+    keys = set()
+    for capteur_id in Capteur.objects.filter(gpsLastAlertAt__date=today).values_list("id", flat=True):
+        keys.add(("DeplacementGPS", str(capteur_id)))
+    for type_, ruche_id, entreprise_id in Notification.objects.filter(
+        date__date=today,
+        type__in=["RappelVisite", "RappelTraitement", "AlerteSanitaire", "Saisonnier"],
+    ).values_list("type", "ruche_id", "entreprise_id"):
+        keys.add((type_, str(entreprise_id if type_ == "Saisonnier" else ruche_id)))
+    AlerteSuppression.objects.bulk_create(
+        [
+            AlerteSuppression(type=type_, sujet=sujet, fenetre=today.isoformat(), expireAt=expire)
+            for type_, sujet in keys
+        ],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0034_regle_seuil'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlerteSuppression',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('type', models.CharField(max_length=50)),
+                ('sujet', models.CharField(max_length=100)),
+                ('fenetre', models.CharField(max_length=40)),
+                ('expireAt', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': "Suppression d'alerte",
+                'verbose_name_plural': "Suppressions d'alertes",
+                'db_table': 'alert_suppressions',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='alertesuppression',
+            constraint=models.UniqueConstraint(fields=('type', 'sujet', 'fenetre'), name='alert_suppression_unique'),
+        ),
+        migrations.RunPython(backfill_today, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0 on 2026-10-19 18:33
+
+from django.db import migrations, models
+
+CHUNK_SIZE = 200
+
+DEDUPE_SQL = """
+    DELETE FROM mesures m
+    USING (
+        SELECT id, row_number() OVER (
+            PARTITION BY capteur_id, date ORDER BY created_at, id
+        ) AS rn
+        FROM mesures
+        WHERE capteur_id = ANY(%s)
+    ) d
+    WHERE m.id = d.id AND d.rn > 1
+"""
+
+
+def dedupe_mesures(apps, schema_editor):
+    """Supprime les doublons (capteur, date) par paquets de capteurs avant la contrainte."""
+    Capteur = apps.get_model("core", "Capteur")
+    capteur_ids = list(Capteur.objects.order_by("id").values_list("id", flat=True))
+    with schema_editor.connection.cursor() as cursor:
+        for start in range(0, len(capteur_ids), CHUNK_SIZE):
+            cursor.execute(DEDUPE_SQL, [capteur_ids[start:start + CHUNK_SIZE]])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0035_alert_suppression'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_mesures, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='mesure',
+            constraint=models.UniqueConstraint(fields=('capteur', 'date'), name='mesure_capteur_date_unique'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0 on 2026-10-19 18:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Initialise l'etat depuis la derniere mesure (index unique capteur, date).
+BACKFILL_SQL = """
+    INSERT INTO capteur_state (
+        capteur_id, entreprise_id, "derniereValeur", "derniereDate", "batteriePct",
+        "nbMesures", created_at, updated_at
+    )
+    SELECT c.id, r.entreprise_id, m.valeur, m.date, c."batteriePct", 0, now(), now()
+    FROM capteurs c
+    JOIN ruches ru ON ru.id = c.ruche_id
+    JOIN ruchers r ON r.id = ru.rucher_id
+    LEFT JOIN LATERAL (
+        SELECT valeur, date FROM mesures WHERE capteur_id = c.id ORDER BY date DESC LIMIT 1
+    ) m ON true
+    ON CONFLICT (capteur_id) DO NOTHING
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0036_mesure_capteur_date_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapteurState',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('capteur', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='state', serialize=False, to='core.capteur')),
+                ('derniereValeur', models.FloatField(blank=True, null=True)),
+                ('derniereDate', models.DateTimeField(blank=True, null=True)),
+                ('batteriePct', models.FloatField(blank=True, null=True)),
+                ('intervalleMoyenSecondes', models.FloatField(blank=True, null=True)),
+                ('nbMesures', models.BigIntegerField(default=0)),
+                ('entreprise', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='capteur_states', to='core.entreprise')),
+            ],
+            options={
+                'verbose_name': 'Etat de capteur',
+                'verbose_name_plural': 'Etats de capteur',
+                'db_table': 'capteur_state',
+                'indexes': [models.Index(fields=['entreprise', 'derniereDate'], name='capteur_state_entreprise_idx')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0 on 2026-10-19 18:39
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_capteur_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MesureChunk',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('jour', models.DateField()),
+                ('nbMesures', models.IntegerField()),
+                ('dateDebut', models.DateTimeField()),
+                ('dateFin', models.DateTimeField()),
+                ('valeurMin', models.FloatField()),
+                ('valeurMax', models.FloatField()),
+                ('codec', models.CharField(choices=[('raw', 'Brut'), ('zlib', 'zlib'), ('zstd', 'zstd')], default='zlib', max_length=10)),
+                ('timestamps', models.BinaryField()),
+                ('valeurs', models.BinaryField()),
+                ('capteur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mesure_chunks', to='core.capteur')),
+            ],
+            options={
+                'verbose_name': 'Bloc de mesures',
+                'verbose_name_plural': 'Blocs de mesures',
+                'db_table': 'mesures_chunks',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='mesurechunk',
+            constraint=models.UniqueConstraint(fields=('capteur', 'jour'), name='mesure_chunk_capteur_jour_unique'),
+        ),
+    ]
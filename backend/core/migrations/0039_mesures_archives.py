@@ -0,0 +1,41 @@
+# Generated by Django 5.0 on 2026-10-19 18:44
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_mesures_chunks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MesureArchive',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('mois', models.DateField()),
+                ('dateDebut', models.DateTimeField()),
+                ('dateFin', models.DateTimeField()),
+                ('nbMesures', models.IntegerField()),
+                ('chemin', models.CharField(max_length=255)),
+                ('taille', models.BigIntegerField()),
+                ('index', models.JSONField(default=list)),
+                ('capteur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mesure_archives', to='core.capteur')),
+            ],
+            options={
+                'verbose_name': 'Archive de mesures',
+                'verbose_name_plural': 'Archives de mesures',
+                'db_table': 'mesures_archives',
+                'indexes': [models.Index(fields=['capteur', 'dateDebut', 'dateFin'], name='mesure_archive_range_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='mesurearchive',
+            constraint=models.UniqueConstraint(fields=('capteur', 'mois'), name='mesure_archive_capteur_mois_unique'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0 on 2026-10-19 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_mesures_archives'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE SEQUENCE IF NOT EXISTS capteurs_short_id_seq MINVALUE 1',
+            'DROP SEQUENCE IF EXISTS capteurs_short_id_seq',
+        ),
+        migrations.AddField(
+            model_name='capteur',
+            name='shortId',
+            field=models.IntegerField(db_default=models.Func(models.Value('capteurs_short_id_seq'), function='nextval'), editable=False, unique=True),
+        ),
+    ]
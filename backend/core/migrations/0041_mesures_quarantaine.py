@@ -0,0 +1,34 @@
+# Generated by Django 5.0 on 2026-10-19 19:05
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0040_capteur_short_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MesureQuarantaine',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateTimeField()),
+                ('valeur', models.FloatField()),
+                ('raison', models.CharField(choices=[('hors_plage', 'Hors plage physique'), ('pic', 'Pic isole'), ('variation', 'Variation trop rapide')], max_length=20)),
+                ('reference', models.FloatField(blank=True, null=True)),
+                ('capteur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mesures_quarantaine', to='core.capteur')),
+            ],
+            options={
+                'verbose_name': 'Mesure en quarantaine',
+                'verbose_name_plural': 'Mesures en quarantaine',
+                'db_table': 'mesures_quarantaine',
+                'indexes': [models.Index(fields=['capteur', 'date'], name='mesure_quarantaine_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0 on 2026-10-19 19:16
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0041_mesures_quarantaine'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SonSpectre',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateTimeField()),
+                ('frequenceDominante', models.FloatField()),
+                ('centroide', models.FloatField()),
+                ('energieTotale', models.FloatField()),
+                ('ratiosBandes', models.JSONField(default=list)),
+                ('indiceEssaimage', models.FloatField(blank=True, null=True)),
+                ('spectre', models.BinaryField(blank=True, null=True)),
+                ('spectreFrequenceMax', models.FloatField(blank=True, null=True)),
+                ('capteur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spectres', to='core.capteur')),
+            ],
+            options={
+                'verbose_name': 'Spectre de son',
+                'verbose_name_plural': 'Spectres de son',
+                'db_table': 'sons_spectres',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sonspectre',
+            constraint=models.UniqueConstraint(fields=('capteur', 'date'), name='son_spectre_capteur_date_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-19 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0042_sons_spectres'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='type',
+            field=models.CharField(choices=[('RappelVisite', 'RappelVisite'), ('RappelTraitement', 'RappelTraitement'), ('Equipe', 'Equipe'), ('Saisonnier', 'Saisonnier'), ('AlerteSanitaire', 'AlerteSanitaire'), ('AlerteGPS', 'AlerteGPS'), ('AlerteCapteur', 'AlerteCapteur'), ('ConseilHausse', 'ConseilHausse')], max_length=30),
+        ),
+    ]
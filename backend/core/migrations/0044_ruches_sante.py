@@ -0,0 +1,97 @@
+# Generated by Django 5.0 on 2026-10-19 19:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Toute ecriture (Django ou Hasura) sur une source du score marque la ruche a recalculer.
+TRIGGERS_SQL = """
+CREATE OR REPLACE FUNCTION ruches_sante_invalider(ids uuid[]) RETURNS void AS $$
+    UPDATE ruches_sante SET "invalideAt" = clock_timestamp()
+    WHERE ruche_id = ANY(ids);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION ruches_sante_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'ruches' THEN
+        PERFORM ruches_sante_invalider(ARRAY[NEW.id]);
+    ELSIF TG_TABLE_NAME = 'alertes' THEN
+        IF TG_OP <> 'INSERT' THEN
+            PERFORM ruches_sante_invalider(ARRAY(SELECT ruche_id FROM capteurs WHERE id = OLD.capteur_id));
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            PERFORM ruches_sante_invalider(ARRAY(SELECT ruche_id FROM capteurs WHERE id = NEW.capteur_id));
+        END IF;
+    ELSE
+        IF TG_OP <> 'INSERT' THEN
+            PERFORM ruches_sante_invalider(ARRAY[OLD.ruche_id]);
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            PERFORM ruches_sante_invalider(ARRAY[NEW.ruche_id]);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_ruches_sante ON ruches;
+CREATE TRIGGER trigger_ruches_sante
+    AFTER UPDATE OF statut, maladie, rucher_id ON ruches
+    FOR EACH ROW EXECUTE FUNCTION ruches_sante_trigger();
+
+DROP TRIGGER IF EXISTS trigger_ruches_sante ON interventions;
+CREATE TRIGGER trigger_ruches_sante
+    AFTER INSERT OR UPDATE OR DELETE ON interventions
+    FOR EACH ROW EXECUTE FUNCTION ruches_sante_trigger();
+
+DROP TRIGGER IF EXISTS trigger_ruches_sante ON alertes;
+CREATE TRIGGER trigger_ruches_sante
+    AFTER INSERT OR DELETE OR UPDATE OF acquittee, capteur_id ON alertes
+    FOR EACH ROW EXECUTE FUNCTION ruches_sante_trigger();
+
+DROP TRIGGER IF EXISTS trigger_ruches_sante ON capteurs;
+CREATE TRIGGER trigger_ruches_sante
+    AFTER INSERT OR DELETE OR UPDATE OF ruche_id, actif, type ON capteurs
+    FOR EACH ROW EXECUTE FUNCTION ruches_sante_trigger();
+"""
+
+DROP_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS trigger_ruches_sante ON ruches;
+DROP TRIGGER IF EXISTS trigger_ruches_sante ON interventions;
+DROP TRIGGER IF EXISTS trigger_ruches_sante ON alertes;
+DROP TRIGGER IF EXISTS trigger_ruches_sante ON capteurs;
+DROP FUNCTION IF EXISTS ruches_sante_trigger();
+DROP FUNCTION IF EXISTS ruches_sante_invalider(uuid[]);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_conseil_hausse'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RucheSante',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ruche', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sante', serialize=False, to='core.ruche')),
+                ('score', models.FloatField()),
+                ('penalites', models.JSONField(blank=True, default=dict)),
+                ('derniereInterventionAt', models.DateTimeField(blank=True, null=True)),
+                ('alertesOuvertes', models.IntegerField(default=0)),
+                ('tendancePoidsKgJour', models.FloatField(blank=True, null=True)),
+                ('calculeAt', models.DateTimeField()),
+                ('invalideAt', models.DateTimeField(blank=True, null=True)),
+                ('entreprise', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ruches_sante', to='core.entreprise')),
+            ],
+            options={
+                'verbose_name': 'Sante de ruche',
+                'verbose_name_plural': 'Sante des ruches',
+                'db_table': 'ruches_sante',
+                'indexes': [models.Index(fields=['entreprise', 'score'], name='ruche_sante_entreprise_idx')],
+            },
+        ),
+        migrations.RunSQL(TRIGGERS_SQL, DROP_TRIGGERS_SQL),
+    ]
@@ -0,0 +1,95 @@
+from django.db import migrations
+
+# Resume du tableau de bord par entreprise (une ligne, index unique pour
+# REFRESH MATERIALIZED VIEW CONCURRENTLY). Rafraichi par core.dashboard.
+CREATE_SQL = """
+CREATE MATERIALIZED VIEW dashboard_entreprise AS
+WITH ruches_e AS (
+    SELECT r.entreprise_id, ru.statut, ru.maladie
+    FROM ruches ru
+    JOIN ruchers r ON r.id = ru.rucher_id
+),
+ruches_statut AS (
+    SELECT entreprise_id, sum(n)::int AS total, jsonb_object_agg(statut, n) AS par_statut
+    FROM (SELECT entreprise_id, statut, count(*) AS n FROM ruches_e GROUP BY 1, 2) s
+    GROUP BY 1
+),
+ruches_maladie AS (
+    SELECT entreprise_id, jsonb_object_agg(maladie, n) AS par_maladie
+    FROM (SELECT entreprise_id, maladie, count(*) AS n FROM ruches_e GROUP BY 1, 2) s
+    GROUP BY 1
+),
+capteurs_e AS (
+    SELECT r.entreprise_id, c.id, c.type
+    FROM capteurs c
+    JOIN ruches ru ON ru.id = c.ruche_id
+    JOIN ruchers r ON r.id = ru.rucher_id
+    WHERE c.actif
+),
+capteurs_type AS (
+    SELECT entreprise_id, sum(n)::int AS total, jsonb_object_agg(type, n) AS par_type
+    FROM (SELECT entreprise_id, type, count(*) AS n FROM capteurs_e GROUP BY 1, 2) s
+    GROUP BY 1
+),
+alertes_ouvertes AS (
+    SELECT ce.entreprise_id, count(*)::int AS n
+    FROM alertes a
+    JOIN capteurs_e ce ON ce.id = a.capteur_id
+    WHERE NOT a.acquittee
+    GROUP BY 1
+),
+reines_statut AS (
+    SELECT entreprise_id, jsonb_object_agg(statut, n) AS par_statut
+    FROM (SELECT entreprise_id, statut, count(*) AS n FROM reines WHERE entreprise_id IS NOT NULL GROUP BY 1, 2) s
+    GROUP BY 1
+),
+taches AS (
+    SELECT ra.entreprise_id,
+           count(*)::int AS a_faire,
+           (count(*) FILTER (WHERE t."datePrevue" < CURRENT_DATE))::int AS en_retard
+    FROM taches_cycle_elevage t
+    JOIN cycles_elevage_reines c ON c.id = t.cycle_id
+    JOIN racles_elevage ra ON ra.id = c.racle_id
+    WHERE t.statut = 'AFaire'
+    GROUP BY 1
+),
+ruchers_n AS (
+    SELECT entreprise_id, count(*)::int AS n FROM ruchers GROUP BY 1
+)
+SELECT
+    e.id AS entreprise_id,
+    COALESCE(rn.n, 0) AS "nbRuchers",
+    COALESCE(rs.total, 0) AS "nbRuches",
+    COALESCE(rs.par_statut, '{}'::jsonb) AS "ruchesParStatut",
+    COALESCE(rm.par_maladie, '{}'::jsonb) AS "ruchesParMaladie",
+    COALESCE(ct.total, 0) AS "nbCapteurs",
+    COALESCE(ct.par_type, '{}'::jsonb) AS "capteursParType",
+    COALESCE(ao.n, 0) AS "alertesOuvertes",
+    COALESCE(re.par_statut, '{}'::jsonb) AS "reinesParStatut",
+    COALESCE(ta.a_faire, 0) AS "tachesAFaire",
+    COALESCE(ta.en_retard, 0) AS "tachesEnRetard",
+    now() AS "refreshedAt"
+FROM entreprises e
+LEFT JOIN ruchers_n rn ON rn.entreprise_id = e.id
+LEFT JOIN ruches_statut rs ON rs.entreprise_id = e.id
+LEFT JOIN ruches_maladie rm ON rm.entreprise_id = e.id
+LEFT JOIN capteurs_type ct ON ct.entreprise_id = e.id
+LEFT JOIN alertes_ouvertes ao ON ao.entreprise_id = e.id
+LEFT JOIN reines_statut re ON re.entreprise_id = e.id
+LEFT JOIN taches ta ON ta.entreprise_id = e.id;
+
+CREATE UNIQUE INDEX dashboard_entreprise_pk ON dashboard_entreprise (entreprise_id);
+"""
+
+DROP_SQL = "DROP MATERIALIZED VIEW IF EXISTS dashboard_entreprise"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0044_ruches_sante'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SQL, DROP_SQL),
+    ]
@@ -0,0 +1,190 @@
+# Generated by Django 5.0 on 2026-10-19 19:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Remplace les triggers COUNT(...) de la migration Hasura
+# 20260203101636_add_ruchers_capteurs_triggers: chaque ecriture (Django ou
+# Hasura) ajuste le compteur de l'entreprise par un UPDATE conditionnel; le
+# verrou de ligne serialise les insertions concurrentes d'une meme entreprise.
+# Limite NULL (pas d'offre active) ou -1: illimite.
+TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS trigger_check_ruchers_limit ON ruchers;
+DROP FUNCTION IF EXISTS check_ruchers_limit();
+DROP TRIGGER IF EXISTS trigger_check_capteurs_limit ON capteurs;
+DROP FUNCTION IF EXISTS check_capteurs_limit();
+
+CREATE OR REPLACE FUNCTION usage_entreprise_ajuster(eid uuid, ressource text, delta integer) RETURNS void AS $$
+DECLARE
+    max_allowed integer;
+    current_count integer;
+BEGIN
+    IF eid IS NULL OR delta = 0 THEN
+        RETURN;
+    END IF;
+    IF delta < 0 THEN
+        UPDATE usage_entreprise SET
+            "nbRuchers" = GREATEST("nbRuchers" + CASE WHEN ressource = 'ruchers' THEN delta ELSE 0 END, 0),
+            "nbCapteurs" = GREATEST("nbCapteurs" + CASE WHEN ressource = 'capteurs' THEN delta ELSE 0 END, 0),
+            "nbReines" = GREATEST("nbReines" + CASE WHEN ressource = 'reines' THEN delta ELSE 0 END, 0),
+            updated_at = now()
+        WHERE entreprise_id = eid;
+        RETURN;
+    END IF;
+
+    INSERT INTO usage_entreprise (entreprise_id, "nbRuchers", "nbCapteurs", "nbReines", created_at, updated_at)
+    VALUES (eid, 0, 0, 0, now(), now())
+    ON CONFLICT (entreprise_id) DO NOTHING;
+
+    -- Les reines sont comptees sans limite: les offres anterieures a
+    -- nbReinesMax ont 0 par defaut.
+    SELECT CASE ressource
+               WHEN 'ruchers' THEN o."nbRuchersMax"
+               WHEN 'capteurs' THEN o."nbCapteursMax"
+           END
+    INTO max_allowed
+    FROM offres o
+    WHERE o.entreprise_id = eid AND o.active = true;
+
+    UPDATE usage_entreprise SET
+        "nbRuchers" = "nbRuchers" + CASE WHEN ressource = 'ruchers' THEN delta ELSE 0 END,
+        "nbCapteurs" = "nbCapteurs" + CASE WHEN ressource = 'capteurs' THEN delta ELSE 0 END,
+        "nbReines" = "nbReines" + CASE WHEN ressource = 'reines' THEN delta ELSE 0 END,
+        updated_at = now()
+    WHERE entreprise_id = eid
+      AND (
+          max_allowed IS NULL OR max_allowed < 0
+          OR CASE ressource WHEN 'ruchers' THEN "nbRuchers" WHEN 'capteurs' THEN "nbCapteurs" ELSE "nbReines" END
+             + delta <= max_allowed
+      )
+    RETURNING 1 INTO current_count;
+
+    IF NOT FOUND THEN
+        SELECT CASE ressource WHEN 'ruchers' THEN "nbRuchers" WHEN 'capteurs' THEN "nbCapteurs" ELSE "nbReines" END
+        INTO current_count
+        FROM usage_entreprise
+        WHERE entreprise_id = eid;
+        RAISE EXCEPTION 'Limite de % atteinte pour cette offre (% / %)', ressource, current_count, max_allowed;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION usage_entreprise_capteur(ruche uuid) RETURNS uuid AS $$
+    SELECT r.entreprise_id FROM ruches ru JOIN ruchers r ON ru.rucher_id = r.id WHERE ru.id = ruche;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION usage_entreprise_trigger() RETURNS trigger AS $$
+DECLARE
+    old_eid uuid;
+    new_eid uuid;
+    n integer := 1;
+    nb_capteurs integer;
+BEGIN
+    IF TG_TABLE_NAME = 'capteurs' THEN
+        IF TG_OP <> 'INSERT' THEN
+            old_eid := usage_entreprise_capteur(OLD.ruche_id);
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            new_eid := usage_entreprise_capteur(NEW.ruche_id);
+        END IF;
+    ELSIF TG_TABLE_NAME = 'ruches' THEN
+        -- Ruche deplacee vers un rucher d'une autre entreprise: ses capteurs suivent.
+        SELECT entreprise_id INTO old_eid FROM ruchers WHERE id = OLD.rucher_id;
+        SELECT entreprise_id INTO new_eid FROM ruchers WHERE id = NEW.rucher_id;
+        SELECT count(*) INTO n FROM capteurs WHERE ruche_id = NEW.id;
+    ELSE
+        IF TG_OP <> 'INSERT' THEN
+            old_eid := OLD.entreprise_id;
+        END IF;
+        IF TG_OP <> 'DELETE' THEN
+            new_eid := NEW.entreprise_id;
+        END IF;
+    END IF;
+
+    IF old_eid IS DISTINCT FROM new_eid THEN
+        PERFORM usage_entreprise_ajuster(old_eid, TG_ARGV[0], -n);
+        PERFORM usage_entreprise_ajuster(new_eid, TG_ARGV[0], n);
+        IF TG_TABLE_NAME = 'ruchers' AND TG_OP = 'UPDATE' THEN
+            -- Rucher transfere a une autre entreprise: les capteurs de ses ruches suivent.
+            SELECT count(*) INTO nb_capteurs
+            FROM capteurs c JOIN ruches ru ON c.ruche_id = ru.id
+            WHERE ru.rucher_id = NEW.id;
+            PERFORM usage_entreprise_ajuster(old_eid, 'capteurs', -nb_capteurs);
+            PERFORM usage_entreprise_ajuster(new_eid, 'capteurs', nb_capteurs);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_usage_entreprise ON ruchers;
+CREATE TRIGGER trigger_usage_entreprise
+    AFTER INSERT OR DELETE OR UPDATE OF entreprise_id ON ruchers
+    FOR EACH ROW EXECUTE FUNCTION usage_entreprise_trigger('ruchers');
+
+DROP TRIGGER IF EXISTS trigger_usage_entreprise ON capteurs;
+CREATE TRIGGER trigger_usage_entreprise
+    AFTER INSERT OR DELETE OR UPDATE OF ruche_id ON capteurs
+    FOR EACH ROW EXECUTE FUNCTION usage_entreprise_trigger('capteurs');
+
+DROP TRIGGER IF EXISTS trigger_usage_entreprise ON ruches;
+CREATE TRIGGER trigger_usage_entreprise
+    AFTER UPDATE OF rucher_id ON ruches
+    FOR EACH ROW EXECUTE FUNCTION usage_entreprise_trigger('capteurs');
+
+DROP TRIGGER IF EXISTS trigger_usage_entreprise ON reines;
+CREATE TRIGGER trigger_usage_entreprise
+    AFTER INSERT OR DELETE OR UPDATE OF entreprise_id ON reines
+    FOR EACH ROW EXECUTE FUNCTION usage_entreprise_trigger('reines');
+"""
+
+DROP_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS trigger_usage_entreprise ON ruchers;
+DROP TRIGGER IF EXISTS trigger_usage_entreprise ON capteurs;
+DROP TRIGGER IF EXISTS trigger_usage_entreprise ON ruches;
+DROP TRIGGER IF EXISTS trigger_usage_entreprise ON reines;
+DROP FUNCTION IF EXISTS usage_entreprise_trigger();
+DROP FUNCTION IF EXISTS usage_entreprise_capteur(uuid);
+DROP FUNCTION IF EXISTS usage_entreprise_ajuster(uuid, text, integer);
+"""
+
+# Initialise les compteurs depuis les donnees existantes (meme calcul que core.usage.reconcile).
+BACKFILL_SQL = """
+INSERT INTO usage_entreprise (entreprise_id, "nbRuchers", "nbCapteurs", "nbReines", created_at, updated_at)
+SELECT e.id,
+       (SELECT count(*) FROM ruchers r WHERE r.entreprise_id = e.id),
+       (SELECT count(*) FROM capteurs c JOIN ruches ru ON c.ruche_id = ru.id
+            JOIN ruchers r ON ru.rucher_id = r.id WHERE r.entreprise_id = e.id),
+       (SELECT count(*) FROM reines q WHERE q.entreprise_id = e.id),
+       now(), now()
+FROM entreprises e
+ON CONFLICT (entreprise_id) DO NOTHING;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0045_dashboard_entreprise'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsageEntreprise',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('entreprise', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='core.entreprise')),
+                ('nbRuchers', models.IntegerField(default=0)),
+                ('nbCapteurs', models.IntegerField(default=0)),
+                ('nbReines', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Usage entreprise',
+                'verbose_name_plural': 'Usages entreprises',
+                'db_table': 'usage_entreprise',
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+        migrations.RunSQL(TRIGGERS_SQL, DROP_TRIGGERS_SQL),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.0 on 2026-10-19 19:43
+
+from django.db import migrations, models
+
+# Toute ecriture (Django ou Hasura) sur interventions met a jour les dates de
+# la ruche: maximum incremental a l'insertion, recalcul sinon (une
+# intervention modifiee ou supprimee peut etre la plus recente).
+TRIGGERS_SQL = """
+CREATE OR REPLACE FUNCTION ruches_dernieres_interventions(ruche uuid) RETURNS void AS $$
+    UPDATE ruches SET
+        "derniereVisiteAt" = (SELECT max(date) FROM interventions WHERE ruche_id = ruche),
+        "dernierTraitementAt" = (
+            SELECT max(date) FROM interventions WHERE ruche_id = ruche AND type = 'Traitement'
+        )
+    WHERE id = ruche;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION ruches_interventions_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE ruches SET
+            "derniereVisiteAt" = GREATEST("derniereVisiteAt", NEW.date),
+            "dernierTraitementAt" = CASE
+                WHEN NEW.type = 'Traitement' THEN GREATEST("dernierTraitementAt", NEW.date)
+                ELSE "dernierTraitementAt"
+            END
+        WHERE id = NEW.ruche_id;
+        RETURN NULL;
+    END IF;
+    PERFORM ruches_dernieres_interventions(OLD.ruche_id);
+    IF TG_OP = 'UPDATE' AND NEW.ruche_id IS DISTINCT FROM OLD.ruche_id THEN
+        PERFORM ruches_dernieres_interventions(NEW.ruche_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_ruches_interventions ON interventions;
+CREATE TRIGGER trigger_ruches_interventions
+    AFTER INSERT OR DELETE OR UPDATE OF date, type, ruche_id ON interventions
+    FOR EACH ROW EXECUTE FUNCTION ruches_interventions_trigger();
+"""
+
+DROP_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS trigger_ruches_interventions ON interventions;
+DROP FUNCTION IF EXISTS ruches_interventions_trigger();
+DROP FUNCTION IF EXISTS ruches_dernieres_interventions(uuid);
+"""
+
+BACKFILL_SQL = """
+UPDATE ruches r SET
+    "derniereVisiteAt" = i.derniere_visite,
+    "dernierTraitementAt" = i.dernier_traitement
+FROM (
+    SELECT ruche_id,
+           max(date) AS derniere_visite,
+           max(date) FILTER (WHERE type = 'Traitement') AS dernier_traitement
+    FROM interventions
+    GROUP BY ruche_id
+) i
+WHERE r.id = i.ruche_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0046_usage_entreprise'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ruche',
+            name='dernierTraitementAt',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='ruche',
+            name='derniereVisiteAt',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='ruche',
+            index=models.Index(fields=['derniereVisiteAt'], name='ruche_derniere_visite_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ruche',
+            index=models.Index(fields=['dernierTraitementAt'], name='ruche_dernier_traitement_idx'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+        migrations.RunSQL(TRIGGERS_SQL, DROP_TRIGGERS_SQL),
+    ]
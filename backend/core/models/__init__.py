@@ -29,11 +29,11 @@ from .organisation import (
     TypeTacheElevage,
     StatutTacheElevage,
 )
-from .suivi import Intervention, TypeIntervention
+from .suivi import Intervention, TypeIntervention, RucheSante
 from .transhumance import Transhumance, Alerte, TypeAlerte
-from .iot import Capteur, Mesure, TypeCapteur
-from .offre import Offre, TypeOffre, TypeOffreModel, LimitationOffre
-from .notification import Notification, TypeNotification
+from .iot import Capteur, CapteurState, Mesure, MesureChunk, CodecChunk, MesureArchive, MesureQuarantaine, RaisonQuarantaine, SonSpectre, TypeCapteur, DetectionWatermark, RegleSeuil, CibleRegle
+from .offre import Offre, TypeOffre, TypeOffreModel, LimitationOffre, UsageEntreprise
+from .notification import Notification, TypeNotification, AlerteSuppression
 
 __all__ = [
     'Utilisateur', 'RoleUtilisateur', 'Entreprise', 'EntrepriseProfile', 'TypeProfileEntreprise',
@@ -41,13 +41,13 @@ __all__ = [
     'UtilisateurEntreprise', 'Invitation',
     'AccountVerificationToken',
     'PasswordResetToken',
-    'Offre', 'TypeOffre', 'TypeOffreModel', 'LimitationOffre',
+    'Offre', 'TypeOffre', 'TypeOffreModel', 'LimitationOffre', 'UsageEntreprise',
     'Rucher', 'Ruche', 'Reine', 'StatutRuche', 'TypeFlore', 'TypeMaladie',
     'TypeRuche', 'TypeRaceAbeille', 'LigneeReine', 'CodeCouleurReine',
     'ReineStatut', 'RacleElevage', 'CycleElevageReine', 'StatutCycleElevage',
     'TacheCycleElevage', 'TypeTacheElevage', 'StatutTacheElevage',
-    'Intervention', 'TypeIntervention',
+    'Intervention', 'TypeIntervention', 'RucheSante',
     'Transhumance', 'Alerte', 'TypeAlerte',
-    'Capteur', 'Mesure', 'TypeCapteur',
-    'Notification', 'TypeNotification',
+    'Capteur', 'CapteurState', 'Mesure', 'MesureChunk', 'CodecChunk', 'MesureArchive', 'MesureQuarantaine', 'RaisonQuarantaine', 'SonSpectre', 'TypeCapteur', 'DetectionWatermark', 'RegleSeuil', 'CibleRegle',
+    'Notification', 'TypeNotification', 'AlerteSuppression',
 ]
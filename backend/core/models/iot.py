@@ -2,6 +2,7 @@ from django.db import models
 from django.utils import timezone
 import uuid
 from .base import TimestampedModel
+from .transhumance import TypeAlerte
 
 class TypeCapteur(models.TextChoices):
     POIDS = 'Poids', 'Poids'
@@ -16,6 +17,12 @@ class Capteur(TimestampedModel):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     type = models.CharField(max_length=20, choices=TypeCapteur.choices)
     identifiant = models.CharField(max_length=100, unique=True)
+    # Identifiant numerique court transmis par les trames binaires (voir core.frames).
+    shortId = models.IntegerField(
+        unique=True,
+        db_default=models.Func(models.Value('capteurs_short_id_seq'), function='nextval'),
+        editable=False,
+    )
     actif = models.BooleanField(default=True)
     batteriePct = models.FloatField(null=True, blank=True)
     derniereCommunication = models.DateTimeField(null=True, blank=True)
@@ -25,16 +32,31 @@ class Capteur(TimestampedModel):
     gpsThresholdMeters = models.FloatField(default=100.0)
     gpsLastCheckedAt = models.DateTimeField(null=True, blank=True)
     gpsLastAlertAt = models.DateTimeField(null=True, blank=True)
+    gpsLastDistanceMeters = models.FloatField(null=True, blank=True)
+    gpsCheckIntervalSeconds = models.IntegerField(null=True, blank=True)
+    gpsNextCheckAt = models.DateTimeField(null=True, blank=True, db_index=True)
+    horsLigneDepuis = models.DateTimeField(null=True, blank=True)
+    horsLigneLastAlertAt = models.DateTimeField(null=True, blank=True)
     ruche = models.ForeignKey('Ruche', on_delete=models.CASCADE, related_name='capteurs')
 
     class Meta:
         db_table = 'capteurs'
         verbose_name = 'Capteur'
         verbose_name_plural = 'Capteurs'
+        indexes = [
+            models.Index(
+                fields=['actif', 'type', 'derniereCommunication'],
+                name='capteurs_actif_type_comm_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.type} - {self.identifiant}"
 
+class CibleRegle(models.TextChoices):
+    MESURE = 'Mesure', 'Mesure'
+    BATTERIE = 'Batterie', 'Batterie'
+
 class Mesure(TimestampedModel):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     date = models.DateTimeField(default=timezone.now)
@@ -45,6 +67,193 @@ class Mesure(TimestampedModel):
         db_table = 'mesures'
         verbose_name = 'Mesure'
         verbose_name_plural = 'Mesures'
+        constraints = [
+            models.UniqueConstraint(fields=['capteur', 'date'], name='mesure_capteur_date_unique'),
+        ]
 
     def __str__(self):
         return f"{self.capteur.type}: {self.valeur} ({self.created_at})"
+
+
+class CodecChunk(models.TextChoices):
+    RAW = 'raw', 'Brut'
+    ZLIB = 'zlib', 'zlib'
+    ZSTD = 'zstd', 'zstd'
+
+class MesureChunk(TimestampedModel):
+    """Mesures d'un capteur sur un jour (UTC), compactees en colonnes."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    capteur = models.ForeignKey(Capteur, on_delete=models.CASCADE, related_name='mesure_chunks')
+    jour = models.DateField()
+    nbMesures = models.IntegerField()
+    dateDebut = models.DateTimeField()
+    dateFin = models.DateTimeField()
+    valeurMin = models.FloatField()
+    valeurMax = models.FloatField()
+    codec = models.CharField(max_length=10, choices=CodecChunk.choices, default=CodecChunk.ZLIB)
+    # int64 epoch ms de la premiere mesure puis ecarts uint32 (ms), little-endian.
+    timestamps = models.BinaryField()
+    # float32 little-endian.
+    valeurs = models.BinaryField()
+
+    class Meta:
+        db_table = 'mesures_chunks'
+        verbose_name = 'Bloc de mesures'
+        verbose_name_plural = 'Blocs de mesures'
+        constraints = [
+            models.UniqueConstraint(fields=['capteur', 'jour'], name='mesure_chunk_capteur_jour_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.capteur_id} {self.jour} ({self.nbMesures} mesures)"
+
+
+class MesureArchive(TimestampedModel):
+    """Mois de blocs de mesures d'un capteur deplace dans un fichier local."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    capteur = models.ForeignKey(Capteur, on_delete=models.CASCADE, related_name='mesure_archives')
+    mois = models.DateField()
+    dateDebut = models.DateTimeField()
+    dateFin = models.DateTimeField()
+    nbMesures = models.IntegerField()
+    chemin = models.CharField(max_length=255)
+    taille = models.BigIntegerField()
+    # Un element par jour: position des blocs compresses dans le fichier.
+    index = models.JSONField(default=list)
+
+    class Meta:
+        db_table = 'mesures_archives'
+        verbose_name = 'Archive de mesures'
+        verbose_name_plural = 'Archives de mesures'
+        constraints = [
+            models.UniqueConstraint(fields=['capteur', 'mois'], name='mesure_archive_capteur_mois_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['capteur', 'dateDebut', 'dateFin'], name='mesure_archive_range_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.capteur_id} {self.mois:%Y-%m} ({self.nbMesures} mesures)"
+
+
+class RaisonQuarantaine(models.TextChoices):
+    HORS_PLAGE = 'hors_plage', 'Hors plage physique'
+    PIC = 'pic', 'Pic isole'
+    VARIATION = 'variation', 'Variation trop rapide'
+
+
+class MesureQuarantaine(TimestampedModel):
+    """Mesure ecartee par les controles de plausibilite a l'ingestion."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    capteur = models.ForeignKey(Capteur, on_delete=models.CASCADE, related_name='mesures_quarantaine')
+    date = models.DateTimeField()
+    valeur = models.FloatField()
+    raison = models.CharField(max_length=20, choices=RaisonQuarantaine.choices)
+    # Mediane glissante (pic) ou mesure precedente (variation).
+    reference = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'mesures_quarantaine'
+        verbose_name = 'Mesure en quarantaine'
+        verbose_name_plural = 'Mesures en quarantaine'
+        indexes = [
+            models.Index(fields=['capteur', 'date'], name='mesure_quarantaine_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.capteur_id} {self.date}: {self.valeur} ({self.raison})"
+
+
+class SonSpectre(TimestampedModel):
+    """Caracteristiques spectrales d'une mesure de capteur Son (core.spectres)."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    capteur = models.ForeignKey(Capteur, on_delete=models.CASCADE, related_name='spectres')
+    date = models.DateTimeField()
+    frequenceDominante = models.FloatField()
+    centroide = models.FloatField()
+    energieTotale = models.FloatField()
+    # Part de l'energie dans chaque bande de SON_BANDES_HZ.
+    ratiosBandes = models.JSONField(default=list)
+    indiceEssaimage = models.FloatField(null=True, blank=True)
+    # Spectre reduit optionnel: float16 little-endian normalise, de 0 a spectreFrequenceMax.
+    spectre = models.BinaryField(null=True, blank=True)
+    spectreFrequenceMax = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'sons_spectres'
+        verbose_name = 'Spectre de son'
+        verbose_name_plural = 'Spectres de son'
+        constraints = [
+            models.UniqueConstraint(fields=['capteur', 'date'], name='son_spectre_capteur_date_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.capteur_id} {self.date}: {self.frequenceDominante} Hz"
+
+
+class CapteurState(TimestampedModel):
+    """Derniere valeur connue d'un capteur, tenue a jour par lot d'ingestion."""
+    capteur = models.OneToOneField(Capteur, primary_key=True, on_delete=models.CASCADE, related_name='state')
+    entreprise = models.ForeignKey(
+        'Entreprise', on_delete=models.CASCADE, related_name='capteur_states', null=True, blank=True
+    )
+    derniereValeur = models.FloatField(null=True, blank=True)
+    derniereDate = models.DateTimeField(null=True, blank=True)
+    batteriePct = models.FloatField(null=True, blank=True)
+    intervalleMoyenSecondes = models.FloatField(null=True, blank=True)
+    nbMesures = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'capteur_state'
+        verbose_name = 'Etat de capteur'
+        verbose_name_plural = 'Etats de capteur'
+        indexes = [
+            models.Index(fields=['entreprise', 'derniereDate'], name='capteur_state_entreprise_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.capteur_id}: {self.derniereValeur} ({self.derniereDate})"
+
+
+class DetectionWatermark(TimestampedModel):
+    """Position et etat d'un detecteur incremental pour un capteur."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    detecteur = models.CharField(max_length=50)
+    capteur = models.ForeignKey(Capteur, on_delete=models.CASCADE, related_name='detection_watermarks')
+    lastDate = models.DateTimeField(null=True, blank=True)
+    state = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        db_table = 'detection_watermarks'
+        verbose_name = 'Watermark de detection'
+        verbose_name_plural = 'Watermarks de detection'
+        constraints = [
+            models.UniqueConstraint(fields=['detecteur', 'capteur'], name='detection_watermark_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.detecteur} - {self.capteur_id} ({self.lastDate})"
+
+
+class RegleSeuil(TimestampedModel):
+    """Seuil d'alerte configure par une entreprise pour un type de capteur."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    entreprise = models.ForeignKey('Entreprise', on_delete=models.CASCADE, related_name='regles_seuil')
+    typeCapteur = models.CharField(max_length=20, choices=TypeCapteur.choices, null=True, blank=True)
+    typeAlerte = models.CharField(max_length=30, choices=TypeAlerte.choices)
+    cible = models.CharField(max_length=20, choices=CibleRegle.choices, default=CibleRegle.MESURE)
+    valeurMin = models.FloatField(null=True, blank=True)
+    valeurMax = models.FloatField(null=True, blank=True)
+    dureeMinutes = models.IntegerField(default=0)
+    actif = models.BooleanField(default=True)
+
+    class Meta:
+        db_table = 'regles_seuil'
+        verbose_name = 'Regle de seuil'
+        verbose_name_plural = 'Regles de seuil'
+        indexes = [
+            models.Index(fields=['entreprise', 'actif']),
+        ]
+
+    def __str__(self):
+        return f"{self.typeAlerte} {self.typeCapteur or '*'} [{self.valeurMin}, {self.valeurMax}]"
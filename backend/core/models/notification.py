@@ -11,6 +11,8 @@ class TypeNotification(models.TextChoices):
     SAISONNIER = 'Saisonnier', 'Saisonnier'
     ALERTE_SANITAIRE = 'AlerteSanitaire', 'AlerteSanitaire'
     ALERTE_GPS = 'AlerteGPS', 'AlerteGPS'
+    ALERTE_CAPTEUR = 'AlerteCapteur', 'AlerteCapteur'
+    CONSEIL_HAUSSE = 'ConseilHausse', 'ConseilHausse'
 
 
 class Notification(TimestampedModel):
@@ -45,3 +47,23 @@ class Notification(TimestampedModel):
 
     def __str__(self):
         return f"{self.type} - {self.titre}"
+
+
+class AlerteSuppression(TimestampedModel):
+    """Cle (type, sujet, fenetre) deja emise: empeche les doublons d'alertes et de notifications."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    type = models.CharField(max_length=50)
+    sujet = models.CharField(max_length=100)
+    fenetre = models.CharField(max_length=40)
+    expireAt = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'alert_suppressions'
+        verbose_name = 'Suppression d\'alerte'
+        verbose_name_plural = 'Suppressions d\'alertes'
+        constraints = [
+            models.UniqueConstraint(fields=['type', 'sujet', 'fenetre'], name='alert_suppression_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.sujet} ({self.fenetre})"
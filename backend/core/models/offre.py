@@ -80,3 +80,19 @@ class Offre(TimestampedModel):
 
     def __str__(self):
         return f"Offre {self.type} ({self.entreprise})"
+
+
+class UsageEntreprise(TimestampedModel):
+    """Compteurs de ressources d'une entreprise, tenus par les triggers de limites d'offre (core.usage)."""
+    entreprise = models.OneToOneField(Entreprise, primary_key=True, on_delete=models.CASCADE, related_name="usage")
+    nbRuchers = models.IntegerField(default=0)
+    nbCapteurs = models.IntegerField(default=0)
+    nbReines = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "usage_entreprise"
+        verbose_name = "Usage entreprise"
+        verbose_name_plural = "Usages entreprises"
+
+    def __str__(self):
+        return f"{self.entreprise_id} (R:{self.nbRuchers}, C:{self.nbCapteurs}, Q:{self.nbReines})"
@@ -169,16 +169,35 @@ class Ruche(TimestampedModel):
     )
     securisee = models.BooleanField(default=False)
     rucher = models.ForeignKey(Rucher, on_delete=models.CASCADE, related_name='ruches')
+    # Tenues par le trigger des interventions (migration 0047): date de la
+    # derniere intervention de tout type et du dernier Traitement.
+    derniereVisiteAt = models.DateTimeField(null=True, blank=True, editable=False)
+    dernierTraitementAt = models.DateTimeField(null=True, blank=True, editable=False)
     # Relation inverse via Reine.ruche
 
+    TRIGGER_FIELDS = ('derniereVisiteAt', 'dernierTraitementAt')
+
     class Meta:
         db_table = 'ruches'
         verbose_name = 'Ruche'
         verbose_name_plural = 'Ruches'
+        indexes = [
+            models.Index(fields=['derniereVisiteAt'], name='ruche_derniere_visite_idx'),
+            models.Index(fields=['dernierTraitementAt'], name='ruche_dernier_traitement_idx'),
+        ]
 
     def __str__(self):
         return self.immatriculation
 
+    def save(self, *args, **kwargs):
+        # Une instance chargee avant une intervention ne doit pas ecraser les colonnes du trigger.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.TRIGGER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 class Reine(TimestampedModel):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     entreprise = models.ForeignKey('Entreprise', on_delete=models.CASCADE, related_name='reines', null=True, blank=True)
@@ -30,3 +30,31 @@ class Intervention(TimestampedModel):
 
     def __str__(self):
         return f"{self.type} - {self.ruche.immatriculation} ({self.date})"
+
+
+class RucheSante(TimestampedModel):
+    """Score de sante d'une ruche (100 = rien a signaler), recalcule par lot (core.health_scores)."""
+    ruche = models.OneToOneField('Ruche', primary_key=True, on_delete=models.CASCADE, related_name='sante')
+    entreprise = models.ForeignKey(
+        'Entreprise', on_delete=models.CASCADE, related_name='ruches_sante', null=True, blank=True
+    )
+    score = models.FloatField()
+    # Points retires par composante: statut, maladie, visite, alertes, poids.
+    penalites = models.JSONField(default=dict, blank=True)
+    derniereInterventionAt = models.DateTimeField(null=True, blank=True)
+    alertesOuvertes = models.IntegerField(default=0)
+    tendancePoidsKgJour = models.FloatField(null=True, blank=True)
+    calculeAt = models.DateTimeField()
+    # Renseigne par les triggers des tables sources: recalcul si invalideAt > calculeAt.
+    invalideAt = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'ruches_sante'
+        verbose_name = 'Sante de ruche'
+        verbose_name_plural = 'Sante des ruches'
+        indexes = [
+            models.Index(fields=['entreprise', 'score'], name='ruche_sante_entreprise_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ruche_id}: {self.score}"
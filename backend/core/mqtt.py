@@ -0,0 +1,242 @@
+"""
+Pont MQTT -> mesures.
+
+Les passerelles des ruchers publient sur `ruchers/<rucher>/capteurs/<identifiant>`
+une valeur seule, un objet {"valeur", "date", "batteriePct"} ou une liste
+de ces objets. Le thread reseau du client MQTT ne fait que decoder et
+deposer les lectures dans une file bornee; un thread d'ecriture les
+regroupe et les ecrit par lots (write_mesures) toutes les `flush_ms`
+millisecondes ou tous les `batch_size` lectures.
+
+Contre-pression: quand la base ralentit, la file se remplit et le
+thread reseau se bloque sur put(); le client cesse alors de lire la
+socket et le broker retient les messages (QoS 1) au lieu de les perdre.
+
+Acquittement manuel (manual_ack): le PUBACK d'un message n'est envoye
+qu'apres l'ecriture du lot qui contient sa derniere lecture. Un arret
+brutal avant l'ecriture laisse le message au broker, qui le redistribue
+a la reconnexion (session persistante, MQTT_CLIENT_ID fixe).
+"""
+import json
+import logging
+import queue
+import time
+from datetime import timezone as dt_timezone
+
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.ingestion import ON_CONFLICT_IGNORE, TRANSIENT_DB_ERRORS, write_mesures_isolating
+from core.models import Capteur
+
+try:
+    import paho.mqtt.client as mqtt
+except ImportError:  # optionnel
+    mqtt = None
+
+DEFAULT_TOPIC = "ruchers/+/capteurs/+"
+_MAX_BACKOFF = 30.0
+
+logger = logging.getLogger(__name__)
+
+
+class PayloadError(ValueError):
+    pass
+
+
+def available():
+    return mqtt is not None
+
+
+def parse_topic(topic):
+    """(rucher, identifiant) d'un topic ruchers/<rucher>/capteurs/<identifiant>."""
+    parts = topic.split("/")
+    if len(parts) < 4 or parts[-2] != "capteurs" or parts[-4] != "ruchers" or not parts[-1]:
+        raise PayloadError("unexpected topic")
+    return parts[-3], parts[-1]
+
+
+def _reading(item, received):
+    if isinstance(item, dict):
+        valeur = item.get("valeur", item.get("value"))
+        date = item.get("date")
+        batterie = item.get("batteriePct", item.get("battery"))
+    else:
+        valeur, date, batterie = item, None, None
+    if isinstance(valeur, bool) or not isinstance(valeur, (int, float)):
+        raise PayloadError("invalid valeur")
+    if date is not None:
+        date = parse_datetime(date) if isinstance(date, str) else None
+        if date is None:
+            raise PayloadError("invalid date")
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date, dt_timezone.utc)
+    if isinstance(batterie, bool) or not isinstance(batterie, (int, float)) or not 0 <= batterie <= 100:
+        batterie = None
+    return date or received, float(valeur), batterie
+
+
+def parse_payload(payload, received=None):
+    """[(date, valeur, batterie)] depuis la charge utile JSON d'un message."""
+    try:
+        data = json.loads(payload)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise PayloadError("invalid json")
+    received = received or timezone.now()
+    items = data if isinstance(data, list) else [data]
+    return [_reading(item, received) for item in items]
+
+
+class MqttBridge:
+    """File bornee entre le client MQTT et l'ecriture groupee des mesures."""
+
+    def __init__(self, batch_size=500, flush_ms=1000, queue_size=10000,
+                 on_conflict=ON_CONFLICT_IGNORE, cache_ttl=300):
+        self.batch_size = batch_size
+        self.flush_delay = flush_ms / 1000.0
+        self.on_conflict = on_conflict
+        self.cache_ttl = cache_ttl
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = {
+            "received": 0, "rejected": 0, "unknown": 0,
+            "inserted": 0, "updated": 0, "duplicates": 0, "quarantined": 0, "invalid": 0,
+        }
+        self._capteurs = {}
+        self._capteurs_loaded_at = 0.0
+
+    # Thread reseau du client MQTT: pas d'acces a la base ici.
+    def on_message(self, client, userdata, message):
+        ack = (client, message.mid, message.qos) if client is not None else None
+        try:
+            _, identifiant = parse_topic(message.topic)
+            readings = parse_payload(message.payload)
+        except PayloadError as exc:
+            self.stats["rejected"] += 1
+            logger.debug("Message MQTT ignore sur %s: %s", message.topic, exc)
+            readings = []
+        if not readings:
+            self._ack([ack])
+            return
+        for index, (date, valeur, batterie) in enumerate(readings):
+            # Bloque tant que la file est pleine (contre-pression). Le message
+            # est acquitte avec sa derniere lecture, une fois le lot ecrit.
+            last = index == len(readings) - 1
+            self.queue.put(((identifiant, date, valeur, batterie), ack if last else None))
+        self.stats["received"] += len(readings)
+
+    @staticmethod
+    def _ack(acks):
+        for ack in acks:
+            if ack is not None:
+                client_, mid, qos = ack
+                client_.ack(mid, qos)
+
+    def _resolve(self, identifiants):
+        if time.monotonic() - self._capteurs_loaded_at > self.cache_ttl:
+            self._capteurs = {}
+            self._capteurs_loaded_at = time.monotonic()
+        missing = set(identifiants) - set(self._capteurs)
+        if missing:
+            found = dict(
+                Capteur.objects.filter(identifiant__in=missing, actif=True).values_list("identifiant", "id")
+            )
+            for identifiant in missing:
+                self._capteurs[identifiant] = found.get(identifiant)
+        return self._capteurs
+
+    def _write(self, rows, stop):
+        """
+        Reessaie tant que la base est indisponible; les lignes rejetees par
+        la base (capteur supprime depuis sa mise en cache...) sont ecartees
+        et comptees dans "invalid", sans bloquer la file.
+        """
+        delay = 0.5
+        while True:
+            try:
+                result, invalid = write_mesures_isolating(rows, on_conflict=self.on_conflict)
+                break
+            except TRANSIENT_DB_ERRORS:
+                if stop is not None and stop.is_set():
+                    raise
+                logger.exception("Ecriture de %d mesure(s) MQTT impossible, nouvel essai dans %.1fs", len(rows), delay)
+                connection.close()
+                time.sleep(delay)
+                delay = min(delay * 2, _MAX_BACKOFF)
+        if invalid:
+            invalid_ids = {str(row[0]) for row in invalid}
+            logger.warning("%d mesure(s) MQTT ecartee(s) par la base", len(invalid))
+            self._capteurs = {
+                identifiant: capteur_id for identifiant, capteur_id in self._capteurs.items()
+                if str(capteur_id) not in invalid_ids
+            }
+        return result
+
+    def flush(self, items, stop=None):
+        """Ecrit un lot de lectures [(identifiant, date, valeur, batterie)]."""
+        capteurs = self._resolve(item[0] for item in items)
+        rows = []
+        for identifiant, date, valeur, batterie in items:
+            capteur_id = capteurs.get(identifiant)
+            if capteur_id is None:
+                self.stats["unknown"] += 1
+                continue
+            rows.append((capteur_id, date, valeur, batterie))
+        if not rows:
+            return None
+        result = self._write(rows, stop)
+        for key, value in result.items():
+            self.stats[key] += value
+        return result
+
+    def _flush_pending(self, pending, stop):
+        """Ecrit les entrees (lecture, ack) de la file puis acquitte leurs messages."""
+        self.flush([reading for reading, _ in pending], stop)
+        self._ack(ack for _, ack in pending)
+
+    def run(self, stop):
+        """Boucle d'ecriture jusqu'a `stop` (threading.Event), puis vide la file."""
+        pending = []
+        first_at = None
+        while not (stop.is_set() and self.queue.empty()):
+            if first_at is None:
+                timeout = self.flush_delay
+            else:
+                timeout = max(0.0, self.flush_delay - (time.monotonic() - first_at))
+            try:
+                pending.append(self.queue.get(timeout=timeout))
+                if first_at is None:
+                    first_at = time.monotonic()
+            except queue.Empty:
+                pass
+            if pending and (
+                len(pending) >= self.batch_size
+                or (stop.is_set() and self.queue.empty())
+                or time.monotonic() - first_at >= self.flush_delay
+            ):
+                self._flush_pending(pending, stop)
+                pending = []
+                first_at = None
+        if pending:
+            self._flush_pending(pending, stop)
+
+
+def client(bridge, topic=DEFAULT_TOPIC, qos=1, client_id="", username=None, password=None):
+    """Client paho configure pour `bridge`; la souscription est refaite a chaque connexion."""
+    if mqtt is None:
+        raise RuntimeError("paho-mqtt is not installed")
+    mqtt_client = mqtt.Client(
+        mqtt.CallbackAPIVersion.VERSION2, client_id=client_id, clean_session=not client_id, manual_ack=True,
+    )
+    if username:
+        mqtt_client.username_pw_set(username, password or None)
+
+    def on_connect(client_, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            logger.error("Connexion MQTT refusee: %s", reason_code)
+            return
+        client_.subscribe(topic, qos=qos)
+
+    mqtt_client.on_connect = on_connect
+    mqtt_client.on_message = bridge.on_message
+    return mqtt_client
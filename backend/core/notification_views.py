@@ -3,6 +3,8 @@ import logging
 from datetime import timedelta
 
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from django.http import JsonResponse
 from django.utils import timezone
 from django.views.decorators.http import require_POST
@@ -14,9 +16,9 @@ from core.models import (
     UtilisateurEntreprise,
     Ruche,
     StatutRuche,
-    Intervention,
-    TypeIntervention,
 )
+from core import dashboard, weight_forecast
+from core.suppression import DAY, claim_many, purge_expired
 
 logger = logging.getLogger(__name__)
 
@@ -113,117 +115,64 @@ def webhook_daily_notifications(request):
 
     today = timezone.now().date()
     created_count = 0
+    purge_expired()
 
     created_count += _generate_rappels_visite(today)
     created_count += _generate_rappels_traitement(today)
     created_count += _generate_rappels_saisonniers(today)
     created_count += _generate_alertes_sanitaires(today)
+    if getattr(settings, 'PREVISION_POIDS_NOTIFICATIONS', True):
+        created_count += _generate_conseils_hausse(today)
 
     return JsonResponse({'ok': True, 'created': created_count})
 
 
-def _generate_rappels_visite(today):
-    seuil = timezone.now() - timedelta(days=30)
-    ruches = Ruche.objects.filter(
-        statut__in=[StatutRuche.ACTIVE, StatutRuche.FAIBLE]
-    ).select_related('rucher__entreprise')
-
-    created = 0
-    for ruche in ruches:
-        entreprise = ruche.rucher.entreprise
-        if not entreprise:
-            continue
+@require_POST
+def webhook_refresh_dashboard(request):
+    """POST /api/webhooks/refresh-dashboard - Cron Hasura: rafraichit dashboard_entreprise."""
+    if not _verify_webhook_secret(request):
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
 
-        derniere = Intervention.objects.filter(
-            ruche=ruche
-        ).order_by('-date').first()
+    return JsonResponse({'ok': True, 'refreshed': dashboard.refresh()})
 
-        if derniere and derniere.date >= seuil:
-            continue
 
-        already = Notification.objects.filter(
-            type=TypeNotification.RAPPEL_VISITE,
-            ruche=ruche,
-            date__date=today,
-        ).exists()
-        if already:
-            continue
-
-        membres = _get_entreprise_members(entreprise.id)
-        notifications = [
-            Notification(
-                type=TypeNotification.RAPPEL_VISITE,
-                titre=f"Visite requise sur {ruche.immatriculation}",
-                message=f"Aucune visite sur {ruche.immatriculation} depuis plus de 30 jours",
-                utilisateur=m.utilisateur,
-                entreprise=entreprise,
-                ruche=ruche,
-            )
-            for m in membres
-        ]
-        if notifications:
-            Notification.objects.bulk_create(notifications)
-            created += len(notifications)
-
-    return created
+def _generate_rappels_visite(today):
+    seuil = timezone.now() - timedelta(days=30)
+    candidates = list(Ruche.objects.filter(
+        Q(derniereVisiteAt__isnull=True) | Q(derniereVisiteAt__lt=seuil),
+        statut__in=[StatutRuche.ACTIVE, StatutRuche.FAIBLE],
+        rucher__entreprise__isnull=False,
+    ).select_related('rucher__entreprise'))
+
+    return _notify_ruches(
+        TypeNotification.RAPPEL_VISITE,
+        candidates,
+        lambda ruche: (
+            f"Visite requise sur {ruche.immatriculation}",
+            f"Aucune visite sur {ruche.immatriculation} depuis plus de 30 jours",
+        ),
+    )
 
 
 def _generate_rappels_traitement(today):
-    trois_jours = today + timedelta(days=3)
-    ruches_traitees = Intervention.objects.filter(
-        type=TypeIntervention.TRAITEMENT,
-    ).values_list('ruche_id', flat=True).distinct()
-
-    created = 0
-    for ruche_id in ruches_traitees:
-        try:
-            ruche = Ruche.objects.select_related('rucher__entreprise').get(
-                id=ruche_id,
-                statut__in=[StatutRuche.ACTIVE, StatutRuche.FAIBLE, StatutRuche.MALADE],
-            )
-        except Ruche.DoesNotExist:
-            continue
-
-        entreprise = ruche.rucher.entreprise
-        if not entreprise:
-            continue
-
-        dernier_traitement = Intervention.objects.filter(
-            ruche=ruche, type=TypeIntervention.TRAITEMENT
-        ).order_by('-date').first()
-
-        if not dernier_traitement:
-            continue
-
-        jours_depuis = (timezone.now() - dernier_traitement.date).days
-        if jours_depuis < 27 or jours_depuis > 33:
-            continue
-
-        already = Notification.objects.filter(
-            type=TypeNotification.RAPPEL_TRAITEMENT,
-            ruche=ruche,
-            date__date=today,
-        ).exists()
-        if already:
-            continue
-
-        membres = _get_entreprise_members(entreprise.id)
-        notifications = [
-            Notification(
-                type=TypeNotification.RAPPEL_TRAITEMENT,
-                titre=f"Traitement a prevoir sur {ruche.immatriculation}",
-                message=f"Le prochain traitement sur {ruche.immatriculation} approche (dernier il y a {jours_depuis} jours)",
-                utilisateur=m.utilisateur,
-                entreprise=entreprise,
-                ruche=ruche,
-            )
-            for m in membres
-        ]
-        if notifications:
-            Notification.objects.bulk_create(notifications)
-            created += len(notifications)
-
-    return created
+    now = timezone.now()
+    # Dernier traitement il y a 27 a 33 jours (jours entiers).
+    candidates = list(Ruche.objects.filter(
+        statut__in=[StatutRuche.ACTIVE, StatutRuche.FAIBLE, StatutRuche.MALADE],
+        rucher__entreprise__isnull=False,
+        dernierTraitementAt__gt=now - timedelta(days=34),
+        dernierTraitementAt__lte=now - timedelta(days=27),
+    ).select_related('rucher__entreprise'))
+    jours = {ruche.id: (now - ruche.dernierTraitementAt).days for ruche in candidates}
+
+    return _notify_ruches(
+        TypeNotification.RAPPEL_TRAITEMENT,
+        candidates,
+        lambda ruche: (
+            f"Traitement a prevoir sur {ruche.immatriculation}",
+            f"Le prochain traitement sur {ruche.immatriculation} approche (dernier il y a {jours[ruche.id]} jours)",
+        ),
+    )
 
 
 def _generate_rappels_saisonniers(today):
@@ -236,81 +185,101 @@ def _generate_rappels_saisonniers(today):
         return 0
 
     created = 0
-    entreprises_ids = UtilisateurEntreprise.objects.values_list(
+    entreprises_ids = list(UtilisateurEntreprise.objects.values_list(
         'entreprise_id', flat=True
-    ).distinct()
-
-    for entreprise_id in entreprises_ids:
-        already = Notification.objects.filter(
-            type=TypeNotification.SAISONNIER,
-            entreprise_id=entreprise_id,
-            date__date=today,
-        ).exists()
-        if already:
-            continue
-
-        membres = _get_entreprise_members(entreprise_id)
-        notifications = [
-            Notification(
-                type=TypeNotification.SAISONNIER,
-                titre="Rappel saisonnier",
-                message=message_saisonnier,
-                utilisateur=m.utilisateur,
-                entreprise_id=entreprise_id,
-            )
-            for m in membres
-        ]
-        if notifications:
-            Notification.objects.bulk_create(notifications)
-            created += len(notifications)
+    ).distinct())
+
+    with transaction.atomic():
+        claimed = claim_many(TypeNotification.SAISONNIER, entreprises_ids)
+        for entreprise_id in entreprises_ids:
+            if str(entreprise_id) not in claimed:
+                continue
+
+            membres = _get_entreprise_members(entreprise_id)
+            notifications = [
+                Notification(
+                    type=TypeNotification.SAISONNIER,
+                    titre="Rappel saisonnier",
+                    message=message_saisonnier,
+                    utilisateur=m.utilisateur,
+                    entreprise_id=entreprise_id,
+                )
+                for m in membres
+            ]
+            if notifications:
+                Notification.objects.bulk_create(notifications)
+                created += len(notifications)
 
     return created
 
 
 def _generate_alertes_sanitaires(today):
-    ruches_malades = Ruche.objects.filter(
-        statut=StatutRuche.MALADE
-    ).select_related('rucher__entreprise')
-
     seuil = timezone.now() - timedelta(days=14)
-    created = 0
-
-    for ruche in ruches_malades:
-        entreprise = ruche.rucher.entreprise
-        if not entreprise:
-            continue
-
-        traitement_recent = Intervention.objects.filter(
-            ruche=ruche,
-            type=TypeIntervention.TRAITEMENT,
-            date__gte=seuil,
-        ).exists()
+    candidates = list(Ruche.objects.filter(
+        Q(dernierTraitementAt__isnull=True) | Q(dernierTraitementAt__lt=seuil),
+        statut=StatutRuche.MALADE,
+        rucher__entreprise__isnull=False,
+    ).select_related('rucher__entreprise'))
+
+    return _notify_ruches(
+        TypeNotification.ALERTE_SANITAIRE,
+        candidates,
+        lambda ruche: (
+            f"Alerte sanitaire : {ruche.immatriculation}",
+            f"La ruche {ruche.immatriculation} est Malade sans traitement recent",
+        ),
+    )
+
+
+def _generate_conseils_hausse(today):
+    conseils = weight_forecast.conseils_hausse(today)
+    if not conseils:
+        return 0
+    ruches = Ruche.objects.filter(id__in=conseils.keys()).select_related('rucher__entreprise')
+    # Un conseil couvre l'horizon de prevision: pas de rappel quotidien pendant la miellee.
+    horizon = timedelta(days=int(getattr(settings, 'PREVISION_POIDS_HORIZON_JOURS', 7)))
+
+    def contenu(ruche):
+        prevision = conseils[str(ruche.id)]
+        return (
+            f"Pose de hausse conseillee sur {ruche.immatriculation}",
+            f"Miellee en cours depuis le {prevision['miellee']['depuis']} sur {ruche.immatriculation} : "
+            f"+{prevision['tendanceKgJour']:.1f} kg/jour, {prevision['poidsPrevuKg']:.1f} kg prevus "
+            f"dans {horizon.days} jours",
+        )
 
-        if traitement_recent:
-            continue
+    return _notify_ruches(TypeNotification.CONSEIL_HAUSSE, list(ruches), contenu, window=horizon)
 
-        already = Notification.objects.filter(
-            type=TypeNotification.ALERTE_SANITAIRE,
-            ruche=ruche,
-            date__date=today,
-        ).exists()
-        if already:
-            continue
 
-        membres = _get_entreprise_members(entreprise.id)
-        notifications = [
-            Notification(
-                type=TypeNotification.ALERTE_SANITAIRE,
-                titre=f"Alerte sanitaire : {ruche.immatriculation}",
-                message=f"La ruche {ruche.immatriculation} est Malade sans traitement recent",
-                utilisateur=m.utilisateur,
-                entreprise=entreprise,
-                ruche=ruche,
+def _notify_ruches(type_notification, ruches, contenu, window=DAY):
+    """
+    Notifie les membres de chaque entreprise pour les ruches pas encore
+    notifiees dans la fenetre (reservation groupee dans le store de suppression).
+    """
+    if not ruches:
+        return 0
+    membres_par_entreprise = {}
+    notifications = []
+    with transaction.atomic():
+        claimed = claim_many(type_notification, [ruche.id for ruche in ruches], window=window)
+        for ruche in ruches:
+            if str(ruche.id) not in claimed:
+                continue
+            entreprise = ruche.rucher.entreprise
+            if entreprise.id not in membres_par_entreprise:
+                membres_par_entreprise[entreprise.id] = list(_get_entreprise_members(entreprise.id))
+            titre, message = contenu(ruche)
+            notifications.extend(
+                Notification(
+                    type=type_notification,
+                    titre=titre,
+                    message=message,
+                    utilisateur=m.utilisateur,
+                    entreprise=entreprise,
+                    ruche=ruche,
+                )
+                for m in membres_par_entreprise[entreprise.id]
             )
-            for m in membres
-        ]
         if notifications:
             Notification.objects.bulk_create(notifications)
-            created += len(notifications)
-
-    return created
+    return len(notifications)
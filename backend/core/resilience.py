@@ -0,0 +1,232 @@
+import threading
+import time
+
+from django.conf import settings
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class BulkheadFullError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur a trois etats (closed / open / half_open).
+
+    Apres `failure_threshold` echecs consecutifs le circuit s'ouvre et les
+    appels echouent immediatement. Passe `reset_timeout` secondes, un seul
+    appel de sonde est autorise (half_open): un succes referme le circuit,
+    un echec le rouvre pour une nouvelle periode.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def before_call(self):
+        """Reserve le droit d'appeler la dependance ou leve CircuitOpenError."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self._stats["rejected"] += 1
+        raise CircuitOpenError(self.name)
+
+    def record_success(self):
+        with self._lock:
+            self._stats["successes"] += 1
+            self._failures = 0
+            self._state = self.CLOSED
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._stats["opened"] += 1
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+            self._probe_in_flight = False
+
+    def cancel_call(self):
+        """Annule une reservation faite par before_call sans changer l'etat."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+            for key in self._stats:
+                self._stats[key] = 0
+
+    def snapshot(self):
+        with self._lock:
+            state = self._current_state()
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+            return {
+                "state": state,
+                "consecutiveFailures": self._failures,
+                "failureThreshold": self.failure_threshold,
+                "resetTimeoutSeconds": self.reset_timeout,
+                "retryInSeconds": retry_in,
+                **self._stats,
+            }
+
+
+class Bulkhead:
+    """Limite le nombre d'appels simultanes vers une dependance."""
+
+    def __init__(self, name, max_concurrency=10, acquire_timeout=0.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+
+    def acquire(self):
+        if self.acquire_timeout > 0:
+            acquired = self._semaphore.acquire(timeout=self.acquire_timeout)
+        else:
+            acquired = self._semaphore.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self._rejected += 1
+            raise BulkheadFullError(self.name)
+        with self._lock:
+            self._in_flight += 1
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._semaphore.release()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "maxConcurrency": self.max_concurrency,
+                "inFlight": self._in_flight,
+                "rejected": self._rejected,
+            }
+
+
+class ExternalDependency:
+    """Disjoncteur + cloison autour des appels vers un service externe."""
+
+    def __init__(self, name, breaker, bulkhead):
+        self.name = name
+        self.breaker = breaker
+        self.bulkhead = bulkhead
+
+    def call(self, fn, *args, is_failure=None, exception_is_failure=None, **kwargs):
+        """
+        Execute fn(*args, **kwargs) sous protection.
+
+        `is_failure(result)` permet de compter un resultat (ex: HTTP 5xx) comme
+        un echec; `exception_is_failure(exc)` permet d'ignorer certaines
+        exceptions metier (ex: 4xx). Leve CircuitOpenError ou BulkheadFullError
+        sans appeler fn si la dependance est indisponible ou saturee.
+        """
+        self.breaker.before_call()
+        try:
+            self.bulkhead.acquire()
+        except BulkheadFullError:
+            self.breaker.cancel_call()
+            raise
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if exception_is_failure is None or exception_is_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        finally:
+            self.bulkhead.release()
+        if is_failure is not None and is_failure(result):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return result
+
+    def snapshot(self):
+        return {"circuit": self.breaker.snapshot(), "bulkhead": self.bulkhead.snapshot()}
+
+
+_dependencies = {}
+_dependencies_lock = threading.Lock()
+
+
+def _setting(name, key, default):
+    specific = getattr(settings, f"{name.upper()}_{key}", None)
+    if specific is not None:
+        return specific
+    return getattr(settings, key, default)
+
+
+def get_dependency(name):
+    """Retourne (en le creant au besoin) le garde-fou partage pour `name`."""
+    with _dependencies_lock:
+        dep = _dependencies.get(name)
+        if dep is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=int(_setting(name, "CIRCUIT_BREAKER_FAILURE_THRESHOLD", 5)),
+                reset_timeout=float(_setting(name, "CIRCUIT_BREAKER_RESET_SECONDS", 30)),
+            )
+            bulkhead = Bulkhead(
+                name,
+                max_concurrency=int(_setting(name, "MAX_CONCURRENCY", 10)),
+                acquire_timeout=float(_setting(name, "BULKHEAD_ACQUIRE_TIMEOUT", 0.5)),
+            )
+            dep = ExternalDependency(name, breaker, bulkhead)
+            _dependencies[name] = dep
+        return dep
+
+
+def dependencies_snapshot():
+    with _dependencies_lock:
+        deps = dict(_dependencies)
+    return {name: dep.snapshot() for name, dep in sorted(deps.items())}
+
+
+def reset_dependencies():
+    with _dependencies_lock:
+        _dependencies.clear()
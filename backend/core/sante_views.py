@@ -0,0 +1,71 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from core.auth_views import _get_user_from_request
+from core.iot_views import _entreprise_id_from_request, _ensure_user_in_entreprise
+from core.models import RucheSante
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def _parse_int(value, default, minimum, maximum):
+    if value in (None, ""):
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    if value < minimum or value > maximum:
+        return None
+    return value
+
+
+def _serialize_sante(sante):
+    ruche = sante.ruche
+    return {
+        "rucheId": str(ruche.id),
+        "immatriculation": ruche.immatriculation,
+        "rucherId": str(ruche.rucher_id),
+        "rucherNom": ruche.rucher.nom,
+        "statut": ruche.statut,
+        "maladie": ruche.maladie_id,
+        "score": sante.score,
+        "penalites": sante.penalites,
+        "derniereInterventionAt": sante.derniereInterventionAt.isoformat() if sante.derniereInterventionAt else None,
+        "alertesOuvertes": sante.alertesOuvertes,
+        "tendancePoidsKgJour": sante.tendancePoidsKgJour,
+        "calculeAt": sante.calculeAt.isoformat(),
+    }
+
+
+@require_GET
+def list_ruches_sante(request):
+    """GET /api/ruches/sante?limit=&offset=&scoreMax= - Ruches de l'entreprise courante, la plus a surveiller d'abord."""
+    user, err = _get_user_from_request(request)
+    if err:
+        return err
+
+    entreprise_id = _entreprise_id_from_request(request)
+    err = _ensure_user_in_entreprise(user, entreprise_id)
+    if err:
+        return err
+
+    limit = _parse_int(request.GET.get("limit"), DEFAULT_LIMIT, 1, MAX_LIMIT)
+    offset = _parse_int(request.GET.get("offset"), 0, 0, 10**9)
+    if limit is None or offset is None:
+        return JsonResponse({"error": "invalid_pagination"}, status=400)
+
+    scores = RucheSante.objects.filter(entreprise_id=entreprise_id)
+    if request.GET.get("scoreMax"):
+        try:
+            scores = scores.filter(score__lte=float(request.GET["scoreMax"]))
+        except ValueError:
+            return JsonResponse({"error": "invalid_score_max"}, status=400)
+
+    total = scores.count()
+    page = scores.select_related("ruche__rucher").order_by("score", "ruche_id")[offset:offset + limit]
+    return JsonResponse(
+        {"total": total, "ruches": [_serialize_sante(s) for s in page]},
+        status=200,
+    )
@@ -0,0 +1,185 @@
+"""
+Caracteristiques spectrales des capteurs de son.
+
+Un capteur Son peut joindre a chaque mesure un court spectre (energies
+sur des frequences regulierement espacees de 0 a `frequenceMax`) ou des
+energies par bande (`bandesHz`: bornes des bandes). Seules les
+caracteristiques sont conservees (sons_spectres): frequence dominante,
+centroide, energie totale, part d'energie par bande de SON_BANDES_HZ et
+indice d'essaimage, plus un spectre reduit a SON_SPECTRE_BINS valeurs
+float16 normalisees si demande. Les calculs sont faits par lot sur des
+matrices numpy (une ligne par mesure).
+
+L'indice d'essaimage est le rapport entre l'energie de la bande du
+chant de reine (SON_BANDE_PIPING_HZ, 400-600 Hz) et celle du
+bourdonnement de la colonie (SON_BANDE_BOURDONNEMENT_HZ, 100-300 Hz).
+"""
+import base64
+import binascii
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+
+from core.models import SonSpectre
+
+MAX_BINS = 4096
+_VECTOR_DTYPE = np.dtype("<f4")
+_SPECTRE_DTYPE = np.dtype("<f2")
+
+Vecteur = namedtuple("Vecteur", ["frequences", "energies"])
+
+
+class SpectreError(ValueError):
+    pass
+
+
+def bandes_hz():
+    return [float(b) for b in getattr(settings, "SON_BANDES_HZ", [0, 100, 200, 300, 400, 500, 600, 1000, 2000])]
+
+
+def _decode_array(value):
+    """Tableau float32 depuis une liste JSON ou du base64 (float32 little-endian)."""
+    if isinstance(value, str):
+        try:
+            raw = base64.b64decode(value, validate=True)
+        except (binascii.Error, ValueError):
+            raise SpectreError("invalid base64")
+        if len(raw) % _VECTOR_DTYPE.itemsize:
+            raise SpectreError("invalid length")
+        array = np.frombuffer(raw, dtype=_VECTOR_DTYPE).astype(np.float64)
+    elif isinstance(value, list) and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value):
+        array = np.asarray(value, dtype=np.float64)
+    else:
+        raise SpectreError("expected a list or base64 string")
+    if not 2 <= array.size <= MAX_BINS or not np.isfinite(array).all() or (array < 0).any():
+        raise SpectreError("invalid values")
+    return array
+
+
+def parse_vecteur(item):
+    """Vecteur (frequences centrales, energies) d'un element de requete, ou None s'il n'en porte pas."""
+    if item.get("spectre") is not None:
+        energies = _decode_array(item.get("spectre"))
+        frequence_max = item.get("frequenceMax")
+        if isinstance(frequence_max, bool) or not isinstance(frequence_max, (int, float)) or frequence_max <= 0:
+            raise SpectreError("invalid frequenceMax")
+        return Vecteur(np.linspace(0.0, float(frequence_max), energies.size), energies)
+    if item.get("bandes") is not None:
+        energies = _decode_array(item.get("bandes"))
+        bornes = item.get("bandesHz")
+        if not isinstance(bornes, list) or len(bornes) != energies.size + 1:
+            raise SpectreError("bandesHz must have len(bandes) + 1 bounds")
+        bornes = np.asarray(bornes, dtype=np.float64)
+        if not np.isfinite(bornes).all() or (np.diff(bornes) <= 0).any():
+            raise SpectreError("invalid bandesHz")
+        return Vecteur((bornes[:-1] + bornes[1:]) / 2, energies)
+    return None
+
+
+def _band_energy(frequences, energies, low, high):
+    mask = (frequences >= low) & (frequences < high)
+    return energies[:, mask].sum(axis=1)
+
+
+def _reduce(frequences, energies, bins):
+    """Spectre moyen sur `bins` intervalles egaux de 0 a la frequence max."""
+    edges = np.linspace(0.0, frequences[-1], bins + 1)
+    index = np.clip(np.searchsorted(edges, frequences, side="right") - 1, 0, bins - 1)
+    sums = np.zeros((energies.shape[0], bins))
+    np.add.at(sums.T, index, energies.T)
+    counts = np.bincount(index, minlength=bins)
+    return sums / np.maximum(counts, 1)
+
+
+def features(frequences, energies, keep_spectre=False):
+    """
+    Caracteristiques d'une matrice d'energies (une ligne par mesure)
+    partageant les memes frequences. Retourne une liste de dicts.
+    """
+    energies = np.atleast_2d(energies)
+    total = energies.sum(axis=1)
+    safe_total = np.where(total > 0, total, 1.0)
+    dominante = frequences[np.argmax(energies, axis=1)]
+    centroide = (energies * frequences).sum(axis=1) / safe_total
+
+    bornes = bandes_hz()
+    ratios = np.column_stack([
+        _band_energy(frequences, energies, low, high) for low, high in zip(bornes[:-1], bornes[1:])
+    ]) / safe_total[:, None]
+    piping = _band_energy(frequences, energies, *getattr(settings, "SON_BANDE_PIPING_HZ", (400, 600)))
+    bourdonnement = _band_energy(frequences, energies, *getattr(settings, "SON_BANDE_BOURDONNEMENT_HZ", (100, 300)))
+    essaimage = np.divide(piping, bourdonnement, out=np.full(total.shape, np.nan), where=bourdonnement > 0)
+
+    spectres = None
+    if keep_spectre:
+        bins = min(int(getattr(settings, "SON_SPECTRE_BINS", 64)), frequences.size)
+        reduced = _reduce(frequences, energies, bins)
+        # Normalise (max = 1): la forme du spectre tient en float16 quelle que soit l'echelle.
+        peak = reduced.max(axis=1, keepdims=True)
+        spectres = (reduced / np.where(peak > 0, peak, 1.0)).astype(_SPECTRE_DTYPE)
+
+    result = []
+    for i in range(energies.shape[0]):
+        result.append({
+            "frequenceDominante": float(dominante[i]),
+            "centroide": float(centroide[i]),
+            "energieTotale": float(total[i]),
+            "ratiosBandes": [round(float(r), 6) for r in ratios[i]],
+            "indiceEssaimage": None if np.isnan(essaimage[i]) else float(essaimage[i]),
+            "spectre": spectres[i].tobytes() if spectres is not None else None,
+            "spectreFrequenceMax": float(frequences[-1]) if spectres is not None else None,
+        })
+    return result
+
+
+def compute(vecteurs, keep_spectre=False):
+    """Caracteristiques de chaque vecteur; les vecteurs de memes frequences sont calcules ensemble."""
+    groups = {}
+    for index, vecteur in enumerate(vecteurs):
+        key = (vecteur.frequences.size, vecteur.frequences.tobytes())
+        groups.setdefault(key, []).append(index)
+    result = [None] * len(vecteurs)
+    for indexes in groups.values():
+        frequences = vecteurs[indexes[0]].frequences
+        matrix = np.vstack([vecteurs[i].energies for i in indexes])
+        for index, values in zip(indexes, features(frequences, matrix, keep_spectre)):
+            result[index] = values
+    return result
+
+
+def write_spectres(rows, keep_spectre=False, update=False):
+    """
+    Enregistre [(capteur_id, date, Vecteur)] dans sons_spectres.
+    update=True remplace les caracteristiques deja stockees pour (capteur, date).
+    """
+    # Une seule ligne par (capteur, date): la derniere recue l'emporte.
+    rows = list({(str(capteur_id), date): (capteur_id, date, vecteur) for capteur_id, date, vecteur in rows}.values())
+    if not rows:
+        return 0
+    computed = compute([vecteur for _, _, vecteur in rows], keep_spectre)
+    objects = [
+        SonSpectre(capteur_id=capteur_id, date=date, **values)
+        for (capteur_id, date, _), values in zip(rows, computed)
+    ]
+    if update:
+        SonSpectre.objects.bulk_create(
+            objects,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["capteur", "date"],
+            update_fields=[
+                "frequenceDominante", "centroide", "energieTotale", "ratiosBandes",
+                "indiceEssaimage", "spectre", "spectreFrequenceMax", "updated_at",
+            ],
+        )
+    else:
+        SonSpectre.objects.bulk_create(objects, batch_size=1000, ignore_conflicts=True)
+    return len(objects)
+
+
+def decode_spectre(spectre, frequence_max):
+    """(frequences centrales, energies relatives) d'un spectre reduit stocke."""
+    energies = np.frombuffer(bytes(spectre), dtype=_SPECTRE_DTYPE).astype(np.float64)
+    step = frequence_max / energies.size
+    return (np.arange(energies.size) + 0.5) * step, energies
@@ -0,0 +1,109 @@
+"""
+Deduplication centrale des alertes et notifications.
+
+Une cle (type, sujet, fenetre) ne peut etre reservee qu'une fois:
+INSERT ... ON CONFLICT DO NOTHING RETURNING rend la reservation atomique
+entre processus (deux workers ne peuvent pas envoyer la meme alerte).
+Un LRU en memoire, alimente apres commit, evite l'aller-retour en base
+pour les cles deja prises.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import AlerteSuppression
+
+DAY = "day"
+_INSERT_BATCH = 500
+
+_lru = OrderedDict()
+_lru_lock = threading.Lock()
+
+
+def _lru_max_entries():
+    return int(getattr(settings, "ALERT_SUPPRESSION_LRU_SIZE", 10000))
+
+
+def _lru_contains(key):
+    with _lru_lock:
+        if key in _lru:
+            _lru.move_to_end(key)
+            return True
+    return False
+
+
+def _remember(keys):
+    max_entries = _lru_max_entries()
+    with _lru_lock:
+        for key in keys:
+            _lru[key] = True
+            _lru.move_to_end(key)
+        while len(_lru) > max_entries:
+            _lru.popitem(last=False)
+
+
+def clear_cache():
+    with _lru_lock:
+        _lru.clear()
+
+
+def window_key(window, now):
+    """
+    (fenetre, expiration) pour `now`. `window` vaut DAY (jour calendaire UTC)
+    ou une duree (timedelta) decoupee en tranches fixes.
+    """
+    if window == DAY:
+        day = now.date()
+        return day.isoformat(), datetime.combine(day + timedelta(days=2), time.min, tzinfo=dt_timezone.utc)
+    seconds = max(1, int(window.total_seconds()))
+    bucket = int(now.timestamp()) // seconds
+    return f"{seconds}s:{bucket}", datetime.fromtimestamp((bucket + 2) * seconds, tz=dt_timezone.utc)
+
+
+def claim_many(type_, sujets, window=DAY, now=None):
+    """Reserve les sujets encore libres dans la fenetre; retourne l'ensemble reserve."""
+    sujets = {str(s) for s in sujets}
+    if not sujets:
+        return set()
+    now = now or timezone.now()
+    fenetre, expire_at = window_key(window, now)
+    candidates = sorted(s for s in sujets if not _lru_contains((type_, s, fenetre)))
+    if not candidates:
+        return set()
+
+    claimed = set()
+    with connection.cursor() as cursor:
+        for start in range(0, len(candidates), _INSERT_BATCH):
+            batch = candidates[start:start + _INSERT_BATCH]
+            params = []
+            for sujet in batch:
+                params.extend([uuid.uuid4(), type_, sujet, fenetre, expire_at, now, now])
+            cursor.execute(
+                'INSERT INTO alert_suppressions (id, type, sujet, fenetre, "expireAt", created_at, updated_at) '
+                "VALUES " + ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(batch)) + " "
+                "ON CONFLICT (type, sujet, fenetre) DO NOTHING RETURNING sujet",
+                params,
+            )
+            claimed.update(row[0] for row in cursor.fetchall())
+
+    # Reservees par nous ou deja prises: dans tous les cas plus disponibles,
+    # mais seulement une fois la transaction validee.
+    keys = [(type_, s, fenetre) for s in candidates]
+    transaction.on_commit(lambda: _remember(keys))
+    return claimed
+
+
+def claim(type_, sujet, window=DAY, now=None):
+    """True si l'appelant est le premier a emettre (type_, sujet) dans la fenetre."""
+    return str(sujet) in claim_many(type_, [sujet], window=window, now=now)
+
+
+def purge_expired(now=None):
+    """Supprime les reservations dont la fenetre est passee."""
+    deleted, _ = AlerteSuppression.objects.filter(expireAt__lt=now or timezone.now()).delete()
+    return deleted
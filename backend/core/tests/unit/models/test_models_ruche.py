@@ -1,7 +1,10 @@
+from datetime import timedelta
+
 from django.test import TestCase
 from django.db import IntegrityError
+from django.utils import timezone
 from core.models import (
-    Ruche, Rucher, Entreprise, StatutRuche,
+    Ruche, Rucher, Entreprise, StatutRuche, Intervention, TypeIntervention,
     TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie,
 )
 
@@ -53,3 +56,33 @@ class RucheModelTest(TestCase):
                 race_id=TypeRaceAbeille.BUCKFAST,
                 rucher=self.rucher
             )
+
+    def test_dernieres_interventions_tenues_par_trigger(self):
+        now = timezone.now()
+        visite = Intervention.objects.create(
+            ruche=self.ruche, type=TypeIntervention.VISITE, date=now - timedelta(days=3),
+        )
+        traitement = Intervention.objects.create(
+            ruche=self.ruche, type=TypeIntervention.TRAITEMENT, date=now - timedelta(days=10),
+        )
+        self.ruche.refresh_from_db()
+        self.assertEqual(self.ruche.derniereVisiteAt, visite.date)
+        self.assertEqual(self.ruche.dernierTraitementAt, traitement.date)
+
+        visite.delete()
+        traitement.type = TypeIntervention.NOURRISSEMENT
+        traitement.save()
+        self.ruche.refresh_from_db()
+        self.assertEqual(self.ruche.derniereVisiteAt, traitement.date)
+        self.assertIsNone(self.ruche.dernierTraitementAt)
+
+    def test_save_ne_remet_pas_a_zero_les_dates_du_trigger(self):
+        ruche = Ruche.objects.get(id=self.ruche.id)
+        intervention = Intervention.objects.create(
+            ruche=self.ruche, type=TypeIntervention.VISITE, date=timezone.now(),
+        )
+        ruche.statut = StatutRuche.FAIBLE
+        ruche.save()
+        ruche.refresh_from_db()
+        self.assertEqual(ruche.statut, StatutRuche.FAIBLE)
+        self.assertEqual(ruche.derniereVisiteAt, intervention.date)
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.archive import archive_capteur, read_points
+from core.models import (
+    Entreprise, Rucher, Ruche, Capteur, Mesure, MesureChunk, MesureArchive,
+    TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie, TypeCapteur,
+)
+from core.timeseries import compact_capteur, read_series, to_ms
+
+
+class ArchiveTest(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(MESURES_ARCHIVE_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'),
+            (TypeRaceAbeille, 'Buckfast'), (TypeMaladie, 'Aucune'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        entreprise = Entreprise.objects.create(nom='ArchiveCo', adresse='Addr')
+        rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=200, entreprise=entreprise,
+        )
+        ruche = Ruche.objects.create(
+            immatriculation='AR-001', type_id='Dadant', race_id='Buckfast',
+            rucher=rucher, maladie_id='Aucune',
+        )
+        self.capteur = Capteur.objects.create(
+            identifiant='P-AR', type=TypeCapteur.POIDS.value, ruche=ruche,
+        )
+        # Fin janvier et debut fevrier 2024, une mesure toutes les 6 heures.
+        self.start = datetime(2024, 1, 30, tzinfo=dt_timezone.utc)
+        self._mesures(self.start, 16)
+        compact_capteur(self.capteur.id, datetime(2024, 3, 1, tzinfo=dt_timezone.utc))
+
+    def _mesures(self, start, count, base=30.0):
+        Mesure.objects.bulk_create([
+            Mesure(capteur=self.capteur, date=start + timedelta(hours=6 * i), valeur=base + i)
+            for i in range(count)
+        ])
+
+    def test_archives_by_month(self):
+        self.assertEqual(archive_capteur(self.capteur.id, datetime(2024, 3, 15, tzinfo=dt_timezone.utc)), (4, 2))
+        self.assertFalse(MesureChunk.objects.exists())
+        janvier = MesureArchive.objects.get(mois=datetime(2024, 1, 1).date())
+        self.assertEqual(janvier.nbMesures, 8)
+        self.assertEqual(len(janvier.index), 2)
+        self.assertTrue(os.path.exists(os.path.join(self.root, janvier.chemin)))
+
+        series = read_series(self.capteur.id)
+        self.assertEqual(len(series), 16)
+        self.assertEqual(series[9], (self.start + timedelta(hours=54), 39.0))
+
+    def test_range_reads_only_overlapping_days(self):
+        archive_capteur(self.capteur.id, datetime(2024, 3, 15, tzinfo=dt_timezone.utc))
+        fevrier = MesureArchive.objects.get(mois=datetime(2024, 2, 1).date())
+        start = datetime(2024, 2, 1, 12, tzinfo=dt_timezone.utc)
+        ms, values = read_points(fevrier, to_ms(start), to_ms(start + timedelta(hours=6)))
+        self.assertEqual(values.tolist(), [40.0, 41.0])
+
+    def test_only_months_before_cutoff(self):
+        self.assertEqual(archive_capteur(self.capteur.id, datetime(2024, 2, 20, tzinfo=dt_timezone.utc)), (2, 1))
+        self.assertEqual(MesureChunk.objects.count(), 2)
+
+    def test_late_chunk_rewrites_archive(self):
+        archive_capteur(self.capteur.id, datetime(2024, 3, 15, tzinfo=dt_timezone.utc))
+        old = MesureArchive.objects.get(mois=datetime(2024, 1, 1).date())
+        Mesure.objects.create(capteur=self.capteur, date=self.start + timedelta(hours=3), valeur=99.0)
+        Mesure.objects.create(capteur=self.capteur, date=datetime(2024, 1, 5, tzinfo=dt_timezone.utc), valeur=1.0)
+        compact_capteur(self.capteur.id, datetime(2024, 3, 1, tzinfo=dt_timezone.utc))
+        with self.captureOnCommitCallbacks(execute=True):
+            archive_capteur(self.capteur.id, datetime(2024, 3, 15, tzinfo=dt_timezone.utc))
+
+        janvier = MesureArchive.objects.get(mois=datetime(2024, 1, 1).date())
+        self.assertEqual(janvier.nbMesures, 10)
+        self.assertNotEqual(janvier.chemin, old.chemin)
+        self.assertFalse(os.path.exists(os.path.join(self.root, old.chemin)))
+        self.assertIn((self.start + timedelta(hours=3), 99.0), read_series(self.capteur.id))
+
+    def test_reader_follows_replaced_file(self):
+        archive_capteur(self.capteur.id, datetime(2024, 3, 15, tzinfo=dt_timezone.utc))
+        stale = MesureArchive.objects.get(mois=datetime(2024, 1, 1).date())
+        Mesure.objects.create(capteur=self.capteur, date=self.start + timedelta(hours=3), valeur=99.0)
+        compact_capteur(self.capteur.id, datetime(2024, 3, 1, tzinfo=dt_timezone.utc))
+        with self.captureOnCommitCallbacks(execute=True):
+            archive_capteur(self.capteur.id, datetime(2024, 3, 15, tzinfo=dt_timezone.utc))
+
+        # Ligne lue avant la reecriture: l'ancien fichier n'existe plus.
+        self.assertFalse(os.path.exists(os.path.join(self.root, stale.chemin)))
+        ms, values = read_points(stale)
+        self.assertEqual(len(values), 9)
+        self.assertIn(99.0, values.tolist())
+
+        MesureArchive.objects.filter(pk=stale.pk).delete()
+        ms, values = read_points(stale)
+        self.assertEqual(len(values), 0)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('archive_mesures', '--older-than-days', '30', stdout=out)
+        self.assertIn('4 bloc(s) jour dans 2 fichier(s)', out.getvalue())
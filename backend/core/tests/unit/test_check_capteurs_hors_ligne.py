@@ -0,0 +1,124 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import (
+    Utilisateur, Entreprise, Rucher, Ruche, Capteur, Alerte, Notification,
+    TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie,
+    TypeCapteur, TypeAlerte, TypeNotification,
+    UtilisateurEntreprise, RoleUtilisateur,
+)
+
+
+@override_settings(
+    CAPTEUR_HORS_LIGNE_MINUTES={'Poids': 60, 'GPS': 600},
+    CAPTEUR_HORS_LIGNE_REALERT_HOURS=24,
+)
+class CheckCapteursHorsLigneTest(TestCase):
+    def setUp(self):
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'),
+            (TypeRaceAbeille, 'Buckfast'), (TypeMaladie, 'Aucune'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        self.admin = Utilisateur.objects.create(
+            email='hl@test.com', nom='Test', prenom='Admin',
+            motDePasseHash='hashed', actif=True,
+        )
+        self.entreprise = Entreprise.objects.create(nom='HLCo', adresse='Addr')
+        UtilisateurEntreprise.objects.create(
+            utilisateur=self.admin, entreprise=self.entreprise,
+            role=RoleUtilisateur.ADMIN_ENTREPRISE.value,
+        )
+        rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=200, entreprise=self.entreprise,
+        )
+        self.ruche = Ruche.objects.create(
+            immatriculation='HL-001', type_id='Dadant', race_id='Buckfast',
+            rucher=rucher, maladie_id='Aucune',
+        )
+        self.now = timezone.now()
+
+    def _capteur(self, identifiant, minutes_ago, type=TypeCapteur.POIDS.value, **kwargs):
+        return Capteur.objects.create(
+            identifiant=identifiant, type=type, ruche=self.ruche,
+            derniereCommunication=self.now - timedelta(minutes=minutes_ago)
+            if minutes_ago is not None else None,
+            **kwargs,
+        )
+
+    def _run(self):
+        out = StringIO()
+        call_command('check_capteurs_hors_ligne', stdout=out)
+        return out.getvalue()
+
+    def test_stale_capteur_alerted_once(self):
+        stale = self._capteur('POIDS-STALE', 90)
+        self._capteur('POIDS-OK', 10)
+        self._capteur('GPS-SLEEPING', 90, type=TypeCapteur.GPS.value)
+        self._capteur('POIDS-NEVER', None)
+
+        self._run()
+        stale.refresh_from_db()
+        self.assertIsNotNone(stale.horsLigneDepuis)
+        alertes = Alerte.objects.filter(type=TypeAlerte.HORS_LIGNE.value)
+        self.assertEqual(list(alertes.values_list('capteur_id', flat=True)), [stale.id])
+        notif = Notification.objects.get(utilisateur=self.admin)
+        self.assertEqual(notif.type, TypeNotification.ALERTE_CAPTEUR.value)
+        self.assertIn('POIDS-STALE', notif.message)
+
+        self._run()
+        self.assertEqual(alertes.count(), 1)
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_hysteresis_recovery(self):
+        capteur = self._capteur('POIDS-FLAP', 90)
+        self._run()
+
+        # Communication recente mais au-dela de la moitie du seuil: reste hors ligne.
+        Capteur.objects.filter(id=capteur.id).update(derniereCommunication=self.now - timedelta(minutes=45))
+        self._run()
+        capteur.refresh_from_db()
+        self.assertIsNotNone(capteur.horsLigneDepuis)
+
+        Capteur.objects.filter(id=capteur.id).update(derniereCommunication=timezone.now())
+        out = self._run()
+        capteur.refresh_from_db()
+        self.assertIsNone(capteur.horsLigneDepuis)
+        self.assertIn('1 retour(s) en ligne', out)
+
+    def test_flapping_capteur_not_realerted_within_window(self):
+        capteur = self._capteur('POIDS-FLAP', 90, horsLigneLastAlertAt=self.now - timedelta(hours=2))
+        self._run()
+        capteur.refresh_from_db()
+        self.assertIsNotNone(capteur.horsLigneDepuis)
+        self.assertFalse(Alerte.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+    def test_inactive_capteur_ignored(self):
+        self._capteur('POIDS-OFF', 90, actif=False)
+        self._run()
+        self.assertFalse(Alerte.objects.exists())
+
+    def test_many_capteurs_single_summary_notification(self):
+        Capteur.objects.bulk_create([
+            Capteur(
+                identifiant=f'BULK{i:04d}', type=TypeCapteur.POIDS.value, ruche=self.ruche,
+                derniereCommunication=self.now - timedelta(hours=5),
+            )
+            for i in range(25)
+        ])
+        call_command('check_capteurs_hors_ligne', batch_size=10, stdout=StringIO())
+        self.assertEqual(Alerte.objects.count(), 25)
+        notif = Notification.objects.get()
+        self.assertIn('25 capteur(s)', notif.message)
+        self.assertIn('(+15)', notif.message)
+
+    def test_invalid_batch_size(self):
+        with self.assertRaises(CommandError):
+            call_command('check_capteurs_hors_ligne', batch_size=0, stdout=StringIO())
@@ -1,16 +1,25 @@
 from unittest.mock import patch, MagicMock
+from datetime import timedelta
 from io import StringIO
 from django.test import TestCase
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.utils import timezone
 
-from core.management.commands.check_gps_alerts import _distance_meters
+from core.management.commands.check_gps_alerts import (
+    ADVISORY_LOCK_NAMESPACE,
+    _distance_meters,
+    _filter_shard,
+    _parse_shard,
+)
 from core.models import (
-    Utilisateur, Entreprise, Rucher, Ruche, Capteur,
+    Utilisateur, Entreprise, Rucher, Ruche, Capteur, Alerte,
     TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie,
     TypeCapteur, UtilisateurEntreprise, RoleUtilisateur,
-    TypeOffreModel, LimitationOffre, Offre, TypeOffre,
+    TypeOffreModel, LimitationOffre, Offre, TypeOffre, TypeAlerte,
 )
+from core.suppression import claim
 
 
 class DistanceMetersTest(TestCase):
@@ -23,6 +32,16 @@ class DistanceMetersTest(TestCase):
         self.assertLess(d, 700_000)
 
 
+class ParseShardTest(TestCase):
+    def test_valid(self):
+        self.assertEqual(_parse_shard('2/4'), (2, 4))
+
+    def test_invalid(self):
+        for value in ('', '4/4', '-1/2', 'a/b', '1/0'):
+            with self.assertRaises(CommandError):
+                _parse_shard(value)
+
+
 class CheckGpsAlertsCommandTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -53,7 +72,7 @@ class CheckGpsAlertsCommandTest(TestCase):
         )
         Offre.objects.create(
             entreprise=self.entreprise, type_id='Freemium', active=True,
-            dateDebut=timezone.now(), nbRuchersMax=5, nbCapteursMax=5, nbReinesMax=5,
+            dateDebut=timezone.now(), nbRuchersMax=5, nbCapteursMax=20, nbReinesMax=5,
         )
         self.rucher = Rucher.objects.create(
             nom='Rucher GPS', latitude=43.6, longitude=3.8,
@@ -101,3 +120,94 @@ class CheckGpsAlertsCommandTest(TestCase):
         out = StringIO()
         call_command('check_gps_alerts', stdout=out)
         self.assertIn('test error', out.getvalue())
+
+    @patch('core.management.commands.check_gps_alerts.send_email')
+    @patch('core.management.commands.check_gps_alerts.get_latest_position')
+    def test_alert_skipped_when_already_sent_today(self, mock_pos, mock_email):
+        mock_pos.return_value = {'latitude': 44.0, 'longitude': 4.0}
+        claim(TypeAlerte.DEPLACEMENT_GPS.value, self.capteur.id)
+        out = StringIO()
+        call_command('check_gps_alerts', stdout=out)
+        mock_email.assert_not_called()
+        self.assertIn('already sent today', out.getvalue())
+        self.assertFalse(Alerte.objects.filter(capteur=self.capteur).exists())
+
+    def test_shards_partition_capteurs(self):
+        for i in range(2, 12):
+            Capteur.objects.create(
+                identifiant=f'TRACKER{i:03d}', type=TypeCapteur.GPS.value,
+                ruche=self.ruche, actif=True,
+            )
+        all_ids = set(Capteur.objects.values_list('id', flat=True))
+        seen = []
+        for index in range(3):
+            seen.extend(_filter_shard(Capteur.objects.all(), index, 3).values_list('id', flat=True))
+        self.assertEqual(len(seen), len(all_ids))
+        self.assertEqual(set(seen), all_ids)
+
+    @patch('core.management.commands.check_gps_alerts.get_latest_position')
+    def test_shard_filter_applied(self, mock_pos):
+        mock_pos.return_value = {'latitude': 43.6, 'longitude': 3.8}
+        out = StringIO()
+        for index in range(2):
+            call_command('check_gps_alerts', shard=f'{index}/2', stdout=out)
+        self.assertEqual(mock_pos.call_count, 1)
+        self.assertIn('shard', out.getvalue())
+
+    @patch('core.management.commands.check_gps_alerts.get_latest_position')
+    def test_shard_already_running(self, mock_pos):
+        other = connection.copy()
+        try:
+            with other.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_lock(%s, %s)', [ADVISORY_LOCK_NAMESPACE, 1000])
+            out = StringIO()
+            call_command('check_gps_alerts', stdout=out)
+            self.assertIn('already running', out.getvalue())
+            mock_pos.assert_not_called()
+        finally:
+            other.close()
+
+    @patch('core.management.commands.check_gps_alerts.get_latest_position')
+    def test_capteur_not_due_is_skipped(self, mock_pos):
+        self.capteur.gpsNextCheckAt = timezone.now() + timedelta(minutes=30)
+        self.capteur.save(update_fields=['gpsNextCheckAt'])
+        out = StringIO()
+        call_command('check_gps_alerts', stdout=out)
+        mock_pos.assert_not_called()
+        self.assertIn('0 capteur(s) to check', out.getvalue())
+
+    @patch('core.management.commands.check_gps_alerts.get_latest_position')
+    def test_all_ignores_schedule(self, mock_pos):
+        mock_pos.return_value = {'latitude': 43.6, 'longitude': 3.8}
+        self.capteur.gpsNextCheckAt = timezone.now() + timedelta(minutes=30)
+        self.capteur.save(update_fields=['gpsNextCheckAt'])
+        call_command('check_gps_alerts', all=True, stdout=StringIO())
+        mock_pos.assert_called_once()
+
+    @patch('core.management.commands.check_gps_alerts.get_latest_position')
+    def test_check_schedules_next_run(self, mock_pos):
+        mock_pos.return_value = {'latitude': 43.6, 'longitude': 3.8}
+        call_command('check_gps_alerts', stdout=StringIO())
+        self.capteur.refresh_from_db()
+        self.assertIsNotNone(self.capteur.gpsNextCheckAt)
+        self.assertGreater(self.capteur.gpsNextCheckAt, timezone.now())
+        self.assertEqual(self.capteur.gpsLastDistanceMeters, 0.0)
+
+    @patch('core.management.commands.check_gps_alerts.get_latest_position')
+    def test_limit_checks_most_overdue_first(self, mock_pos):
+        mock_pos.return_value = {'latitude': 43.6, 'longitude': 3.8}
+        other = Capteur.objects.create(
+            identifiant='TRACKER002', type=TypeCapteur.GPS.value,
+            ruche=self.ruche, actif=True,
+            gpsAlertActive=True, gpsReferenceLat=43.6,
+            gpsReferenceLng=3.8, gpsThresholdMeters=100.0,
+        )
+        now = timezone.now()
+        Capteur.objects.filter(id=self.capteur.id).update(gpsNextCheckAt=now - timedelta(minutes=5))
+        Capteur.objects.filter(id=other.id).update(gpsNextCheckAt=now - timedelta(hours=1))
+        call_command('check_gps_alerts', limit=1, stdout=StringIO())
+        mock_pos.assert_called_once_with('TRACKER002')
+
+    def test_invalid_limit(self):
+        with self.assertRaises(CommandError):
+            call_command('check_gps_alerts', limit=0, stdout=StringIO())
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import dashboard
+from core.models import (
+    Entreprise, Rucher, Ruche, Capteur, Alerte, TypeAlerte, Reine, ReineStatut, LigneeReine,
+    CodeCouleurReine, RacleElevage, CycleElevageReine, TacheCycleElevage, StatutTacheElevage,
+    StatutRuche, TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie, TypeCapteur,
+)
+
+
+class DashboardTest(TestCase):
+    def setUp(self):
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'), (TypeRaceAbeille, 'Buckfast'),
+            (TypeMaladie, 'Aucune'), (TypeMaladie, 'Varroose'), (LigneeReine, 'Buckfast'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        self.entreprise = Entreprise.objects.create(nom='DashCo', adresse='Addr')
+        self.vide = Entreprise.objects.create(nom='Vide', adresse='Addr')
+        rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8, flore_id='Lavande', altitude=200, entreprise=self.entreprise,
+        )
+        ruches = [
+            Ruche.objects.create(
+                immatriculation=f'D000000{i}', type_id='Dadant', race_id='Buckfast', rucher=rucher,
+                statut=statut, maladie_id=maladie,
+            )
+            for i, (statut, maladie) in enumerate([
+                (StatutRuche.ACTIVE, 'Aucune'), (StatutRuche.ACTIVE, 'Aucune'), (StatutRuche.MALADE, 'Varroose'),
+            ])
+        ]
+        poids = Capteur.objects.create(identifiant='DASH-POIDS', type=TypeCapteur.POIDS.value, ruche=ruches[0])
+        Capteur.objects.create(identifiant='DASH-GPS', type=TypeCapteur.GPS.value, ruche=ruches[1])
+        Capteur.objects.create(identifiant='DASH-OFF', type=TypeCapteur.GPS.value, ruche=ruches[1], actif=False)
+        Alerte.objects.create(type=TypeAlerte.CHUTE_POIDS, message='m', capteur=poids)
+        Alerte.objects.create(type=TypeAlerte.VOL, message='m', capteur=poids, acquittee=True)
+        Reine.objects.create(
+            entreprise=self.entreprise, anneeNaissance=2025, codeCouleur=CodeCouleurReine.choices[0][0],
+            lignee_id='Buckfast', noteDouceur=5, statut=ReineStatut.FECONDEE,
+        )
+        racle = RacleElevage.objects.create(
+            entreprise=self.entreprise, reference='R1', dateCreation=timezone.now().date(), nbCupules=10,
+        )
+        cycle = CycleElevageReine.objects.create(racle=racle, dateDebut=timezone.now().date())
+        today = timezone.now().date()
+        for offset, statut in [(-2, StatutTacheElevage.A_FAIRE), (3, StatutTacheElevage.A_FAIRE),
+                               (-5, StatutTacheElevage.FAITE)]:
+            TacheCycleElevage.objects.create(
+                cycle=cycle, type='Greffage', jourTheorique=0, datePrevue=today + timedelta(days=offset),
+                statut=statut,
+            )
+
+    def test_refresh_and_summary(self):
+        self.assertTrue(dashboard.refresh(min_interval=0))
+        data = dashboard.summary(self.entreprise.id)
+        self.assertEqual(data["nbRuchers"], 1)
+        self.assertEqual(data["nbRuches"], 3)
+        self.assertEqual(data["ruchesParStatut"], {"Active": 2, "Malade": 1})
+        self.assertEqual(data["ruchesParMaladie"], {"Aucune": 2, "Varroose": 1})
+        self.assertEqual(data["nbCapteurs"], 2)
+        self.assertEqual(data["capteursParType"], {"Poids": 1, "GPS": 1})
+        self.assertEqual(data["alertesOuvertes"], 1)
+        self.assertEqual(data["reinesParStatut"], {"Fecondee": 1})
+        self.assertEqual(data["tachesAFaire"], 2)
+        self.assertEqual(data["tachesEnRetard"], 1)
+
+        vide = dashboard.summary(self.vide.id)
+        self.assertEqual((vide["nbRuches"], vide["ruchesParStatut"]), (0, {}))
+
+    @override_settings(DASHBOARD_REFRESH_MIN_SECONDS=300)
+    def test_refresh_is_debounced(self):
+        self.assertTrue(dashboard.refresh(min_interval=0))
+        self.assertFalse(dashboard.refresh())
+        self.assertTrue(dashboard.refresh(now=timezone.now() + timedelta(minutes=10)))
+
+    @override_settings(HASURA_WEBHOOK_SECRET="secret")
+    def test_webhook(self):
+        resp = self.client.post("/api/webhooks/refresh-dashboard")
+        self.assertEqual(resp.status_code, 401)
+        resp = self.client.post("/api/webhooks/refresh-dashboard", HTTP_X_HASURA_WEBHOOK_SECRET="secret")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIsNotNone(dashboard.summary(self.entreprise.id))
+
+    def test_command(self):
+        call_command("refresh_dashboard", "--min-interval", "0", stdout=open("/dev/null", "w"))
+        self.assertEqual(dashboard.summary(self.entreprise.id)["nbRuches"], 3)
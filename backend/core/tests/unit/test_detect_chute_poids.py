@@ -0,0 +1,101 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import (
+    Utilisateur, Entreprise, Rucher, Ruche, Capteur, Mesure, Alerte, Notification,
+    DetectionWatermark, TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie,
+    TypeCapteur, TypeAlerte, UtilisateurEntreprise, RoleUtilisateur,
+)
+from core.weight_detection import DETECTEUR_CHUTE_POIDS
+
+
+@override_settings(CHUTE_POIDS_SEUIL_KG=2.0, CHUTE_POIDS_TOLERANCE_KG=0.2, CHUTE_POIDS_LOOKBACK_HOURS=48)
+class DetectChutePoidsCommandTest(TestCase):
+    def setUp(self):
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'),
+            (TypeRaceAbeille, 'Buckfast'), (TypeMaladie, 'Aucune'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        self.admin = Utilisateur.objects.create(
+            email='poids@test.com', nom='Test', prenom='Admin',
+            motDePasseHash='hashed', actif=True,
+        )
+        entreprise = Entreprise.objects.create(nom='PoidsCo', adresse='Addr')
+        UtilisateurEntreprise.objects.create(
+            utilisateur=self.admin, entreprise=entreprise,
+            role=RoleUtilisateur.ADMIN_ENTREPRISE.value,
+        )
+        rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=200, entreprise=entreprise,
+        )
+        self.ruche = Ruche.objects.create(
+            immatriculation='CP-001', type_id='Dadant', race_id='Buckfast',
+            rucher=rucher, maladie_id='Aucune',
+        )
+        self.capteur = Capteur.objects.create(
+            identifiant='POIDS001', type=TypeCapteur.POIDS.value, ruche=self.ruche,
+        )
+        self.start = timezone.now() - timedelta(hours=10)
+
+    def _mesures(self, values, offset_hours=0):
+        Mesure.objects.bulk_create([
+            Mesure(capteur=self.capteur, valeur=v, date=self.start + timedelta(hours=offset_hours + i))
+            for i, v in enumerate(values)
+        ])
+
+    def test_drop_creates_alert_and_notification(self):
+        self._mesures([40.0, 40.1, 40.0, 36.0, 36.1])
+        call_command('detect_chute_poids', stdout=StringIO())
+        alerte = Alerte.objects.get(type=TypeAlerte.CHUTE_POIDS.value)
+        self.assertEqual(alerte.capteur_id, self.capteur.id)
+        self.assertIn('CP-001', alerte.message)
+        self.assertEqual(Notification.objects.get().ruche_id, self.ruche.id)
+
+    def test_incremental_from_watermark(self):
+        self._mesures([40.0, 40.1, 40.0])
+        call_command('detect_chute_poids', stdout=StringIO())
+        wm = DetectionWatermark.objects.get(detecteur=DETECTEUR_CHUTE_POIDS, capteur=self.capteur)
+        self.assertEqual(wm.state['lastValue'], 40.0)
+
+        out = StringIO()
+        call_command('detect_chute_poids', stdout=out)
+        self.assertIn('0 mesure(s)', out.getvalue())
+
+        # La chute est mesuree par rapport a la derniere valeur du run precedent.
+        self._mesures([37.0], offset_hours=3)
+        call_command('detect_chute_poids', stdout=StringIO())
+        self.assertEqual(Alerte.objects.count(), 1)
+
+    def test_no_alert_on_stable_weight(self):
+        self._mesures([40.0, 40.2, 40.1, 40.3, 40.2])
+        call_command('detect_chute_poids', stdout=StringIO())
+        self.assertFalse(Alerte.objects.exists())
+
+    def test_old_history_ignored_on_first_run(self):
+        Mesure.objects.create(capteur=self.capteur, valeur=50.0, date=timezone.now() - timedelta(days=10))
+        self._mesures([40.0, 40.1])
+        call_command('detect_chute_poids', stdout=StringIO())
+        self.assertFalse(Alerte.objects.exists())
+
+    def test_watermark_per_capteur_in_same_batch(self):
+        self._mesures([40.0, 40.1, 40.0])
+        call_command('detect_chute_poids', stdout=StringIO())
+        # Un second capteur jamais traite part de la fenetre par defaut, le
+        # premier reste borne par son watermark.
+        autre = Capteur.objects.create(
+            identifiant='POIDS002', type=TypeCapteur.POIDS.value, ruche=self.ruche,
+        )
+        Mesure.objects.bulk_create([
+            Mesure(capteur=autre, valeur=v, date=self.start + timedelta(hours=i))
+            for i, v in enumerate([30.0, 30.1])
+        ])
+        self._mesures([40.2], offset_hours=3)
+        out = StringIO()
+        call_command('detect_chute_poids', stdout=out)
+        self.assertIn('3 mesure(s)', out.getvalue())
@@ -0,0 +1,87 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import (
+    Utilisateur, Entreprise, Rucher, Ruche, Capteur, Mesure, Alerte, Notification,
+    RegleSeuil, CibleRegle, TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie,
+    TypeCapteur, TypeAlerte, UtilisateurEntreprise, RoleUtilisateur,
+)
+from core.threshold_rules import compile_rules
+
+
+class EvaluateReglesSeuilCommandTest(TestCase):
+    def setUp(self):
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'),
+            (TypeRaceAbeille, 'Buckfast'), (TypeMaladie, 'Aucune'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        self.admin = Utilisateur.objects.create(
+            email='seuil@test.com', nom='Test', prenom='Admin',
+            motDePasseHash='hashed', actif=True,
+        )
+        self.entreprise = Entreprise.objects.create(nom='SeuilCo', adresse='Addr')
+        UtilisateurEntreprise.objects.create(
+            utilisateur=self.admin, entreprise=self.entreprise,
+            role=RoleUtilisateur.ADMIN_ENTREPRISE.value,
+        )
+        rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=200, entreprise=self.entreprise,
+        )
+        self.ruche = Ruche.objects.create(
+            immatriculation='RS-001', type_id='Dadant', race_id='Buckfast',
+            rucher=rucher, maladie_id='Aucune',
+        )
+        self.temp = Capteur.objects.create(
+            identifiant='TEMP001', type=TypeCapteur.TEMPERATURE.value, ruche=self.ruche,
+        )
+        self.poids = Capteur.objects.create(
+            identifiant='POIDS001', type=TypeCapteur.POIDS.value, ruche=self.ruche, batteriePct=8.0,
+        )
+        RegleSeuil.objects.create(
+            entreprise=self.entreprise, typeCapteur=TypeCapteur.TEMPERATURE.value,
+            typeAlerte=TypeAlerte.TEMPERATURE_CRITIQUE.value, valeurMax=40.0, dureeMinutes=30,
+        )
+        RegleSeuil.objects.create(
+            entreprise=self.entreprise, typeCapteur=None,
+            typeAlerte=TypeAlerte.BATTERIE_FAIBLE.value, cible=CibleRegle.BATTERIE.value, valeurMin=15.0,
+        )
+
+    def test_compile_rules_by_capteur(self):
+        compiled = compile_rules()
+        self.assertEqual(
+            sorted(r.type_alerte for r in compiled[self.temp.id]),
+            [TypeAlerte.BATTERIE_FAIBLE.value, TypeAlerte.TEMPERATURE_CRITIQUE.value],
+        )
+        self.assertEqual([r.type_alerte for r in compiled[self.poids.id]], [TypeAlerte.BATTERIE_FAIBLE.value])
+
+    def test_temperature_and_battery_alerts(self):
+        start = timezone.now() - timedelta(hours=2)
+        Mesure.objects.bulk_create([
+            Mesure(capteur=self.temp, valeur=v, date=start + timedelta(minutes=15 * i))
+            for i, v in enumerate([35, 41, 42, 43, 44])
+        ])
+        call_command('evaluate_regles_seuil', stdout=StringIO())
+
+        temp_alert = Alerte.objects.get(type=TypeAlerte.TEMPERATURE_CRITIQUE.value)
+        self.assertEqual(temp_alert.capteur_id, self.temp.id)
+        self.assertIn('depuis 30 min', temp_alert.message)
+        battery_alert = Alerte.objects.get(type=TypeAlerte.BATTERIE_FAIBLE.value)
+        self.assertEqual(battery_alert.capteur_id, self.poids.id)
+        self.assertEqual(Notification.objects.filter(utilisateur=self.admin).count(), 2)
+
+        # Execution suivante: rien de nouveau, pas de doublon.
+        out = StringIO()
+        call_command('evaluate_regles_seuil', stdout=out)
+        self.assertEqual(Alerte.objects.count(), 2)
+        self.assertIn('0 mesure(s)', out.getvalue())
+
+    def test_inactive_rule_ignored(self):
+        RegleSeuil.objects.update(actif=False)
+        call_command('evaluate_regles_seuil', stdout=StringIO())
+        self.assertFalse(Alerte.objects.exists())
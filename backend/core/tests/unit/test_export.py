@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core import export
+from core.models import (
+    Entreprise, Rucher, Ruche, Capteur, Mesure,
+    TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie, TypeCapteur,
+)
+from core.timeseries import compact_capteur
+
+if export.available():
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+
+@unittest.skipUnless(export.available(), "pyarrow non installe")
+class ExportTest(TestCase):
+    def setUp(self):
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'),
+            (TypeRaceAbeille, 'Buckfast'), (TypeMaladie, 'Aucune'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        entreprise = Entreprise.objects.create(nom='ExportCo', adresse='Addr')
+        rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=200, entreprise=entreprise,
+        )
+        ruche = Ruche.objects.create(
+            immatriculation='EX-001', type_id='Dadant', race_id='Buckfast',
+            rucher=rucher, maladie_id='Aucune',
+        )
+        self.poids = Capteur.objects.create(identifiant='P-EX', type=TypeCapteur.POIDS.value, ruche=ruche)
+        self.temp = Capteur.objects.create(identifiant='T-EX', type=TypeCapteur.TEMPERATURE.value, ruche=ruche)
+        self.day = datetime(2026, 3, 1, tzinfo=dt_timezone.utc)
+        Mesure.objects.bulk_create(
+            [Mesure(capteur=self.poids, date=self.day + timedelta(hours=i), valeur=40.0 + i) for i in range(30)]
+            + [Mesure(capteur=self.temp, date=self.day + timedelta(hours=i), valeur=20.0) for i in range(5)]
+        )
+        # L'historique du premier jour du capteur de poids est compacte.
+        compact_capteur(self.poids.id, self.day + timedelta(days=1))
+
+    def test_arrow_stream_batches(self):
+        data = b"".join(export.stream_export(
+            Capteur.objects.all(), fmt=export.FORMAT_ARROW, details=True, batch_size=7,
+        ))
+        table = pa.ipc.open_stream(data).read_all()
+        self.assertEqual(table.num_rows, 35)
+        rows = table.to_pylist()
+        poids = [r for r in rows if r['capteur_id'] == str(self.poids.id)]
+        self.assertEqual([r['valeur'] for r in poids], [40.0 + i for i in range(30)])
+        self.assertEqual(poids[0]['date'], self.day)
+        self.assertEqual({r['capteur_type'] for r in rows}, {'Poids', 'Temperature'})
+        self.assertEqual({r['ruche_immatriculation'] for r in rows}, {'EX-001'})
+
+    def test_date_range(self):
+        batches = list(export.iter_record_batches(
+            Capteur.objects.filter(id=self.poids.id),
+            start=self.day + timedelta(hours=22), end=self.day + timedelta(hours=25),
+        ))
+        self.assertEqual(sum(b.num_rows for b in batches), 4)
+
+    def test_command_parquet(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'mesures.parquet')
+            out = StringIO()
+            call_command('export_mesures', path, '--batch-size', '10', stdout=out)
+            self.assertIn('35 mesure(s)', out.getvalue())
+            parquet = pq.ParquetFile(path)
+            self.assertEqual(parquet.metadata.num_rows, 35)
+            self.assertGreater(parquet.num_row_groups, 1)
+
+    def test_command_invalid_capteur(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaisesMessage(CommandError, '--capteur'):
+                call_command('export_mesures', os.path.join(tmp, 'm.parquet'), '--capteur', 'abc', stdout=StringIO())
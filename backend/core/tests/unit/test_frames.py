@@ -0,0 +1,54 @@
+import unittest
+
+from django.test import SimpleTestCase
+
+from core import frames
+
+
+class BinaryFrameTest(SimpleTestCase):
+    def test_roundtrip_float16_with_battery(self):
+        data = frames.encode_frame(7, 1_700_000_000, [0, 60, 60], [40.5, 40.25, 40.0], batterie=82)
+        self.assertEqual(len(data), 14 + 1 + 3 * 4)
+        [frame] = frames.decode_binary(data)
+        self.assertEqual(frame.short_id, 7)
+        self.assertEqual(frame.seconds.tolist(), [1_700_000_000, 1_700_000_060, 1_700_000_120])
+        self.assertEqual(frame.valeurs.tolist(), [40.5, 40.25, 40.0])
+        self.assertEqual(frame.batterie, 82)
+
+    def test_concatenated_frames_float32(self):
+        data = (
+            frames.encode_frame(1, 100, [0], [21.3], float16=False)
+            + frames.encode_frame(2, 200, [5, 5], [1.0, 2.0])
+        )
+        first, second = frames.decode_binary(data)
+        self.assertAlmostEqual(first.valeurs[0], 21.3, places=5)
+        self.assertIsNone(first.batterie)
+        self.assertEqual(second.seconds.tolist(), [205, 210])
+
+    def test_truncated(self):
+        data = frames.encode_frame(1, 100, [0, 1], [1.0, 2.0])
+        with self.assertRaises(frames.FrameError):
+            frames.decode_binary(data[:-1])
+        with self.assertRaises(frames.FrameError):
+            frames.decode_binary(b"XX" + data[2:])
+
+    @unittest.skipIf(frames.msgpack is None, "msgpack non installe")
+    def test_msgpack(self):
+        payload = frames.msgpack.packb([{"c": 3, "t": 1000, "d": [0, 30], "v": [12.5, 13.0], "b": 50}])
+        [frame] = frames.decode(payload, "application/msgpack")
+        self.assertEqual(frame.seconds.tolist(), [1000, 1030])
+        self.assertEqual(frame.batterie, 50)
+
+    def test_mapping_out_of_range(self):
+        valid = {"c": 3, "t": 1000, "d": [0, 30], "v": [12.5, 13.0], "b": 50}
+        self.assertEqual(len(frames._from_mapping([valid])), 1)
+        for change in (
+            {"t": 10**12}, {"t": -1}, {"t": "1000"}, {"c": 2**32}, {"d": [0, 70000]},
+            {"d": [0, 2**70]}, {"b": "x"}, {"b": 101}, {"b": True}, {"v": ["x", 1.0]},
+        ):
+            with self.subTest(change=change), self.assertRaises(frames.FrameError):
+                frames._from_mapping([{**valid, **change}])
+
+    def test_unsupported(self):
+        with self.assertRaises(frames.UnsupportedFormat):
+            frames.decode(b"{}", "application/json")
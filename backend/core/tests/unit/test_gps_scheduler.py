@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.gps_scheduler import (
+    apply_check_failure,
+    apply_check_result,
+    due_capteurs,
+    next_check_interval,
+    reset_schedule,
+)
+from core.models import (
+    Capteur, TypeCapteur, Entreprise, Rucher, Ruche,
+    TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie,
+)
+
+
+@override_settings(GPS_CHECK_MIN_INTERVAL_SECONDS=300, GPS_CHECK_MAX_INTERVAL_SECONDS=2400)
+class NextCheckIntervalTest(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.capteur = Capteur(
+            identifiant='SCHED001', type=TypeCapteur.GPS.value,
+            gpsThresholdMeters=100.0,
+        )
+
+    def test_first_check_uses_min_interval(self):
+        self.assertEqual(next_check_interval(self.capteur, 0.0, self.now), 300)
+
+    def test_stationary_backs_off_until_max(self):
+        intervals = []
+        for _ in range(6):
+            apply_check_result(self.capteur, 2.0, self.now)
+            intervals.append(self.capteur.gpsCheckIntervalSeconds)
+        self.assertEqual(intervals, [300, 600, 1200, 2400, 2400, 2400])
+
+    def test_movement_resets_interval(self):
+        self.capteur.gpsLastDistanceMeters = 2.0
+        self.capteur.gpsCheckIntervalSeconds = 2400
+        self.assertEqual(next_check_interval(self.capteur, 30.0, self.now), 300)
+
+    def test_gps_noise_is_not_movement(self):
+        self.capteur.gpsLastDistanceMeters = 2.0
+        self.capteur.gpsCheckIntervalSeconds = 600
+        self.assertEqual(next_check_interval(self.capteur, 8.0, self.now), 1200)
+
+    def test_near_threshold_keeps_min_interval(self):
+        self.capteur.gpsLastDistanceMeters = 60.0
+        self.capteur.gpsCheckIntervalSeconds = 600
+        self.assertEqual(next_check_interval(self.capteur, 60.0, self.now), 300)
+
+    def test_recent_alert_keeps_min_interval(self):
+        self.capteur.gpsLastDistanceMeters = 2.0
+        self.capteur.gpsCheckIntervalSeconds = 600
+        self.capteur.gpsLastAlertAt = self.now - timedelta(hours=2)
+        self.assertEqual(next_check_interval(self.capteur, 2.0, self.now), 300)
+
+    def test_failure_retries_soon_without_resetting_backoff(self):
+        self.capteur.gpsCheckIntervalSeconds = 2400
+        apply_check_failure(self.capteur, self.now)
+        self.assertEqual(self.capteur.gpsNextCheckAt, self.now + timedelta(seconds=300))
+        self.assertEqual(self.capteur.gpsCheckIntervalSeconds, 2400)
+
+    def test_reset_schedule(self):
+        apply_check_result(self.capteur, 2.0, self.now)
+        reset_schedule(self.capteur, self.now)
+        self.assertIsNone(self.capteur.gpsLastDistanceMeters)
+        self.assertIsNone(self.capteur.gpsCheckIntervalSeconds)
+        self.assertEqual(self.capteur.gpsNextCheckAt, self.now)
+
+
+class DueCapteursTest(TestCase):
+    def setUp(self):
+        TypeFlore.objects.get_or_create(value='Lavande', defaults={'label': 'Lavande'})
+        TypeRuche.objects.get_or_create(value='Dadant', defaults={'label': 'Dadant'})
+        TypeRaceAbeille.objects.get_or_create(value='Buckfast', defaults={'label': 'Buckfast'})
+        TypeMaladie.objects.get_or_create(value='Aucune', defaults={'label': 'Aucune'})
+        entreprise = Entreprise.objects.create(nom='SchedCo', adresse='Addr')
+        rucher = Rucher.objects.create(
+            nom='Sched', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=100, entreprise=entreprise,
+        )
+        self.ruche = Ruche.objects.create(
+            immatriculation='SCH-001', type_id='Dadant', race_id='Buckfast',
+            maladie_id='Aucune', rucher=rucher,
+        )
+
+    def test_due_ordering(self):
+        now = timezone.now()
+        late = Capteur.objects.create(
+            identifiant='DUE001', type=TypeCapteur.GPS.value, ruche=self.ruche,
+            gpsNextCheckAt=now - timedelta(hours=1),
+        )
+        never = Capteur.objects.create(identifiant='DUE002', type=TypeCapteur.GPS.value, ruche=self.ruche)
+        recent = Capteur.objects.create(
+            identifiant='DUE003', type=TypeCapteur.GPS.value, ruche=self.ruche,
+            gpsNextCheckAt=now - timedelta(minutes=1),
+        )
+        Capteur.objects.create(
+            identifiant='DUE004', type=TypeCapteur.GPS.value, ruche=self.ruche,
+            gpsNextCheckAt=now + timedelta(hours=1),
+        )
+        ids = list(due_capteurs(Capteur.objects.all(), now).values_list('id', flat=True))
+        self.assertEqual(ids, [never.id, late.id, recent.id])
@@ -0,0 +1,98 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core import health_scores
+from core.ingestion import write_mesures
+from core.models import (
+    Entreprise, Rucher, Ruche, RucheSante, Capteur, Alerte, TypeAlerte, Intervention, TypeIntervention,
+    StatutRuche, TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie, TypeCapteur,
+)
+
+
+class PenalitesTest(TestCase):
+    def test_components(self):
+        composantes, score = health_scores.penalites(
+            ["Active", "Faible", "Morte"],
+            ["Aucune", "Varroose", "LoqueAmericaine"],
+            [10.0, 45.0, np.nan],
+            [0, 2, 1],
+            [0, 1, 0],
+            [0.5, -1.3, np.nan],
+        )
+        self.assertEqual(composantes[0].tolist(), [0.0, 0.0, 0.0, 0.0, 0.0])
+        self.assertEqual(composantes[1].tolist(), [25.0, 25.0, 10.0, 30.0, 20.0])
+        self.assertEqual(score.tolist(), [100.0, 0.0, 0.0])
+
+
+class HealthScoresTest(TestCase):
+    def setUp(self):
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'),
+            (TypeRaceAbeille, 'Buckfast'), (TypeMaladie, 'Aucune'), (TypeMaladie, 'Varroose'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        self.entreprise = Entreprise.objects.create(nom='SanteCo', adresse='Addr')
+        rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=200, entreprise=self.entreprise,
+        )
+        self.saine = Ruche.objects.create(
+            immatriculation='S0000001', type_id='Dadant', race_id='Buckfast', rucher=rucher, maladie_id='Aucune',
+        )
+        self.malade = Ruche.objects.create(
+            immatriculation='S0000002', type_id='Dadant', race_id='Buckfast', rucher=rucher,
+            maladie_id='Varroose', statut=StatutRuche.MALADE,
+        )
+        now = timezone.now()
+        Intervention.objects.create(type=TypeIntervention.VISITE, date=now - timedelta(days=3), ruche=self.saine)
+        Intervention.objects.create(type=TypeIntervention.VISITE, date=now - timedelta(days=3), ruche=self.malade)
+        self.capteur = Capteur.objects.create(identifiant='SANTE-POIDS', type=TypeCapteur.POIDS.value, ruche=self.malade)
+
+    def test_compute_merges_sources(self):
+        today = timezone.now().date()
+        rows = []
+        for k in range(7):
+            day = datetime.combine(today - timedelta(days=7 - k), time(12), tzinfo=dt_timezone.utc)
+            rows.append((self.capteur.id, day, 40.0 - 1.3 * k))
+        write_mesures(rows, validate=False)
+        Alerte.objects.create(type=TypeAlerte.CHUTE_POIDS, message='m', capteur=self.capteur)
+        Alerte.objects.create(type=TypeAlerte.HORS_LIGNE, message='m', capteur=self.capteur, acquittee=True)
+
+        saine, malade = sorted(health_scores.compute([self.saine.id, self.malade.id]), key=lambda s: s.score)[::-1]
+        self.assertEqual(saine.ruche_id, self.saine.id)
+        self.assertEqual(saine.score, 100.0)
+        self.assertEqual(saine.penalites, {})
+        self.assertEqual(malade.penalites, {"statut": 40.0, "maladie": 25.0, "alertes": 20.0, "poids": 20.0})
+        self.assertEqual(malade.alertesOuvertes, 1)
+        self.assertAlmostEqual(malade.tendancePoidsKgJour, -1.3)
+        self.assertEqual(malade.entreprise_id, self.entreprise.id)
+
+    def test_refresh_is_incremental(self):
+        self.assertEqual(health_scores.refresh(), 2)
+        self.assertEqual(health_scores.refresh(), 0)
+
+        # Triggers: modification Django ou SQL directe (Hasura) d'une source.
+        Ruche.objects.filter(id=self.saine.id).update(statut=StatutRuche.FAIBLE)
+        self.assertEqual(health_scores.stale_ruche_ids(), [self.saine.id])
+        self.assertEqual(health_scores.refresh(), 1)
+        self.assertEqual(RucheSante.objects.get(ruche=self.saine).score, 75.0)
+
+        alerte = Alerte.objects.create(type=TypeAlerte.VOL, message='m', capteur=self.capteur)
+        self.assertEqual(health_scores.stale_ruche_ids(), [self.malade.id])
+        health_scores.refresh()
+        Alerte.objects.filter(id=alerte.id).update(acquittee=True)
+        self.assertEqual(health_scores.stale_ruche_ids(), [self.malade.id])
+        Intervention.objects.filter(ruche=self.saine).delete()
+        self.assertEqual(set(health_scores.stale_ruche_ids()), {self.saine.id, self.malade.id})
+
+        # Nouveau jour: anciennete des visites et poids journaliers a recalculer.
+        RucheSante.objects.update(invalideAt=None, calculeAt=timezone.now() - timedelta(days=1))
+        self.assertEqual(len(health_scores.stale_ruche_ids()), 2)
+
+    def test_command(self):
+        call_command("refresh_sante_ruches", stdout=open("/dev/null", "w"))
+        self.assertEqual(RucheSante.objects.count(), 2)
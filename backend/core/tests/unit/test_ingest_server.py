@@ -0,0 +1,124 @@
+import asyncio
+import socket
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from core import frames
+from core.ingest_server import IngestServer, LineError, parse_line
+from core.models import (
+    Entreprise, Rucher, Ruche, Capteur, Mesure,
+    TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie, TypeCapteur,
+)
+
+
+class ParseLineTest(SimpleTestCase):
+    def test_formats(self):
+        self.assertEqual(parse_line("CAP-1 21.5"), ("CAP-1", None, 21.5, None))
+        self.assertEqual(
+            parse_line("CAP-1;40.2;1777629600;85"),
+            ("CAP-1", datetime(2026, 5, 1, 10, tzinfo=dt_timezone.utc), 40.2, 85),
+        )
+        self.assertEqual(
+            parse_line("CAP-1,40.2,2026-05-01T10:00:00,140"),
+            ("CAP-1", datetime(2026, 5, 1, 10, tzinfo=dt_timezone.utc), 40.2, None),
+        )
+
+    def test_invalid(self):
+        for line in ("CAP-1", "CAP-1 abc", "CAP-1 nan", "CAP-1 1 hier", "CAP-1 1 2 3 4"):
+            with self.assertRaises(LineError):
+                parse_line(line)
+
+
+class IngestServerTest(TransactionTestCase):
+    def setUp(self):
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'),
+            (TypeRaceAbeille, 'Buckfast'), (TypeMaladie, 'Aucune'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        entreprise = Entreprise.objects.create(nom='UdpCo', adresse='Addr')
+        rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=200, entreprise=entreprise,
+        )
+        ruche = Ruche.objects.create(
+            immatriculation='UD-001', type_id='Dadant', race_id='Buckfast',
+            rucher=rucher, maladie_id='Aucune',
+        )
+        self.capteur = Capteur.objects.create(identifiant='UDP01', type=TypeCapteur.POIDS.value, ruche=ruche)
+        self.capteur.refresh_from_db()
+
+    async def _exchange(self, server, send):
+        stop = asyncio.Event()
+        task = asyncio.create_task(server.serve("127.0.0.1", udp_port=0, tcp_port=0, stop=stop))
+        await asyncio.wait_for(server.ready.wait(), 5)
+        await send(server)
+        for _ in range(100):
+            if server.stats["received"] >= 5 and server.stats["rejected"] >= 1:
+                break
+            await asyncio.sleep(0.02)
+        stop.set()
+        await asyncio.wait_for(task, 10)
+
+    def test_udp_and_tcp(self):
+        base = 1777629600
+
+        async def send(server):
+            udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            udp.sendto(f"UDP01 40.1 {base}\nINCONNU 1\n".encode(), server.addresses["udp"])
+            udp.sendto(
+                frames.encode_frame(self.capteur.shortId, base + 60, [0, 60], [40.5, 40.75], batterie=80),
+                server.addresses["udp"],
+            )
+            udp.close()
+            reader, writer = await asyncio.open_connection(*server.addresses["tcp"])
+            writer.write(f"UDP01 41 {base + 600}\nUDP01 pas-un-nombre\nUDP01 42 {base + 900}".encode())
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+
+        server = IngestServer(batch_size=100, flush_ms=20)
+        asyncio.run(self._exchange(server, send))
+
+        valeurs = list(Mesure.objects.filter(capteur=self.capteur).order_by("date").values_list("valeur", flat=True))
+        self.assertEqual(valeurs, [40.1, 40.5, 40.75, 41.0, 42.0])
+        self.assertEqual(
+            {k: server.stats[k] for k in ("received", "inserted", "unknown", "rejected", "dropped")},
+            {"received": 5, "inserted": 5, "unknown": 1, "rejected": 1, "dropped": 0},
+        )
+        self.capteur.refresh_from_db()
+        self.assertEqual(self.capteur.batteriePct, 80)
+
+    def test_udp_dropped_when_queue_full(self):
+        server = IngestServer(queue_size=1)
+        server.capteurs.load()
+        server.offer(server.rows_from_datagram(b"UDP01 1\n"))
+        server.offer(server.rows_from_datagram(b"UDP01 2\nUDP01 3\n"))
+        self.assertEqual((server.stats["received"], server.stats["dropped"]), (1, 2))
+
+    def test_allowed_networks(self):
+        server = IngestServer(allowed_networks=["10.0.0.0/8"])
+        self.assertTrue(server.allowed("10.1.2.3"))
+        self.assertFalse(server.allowed("192.168.1.2"))
+
+    def test_deleted_capteur_does_not_block_writer(self):
+        supprime = Capteur.objects.create(identifiant='UDP02', type=TypeCapteur.POIDS.value, ruche=self.capteur.ruche)
+        server = IngestServer()
+        server.capteurs.load()
+        rows = server.rows_from_datagram(b"UDP01 40 1777629600\nUDP02 41 1777629600\n")
+        supprime.delete()
+
+        async def run():
+            await server.flush(rows)
+            server._db.shutdown()
+
+        asyncio.run(run())
+        self.assertEqual((server.stats["inserted"], server.stats["invalid"]), (1, 1))
+        self.assertNotIn('UDP02', server.capteurs.by_identifiant)
+
+    @override_settings(INGEST_SERVER_ALLOWED_NETWORKS="")
+    def test_public_bind_requires_allowed_networks(self):
+        with self.assertRaisesMessage(CommandError, "INGEST_SERVER_ALLOWED_NETWORKS"):
+            call_command("run_ingest_server", "--host", "0.0.0.0")
@@ -0,0 +1,148 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from core.ingestion import ON_CONFLICT_UPDATE, dedupe_mesures, refresh_capteur_state, write_mesures
+from core.models import (
+    Entreprise, Rucher, Ruche, Capteur, CapteurState, Mesure,
+    TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie, TypeCapteur,
+)
+
+
+class IngestionTestMixin:
+    def setUp(self):
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'),
+            (TypeRaceAbeille, 'Buckfast'), (TypeMaladie, 'Aucune'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        self.entreprise = entreprise = Entreprise.objects.create(nom='IngestCo', adresse='Addr')
+        rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=200, entreprise=entreprise,
+        )
+        ruche = Ruche.objects.create(
+            immatriculation='IN-001', type_id='Dadant', race_id='Buckfast',
+            rucher=rucher, maladie_id='Aucune',
+        )
+        self.capteur = Capteur.objects.create(
+            identifiant='POIDS-IN', type=TypeCapteur.POIDS.value, ruche=ruche,
+        )
+        self.date = timezone.now().replace(microsecond=0) - timedelta(hours=1)
+
+
+class WriteMesuresTest(IngestionTestMixin, TestCase):
+    def test_retransmission_is_ignored(self):
+        rows = [(self.capteur.id, self.date, 40.0), (self.capteur.id, self.date + timedelta(minutes=5), 40.2)]
+        self.assertEqual(write_mesures(rows), {'inserted': 2, 'updated': 0, 'duplicates': 0, 'quarantined': 0})
+
+        stats = write_mesures([(self.capteur.id, self.date, 41.0)])
+        self.assertEqual(stats, {'inserted': 0, 'updated': 0, 'duplicates': 1, 'quarantined': 0})
+        self.assertEqual(Mesure.objects.get(date=self.date).valeur, 40.0)
+        self.assertEqual(Mesure.objects.count(), 2)
+
+    def test_update_replaces_value(self):
+        write_mesures([(self.capteur.id, self.date, 40.0)])
+        stats = write_mesures(
+            [(self.capteur.id, self.date, 41.0), (self.capteur.id, self.date + timedelta(minutes=5), 41.1)],
+            on_conflict=ON_CONFLICT_UPDATE,
+        )
+        self.assertEqual(stats, {'inserted': 1, 'updated': 1, 'duplicates': 0, 'quarantined': 0})
+        self.assertEqual(Mesure.objects.get(date=self.date).valeur, 41.0)
+
+        # Meme valeur: rien a reecrire.
+        stats = write_mesures([(self.capteur.id, self.date, 41.0)], on_conflict=ON_CONFLICT_UPDATE)
+        self.assertEqual(stats, {'inserted': 0, 'updated': 0, 'duplicates': 1, 'quarantined': 0})
+
+    def test_duplicates_within_batch_keep_last(self):
+        stats = write_mesures([(self.capteur.id, self.date, 40.0), (self.capteur.id, self.date, 42.0)])
+        self.assertEqual(stats['inserted'], 1)
+        self.assertEqual(Mesure.objects.get().valeur, 42.0)
+
+    def test_advances_derniere_communication(self):
+        write_mesures([(self.capteur.id, self.date, 40.0)])
+        self.capteur.refresh_from_db()
+        self.assertEqual(self.capteur.derniereCommunication, self.date)
+
+        write_mesures([(self.capteur.id, self.date - timedelta(hours=2), 39.0)])
+        self.capteur.refresh_from_db()
+        self.assertEqual(self.capteur.derniereCommunication, self.date)
+
+    def test_invalid_on_conflict(self):
+        with self.assertRaises(ValueError):
+            write_mesures([], on_conflict='replace')
+
+
+class CapteurStateTest(IngestionTestMixin, TestCase):
+    def test_state_tracks_latest_reading(self):
+        write_mesures([
+            (self.capteur.id, self.date, 40.0),
+            (self.capteur.id, self.date + timedelta(minutes=10), 40.5, 87),
+            (self.capteur.id, self.date + timedelta(minutes=20), 41.0),
+        ])
+        state = CapteurState.objects.get(capteur=self.capteur)
+        self.assertEqual(state.entreprise_id, self.entreprise.id)
+        self.assertEqual(state.derniereValeur, 41.0)
+        self.assertEqual(state.derniereDate, self.date + timedelta(minutes=20))
+        self.assertEqual(state.batteriePct, 87)
+        self.assertEqual(state.intervalleMoyenSecondes, 600)
+        self.assertEqual(state.nbMesures, 3)
+
+        self.capteur.refresh_from_db()
+        self.assertEqual(self.capteur.batteriePct, 87)
+        self.assertEqual(self.capteur.derniereCommunication, self.date + timedelta(minutes=20))
+
+    def test_interval_is_smoothed(self):
+        write_mesures([(self.capteur.id, self.date, 40.0), (self.capteur.id, self.date + timedelta(minutes=10), 40.0)])
+        write_mesures([(self.capteur.id, self.date + timedelta(minutes=30), 40.0)])
+        state = CapteurState.objects.get(capteur=self.capteur)
+        self.assertAlmostEqual(state.intervalleMoyenSecondes, 0.8 * 600 + 0.2 * 1200)
+
+    def test_late_and_duplicate_readings_do_not_rewind(self):
+        write_mesures([(self.capteur.id, self.date, 40.0, 80)])
+        write_mesures([(self.capteur.id, self.date - timedelta(hours=1), 38.0, 95)])
+        write_mesures([(self.capteur.id, self.date, 40.0)])
+        state = CapteurState.objects.get(capteur=self.capteur)
+        self.assertEqual(state.derniereValeur, 40.0)
+        self.assertEqual(state.batteriePct, 80)
+        self.assertEqual(state.nbMesures, 2)
+
+    def test_many_capteurs_single_batch(self):
+        capteurs = [
+            Capteur.objects.create(identifiant=f'T-{i}', type=TypeCapteur.TEMPERATURE.value, ruche=self.capteur.ruche)
+            for i in range(5)
+        ]
+        with self.assertNumQueries(3):
+            refresh_capteur_state([(str(c.id), self.date, float(i), None) for i, c in enumerate(capteurs)])
+        self.assertEqual(
+            sorted(CapteurState.objects.values_list('derniereValeur', flat=True)), [0.0, 1.0, 2.0, 3.0, 4.0]
+        )
+
+
+class DedupeMesuresTest(IngestionTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # Simule une base anterieure a la contrainte unique (annule en fin de test).
+        with connection.cursor() as cursor:
+            cursor.execute('ALTER TABLE mesures DROP CONSTRAINT mesure_capteur_date_unique')
+        first = Mesure.objects.create(capteur=self.capteur, date=self.date, valeur=40.0)
+        Mesure.objects.filter(id=first.id).update(created_at=self.date)
+        Mesure.objects.create(capteur=self.capteur, date=self.date, valeur=40.5)
+        Mesure.objects.create(capteur=self.capteur, date=self.date, valeur=40.6)
+        Mesure.objects.create(capteur=self.capteur, date=self.date + timedelta(minutes=5), valeur=40.1)
+        self.first = first
+
+    def test_keeps_first_received(self):
+        self.assertEqual(dedupe_mesures(capteur_chunk_size=1), 2)
+        self.assertEqual(Mesure.objects.count(), 2)
+        self.assertTrue(Mesure.objects.filter(id=self.first.id).exists())
+        self.assertEqual(dedupe_mesures(), 0)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('dedupe_mesures', '--chunk-size', '10', stdout=out)
+        self.assertIn('2 doublon(s) supprime(s)', out.getvalue())
@@ -0,0 +1,162 @@
+import base64
+import struct
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core import lorawan
+from core.ingestion import BatchBuffer
+from core.models import (
+    Entreprise, Rucher, Ruche, Capteur, Mesure,
+    TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie, TypeCapteur,
+)
+
+
+def _b64(data):
+    return base64.b64encode(data).decode()
+
+
+class ParseUplinkTest(SimpleTestCase):
+    def test_things_stack(self):
+        dev_eui, date, f_port, payload, decoded = lorawan.parse_uplink({
+            "end_device_ids": {"dev_eui": "70b3d57ed0000001"},
+            "received_at": "2026-05-01T10:00:00.123Z",
+            "uplink_message": {"f_port": 2, "frm_payload": _b64(b"\x0f\xa0\x50")},
+        })
+        self.assertEqual(dev_eui, "70B3D57ED0000001")
+        self.assertEqual(date, datetime(2026, 5, 1, 10, 0, 0, 123000, tzinfo=dt_timezone.utc))
+        self.assertEqual((f_port, payload, decoded), (2, b"\x0f\xa0\x50", None))
+
+    def test_chirpstack_v3_base64_dev_eui(self):
+        dev_eui, _, _, _, decoded = lorawan.parse_uplink({
+            "devEUI": _b64(bytes.fromhex("70b3d57ed0000002")),
+            "data": _b64(b"\x00"),
+            "object": {"valeur": 21.5},
+        })
+        self.assertEqual(dev_eui, "70B3D57ED0000002")
+        self.assertEqual(decoded, {"valeur": 21.5})
+
+    def test_invalid(self):
+        with self.assertRaises(lorawan.UplinkError):
+            lorawan.parse_uplink({"deviceInfo": {"devEui": "xyz"}, "data": "AA=="})
+        with self.assertRaises(lorawan.UplinkError):
+            lorawan.parse_uplink({"deviceInfo": {"devEui": "70b3d57ed0000001"}, "data": "***"})
+
+    def test_weight_codec(self):
+        readings, batterie = lorawan.CODECS[TypeCapteur.POIDS.value](struct.pack(">hBhB", 4025, 91, 4010, 90))
+        self.assertEqual((readings, batterie), ([40.25, 40.1], 90))
+
+
+@override_settings(LORAWAN_READING_INTERVAL_SECONDS=600)
+class UplinkRowsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'),
+            (TypeRaceAbeille, 'Buckfast'), (TypeMaladie, 'Aucune'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        entreprise = Entreprise.objects.create(nom='LoraCo', adresse='Addr')
+        rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=200, entreprise=entreprise,
+        )
+        self.ruche = Ruche.objects.create(
+            immatriculation='LO-001', type_id='Dadant', race_id='Buckfast',
+            rucher=rucher, maladie_id='Aucune',
+        )
+        self.capteur = Capteur.objects.create(
+            identifiant='70b3d57ed0000001', type=TypeCapteur.POIDS.value, ruche=self.ruche,
+        )
+        self.date = timezone.now().replace(microsecond=0)
+
+    def test_rows_and_cached_index(self):
+        uplinks = [
+            ("70B3D57ED0000001", self.date, 2, struct.pack(">hBhB", 4025, 90, 4010, 89), None),
+            ("70B3D57ED00000FF", self.date, 2, b"\x00\x01\x02", None),
+        ]
+        rows, ignored = lorawan.uplink_rows(uplinks)
+        self.assertEqual(ignored, 1)
+        self.assertEqual(rows, [
+            (str(self.capteur.id), self.date - timedelta(seconds=600), 40.25, 89),
+            (str(self.capteur.id), self.date, 40.1, 89),
+        ])
+        with self.assertNumQueries(0):
+            lorawan.uplink_rows(uplinks)
+
+    def test_forget_after_update(self):
+        lorawan.resolve_dev_euis(["70B3D57ED0000001"])
+        Capteur.objects.filter(id=self.capteur.id).update(actif=False)
+        self.assertIn("70B3D57ED0000001", lorawan.resolve_dev_euis(["70B3D57ED0000001"]))
+        lorawan.forget_dev_eui(self.capteur.identifiant)
+        self.assertEqual(lorawan.resolve_dev_euis(["70B3D57ED0000001"]), {})
+
+
+class BatchBufferTest(TestCase):
+    def setUp(self):
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'),
+            (TypeRaceAbeille, 'Buckfast'), (TypeMaladie, 'Aucune'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        entreprise = Entreprise.objects.create(nom='BufCo', adresse='Addr')
+        rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=200, entreprise=entreprise,
+        )
+        ruche = Ruche.objects.create(
+            immatriculation='BU-001', type_id='Dadant', race_id='Buckfast',
+            rucher=rucher, maladie_id='Aucune',
+        )
+        self.capteur = Capteur.objects.create(identifiant='BUF01', type=TypeCapteur.POIDS.value, ruche=ruche)
+        self.date = timezone.now().replace(microsecond=0)
+
+    def _follow(self, buffer, rows, results):
+        """Ajoute des lignes depuis un autre thread une fois le lot ouvert par le thread principal."""
+        def run():
+            while buffer._lot is None:
+                time.sleep(0.001)
+            try:
+                results.append(buffer.add(rows))
+            except Exception as exc:
+                results.append(exc)
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_coalesces_concurrent_requests(self):
+        buffer = BatchBuffer(max_delay=30, max_rows=2)
+        results = []
+        thread = self._follow(buffer, [(self.capteur.id, self.date + timedelta(minutes=1), 2.0)], results)
+        stats = buffer.add([(self.capteur.id, self.date, 1.0)])
+        thread.join(5)
+        self.assertEqual(stats["inserted"], 2)
+        self.assertEqual(results, [stats])
+        self.assertEqual(Mesure.objects.count(), 2)
+
+    def test_writes_after_delay(self):
+        stats = BatchBuffer(max_delay=0.01, max_rows=100).add([(self.capteur.id, self.date, 1.0)])
+        self.assertEqual(stats["inserted"], 1)
+        self.assertEqual(Mesure.objects.count(), 1)
+
+    def test_error_reaches_every_request(self):
+        buffer = BatchBuffer(max_delay=30, max_rows=2)
+        results = []
+        thread = self._follow(buffer, [(self.capteur.id, self.date + timedelta(minutes=1), 2.0)], results)
+        with patch('core.ingestion.write_mesures_isolating', side_effect=OperationalError('down')):
+            with self.assertRaises(OperationalError):
+                buffer.add([(self.capteur.id, self.date, 1.0)])
+        thread.join(5)
+        self.assertIsInstance(results[0], OperationalError)
+        self.assertIsNone(buffer._lot)
+
+    def test_no_delay_writes_immediately(self):
+        stats = BatchBuffer(max_delay=0).add([(self.capteur.id, self.date, 1.0)])
+        self.assertEqual(stats["inserted"], 1)
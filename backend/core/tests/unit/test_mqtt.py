@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+import time
+import unittest
+from datetime import datetime, timezone as dt_timezone
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core import mqtt
+from core.models import (
+    Entreprise, Rucher, Ruche, Capteur, Mesure,
+    TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie, TypeCapteur,
+)
+
+
+class _Message:
+    def __init__(self, topic, payload, mid=0, qos=1):
+        self.topic = topic
+        self.payload = payload
+        self.mid = mid
+        self.qos = qos
+
+
+class _Client:
+    """Client MQTT factice qui enregistre les acquittements (manual_ack)."""
+
+    def __init__(self):
+        self.acks = []
+
+    def ack(self, mid, qos):
+        self.acks.append(mid)
+
+
+class ParseTest(SimpleTestCase):
+    def test_topic(self):
+        self.assertEqual(mqtt.parse_topic("ruchers/r1/capteurs/CAP-1"), ("r1", "CAP-1"))
+        with self.assertRaises(mqtt.PayloadError):
+            mqtt.parse_topic("ruchers/r1/gps/CAP-1")
+
+    def test_payloads(self):
+        received = datetime(2026, 5, 1, tzinfo=dt_timezone.utc)
+        self.assertEqual(mqtt.parse_payload(b"21.5", received), [(received, 21.5, None)])
+        self.assertEqual(
+            mqtt.parse_payload(json.dumps([
+                {"valeur": 40, "date": "2026-05-01T10:00:00", "batteriePct": 80},
+                {"value": 41, "battery": 120},
+            ]), received),
+            [
+                (datetime(2026, 5, 1, 10, tzinfo=dt_timezone.utc), 40.0, 80),
+                (received, 41.0, None),
+            ],
+        )
+        for payload in (b"{", b'{"valeur": "x"}', b'{"valeur": 1, "date": "hier"}'):
+            with self.assertRaises(mqtt.PayloadError):
+                mqtt.parse_payload(payload)
+
+
+class MqttBridgeTest(TestCase):
+    def setUp(self):
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'),
+            (TypeRaceAbeille, 'Buckfast'), (TypeMaladie, 'Aucune'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        entreprise = Entreprise.objects.create(nom='MqttCo', adresse='Addr')
+        self.rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=200, entreprise=entreprise,
+        )
+        ruche = Ruche.objects.create(
+            immatriculation='MQ-001', type_id='Dadant', race_id='Buckfast',
+            rucher=self.rucher, maladie_id='Aucune',
+        )
+        self.capteur = Capteur.objects.create(identifiant='MQTT01', type=TypeCapteur.POIDS.value, ruche=ruche)
+        self.topic = f"ruchers/{self.rucher.id}/capteurs/MQTT01"
+
+    def test_batches_until_stopped(self):
+        bridge = mqtt.MqttBridge(batch_size=2, flush_ms=60000)
+        bridge.on_message(None, None, _Message(self.topic, b'[{"valeur": 40.5, "date": "2026-05-01T10:00:00Z"}]'))
+        bridge.on_message(None, None, _Message(self.topic, b'{"valeur": 40.6, "date": "2026-05-01T10:10:00Z", "batteriePct": 77}'))
+        bridge.on_message(None, None, _Message("ruchers/x/capteurs/INCONNU", b"1"))
+        bridge.on_message(None, None, _Message(self.topic, b"pas du json"))
+        stop = threading.Event()
+        stop.set()
+        bridge.run(stop)
+        self.assertEqual(Mesure.objects.filter(capteur=self.capteur).count(), 2)
+        self.capteur.refresh_from_db()
+        self.assertEqual(self.capteur.batteriePct, 77)
+        self.assertEqual(
+            {k: bridge.stats[k] for k in ("received", "inserted", "unknown", "rejected")},
+            {"received": 3, "inserted": 2, "unknown": 1, "rejected": 1},
+        )
+
+    def test_ack_after_write(self):
+        bridge = mqtt.MqttBridge(batch_size=10, flush_ms=60000)
+        client = _Client()
+        payload = b'[{"valeur": 40.5, "date": "2026-05-01T10:00:00Z"}, {"valeur": 40.6, "date": "2026-05-01T10:10:00Z"}]'
+        bridge.on_message(client, None, _Message(self.topic, payload, mid=1))
+        bridge.on_message(client, None, _Message(self.topic, b"pas du json", mid=2))
+        # Message invalide acquitte tout de suite, lectures en attente d'ecriture.
+        self.assertEqual(client.acks, [2])
+        self.assertFalse(Mesure.objects.exists())
+
+        stop = threading.Event()
+        stop.set()
+        bridge.run(stop)
+        self.assertEqual(client.acks, [2, 1])
+        self.assertEqual(Mesure.objects.filter(capteur=self.capteur).count(), 2)
+
+    def test_deleted_capteur_does_not_block_writer(self):
+        supprime = Capteur.objects.create(identifiant='MQTT02', type=TypeCapteur.POIDS.value, ruche=self.capteur.ruche)
+        bridge = mqtt.MqttBridge()
+        bridge._resolve(["MQTT01", "MQTT02"])
+        supprime.delete()
+        date = datetime(2026, 5, 1, 10, tzinfo=dt_timezone.utc)
+        result = bridge.flush([("MQTT01", date, 40.0, None), ("MQTT02", date, 41.0, None)])
+        self.assertEqual((result["inserted"], result["invalid"]), (1, 1))
+        self.assertEqual(bridge.stats["invalid"], 1)
+        self.assertNotIn("MQTT02", bridge._capteurs)
+        self.assertEqual(Mesure.objects.filter(capteur=self.capteur).count(), 1)
+
+    def test_full_queue_blocks_receiver(self):
+        bridge = mqtt.MqttBridge(batch_size=1, flush_ms=10, queue_size=1)
+        payload = json.dumps([{"valeur": v, "date": f"2026-05-01T10:0{v}:00Z"} for v in range(3)]).encode()
+        receiver = threading.Thread(target=bridge.on_message, args=(None, None, _Message(self.topic, payload)))
+        receiver.start()
+        receiver.join(0.2)
+        self.assertTrue(receiver.is_alive())
+        self.assertEqual(bridge.queue.qsize(), 1)
+
+        stop = threading.Event()
+        stopper = threading.Timer(0.3, stop.set)
+        stopper.start()
+        bridge.run(stop)
+        receiver.join(1)
+        self.assertFalse(receiver.is_alive())
+        self.assertEqual(Mesure.objects.filter(capteur=self.capteur).count(), 3)
+
+
+@unittest.skipUnless(mqtt.available() and os.getenv("MQTT_TEST_HOST"), "broker MQTT local non configure (MQTT_TEST_HOST)")
+class MqttBrokerTest(TestCase):
+    setUp = MqttBridgeTest.setUp
+
+    def test_local_broker(self):
+        host = os.getenv("MQTT_TEST_HOST")
+        port = int(os.getenv("MQTT_TEST_PORT", "1883"))
+        bridge = mqtt.MqttBridge(batch_size=10, flush_ms=100)
+        subscribed = threading.Event()
+        subscriber = mqtt.client(bridge, topic=f"ruchers/{self.rucher.id}/capteurs/+")
+        subscriber.on_subscribe = lambda *args: subscribed.set()
+        subscriber.connect(host, port)
+        subscriber.loop_start()
+        self.assertTrue(subscribed.wait(5))
+
+        publisher = mqtt.mqtt.Client(mqtt.mqtt.CallbackAPIVersion.VERSION2)
+        publisher.connect(host, port)
+        publisher.loop_start()
+        now = timezone.now()
+        for i in range(5):
+            payload = json.dumps({"valeur": i, "date": now.replace(second=i).isoformat()})
+            publisher.publish(self.topic, payload, qos=1).wait_for_publish()
+        publisher.disconnect()
+        publisher.loop_stop()
+
+        stop = threading.Event()
+        deadline = time.monotonic() + 5
+
+        def stop_when_received():
+            while bridge.stats["received"] < 5 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            stop.set()
+
+        threading.Thread(target=stop_when_received).start()
+        bridge.run(stop)
+        subscriber.disconnect()
+        subscriber.loop_stop()
+        self.assertEqual(Mesure.objects.filter(capteur=self.capteur).count(), 5)
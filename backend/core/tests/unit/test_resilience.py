@@ -0,0 +1,153 @@
+from unittest.mock import patch, MagicMock
+
+import requests
+from django.test import TestCase, override_settings
+from sib_api_v3_sdk.rest import ApiException
+
+from core.email_utils import send_email
+from core.resilience import (
+    Bulkhead,
+    BulkheadFullError,
+    CircuitBreaker,
+    CircuitOpenError,
+    ExternalDependency,
+    get_dependency,
+    reset_dependencies,
+)
+from core.traccar_client import TraccarError, get_device_by_unique_id
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTest(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=self.clock)
+
+    def test_opens_after_threshold(self):
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_success_resets_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_allows_single_probe(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 11
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_half_open_success_closes(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 11
+        self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_failure_reopens(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 11
+        self.breaker.before_call()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.snapshot()["retryInSeconds"], 10)
+
+
+class ExternalDependencyTest(TestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker("dep", failure_threshold=1, reset_timeout=60)
+        self.bulkhead = Bulkhead("dep", max_concurrency=1)
+        self.dep = ExternalDependency("dep", self.breaker, self.bulkhead)
+
+    def test_result_failure_opens_circuit(self):
+        self.dep.call(lambda: 500, is_failure=lambda r: r >= 500)
+        with self.assertRaises(CircuitOpenError):
+            self.dep.call(lambda: 200)
+
+    def test_ignored_exception_does_not_open(self):
+        with self.assertRaises(ValueError):
+            self.dep.call(MagicMock(side_effect=ValueError()), exception_is_failure=lambda e: False)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_bulkhead_full(self):
+        self.bulkhead.acquire()
+        try:
+            with self.assertRaises(BulkheadFullError):
+                self.dep.call(lambda: 200)
+        finally:
+            self.bulkhead.release()
+        self.assertEqual(self.bulkhead.snapshot()["rejected"], 1)
+        self.assertEqual(self.dep.call(lambda: 200), 200)
+
+
+@override_settings(
+    TRACCAR_BASE_URL='http://traccar:8082', TRACCAR_USER='admin', TRACCAR_PASSWORD='admin',
+    TRACCAR_TOKEN='', TRACCAR_CIRCUIT_BREAKER_FAILURE_THRESHOLD=2,
+)
+class TraccarCircuitTest(TestCase):
+    def setUp(self):
+        reset_dependencies()
+
+    def tearDown(self):
+        reset_dependencies()
+
+    @patch('core.traccar_client.requests.get')
+    def test_network_error_becomes_traccar_error(self, mock_get):
+        mock_get.side_effect = requests.ConnectionError()
+        with self.assertRaises(TraccarError) as ctx:
+            get_device_by_unique_id('GPS001')
+        self.assertIn('traccar_unavailable', str(ctx.exception))
+
+    @patch('core.traccar_client.requests.get')
+    def test_open_circuit_fails_fast(self, mock_get):
+        mock_get.return_value = MagicMock(status_code=503)
+        for _ in range(2):
+            with self.assertRaises(TraccarError):
+                get_device_by_unique_id('GPS001')
+        with self.assertRaises(TraccarError) as ctx:
+            get_device_by_unique_id('GPS001')
+        self.assertEqual(str(ctx.exception), 'traccar_circuit_open')
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(get_dependency('traccar').breaker.state, CircuitBreaker.OPEN)
+
+
+@override_settings(BREVO_CIRCUIT_BREAKER_FAILURE_THRESHOLD=1)
+class BrevoCircuitTest(TestCase):
+    def setUp(self):
+        reset_dependencies()
+
+    def tearDown(self):
+        reset_dependencies()
+
+    @patch('core.email_utils.get_brevo_client')
+    def test_client_error_does_not_open(self, mock_client):
+        mock_client.return_value.send_transac_email.side_effect = ApiException(status=400)
+        result = send_email('a@b.c', 'A', 'Sujet', '<p>x</p>')
+        self.assertFalse(result['success'])
+        self.assertEqual(get_dependency('brevo').breaker.state, CircuitBreaker.CLOSED)
+
+    @patch('core.email_utils.get_brevo_client')
+    def test_server_error_opens_circuit(self, mock_client):
+        mock_client.return_value.send_transac_email.side_effect = ApiException(status=503)
+        send_email('a@b.c', 'A', 'Sujet', '<p>x</p>')
+        result = send_email('a@b.c', 'A', 'Sujet', '<p>x</p>')
+        self.assertEqual(result['error'], 'brevo_circuit_open')
+        self.assertEqual(mock_client.return_value.send_transac_email.call_count, 1)
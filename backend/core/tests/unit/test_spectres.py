@@ -0,0 +1,118 @@
+import base64
+from datetime import timedelta
+
+import numpy as np
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import spectres
+from core.models import (
+    Entreprise, Rucher, Ruche, Capteur, SonSpectre,
+    TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie, TypeCapteur,
+)
+
+
+class SpectreFeaturesTest(TestCase):
+    def test_dominant_frequency_and_band_ratios(self):
+        frequences = np.linspace(0.0, 1000.0, 11)  # pas de 100 Hz
+        energies = np.zeros(11)
+        energies[2] = 3.0   # 200 Hz: bourdonnement
+        energies[5] = 1.0   # 500 Hz: chant de reine
+        with override_settings(SON_BANDES_HZ=[0, 300, 600, 1100]):
+            (result,) = spectres.features(frequences, energies)
+        self.assertEqual(result["frequenceDominante"], 200.0)
+        self.assertAlmostEqual(result["centroide"], 275.0)
+        self.assertEqual(result["energieTotale"], 4.0)
+        self.assertEqual(result["ratiosBandes"], [0.75, 0.25, 0.0])
+        self.assertAlmostEqual(result["indiceEssaimage"], 1.0 / 3.0)
+        self.assertIsNone(result["spectre"])
+
+    def test_swarming_index_without_hum(self):
+        frequences = np.linspace(0.0, 1000.0, 11)
+        energies = np.zeros(11)
+        energies[5] = 2.0
+        (result,) = spectres.features(frequences, energies)
+        self.assertIsNone(result["indiceEssaimage"])
+
+    @override_settings(SON_SPECTRE_BINS=4)
+    def test_reduced_spectrum_is_normalized_float16(self):
+        frequences = np.linspace(0.0, 800.0, 9)
+        energies = np.arange(9, dtype=np.float64) * 10
+        (result,) = spectres.features(frequences, energies, keep_spectre=True)
+        self.assertEqual(len(result["spectre"]), 4 * 2)
+        centres, valeurs = spectres.decode_spectre(result["spectre"], result["spectreFrequenceMax"])
+        self.assertEqual(centres.tolist(), [100.0, 300.0, 500.0, 700.0])
+        self.assertEqual(valeurs.max(), 1.0)
+        self.assertTrue((np.diff(valeurs) > 0).all())
+
+    def test_compute_groups_vectors_by_frequencies(self):
+        a = spectres.Vecteur(np.array([100.0, 200.0]), np.array([1.0, 0.0]))
+        b = spectres.Vecteur(np.array([100.0, 200.0, 300.0]), np.array([0.0, 0.0, 5.0]))
+        c = spectres.Vecteur(np.array([100.0, 200.0]), np.array([0.0, 2.0]))
+        result = spectres.compute([a, b, c])
+        self.assertEqual([r["frequenceDominante"] for r in result], [100.0, 300.0, 200.0])
+
+    def test_parse_vecteur(self):
+        self.assertIsNone(spectres.parse_vecteur({"valeur": 1.0}))
+        encoded = base64.b64encode(np.array([1.0, 2.0, 3.0], dtype="<f4").tobytes()).decode()
+        vecteur = spectres.parse_vecteur({"spectre": encoded, "frequenceMax": 400})
+        self.assertEqual(vecteur.frequences.tolist(), [0.0, 200.0, 400.0])
+        self.assertEqual(vecteur.energies.tolist(), [1.0, 2.0, 3.0])
+        vecteur = spectres.parse_vecteur({"bandes": [1, 2], "bandesHz": [100, 300, 500]})
+        self.assertEqual(vecteur.frequences.tolist(), [200.0, 400.0])
+
+        for item in [
+            {"spectre": [1.0, 2.0]},
+            {"spectre": [1.0], "frequenceMax": 400},
+            {"spectre": [1.0, -2.0], "frequenceMax": 400},
+            {"spectre": "pas du base64!", "frequenceMax": 400},
+            {"spectre": [1.0, True], "frequenceMax": 400},
+            {"bandes": [1, 2], "bandesHz": [100, 300]},
+            {"bandes": [1, 2], "bandesHz": [100, 300, 200]},
+        ]:
+            with self.assertRaises(spectres.SpectreError, msg=item):
+                spectres.parse_vecteur(item)
+
+
+class WriteSpectresTest(TestCase):
+    def setUp(self):
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'),
+            (TypeRaceAbeille, 'Buckfast'), (TypeMaladie, 'Aucune'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        entreprise = Entreprise.objects.create(nom='SonCo', adresse='Addr')
+        rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=200, entreprise=entreprise,
+        )
+        ruche = Ruche.objects.create(
+            immatriculation='SO-001', type_id='Dadant', race_id='Buckfast',
+            rucher=rucher, maladie_id='Aucune',
+        )
+        self.capteur = Capteur.objects.create(identifiant='SON-01', type=TypeCapteur.SON.value, ruche=ruche)
+        self.date = timezone.now().replace(microsecond=0) - timedelta(hours=1)
+
+    def _vecteur(self, dominante):
+        frequences = np.linspace(0.0, 1000.0, 11)
+        energies = np.ones(11)
+        energies[int(dominante // 100)] = 10.0
+        return spectres.Vecteur(frequences, energies)
+
+    def test_ignore_then_update(self):
+        self.assertEqual(spectres.write_spectres([(self.capteur.id, self.date, self._vecteur(200))]), 1)
+        spectres.write_spectres([(self.capteur.id, self.date, self._vecteur(500))])
+        self.assertEqual(SonSpectre.objects.get().frequenceDominante, 200.0)
+
+        spectres.write_spectres([(self.capteur.id, self.date, self._vecteur(500))], keep_spectre=True, update=True)
+        stored = SonSpectre.objects.get()
+        self.assertEqual(stored.frequenceDominante, 500.0)
+        self.assertIsNotNone(stored.spectre)
+
+    def test_duplicates_in_batch_keep_last(self):
+        rows = [
+            (self.capteur.id, self.date, self._vecteur(200)),
+            (self.capteur.id, self.date, self._vecteur(700)),
+        ]
+        self.assertEqual(spectres.write_spectres(rows), 1)
+        self.assertEqual(SonSpectre.objects.get().frequenceDominante, 700.0)
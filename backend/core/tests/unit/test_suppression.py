@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.test import TestCase
+
+from core.models import AlerteSuppression
+from core.suppression import DAY, claim, claim_many, clear_cache, purge_expired, window_key
+
+
+class WindowKeyTest(TestCase):
+    def test_day_window(self):
+        now = datetime(2026, 5, 3, 22, 15, tzinfo=dt_timezone.utc)
+        fenetre, expire_at = window_key(DAY, now)
+        self.assertEqual(fenetre, '2026-05-03')
+        self.assertEqual(expire_at, datetime(2026, 5, 5, tzinfo=dt_timezone.utc))
+
+    def test_duration_window(self):
+        now = datetime(2026, 5, 3, 22, 15, tzinfo=dt_timezone.utc)
+        same, _ = window_key(timedelta(hours=6), now + timedelta(minutes=30))
+        self.assertEqual(window_key(timedelta(hours=6), now)[0], same)
+        self.assertNotEqual(window_key(timedelta(hours=6), now + timedelta(hours=2))[0], same)
+
+
+class ClaimTest(TestCase):
+    def setUp(self):
+        clear_cache()
+
+    def tearDown(self):
+        clear_cache()
+
+    def test_claim_once_per_window(self):
+        self.assertTrue(claim('DeplacementGPS', 'c1'))
+        self.assertFalse(claim('DeplacementGPS', 'c1'))
+        self.assertTrue(claim('HorsLigne', 'c1'))
+        tomorrow = datetime.now(dt_timezone.utc) + timedelta(days=1)
+        self.assertTrue(claim('DeplacementGPS', 'c1', now=tomorrow))
+
+    def test_claim_many_returns_free_subjects(self):
+        claim('RappelVisite', 'r2')
+        claimed = claim_many('RappelVisite', ['r1', 'r2', 'r3'])
+        self.assertEqual(claimed, {'r1', 'r3'})
+        self.assertEqual(AlerteSuppression.objects.filter(type='RappelVisite').count(), 3)
+
+    def test_lru_filled_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(claim('DeplacementGPS', 'c9'))
+        AlerteSuppression.objects.all().delete()
+        with self.assertNumQueries(0):
+            self.assertFalse(claim('DeplacementGPS', 'c9'))
+
+    def test_purge_expired(self):
+        past = datetime.now(dt_timezone.utc) - timedelta(days=5)
+        claim('DeplacementGPS', 'old', now=past)
+        claim('DeplacementGPS', 'new')
+        self.assertEqual(purge_expired(), 1)
+        self.assertEqual(list(AlerteSuppression.objects.values_list('sujet', flat=True)), ['new'])
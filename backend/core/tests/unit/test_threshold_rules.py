@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from core.threshold_rules import CompiledRule, evaluate
+
+
+def _rule(rule_id='r1', valeur_min=None, valeur_max=40.0, duree=0):
+    return CompiledRule(
+        id=rule_id, type_alerte='TemperatureCritique', cible='Mesure',
+        valeur_min=valeur_min, valeur_max=valeur_max, duree=duree,
+    )
+
+
+class EvaluateRulesTest(SimpleTestCase):
+    def setUp(self):
+        self.t0 = timezone.now()
+
+    def _readings(self, values, step_minutes=10):
+        return [(self.t0 + timedelta(minutes=i * step_minutes), v) for i, v in enumerate(values)]
+
+    def test_immediate_breach_alerted_once_per_episode(self):
+        state = {}
+        out = evaluate([_rule()], self._readings([35, 41, 42, 36, 43]), state)
+        self.assertEqual([b.valeur for b in out], [41, 43])
+
+    def test_duration_required(self):
+        state = {}
+        out = evaluate([_rule(duree=20 * 60)], self._readings([41, 41, 36, 41, 41, 41]), state)
+        self.assertEqual(len(out), 1)
+        self.assertEqual(out[0].date, self.t0 + timedelta(minutes=50))
+        self.assertEqual(out[0].depuis, self.t0 + timedelta(minutes=30))
+
+    def test_episode_continues_across_runs(self):
+        state = {}
+        rules = [_rule(duree=20 * 60)]
+        readings = self._readings([41, 41, 41, 41])
+        self.assertEqual(evaluate(rules, readings[:2], state), [])
+        self.assertEqual(len(evaluate(rules, readings[2:], state)), 1)
+        self.assertEqual(evaluate(rules, self._readings([42]), state), [])
+
+    def test_min_and_max(self):
+        rules = [_rule('froid', valeur_min=5.0, valeur_max=None), _rule('chaud')]
+        out = evaluate(rules, self._readings([2, 20, 45]), {})
+        self.assertEqual([b.rule.id for b in out], ['froid', 'chaud'])
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from core.models import (
+    Entreprise, Rucher, Ruche, Capteur, Mesure, MesureChunk, CodecChunk,
+    TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie, TypeCapteur,
+)
+from core.timeseries import compact_capteur, pack, read_series, to_ms, unpack
+
+
+class PackTest(SimpleTestCase):
+    def test_roundtrip(self):
+        ms = [1_700_000_000_000, 1_700_000_060_000, 1_700_000_120_500]
+        values = [40.25, 40.5, -3.75]
+        for codec in (CodecChunk.RAW.value, CodecChunk.ZLIB.value):
+            codec, ts_blob, val_blob = pack(ms, values, codec=codec)
+            out_ms, out_values = unpack(codec, ts_blob, val_blob)
+            self.assertEqual(out_ms.tolist(), ms)
+            np.testing.assert_allclose(out_values, values)
+
+    def test_raw_size(self):
+        _, ts_blob, val_blob = pack(np.arange(1440) * 60_000, np.zeros(1440), codec=CodecChunk.RAW.value)
+        self.assertEqual(len(ts_blob) + len(val_blob), 8 + 4 * 1439 + 4 * 1440)
+
+    def test_unsorted_rejected(self):
+        with self.assertRaises(ValueError):
+            pack([2000, 1000], [1.0, 2.0], codec=CodecChunk.RAW.value)
+
+
+class CompactionTest(TestCase):
+    def setUp(self):
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'),
+            (TypeRaceAbeille, 'Buckfast'), (TypeMaladie, 'Aucune'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        entreprise = Entreprise.objects.create(nom='ChunkCo', adresse='Addr')
+        rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=200, entreprise=entreprise,
+        )
+        ruche = Ruche.objects.create(
+            immatriculation='CH-001', type_id='Dadant', race_id='Buckfast',
+            rucher=rucher, maladie_id='Aucune',
+        )
+        self.capteur = Capteur.objects.create(
+            identifiant='TEMP-CH', type=TypeCapteur.TEMPERATURE.value, ruche=ruche,
+        )
+        self.day = datetime(2026, 1, 10, tzinfo=dt_timezone.utc)
+        # Deux jours de mesures horaires puis une mesure recente.
+        Mesure.objects.bulk_create([
+            Mesure(capteur=self.capteur, date=self.day + timedelta(hours=i), valeur=10.0 + i * 0.5)
+            for i in range(48)
+        ] + [Mesure(capteur=self.capteur, date=self.day + timedelta(days=5), valeur=99.0)])
+
+    def test_compacts_cold_days(self):
+        rows, days = compact_capteur(self.capteur.id, self.day + timedelta(days=3))
+        self.assertEqual((rows, days), (48, 2))
+        self.assertEqual(Mesure.objects.count(), 1)
+        chunk = MesureChunk.objects.get(jour=self.day.date())
+        self.assertEqual(chunk.nbMesures, 24)
+        self.assertEqual(chunk.dateFin, self.day + timedelta(hours=23))
+        self.assertEqual(chunk.valeurMax, 21.5)
+
+        series = read_series(self.capteur.id)
+        self.assertEqual(len(series), 49)
+        self.assertEqual(series[1], (self.day + timedelta(hours=1), 10.5))
+        self.assertEqual(series[-1], (self.day + timedelta(days=5), 99.0))
+
+    def test_read_range(self):
+        compact_capteur(self.capteur.id, self.day + timedelta(days=3))
+        series = read_series(self.capteur.id, self.day + timedelta(hours=22), self.day + timedelta(hours=25))
+        self.assertEqual([d for d, _ in series], [self.day + timedelta(hours=h) for h in (22, 23, 24, 25)])
+
+    def test_late_row_merged_into_existing_chunk(self):
+        compact_capteur(self.capteur.id, self.day + timedelta(days=3))
+        Mesure.objects.create(capteur=self.capteur, date=self.day + timedelta(hours=1), valeur=50.0)
+        Mesure.objects.create(capteur=self.capteur, date=self.day + timedelta(minutes=30), valeur=11.0)
+        # Avant compaction, la ligne brute masque la valeur du bloc.
+        self.assertIn((self.day + timedelta(hours=1), 50.0), read_series(self.capteur.id))
+
+        compact_capteur(self.capteur.id, self.day + timedelta(days=3))
+        chunk = MesureChunk.objects.get(jour=self.day.date())
+        self.assertEqual(chunk.nbMesures, 25)
+        ms, values = unpack(chunk.codec, chunk.timestamps, chunk.valeurs)
+        self.assertEqual(values[ms.tolist().index(to_ms(self.day + timedelta(hours=1)))], 50.0)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('compact_mesures', '--older-than-days', '1', '--codec', 'zlib', stdout=out)
+        self.assertIn('49 mesure(s) deplacee(s) dans 3 bloc(s)', out.getvalue())
+        self.assertEqual(set(MesureChunk.objects.values_list('codec', flat=True)), {'zlib'})
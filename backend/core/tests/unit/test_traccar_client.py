@@ -1,9 +1,12 @@
+import threading
+import time
 from unittest.mock import patch, MagicMock
 from django.test import TestCase, override_settings
 from core.traccar_client import (
     TraccarError, _base_url, _auth, _ensure_configured, _headers,
     get_device_by_unique_id, create_device, update_device, delete_device,
-    get_latest_position,
+    get_latest_position, get_latest_position_cached, position_cache_stats,
+    clear_position_cache,
 )
 
 
@@ -223,3 +226,62 @@ class GetLatestPositionTest(TestCase):
         mock_get.return_value = MagicMock(status_code=500)
         with self.assertRaises(TraccarError):
             get_latest_position('GPS001')
+
+
+class GetLatestPositionCachedTest(TestCase):
+    def setUp(self):
+        clear_position_cache()
+
+    def test_second_call_hits_cache(self):
+        fetch = MagicMock(return_value={'latitude': 43.6, 'longitude': 3.8})
+        get_latest_position_cached('CACHE01', fetch=fetch)
+        result = get_latest_position_cached('CACHE01', fetch=fetch)
+        self.assertEqual(result['latitude'], 43.6)
+        self.assertEqual(fetch.call_count, 1)
+        stats = position_cache_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    @override_settings(TRACCAR_POSITION_CACHE_TTL=0)
+    def test_ttl_zero_disables_cache(self):
+        fetch = MagicMock(return_value={'latitude': 43.6, 'longitude': 3.8})
+        get_latest_position_cached('CACHE02', fetch=fetch)
+        get_latest_position_cached('CACHE02', fetch=fetch)
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_errors_not_cached(self):
+        fetch = MagicMock(side_effect=[TraccarError('boom'), {'latitude': 1.0, 'longitude': 2.0}])
+        with self.assertRaises(TraccarError):
+            get_latest_position_cached('CACHE03', fetch=fetch)
+        result = get_latest_position_cached('CACHE03', fetch=fetch)
+        self.assertEqual(result['latitude'], 1.0)
+        self.assertEqual(position_cache_stats()['errors'], 1)
+
+    def test_concurrent_calls_share_one_fetch(self):
+        calls = []
+        release = threading.Event()
+
+        def slow_fetch(unique_id, timeout=5):
+            calls.append(unique_id)
+            release.wait(2)
+            return {'latitude': 43.6, 'longitude': 3.8}
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(get_latest_position_cached('CACHE04', fetch=slow_fetch))
+            )
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        deadline = time.monotonic() + 2
+        while position_cache_stats()['coalesced'] < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 5)
+        self.assertEqual(position_cache_stats()['coalesced'], 4)
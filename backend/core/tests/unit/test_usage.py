@@ -0,0 +1,131 @@
+from django.core.management import call_command
+from django.db import InternalError, connection, transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from core import usage
+from core.models import (
+    Entreprise, Rucher, Ruche, Capteur, Reine, Offre, TypeOffreModel, UsageEntreprise,
+    TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie, TypeCapteur, LigneeReine, ReineStatut,
+)
+
+
+class UsageEntrepriseTest(TestCase):
+    def setUp(self):
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'), (TypeRaceAbeille, 'Buckfast'),
+            (TypeMaladie, 'Aucune'), (LigneeReine, 'Buckfast'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        TypeOffreModel.objects.get_or_create(value='Freemium', defaults={'titre': 'Freemium'})
+        self.entreprise = Entreprise.objects.create(nom='UsageCo', adresse='Addr')
+        self.offre = Offre.objects.create(
+            entreprise=self.entreprise, type_id='Freemium', dateDebut=timezone.now(), active=True,
+            nbRuchersMax=2, nbCapteursMax=2, nbReinesMax=0,
+        )
+        self.rucher = self._rucher(self.entreprise)
+        self.ruche = Ruche.objects.create(
+            immatriculation='U0000001', type_id='Dadant', race_id='Buckfast', rucher=self.rucher,
+        )
+
+    def _rucher(self, entreprise, nom='R'):
+        return Rucher.objects.create(
+            nom=nom, latitude=43.6, longitude=3.8, flore_id='Lavande', altitude=200, entreprise=entreprise,
+        )
+
+    def _capteur(self, identifiant, ruche=None):
+        return Capteur.objects.create(identifiant=identifiant, type=TypeCapteur.POIDS.value, ruche=ruche or self.ruche)
+
+    def _counts(self, entreprise=None):
+        u = UsageEntreprise.objects.get(entreprise=entreprise or self.entreprise)
+        return u.nbRuchers, u.nbCapteurs, u.nbReines
+
+    def test_triggers_count_and_enforce_limits(self):
+        self._capteur('U-1')
+        self._capteur('U-2')
+        self.assertEqual(self._counts(), (1, 2, 0))
+        with self.assertRaisesMessage(InternalError, 'Limite de capteurs atteinte pour cette offre (2 / 2)'):
+            with transaction.atomic():
+                self._capteur('U-3')
+        self._rucher(self.entreprise, 'R2')
+        with self.assertRaisesMessage(InternalError, 'Limite de ruchers atteinte'):
+            with transaction.atomic():
+                self._rucher(self.entreprise, 'R3')
+        self.assertEqual(self._counts(), (2, 2, 0))
+
+        Capteur.objects.get(identifiant='U-2').delete()
+        self._capteur('U-3')
+        self.assertEqual(self._counts(), (2, 2, 0))
+
+    def test_unlimited_and_reines_not_limited(self):
+        self.offre.nbCapteursMax = -1
+        self.offre.save()
+        for i in range(4):
+            self._capteur(f'U-{i}')
+        Reine.objects.create(
+            entreprise=self.entreprise, anneeNaissance=2025, codeCouleur='Bleu',
+            lignee_id='Buckfast', noteDouceur=5, statut=ReineStatut.FECONDEE,
+        )
+        self.assertEqual(self._counts(), (1, 4, 1))
+
+    def test_moves_between_entreprises(self):
+        other = Entreprise.objects.create(nom='Other', adresse='Addr')
+        other_rucher = self._rucher(other)
+        self._capteur('U-1')
+        self._capteur('U-2')
+        self.ruche.rucher = other_rucher
+        self.ruche.save()
+        self.assertEqual(self._counts(), (1, 0, 0))
+        self.assertEqual(self._counts(other), (1, 2, 0))
+
+        # La ruche partie a libere ses deux places de capteurs.
+        other_ruche = Ruche.objects.create(
+            immatriculation='U0000002', type_id='Dadant', race_id='Buckfast', rucher=self.rucher,
+        )
+        capteur = Capteur.objects.get(identifiant='U-1')
+        capteur.ruche = other_ruche
+        capteur.save()
+        self.assertEqual(self._counts(), (1, 1, 0))
+        self.assertEqual(self._counts(other), (1, 1, 0))
+
+    def test_rucher_moves_with_its_capteurs(self):
+        other = Entreprise.objects.create(nom='Other', adresse='Addr')
+        Offre.objects.create(
+            entreprise=other, type_id='Freemium', dateDebut=timezone.now(), active=True,
+            nbRuchersMax=2, nbCapteursMax=1, nbReinesMax=0,
+        )
+        self._capteur('U-1')
+        self._capteur('U-2')
+        # Deux capteurs pour une offre qui n'en autorise qu'un: transfert refuse.
+        with self.assertRaisesMessage(InternalError, 'Limite de capteurs atteinte'):
+            with transaction.atomic():
+                Rucher.objects.filter(id=self.rucher.id).update(entreprise=other)
+
+        Capteur.objects.get(identifiant='U-2').delete()
+        Rucher.objects.filter(id=self.rucher.id).update(entreprise=other)
+        self.assertEqual(self._counts(), (0, 0, 0))
+        self.assertEqual(self._counts(other), (1, 1, 0))
+        self.assertEqual(usage.reconcile(), [])
+
+    def test_reconcile_and_usage(self):
+        self._capteur('U-1')
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE usage_entreprise SET "nbCapteurs" = 7, "nbRuchers" = 0')
+        vide = Entreprise.objects.create(nom='Vide', adresse='Addr')
+
+        corrected = usage.reconcile()
+        self.assertIn(self.entreprise.id, corrected)
+        self.assertEqual(self._counts(), (1, 1, 0))
+        self.assertEqual(self._counts(vide), (0, 0, 0))
+        self.assertEqual(usage.reconcile(), [])
+
+        data = usage.usage(self.entreprise.id)
+        self.assertEqual(data['capteurs'], {'utilises': 1, 'max': 2, 'restants': 1})
+        self.assertEqual(data['reines'], {'utilises': 0, 'max': None, 'restants': None})
+        self.assertEqual(usage.usage(vide.id)['ruchers'], {'utilises': 0, 'max': None, 'restants': None})
+
+    def test_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE usage_entreprise SET "nbRuchers" = 0')
+        call_command('reconcile_usage_entreprise', stdout=open('/dev/null', 'w'))
+        self.assertEqual(self._counts()[0], 1)
@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.ingestion import write_mesures
+from core.models import (
+    Entreprise, Rucher, Ruche, Capteur, Mesure, MesureQuarantaine, RaisonQuarantaine,
+    TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie, TypeCapteur,
+)
+from core.validation import validate
+
+
+class ValidationTest(TestCase):
+    def setUp(self):
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'),
+            (TypeRaceAbeille, 'Buckfast'), (TypeMaladie, 'Aucune'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        entreprise = Entreprise.objects.create(nom='ValidCo', adresse='Addr')
+        rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=200, entreprise=entreprise,
+        )
+        ruche = Ruche.objects.create(
+            immatriculation='VA-001', type_id='Dadant', race_id='Buckfast',
+            rucher=rucher, maladie_id='Aucune',
+        )
+        self.poids = Capteur.objects.create(identifiant='VAL-POIDS', type=TypeCapteur.POIDS.value, ruche=ruche)
+        self.temperature = Capteur.objects.create(
+            identifiant='VAL-TEMP', type=TypeCapteur.TEMPERATURE.value, ruche=ruche,
+        )
+        self.gps = Capteur.objects.create(identifiant='VAL-GPS', type=TypeCapteur.GPS.value, ruche=ruche)
+        self.start = timezone.now().replace(microsecond=0) - timedelta(days=1)
+
+    def _at(self, minutes):
+        return self.start + timedelta(minutes=minutes)
+
+    def test_range(self):
+        rows = [
+            (str(self.temperature.id), self._at(0), 21.0, None),
+            (str(self.temperature.id), self._at(10), -127.0, None),
+            (str(self.temperature.id), self._at(20), float("nan"), None),
+            (str(self.gps.id), self._at(0), 65535.0, None),
+        ]
+        accepted, rejects = validate(rows)
+        self.assertEqual(accepted, [rows[0], rows[3]])
+        self.assertEqual([r[0] for r in rejects], [rows[1], rows[2]])
+        self.assertEqual({r[1] for r in rejects}, {RaisonQuarantaine.HORS_PLAGE})
+
+    def test_spike_against_history(self):
+        write_mesures([(self.poids.id, self._at(10 * i), 40.0 + 0.01 * i) for i in range(10)])
+        rows = [
+            (str(self.poids.id), self._at(100), 0.0, None),
+            (str(self.poids.id), self._at(110), 40.12, None),
+        ]
+        accepted, rejects = validate(rows)
+        self.assertEqual(accepted, [rows[1]])
+        (row, raison, reference), = rejects
+        self.assertEqual((row, raison), (rows[0], RaisonQuarantaine.PIC))
+        self.assertAlmostEqual(reference, 40.05, places=2)
+
+    def test_rate_of_change_without_history(self):
+        rows = [
+            (str(self.temperature.id), self._at(0), 20.0, None),
+            (str(self.temperature.id), self._at(1), 45.0, None),
+            (str(self.temperature.id), self._at(120), 45.0, None),
+        ]
+        accepted, rejects = validate(rows)
+        self.assertEqual(accepted, [rows[0], rows[2]])
+        self.assertEqual([(r[1], r[2]) for r in rejects], [(RaisonQuarantaine.VARIATION, 20.0)])
+
+    def test_level_shift_accepted_after_consecutive_batches(self):
+        write_mesures([(self.poids.id, self._at(10 * i), 60.0 + 0.01 * (i % 2)) for i in range(20)])
+        # Retrait d'une hausse: 45 kg ensuite, une mesure par lot.
+        results = []
+        for k in range(6):
+            stats = write_mesures([(self.poids.id, self._at(200 + 10 * k), 45.0 + 0.01 * (k % 2))])
+            results.append(stats["quarantined"])
+        self.assertEqual(results, [1, 1, 0, 0, 0, 0])
+        self.assertEqual(
+            list(MesureQuarantaine.objects.filter(capteur=self.poids).values_list("raison", flat=True)),
+            [RaisonQuarantaine.PIC, RaisonQuarantaine.PIC],
+        )
+        self.assertEqual(Mesure.objects.filter(capteur=self.poids, valeur__lt=50).count(), 4)
+
+    def test_isolated_spikes_still_rejected_after_quarantine(self):
+        write_mesures([(self.poids.id, self._at(10 * i), 60.0) for i in range(20)])
+        write_mesures([(self.poids.id, self._at(200), 5.0)])
+        stats = write_mesures([
+            (self.poids.id, self._at(210), 60.0),
+            (self.poids.id, self._at(220), 110.0),
+            (self.poids.id, self._at(230), 60.0),
+        ])
+        self.assertEqual(stats["quarantined"], 1)
+
+    def test_reading_after_variation_compared_with_last_accepted(self):
+        rows = [
+            (str(self.poids.id), self._at(i), valeur, None)
+            for i, valeur in enumerate([40.0, 40.0, 0.0, 40.0, 40.0])
+        ]
+        accepted, rejects = validate(rows)
+        self.assertEqual(accepted, [rows[0], rows[1], rows[3], rows[4]])
+        self.assertEqual([(r[0], r[1], r[2]) for r in rejects], [(rows[2], RaisonQuarantaine.VARIATION, 40.0)])
+
+    def test_write_mesures_quarantines_without_rejecting_batch(self):
+        stats = write_mesures([
+            (self.temperature.id, self._at(0), 21.0),
+            (self.temperature.id, self._at(10), -127.0),
+            (self.temperature.id, self._at(20), 21.5),
+        ])
+        self.assertEqual(stats, {"inserted": 2, "updated": 0, "duplicates": 0, "quarantined": 1})
+        self.assertEqual(Mesure.objects.filter(capteur=self.temperature).count(), 2)
+        quarantaine = MesureQuarantaine.objects.get()
+        self.assertEqual((quarantaine.valeur, quarantaine.raison), (-127.0, RaisonQuarantaine.HORS_PLAGE))
+
+    @override_settings(MESURES_VALIDATION_ENABLED=False)
+    def test_disabled(self):
+        stats = write_mesures([(self.temperature.id, self._at(0), -127.0)])
+        self.assertEqual(stats["quarantined"], 0)
+        self.assertEqual(Mesure.objects.count(), 1)
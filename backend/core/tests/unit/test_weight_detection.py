@@ -0,0 +1,52 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.weight_detection import cusum_drops, lower_cusum
+
+
+def _naive_lower_cusum(x, s0=0.0):
+    s = min(0.0, s0)
+    out = []
+    for v in x:
+        s = min(0.0, s + v)
+        out.append(s)
+    return out
+
+
+class LowerCusumTest(SimpleTestCase):
+    def test_matches_recursion(self):
+        rng = np.random.default_rng(42)
+        for s0 in (0.0, -1.5):
+            x = rng.normal(0, 1, 500)
+            np.testing.assert_allclose(lower_cusum(x, s0), _naive_lower_cusum(x, s0))
+
+
+class CusumDropsTest(SimpleTestCase):
+    def test_slow_consumption_not_flagged(self):
+        values = 40.0 - 0.1 * np.arange(100)
+        alarms, cusum = cusum_drops(values, slack=0.2, threshold=2.0)
+        self.assertEqual(alarms, [])
+        self.assertEqual(cusum, 0.0)
+
+    def test_sudden_drop_flagged_at_reading(self):
+        values = [40.0, 40.1, 40.0, 36.5, 36.4, 36.5]
+        alarms, _ = cusum_drops(values, slack=0.2, threshold=2.0)
+        self.assertEqual(len(alarms), 1)
+        index, drop = alarms[0]
+        self.assertEqual(index, 3)
+        self.assertAlmostEqual(drop, 3.3)
+
+    def test_two_drops_reset_between(self):
+        values = [40.0, 37.0, 37.0, 37.0, 34.0]
+        alarms, _ = cusum_drops(values, slack=0.2, threshold=2.0)
+        self.assertEqual([a[0] for a in alarms], [1, 4])
+
+    def test_resumes_from_previous_state(self):
+        # La baisse commence a la fin du lot precedent et se confirme dans celui-ci.
+        alarms, cusum = cusum_drops([40.0, 38.8], slack=0.2, threshold=2.0)
+        self.assertEqual(alarms, [])
+        alarms, _ = cusum_drops([37.4], previous=38.8, cusum=cusum, slack=0.2, threshold=2.0)
+        self.assertEqual([a[0] for a in alarms], [0])
+
+    def test_empty(self):
+        self.assertEqual(cusum_drops([], previous=40.0, cusum=-1.0), ([], -1.0))
@@ -0,0 +1,120 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from unittest.mock import patch
+
+import numpy as np
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import weight_forecast
+from core.ingestion import write_mesures
+from core.models import (
+    Entreprise, Rucher, Ruche, Capteur, Intervention, TypeIntervention,
+    TypeFlore, TypeRuche, TypeRaceAbeille, TypeMaladie, TypeCapteur,
+)
+
+
+class RobustTrendTest(TestCase):
+    def test_slope_ignores_outliers_and_missing_days(self):
+        matrix = np.array([
+            [10.0, 11.0, 12.0, 40.0, 14.0, 15.0, 16.0],
+            [20.0, np.nan, 19.0, np.nan, 18.0, np.nan, 17.0],
+            [5.0, np.nan, np.nan, np.nan, np.nan, np.nan, 6.0],
+        ])
+        slope, intercept = weight_forecast.robust_trend(matrix)
+        self.assertAlmostEqual(slope[0], 1.0)
+        self.assertAlmostEqual(intercept[0], 10.0)
+        self.assertAlmostEqual(slope[1], -0.5)
+        self.assertTrue(np.isnan(slope[2]))
+
+    def test_trailing_run(self):
+        mask = np.array([
+            [True, False, True, True],
+            [True, True, True, True],
+            [True, True, True, False],
+        ])
+        self.assertEqual(weight_forecast.trailing_run(mask).tolist(), [2, 4, 0])
+
+    def test_analyse_detects_flow_and_recommends_super(self):
+        flat = np.full(10, 30.0)
+        flow = np.concatenate([np.full(6, 30.0), 30.0 + 1.5 * np.arange(1, 5)])
+        result = weight_forecast.analyse(
+            np.vstack([flat, flow]), [0, 0],
+            horizon=7, tendance_jours=7, gain_journalier=0.5, jours_miellee=3, gain_hausse=8.0,
+        )
+        self.assertEqual(result["miellee"].tolist(), [False, True])
+        self.assertEqual(result["debutCol"][1], 5)
+        self.assertAlmostEqual(result["gainMiellee"][1], 6.0)
+        self.assertEqual(result["conseil"].tolist(), [False, True])
+
+        # Hausse posee en debut de miellee: le gain prevu part de ce jour.
+        result = weight_forecast.analyse(
+            np.vstack([flat, flow]), [0, 9],
+            horizon=1, tendance_jours=7, gain_journalier=0.5, jours_miellee=3, gain_hausse=8.0,
+        )
+        self.assertFalse(result["conseil"][1])
+
+
+class ForecastTest(TestCase):
+    def setUp(self):
+        for Model, value in [
+            (TypeFlore, 'Lavande'), (TypeRuche, 'Dadant'),
+            (TypeRaceAbeille, 'Buckfast'), (TypeMaladie, 'Aucune'),
+        ]:
+            Model.objects.get_or_create(value=value, defaults={'label': value})
+        self.entreprise = Entreprise.objects.create(nom='PoidsCo', adresse='Addr')
+        rucher = Rucher.objects.create(
+            nom='R', latitude=43.6, longitude=3.8,
+            flore_id='Lavande', altitude=200, entreprise=self.entreprise,
+        )
+        self.ruche = Ruche.objects.create(
+            immatriculation='PF-001', type_id='Dadant', race_id='Buckfast',
+            rucher=rucher, maladie_id='Aucune',
+        )
+        self.capteur = Capteur.objects.create(identifiant='PF-POIDS', type=TypeCapteur.POIDS.value, ruche=self.ruche)
+        self.today = timezone.now().date()
+
+    def _write_days(self, poids_par_jour):
+        """Quatre mesures par jour, le dernier poids correspondant a hier."""
+        rows = []
+        first = self.today - timedelta(days=len(poids_par_jour))
+        for k, poids in enumerate(poids_par_jour):
+            day = datetime.combine(first + timedelta(days=k), time.min, tzinfo=dt_timezone.utc)
+            rows.extend((self.capteur.id, day + timedelta(hours=h), poids + 0.01 * h) for h in (0, 6, 12, 18))
+        write_mesures(rows, validate=False)
+
+    @override_settings(HAUSSE_GAIN_KG=10.0)
+    def test_compute_reports_flow(self):
+        self._write_days([30.0] * 10 + [31.5, 33.0, 34.5, 36.0])
+        data = weight_forecast.compute(self.entreprise.id, self.today)
+        (prevision,) = data["previsions"]
+        self.assertEqual(prevision["capteurId"], str(self.capteur.id))
+        self.assertTrue(prevision["miellee"]["active"])
+        self.assertEqual(prevision["miellee"]["depuis"], (self.today - timedelta(days=5)).isoformat())
+        self.assertTrue(prevision["poseHausseConseillee"])
+        self.assertEqual(len(prevision["variationsJournalieres"]), len(data["jours"]))
+        self.assertEqual(prevision["variationsJournalieres"][-1], 1.5)
+
+        Intervention.objects.create(
+            type=TypeIntervention.POSE_HAUSSE, ruche=self.ruche,
+            date=timezone.now() - timedelta(days=1), nbHausses=1,
+        )
+        (prevision,) = weight_forecast.compute(self.entreprise.id, self.today)["previsions"]
+        self.assertIsNotNone(prevision["dernierePoseHausse"])
+        self.assertLess(prevision["gainDepuisHausseKg"], 10.0)
+        self.assertFalse(prevision["poseHausseConseillee"])
+
+    def test_cached_until_new_readings(self):
+        self._write_days([30.0] * 5)
+        with patch.object(weight_forecast, "compute", wraps=weight_forecast.compute) as compute:
+            weight_forecast.previsions(self.entreprise.id, self.today)
+            weight_forecast.previsions(self.entreprise.id, self.today)
+            self.assertEqual(compute.call_count, 1)
+            write_mesures([(self.capteur.id, timezone.now(), 30.2)], validate=False)
+            weight_forecast.previsions(self.entreprise.id, self.today)
+            self.assertEqual(compute.call_count, 2)
+
+    @override_settings(MIELLEE_JOURS=2)
+    def test_conseils_hausse(self):
+        self._write_days([30.0] * 3 + [34.0, 38.0, 42.0])
+        conseils = weight_forecast.conseils_hausse(self.today)
+        self.assertEqual(list(conseils), [str(self.ruche.id)])
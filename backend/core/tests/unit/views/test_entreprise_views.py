@@ -244,6 +244,30 @@ class EntrepriseViewsTest(TestCase):
         )
         self.assertEqual(resp.status_code, 404)
 
+    def test_usage(self):
+        from core.models import Rucher, TypeFlore
+        TypeFlore.objects.get_or_create(value="Lavande", defaults={"label": "Lavande"})
+        Rucher.objects.create(
+            nom="R", latitude=43.6, longitude=3.8, flore_id="Lavande", altitude=200, entreprise=self.entreprise,
+        )
+        resp = self.client.get(
+            f"/api/entreprises/{self.entreprise.id}/usage",
+            **self._auth_header(),
+        )
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data["ruchers"], {"utilises": 1, "max": 5, "restants": 4})
+        self.assertEqual(data["capteurs"], {"utilises": 0, "max": 1, "restants": 1})
+        self.assertEqual(data["reines"], {"utilises": 0, "max": None, "restants": None})
+
+    def test_usage_forbidden_for_non_member(self):
+        other = Entreprise.objects.create(nom="Other", adresse="Nice")
+        resp = self.client.get(
+            f"/api/entreprises/{other.id}/usage",
+            **self._auth_header(),
+        )
+        self.assertEqual(resp.status_code, 403)
+
     def test_list_type_profiles(self):
         resp = self.client.get("/api/profiles")
         self.assertEqual(resp.status_code, 200)
@@ -0,0 +1,277 @@
+import base64
+import json
+import struct
+import unittest
+import uuid
+from datetime import timedelta, timezone as dt_timezone
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from core import frames, lorawan
+from core.models import (
+    Utilisateur,
+    Entreprise,
+    UtilisateurEntreprise,
+    RoleUtilisateur,
+    Rucher,
+    Ruche,
+    Capteur,
+    Mesure,
+    TypeCapteur,
+    TypeFlore,
+    TypeRuche,
+    TypeRaceAbeille,
+    TypeMaladie,
+)
+
+
+class IngestViewsTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = Utilisateur.objects.create(
+            nom="Test", prenom="User", email="ingest@test.com",
+            motDePasseHash=make_password("pass"), actif=True,
+        )
+        self.entreprise = Entreprise.objects.create(nom="IngestCo", adresse="Lyon")
+        UtilisateurEntreprise.objects.create(
+            utilisateur=self.user, entreprise=self.entreprise,
+            role=RoleUtilisateur.ADMIN_ENTREPRISE,
+        )
+        TypeFlore.objects.get_or_create(value="Lavande", defaults={"label": "Lavande"})
+        TypeRuche.objects.get_or_create(value="Dadant", defaults={"label": "Dadant"})
+        TypeRaceAbeille.objects.get_or_create(value="Buckfast", defaults={"label": "Buckfast"})
+        TypeMaladie.objects.get_or_create(value="Aucune", defaults={"label": "Aucune"})
+        rucher = Rucher.objects.create(
+            nom="MonRucher", latitude=43.0, longitude=3.0,
+            flore_id="Lavande", altitude=500, entreprise=self.entreprise,
+        )
+        ruche = Ruche.objects.create(
+            immatriculation="A1234567", type_id="Dadant",
+            race_id="Buckfast", maladie_id="Aucune", rucher=rucher,
+        )
+        self.capteur = Capteur.objects.create(
+            type=TypeCapteur.POIDS, identifiant="POIDS01", ruche=ruche, actif=True,
+        )
+        self.date = (timezone.now() - timedelta(hours=1)).replace(microsecond=0)
+
+    def _auth_header(self):
+        from core.auth_views import _make_access_token
+        token = _make_access_token(self.user, entreprise_id=str(self.entreprise.id))
+        return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def _post_json(self, data, **kwargs):
+        return self.client.post(
+            "/api/mesures/ingest", json.dumps(data), content_type="application/json", **kwargs
+        )
+
+    def test_ingest_rejects_spectre_on_non_son_capteur(self):
+        payload = {"mesures": [{
+            "capteurId": str(self.capteur.id), "date": self.date.isoformat(), "valeur": 40.0,
+            "spectre": [1, 2, 3], "frequenceMax": 400,
+        }]}
+        resp = self._post_json(payload, **self._auth_header())
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["error"], "invalid_spectre")
+
+        payload["mesures"][0]["frequenceMax"] = 0
+        resp = self._post_json(payload, **self._auth_header())
+        self.assertEqual(resp.json(), {"error": "invalid_spectre", "index": 0, "detail": "invalid frequenceMax"})
+        self.assertFalse(Mesure.objects.exists())
+
+    def test_ingest_is_idempotent(self):
+        payload = {"mesures": [
+            {"capteurId": str(self.capteur.id), "date": self.date.isoformat(), "valeur": 40.0},
+            {"identifiant": "POIDS01", "date": (self.date + timedelta(minutes=5)).isoformat(), "valeur": 40.1},
+        ]}
+        resp = self._post_json(payload, **self._auth_header())
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {"received": 2, "inserted": 2, "updated": 0, "duplicates": 0, "quarantined": 0})
+
+        resp = self._post_json(payload, **self._auth_header())
+        self.assertEqual(resp.json()["duplicates"], 2)
+        self.assertEqual(Mesure.objects.count(), 2)
+
+    def test_ingest_naive_date_is_utc(self):
+        naive = self.date.astimezone(dt_timezone.utc).replace(tzinfo=None)
+        resp = self._post_json({"mesures": [
+            {"identifiant": "POIDS01", "date": naive.isoformat(), "valeur": 40.0},
+        ]}, **self._auth_header())
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["inserted"], 1)
+        self.assertEqual(Mesure.objects.get().date, naive.replace(tzinfo=dt_timezone.utc))
+
+    def test_ingest_update(self):
+        Mesure.objects.create(capteur=self.capteur, date=self.date, valeur=40.0)
+        resp = self._post_json({
+            "onConflict": "update",
+            "mesures": [{"identifiant": "POIDS01", "date": self.date.isoformat(), "valeur": 39.5}],
+        }, **self._auth_header())
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["updated"], 1)
+        self.assertEqual(Mesure.objects.get().valeur, 39.5)
+
+    def test_ingest_invalid_mesure(self):
+        resp = self._post_json({"mesures": [
+            {"identifiant": "POIDS01", "date": "hier", "valeur": 40.0},
+        ]}, **self._auth_header())
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json(), {"error": "invalid_mesure", "index": 0})
+
+    def test_ingest_invalid_on_conflict(self):
+        resp = self._post_json({"onConflict": "replace", "mesures": []}, **self._auth_header())
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["error"], "invalid_on_conflict")
+
+    def test_ingest_capteur_other_entreprise(self):
+        resp = self._post_json({"mesures": [
+            {"capteurId": str(uuid.uuid4()), "date": self.date.isoformat(), "valeur": 40.0},
+        ]}, **self._auth_header())
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(resp.json()["error"], "capteur_not_found")
+        self.assertFalse(Mesure.objects.exists())
+
+    def test_ingest_no_auth(self):
+        resp = self._post_json({"mesures": []})
+        self.assertEqual(resp.status_code, 401)
+
+
+@override_settings(INGEST_API_KEY="device-key")
+class BinaryIngestViewsTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        entreprise = Entreprise.objects.create(nom="BinCo", adresse="Lyon")
+        TypeFlore.objects.get_or_create(value="Lavande", defaults={"label": "Lavande"})
+        TypeRuche.objects.get_or_create(value="Dadant", defaults={"label": "Dadant"})
+        TypeRaceAbeille.objects.get_or_create(value="Buckfast", defaults={"label": "Buckfast"})
+        TypeMaladie.objects.get_or_create(value="Aucune", defaults={"label": "Aucune"})
+        rucher = Rucher.objects.create(
+            nom="MonRucher", latitude=43.0, longitude=3.0,
+            flore_id="Lavande", altitude=500, entreprise=entreprise,
+        )
+        ruche = Ruche.objects.create(
+            immatriculation="B1234567", type_id="Dadant",
+            race_id="Buckfast", maladie_id="Aucune", rucher=rucher,
+        )
+        self.capteur = Capteur.objects.create(
+            type=TypeCapteur.POIDS, identifiant="BIN01", ruche=ruche, actif=True,
+        )
+        self.base = int((timezone.now() - timedelta(hours=1)).timestamp())
+
+    def _post(self, body, content_type="application/octet-stream", key="device-key"):
+        return self.client.post(
+            "/api/mesures/ingest/binary", body, content_type=content_type, HTTP_X_INGEST_KEY=key,
+        )
+
+    def test_binary_frames(self):
+        body = (
+            frames.encode_frame(self.capteur.shortId, self.base, [0, 600, 600], [40.5, 40.5, 41.0], batterie=77)
+            + frames.encode_frame(999999, self.base, [0], [1.0])
+        )
+        resp = self._post(body)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            resp.json(),
+            {"received": 3, "unknown": 1, "inserted": 3, "updated": 0, "duplicates": 0, "quarantined": 0},
+        )
+        self.capteur.refresh_from_db()
+        self.assertEqual(self.capteur.batteriePct, 77)
+        self.assertEqual(
+            sorted(Mesure.objects.values_list("valeur", flat=True)), [40.5, 40.5, 41.0]
+        )
+
+        resp = self._post(body)
+        self.assertEqual(resp.json()["duplicates"], 3)
+
+    @unittest.skipIf(frames.cbor2 is None, "cbor2 non installe")
+    def test_cbor(self):
+        body = frames.cbor2.dumps([{"c": self.capteur.shortId, "t": self.base, "d": [0, 60], "v": [20.0, 20.5]}])
+        resp = self._post(body, content_type="application/cbor")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["inserted"], 2)
+
+    @unittest.skipIf(frames.cbor2 is None, "cbor2 non installe")
+    def test_cbor_out_of_range(self):
+        for frame in (
+            {"c": self.capteur.shortId, "t": 10**12, "d": [0], "v": [20.0]},
+            {"c": self.capteur.shortId, "t": self.base, "d": [0], "v": [20.0], "b": "x"},
+        ):
+            resp = self._post(frames.cbor2.dumps([frame]), content_type="application/cbor")
+            self.assertEqual(resp.status_code, 400)
+            self.assertEqual(resp.json()["error"], "invalid_frame")
+
+    def test_invalid_frame(self):
+        resp = self._post(b"BZ\x01")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()["error"], "invalid_frame")
+
+    def test_unsupported_media_type(self):
+        resp = self._post(b"{}", content_type="text/plain")
+        self.assertEqual(resp.status_code, 415)
+
+    def test_requires_key(self):
+        body = frames.encode_frame(self.capteur.shortId, self.base, [0], [1.0])
+        self.assertEqual(self._post(body, key="wrong").status_code, 401)
+        with self.settings(INGEST_API_KEY=""):
+            self.assertEqual(self._post(body).status_code, 401)
+
+    @override_settings(LORAWAN_BATCH_WINDOW_MS=0)
+    def test_lorawan_uplink(self):
+        cache.clear()
+        lorawan.reset_buffer()
+        self.addCleanup(lorawan.reset_buffer)
+        self.capteur.identifiant = "70B3D57ED0000010"
+        self.capteur.save()
+        uplink = {
+            "deviceInfo": {"devEui": "70b3d57ed0000010"},
+            "time": timezone.now().isoformat(),
+            "fPort": 2,
+            "data": base64.b64encode(struct.pack(">hB", 3950, 64)).decode(),
+        }
+        resp = self.client.post(
+            "/api/lorawan/uplink?event=up", json.dumps(uplink),
+            content_type="application/json", HTTP_X_INGEST_KEY="device-key",
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["inserted"], 1)
+        self.assertEqual(Mesure.objects.get().valeur, 39.5)
+        self.capteur.refresh_from_db()
+        self.assertEqual(self.capteur.batteriePct, 64)
+
+        resp = self.client.post(
+            "/api/lorawan/uplink?event=join", json.dumps(uplink),
+            content_type="application/json", HTTP_X_INGEST_KEY="device-key",
+        )
+        self.assertEqual(resp.json(), {"status": "ignored"})
+
+    @override_settings(LORAWAN_BATCH_WINDOW_MS=10)
+    def test_lorawan_uplink_waits_for_write(self):
+        cache.clear()
+        lorawan.reset_buffer()
+        self.addCleanup(lorawan.reset_buffer)
+        self.capteur.identifiant = "70B3D57ED0000011"
+        self.capteur.save()
+        uplink = {
+            "end_device_ids": {"dev_eui": "70B3D57ED0000011"},
+            "uplink_message": {"frm_payload": base64.b64encode(struct.pack(">hB", 3950, 64)).decode()},
+        }
+        resp = self.client.post(
+            "/api/lorawan/uplink", json.dumps(uplink),
+            content_type="application/json", HTTP_X_INGEST_KEY="device-key",
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["status"], "written")
+        self.assertEqual(Mesure.objects.count(), 1)
+
+        # Base indisponible: 503 pour que le serveur reseau renvoie l'uplink.
+        with patch("core.ingestion.write_mesures_isolating", side_effect=OperationalError("down")):
+            resp = self.client.post(
+                "/api/lorawan/uplink", json.dumps(uplink),
+                content_type="application/json", HTTP_X_INGEST_KEY="device-key",
+            )
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp.json(), {"error": "database_unavailable"})
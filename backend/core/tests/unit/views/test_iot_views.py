@@ -1,4 +1,5 @@
 import json
+from datetime import timedelta
 from unittest.mock import patch
 
 from django.test import TestCase, Client
@@ -40,12 +41,12 @@ class IotViewsTest(TestCase):
         )
         TypeOffreModel.objects.get_or_create(value="Freemium", defaults={"titre": "Freemium"})
         lim = LimitationOffre.objects.create(
-            typeOffre_id="Freemium", nbRuchersMax=5, nbCapteursMax=1, nbReinesMax=3,
+            typeOffre_id="Freemium", nbRuchersMax=5, nbCapteursMax=5, nbReinesMax=3,
         )
         Offre.objects.create(
             entreprise=self.entreprise, type_id="Freemium",
             dateDebut=timezone.now(), active=True,
-            nbRuchersMax=5, nbCapteursMax=1, nbReinesMax=3,
+            nbRuchersMax=5, nbCapteursMax=5, nbReinesMax=3,
             limitationOffre=lim,
         )
         TypeFlore.objects.get_or_create(value="Lavande", defaults={"label": "Lavande"})
@@ -137,6 +138,131 @@ class IotViewsTest(TestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(len(resp.json()["capteurs"]), 2)
 
+    def test_list_capteur_states(self):
+        from core.ingestion import write_mesures
+        capteur = Capteur.objects.create(
+            type=TypeCapteur.TEMPERATURE, identifiant="STATE01",
+            ruche=self.ruche, actif=True,
+        )
+        date = timezone.now().replace(microsecond=0)
+        write_mesures([
+            (capteur.id, date - timedelta(minutes=15), 20.5),
+            (capteur.id, date, 21.5, 64),
+        ])
+        resp = self.client.get("/api/capteurs/states?type=temperature", **self._auth_header())
+        self.assertEqual(resp.status_code, 200)
+        [state] = resp.json()["states"]
+        self.assertEqual(state["identifiant"], "STATE01")
+        self.assertEqual(state["derniereValeur"], 21.5)
+        self.assertEqual(state["batteriePct"], 64)
+        self.assertEqual(state["mesuresParHeure"], 4.0)
+
+        resp = self.client.get("/api/capteurs/states?type=inconnu", **self._auth_header())
+        self.assertEqual(resp.status_code, 400)
+
+    def test_get_capteur_mesures_merges_compacted_history(self):
+        from core.models import Mesure
+        from core.timeseries import compact_capteur
+        capteur = Capteur.objects.create(
+            type=TypeCapteur.TEMPERATURE, identifiant="SERIE01",
+            ruche=self.ruche, actif=True,
+        )
+        now = timezone.now().replace(microsecond=0)
+        Mesure.objects.create(capteur=capteur, date=now - timedelta(days=40), valeur=12.0)
+        Mesure.objects.create(capteur=capteur, date=now - timedelta(hours=1), valeur=18.0)
+        compact_capteur(capteur.id, now - timedelta(days=30))
+
+        resp = self.client.get(
+            f"/api/capteurs/{capteur.id}/mesures",
+            {"from": (now - timedelta(days=41)).isoformat(), "to": now.isoformat()},
+            **self._auth_header(),
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([m["valeur"] for m in resp.json()["mesures"]], [12.0, 18.0])
+
+        resp = self.client.get(f"/api/capteurs/{capteur.id}/mesures", **self._auth_header())
+        self.assertEqual([m["valeur"] for m in resp.json()["mesures"]], [18.0])
+
+        resp = self.client.get(
+            f"/api/capteurs/{capteur.id}/mesures", {"from": "hier"}, **self._auth_header()
+        )
+        self.assertEqual(resp.status_code, 400)
+
+    def test_get_capteur_mesures_includes_son_spectres(self):
+        capteur = Capteur.objects.create(
+            type=TypeCapteur.SON, identifiant="SON01", ruche=self.ruche, actif=True,
+        )
+        date = timezone.now().replace(microsecond=0) - timedelta(hours=1)
+        resp = self.client.post(
+            "/api/mesures/ingest",
+            json.dumps({"conserverSpectre": True, "mesures": [{
+                "capteurId": str(capteur.id), "date": date.isoformat(), "valeur": 60.0,
+                "spectre": [0, 1, 4, 1, 0, 2, 0, 0], "frequenceMax": 700,
+            }]}),
+            content_type="application/json",
+            **self._auth_header(),
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["spectres"], 1)
+
+        resp = self.client.get(f"/api/capteurs/{capteur.id}/mesures", **self._auth_header())
+        self.assertEqual(resp.status_code, 200)
+        (spectre,) = resp.json()["spectres"]
+        self.assertEqual(spectre["frequenceDominante"], 200.0)
+        self.assertAlmostEqual(spectre["indiceEssaimage"], 2.0 / 5.0)
+        self.assertNotIn("spectre", spectre)
+
+        resp = self.client.get(f"/api/capteurs/{capteur.id}/mesures", {"spectre": "1"}, **self._auth_header())
+        (spectre,) = resp.json()["spectres"]
+        self.assertEqual(spectre["spectre"]["frequenceMax"], 700.0)
+        self.assertEqual(max(spectre["spectre"]["valeurs"]), 1.0)
+
+    def test_get_previsions_poids(self):
+        from core.ingestion import write_mesures
+        capteur = Capteur.objects.create(
+            type=TypeCapteur.POIDS, identifiant="POIDSPREV", ruche=self.ruche, actif=True,
+        )
+        now = timezone.now()
+        write_mesures(
+            [(capteur.id, now - timedelta(days=d, hours=12), 30.0 + (10 - d)) for d in range(1, 10)],
+            validate=False,
+        )
+        resp = self.client.get("/api/capteurs/poids/previsions", **self._auth_header())
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data["horizonJours"], 7)
+        (prevision,) = data["previsions"]
+        self.assertEqual(prevision["identifiant"], "POIDSPREV")
+        self.assertEqual(prevision["tendanceKgJour"], 1.0)
+        self.assertTrue(prevision["miellee"]["active"])
+
+        resp = self.client.get("/api/capteurs/poids/previsions")
+        self.assertEqual(resp.status_code, 401)
+
+    def test_export_mesures_streams_arrow(self):
+        from core import export
+        from core.models import Mesure
+        if not export.available():
+            self.skipTest("pyarrow non installe")
+        import pyarrow as pa
+        capteur = Capteur.objects.create(
+            type=TypeCapteur.TEMPERATURE, identifiant="EXPORT01",
+            ruche=self.ruche, actif=True,
+        )
+        Mesure.objects.create(capteur=capteur, date=timezone.now(), valeur=21.0)
+        resp = self.client.get("/api/mesures/export", {"format": "arrow"}, **self._auth_header())
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["Content-Type"], "application/vnd.apache.arrow.stream")
+        table = pa.ipc.open_stream(b"".join(resp.streaming_content)).read_all()
+        self.assertEqual(table.column("valeur").to_pylist(), [21.0])
+
+        resp = self.client.get("/api/mesures/export", {"format": "csv"}, **self._auth_header())
+        self.assertEqual(resp.status_code, 400)
+
+        resp = self.client.get("/api/mesures/export", {"capteurId": "abc"}, **self._auth_header())
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json(), {"error": "invalid_capteur_id"})
+
     def test_list_capteurs_method_not_allowed(self):
         resp = self._post_json("/api/capteurs", {}, **self._auth_header())
         self.assertEqual(resp.status_code, 405)
@@ -287,6 +413,25 @@ class IotViewsTest(TestCase):
         self.assertTrue(data["distanceMeters"] > 100)
         self.assertTrue(Alerte.objects.filter(capteur=capteur).exists())
 
+    @patch("core.iot_views.send_email", return_value={"success": True})
+    @patch("core.iot_views.get_latest_position", return_value={"latitude": 44.0, "longitude": 4.0})
+    def test_check_gps_alert_sent_once_per_day(self, mock_pos, mock_email):
+        capteur = Capteur.objects.create(
+            type=TypeCapteur.GPS, identifiant="GPSCHK02",
+            ruche=self.ruche, actif=True,
+            gpsAlertActive=True, gpsReferenceLat=43.0, gpsReferenceLng=3.0,
+            gpsThresholdMeters=100,
+        )
+        for _ in range(2):
+            resp = self._post_json(
+                f"/api/capteurs/{capteur.id}/gps-alert/check",
+                {}, **self._auth_header(),
+            )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["status"], "already_alerted")
+        self.assertEqual(Alerte.objects.filter(capteur=capteur).count(), 1)
+        mock_email.assert_called_once()
+
     @patch("core.iot_views.get_latest_position", return_value={"latitude": 43.0, "longitude": 3.0})
     def test_check_gps_alert_ok(self, mock_pos):
         capteur = Capteur.objects.create(
@@ -0,0 +1,146 @@
+from django.test import TestCase, Client
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from core.map_views import _parse_bbox, _parse_zoom, _cell_size, _snap_bbox
+from core.models import (
+    Utilisateur,
+    Entreprise,
+    UtilisateurEntreprise,
+    RoleUtilisateur,
+    Rucher,
+    Ruche,
+    Capteur,
+    TypeCapteur,
+    TypeFlore,
+    TypeRuche,
+    TypeRaceAbeille,
+    TypeMaladie,
+    Offre,
+    TypeOffreModel,
+    LimitationOffre,
+)
+
+
+class MapHelpersTest(TestCase):
+    def test_parse_bbox(self):
+        self.assertEqual(_parse_bbox("2,43,4,45"), (2.0, 43.0, 4.0, 45.0))
+
+    def test_parse_bbox_invalid(self):
+        self.assertIsNone(_parse_bbox(None))
+        self.assertIsNone(_parse_bbox("2,43,4"))
+        self.assertIsNone(_parse_bbox("a,b,c,d"))
+        self.assertIsNone(_parse_bbox("4,43,2,45"))
+        self.assertIsNone(_parse_bbox("2,43,4,95"))
+
+    def test_parse_zoom(self):
+        self.assertEqual(_parse_zoom("5"), 5)
+        self.assertIsNone(_parse_zoom("x"))
+        self.assertIsNone(_parse_zoom("23"))
+
+    def test_snap_bbox_contains_original(self):
+        cell = _cell_size(8)
+        snapped = _snap_bbox((2.01, 43.01, 2.99, 43.99), cell)
+        self.assertLessEqual(snapped[0], 2.01)
+        self.assertLessEqual(snapped[1], 43.01)
+        self.assertGreaterEqual(snapped[2], 2.99)
+        self.assertGreaterEqual(snapped[3], 43.99)
+
+
+class MapClustersViewTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = Utilisateur.objects.create(
+            nom="Map", prenom="User", email="map@test.com",
+            motDePasseHash=make_password("pass"), actif=True,
+        )
+        self.entreprise = Entreprise.objects.create(nom="MapCo", adresse="Nimes")
+        UtilisateurEntreprise.objects.create(
+            utilisateur=self.user, entreprise=self.entreprise,
+            role=RoleUtilisateur.ADMIN_ENTREPRISE,
+        )
+        TypeOffreModel.objects.get_or_create(value="Freemium", defaults={"titre": "Freemium"})
+        lim = LimitationOffre.objects.create(
+            typeOffre_id="Freemium", nbRuchersMax=5, nbCapteursMax=5, nbReinesMax=3,
+        )
+        Offre.objects.create(
+            entreprise=self.entreprise, type_id="Freemium",
+            dateDebut=timezone.now(), active=True,
+            nbRuchersMax=5, nbCapteursMax=5, nbReinesMax=3,
+            limitationOffre=lim,
+        )
+        TypeFlore.objects.get_or_create(value="Lavande", defaults={"label": "Lavande"})
+        TypeRuche.objects.get_or_create(value="Dadant", defaults={"label": "Dadant"})
+        TypeRaceAbeille.objects.get_or_create(value="Buckfast", defaults={"label": "Buckfast"})
+        TypeMaladie.objects.get_or_create(value="Aucune", defaults={"label": "Aucune"})
+
+        self.rucher_a = Rucher.objects.create(
+            nom="A", latitude=43.01, longitude=3.01,
+            flore_id="Lavande", altitude=100, entreprise=self.entreprise,
+        )
+        self.rucher_b = Rucher.objects.create(
+            nom="B", latitude=43.02, longitude=3.02,
+            flore_id="Lavande", altitude=100, entreprise=self.entreprise,
+        )
+        self.rucher_far = Rucher.objects.create(
+            nom="Far", latitude=48.0, longitude=2.0,
+            flore_id="Lavande", altitude=100, entreprise=self.entreprise,
+        )
+        ruche = Ruche.objects.create(
+            immatriculation="M1234567", type_id="Dadant",
+            race_id="Buckfast", maladie_id="Aucune", rucher=self.rucher_a,
+        )
+        Capteur.objects.create(
+            type=TypeCapteur.GPS, identifiant="MAPGPS01",
+            ruche=ruche, actif=True, gpsAlertActive=True,
+        )
+        Capteur.objects.create(
+            type=TypeCapteur.TEMPERATURE, identifiant="MAPTEMP01",
+            ruche=ruche, actif=True,
+        )
+
+    def _auth_header(self):
+        from core.auth_views import _make_access_token
+        token = _make_access_token(self.user, entreprise_id=str(self.entreprise.id))
+        return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def test_clusters_low_zoom_groups_nearby(self):
+        resp = self.client.get(
+            "/api/map/clusters", {"bbox": "2.5,42.5,3.5,43.5", "zoom": "6"},
+            **self._auth_header(),
+        )
+        self.assertEqual(resp.status_code, 200)
+        clusters = resp.json()["clusters"]
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(clusters[0]["ruchersCount"], 2)
+        self.assertEqual(clusters[0]["capteursCount"], 1)
+        self.assertTrue(clusters[0]["hasActiveAlert"])
+
+    def test_clusters_high_zoom_splits(self):
+        resp = self.client.get(
+            "/api/map/clusters", {"bbox": "3.0,43.0,3.03,43.03", "zoom": "16"},
+            **self._auth_header(),
+        )
+        self.assertEqual(resp.status_code, 200)
+        counts = sorted(c["count"] for c in resp.json()["clusters"])
+        self.assertEqual(counts, [1, 2])
+
+    def test_clusters_cache_invalidated_on_new_rucher(self):
+        params = {"bbox": "2.5,42.5,3.5,43.5", "zoom": "6"}
+        self.client.get("/api/map/clusters", params, **self._auth_header())
+        Rucher.objects.create(
+            nom="C", latitude=43.03, longitude=3.03,
+            flore_id="Lavande", altitude=100, entreprise=self.entreprise,
+        )
+        resp = self.client.get("/api/map/clusters", params, **self._auth_header())
+        self.assertEqual(resp.json()["clusters"][0]["ruchersCount"], 3)
+
+    def test_clusters_invalid_params(self):
+        resp = self.client.get("/api/map/clusters", {"bbox": "x", "zoom": "6"}, **self._auth_header())
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.get("/api/map/clusters", {"bbox": "2,42,4,44"}, **self._auth_header())
+        self.assertEqual(resp.status_code, 400)
+
+    def test_clusters_no_auth(self):
+        resp = self.client.get("/api/map/clusters", {"bbox": "2,42,4,44", "zoom": "6"})
+        self.assertEqual(resp.status_code, 401)
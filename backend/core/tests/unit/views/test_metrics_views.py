@@ -0,0 +1,28 @@
+from django.test import TestCase, Client, override_settings
+
+from core.traccar_client import clear_position_cache
+
+
+class MetricsViewTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        clear_position_cache()
+
+    def test_metrics_open_without_secret(self):
+        resp = self.client.get("/api/metrics")
+        self.assertEqual(resp.status_code, 200)
+        cache_stats = resp.json()["traccar"]["positionCache"]
+        self.assertEqual(cache_stats["hits"], 0)
+        self.assertEqual(cache_stats["misses"], 0)
+        self.assertIn("dependencies", resp.json())
+
+    @override_settings(METRICS_SECRET="s3cret")
+    def test_metrics_requires_secret(self):
+        resp = self.client.get("/api/metrics")
+        self.assertEqual(resp.status_code, 401)
+        resp = self.client.get("/api/metrics", HTTP_X_METRICS_SECRET="s3cret")
+        self.assertEqual(resp.status_code, 200)
+
+    def test_metrics_method_not_allowed(self):
+        resp = self.client.post("/api/metrics")
+        self.assertEqual(resp.status_code, 405)
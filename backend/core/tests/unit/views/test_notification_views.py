@@ -175,6 +175,41 @@ class NotificationWebhookTest(TestCase):
             ).exists()
         )
 
+    @override_settings(HASURA_WEBHOOK_SECRET="")
+    def test_daily_rappel_visite_not_sent_after_recent_visit(self):
+        Intervention.objects.create(
+            type=TypeIntervention.VISITE, date=timezone.now() - timedelta(days=5),
+            ruche=self.ruche,
+        )
+        self._post_json("/api/webhooks/daily-notifications", {})
+        self.assertFalse(
+            Notification.objects.filter(type=TypeNotification.RAPPEL_VISITE, ruche=self.ruche).exists()
+        )
+
+    @override_settings(HASURA_WEBHOOK_SECRET="")
+    def test_daily_rappel_traitement(self):
+        Intervention.objects.create(
+            type=TypeIntervention.TRAITEMENT, date=timezone.now() - timedelta(days=30),
+            ruche=self.ruche,
+        )
+        self._post_json("/api/webhooks/daily-notifications", {})
+        notifications = Notification.objects.filter(type=TypeNotification.RAPPEL_TRAITEMENT, ruche=self.ruche)
+        self.assertTrue(notifications.exists())
+        self.assertIn("dernier il y a 30 jours", notifications.first().message)
+
+    @override_settings(HASURA_WEBHOOK_SECRET="")
+    def test_daily_notifications_not_sent_twice(self):
+        self.ruche.statut = StatutRuche.MALADE
+        self.ruche.save()
+        self._post_json("/api/webhooks/daily-notifications", {})
+        count = Notification.objects.filter(type=TypeNotification.ALERTE_SANITAIRE).count()
+        self.assertGreater(count, 0)
+        resp = self._post_json("/api/webhooks/daily-notifications", {})
+        self.assertEqual(resp.json()["created"], 0)
+        self.assertEqual(
+            Notification.objects.filter(type=TypeNotification.ALERTE_SANITAIRE).count(), count
+        )
+
     @override_settings(HASURA_WEBHOOK_SECRET="")
     def test_daily_alerte_sanitaire(self):
         self.ruche.statut = StatutRuche.MALADE
@@ -188,6 +223,27 @@ class NotificationWebhookTest(TestCase):
             ).exists()
         )
 
+    @override_settings(HASURA_WEBHOOK_SECRET="")
+    def test_daily_conseil_hausse_during_flow(self):
+        from core.ingestion import write_mesures
+        from core.models import Capteur, TypeCapteur
+        capteur = Capteur.objects.create(
+            type=TypeCapteur.POIDS, identifiant="POIDSNOTIF", ruche=self.ruche, actif=True,
+        )
+        now = timezone.now()
+        write_mesures(
+            [(capteur.id, now - timedelta(days=d, hours=12), 30.0 + 2 * (10 - d)) for d in range(1, 10)],
+            validate=False,
+        )
+        self._post_json("/api/webhooks/daily-notifications", {})
+        self.assertEqual(
+            Notification.objects.filter(type=TypeNotification.CONSEIL_HAUSSE, ruche=self.ruche).count(), 2
+        )
+        self._post_json("/api/webhooks/daily-notifications", {})
+        self.assertEqual(
+            Notification.objects.filter(type=TypeNotification.CONSEIL_HAUSSE, ruche=self.ruche).count(), 2
+        )
+
     def test_intervention_webhook_method_not_allowed(self):
         resp = self.client.get("/api/webhooks/intervention-created")
         self.assertEqual(resp.status_code, 405)
@@ -0,0 +1,83 @@
+from django.test import TestCase, Client
+from django.contrib.auth.hashers import make_password
+
+from core.health_scores import refresh
+from core.models import (
+    Utilisateur,
+    Entreprise,
+    UtilisateurEntreprise,
+    RoleUtilisateur,
+    Rucher,
+    Ruche,
+    StatutRuche,
+    TypeFlore,
+    TypeRuche,
+    TypeRaceAbeille,
+    TypeMaladie,
+)
+
+
+class SanteViewsTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = Utilisateur.objects.create(
+            nom="Test", prenom="User", email="sante@test.com",
+            motDePasseHash=make_password("pass"), actif=True,
+        )
+        self.entreprise = Entreprise.objects.create(nom="SanteCo", adresse="Lyon")
+        UtilisateurEntreprise.objects.create(
+            utilisateur=self.user, entreprise=self.entreprise,
+            role=RoleUtilisateur.ADMIN_ENTREPRISE,
+        )
+        TypeFlore.objects.get_or_create(value="Lavande", defaults={"label": "Lavande"})
+        TypeRuche.objects.get_or_create(value="Dadant", defaults={"label": "Dadant"})
+        TypeRaceAbeille.objects.get_or_create(value="Buckfast", defaults={"label": "Buckfast"})
+        TypeMaladie.objects.get_or_create(value="Aucune", defaults={"label": "Aucune"})
+        rucher = Rucher.objects.create(
+            nom="MonRucher", latitude=43.0, longitude=3.0,
+            flore_id="Lavande", altitude=500, entreprise=self.entreprise,
+        )
+        self.ruches = [
+            Ruche.objects.create(
+                immatriculation=f"H000000{i}", type_id="Dadant", race_id="Buckfast",
+                maladie_id="Aucune", rucher=rucher, statut=statut,
+            )
+            for i, statut in enumerate([StatutRuche.ACTIVE, StatutRuche.MALADE, StatutRuche.FAIBLE])
+        ]
+        autre = Entreprise.objects.create(nom="Autre", adresse="Paris")
+        Ruche.objects.create(
+            immatriculation="H0000009", type_id="Dadant", race_id="Buckfast", maladie_id="Aucune",
+            rucher=Rucher.objects.create(
+                nom="Autre", latitude=43.0, longitude=3.0, flore_id="Lavande", altitude=500, entreprise=autre,
+            ),
+        )
+        refresh()
+
+    def _auth_header(self):
+        from core.auth_views import _make_access_token
+        token = _make_access_token(self.user, entreprise_id=str(self.entreprise.id))
+        return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def test_list_worst_first(self):
+        resp = self.client.get("/api/ruches/sante", **self._auth_header())
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data["total"], 3)
+        self.assertEqual(
+            [r["immatriculation"] for r in data["ruches"]], ["H0000001", "H0000002", "H0000000"]
+        )
+        self.assertEqual(data["ruches"][0]["penalites"], {"statut": 40.0, "visite": 20.0})
+
+        resp = self.client.get("/api/ruches/sante", {"limit": 1, "offset": 1}, **self._auth_header())
+        self.assertEqual([r["immatriculation"] for r in resp.json()["ruches"]], ["H0000002"])
+
+        resp = self.client.get("/api/ruches/sante", {"scoreMax": 60}, **self._auth_header())
+        self.assertEqual(resp.json()["total"], 2)
+
+    def test_list_invalid_params(self):
+        resp = self.client.get("/api/ruches/sante", {"limit": 0}, **self._auth_header())
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.get("/api/ruches/sante", {"scoreMax": "x"}, **self._auth_header())
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.get("/api/ruches/sante")
+        self.assertEqual(resp.status_code, 401)
@@ -0,0 +1,115 @@
+"""
+Moteur de regles de seuil (TemperatureCritique, BatterieFaible, ...).
+
+Les regles actives sont compilees une fois par execution en un index
+{capteur_id: regles applicables}: chaque mesure n'est comparee qu'aux
+quelques regles de son capteur, le cout reste proportionnel au nombre de
+mesures. Un depassement doit durer `dureeMinutes` avant de declencher une
+alerte, et une seule alerte est emise par episode de depassement.
+"""
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+from core.models import Capteur, CibleRegle, RegleSeuil
+
+DETECTEUR_REGLES_MESURE = "regles_seuil"
+DETECTEUR_REGLES_BATTERIE = "regles_seuil_batterie"
+
+CompiledRule = namedtuple("CompiledRule", "id type_alerte cible valeur_min valeur_max duree")
+Breach = namedtuple("Breach", "rule date valeur depuis")
+
+
+def compile_rules(entreprise_ids=None):
+    """{capteur_id: (regles...)} pour les capteurs actifs couverts par au moins une regle."""
+    rules = RegleSeuil.objects.filter(actif=True)
+    if entreprise_ids is not None:
+        rules = rules.filter(entreprise_id__in=entreprise_ids)
+
+    by_key = defaultdict(list)
+    for r in rules:
+        by_key[(r.entreprise_id, r.typeCapteur)].append(
+            CompiledRule(
+                id=str(r.id),
+                type_alerte=r.typeAlerte,
+                cible=r.cible,
+                valeur_min=r.valeurMin,
+                valeur_max=r.valeurMax,
+                duree=max(0, r.dureeMinutes or 0) * 60,
+            )
+        )
+    if not by_key:
+        return {}
+
+    compiled = {}
+    capteurs = Capteur.objects.filter(
+        actif=True,
+        ruche__rucher__entreprise_id__in={key[0] for key in by_key},
+    ).values_list("id", "type", "ruche__rucher__entreprise_id")
+    for capteur_id, type_capteur, entreprise_id in capteurs:
+        # Une regle sans type de capteur s'applique a tous les capteurs de l'entreprise.
+        applicable = by_key.get((entreprise_id, type_capteur), []) + by_key.get((entreprise_id, None), [])
+        if applicable:
+            compiled[capteur_id] = tuple(applicable)
+    return compiled
+
+
+def rules_for(compiled, cible):
+    """Restreint l'index compile aux regles d'une cible (mesures ou batterie)."""
+    out = {}
+    for capteur_id, rules in compiled.items():
+        selected = tuple(r for r in rules if r.cible == cible)
+        if selected:
+            out[capteur_id] = selected
+    return out
+
+
+def is_breach(rule, valeur):
+    return (rule.valeur_min is not None and valeur < rule.valeur_min) or (
+        rule.valeur_max is not None and valeur > rule.valeur_max
+    )
+
+
+def evaluate(rules, readings, state):
+    """
+    Applique les regles d'un capteur a ses lectures [(date, valeur)] ordonnees.
+
+    `state` ({"breaches": {rule_id: debut iso}, "alerted": [rule_id]}) est mis
+    a jour en place pour reprendre l'episode en cours a l'execution suivante.
+    Retourne les depassements a alerter.
+    """
+    breaches = state.setdefault("breaches", {})
+    alerted = set(state.get("alerted", []))
+    out = []
+    for date, valeur in readings:
+        for rule in rules:
+            if not is_breach(rule, valeur):
+                breaches.pop(rule.id, None)
+                alerted.discard(rule.id)
+                continue
+            if rule.id not in breaches:
+                breaches[rule.id] = date.isoformat()
+            if rule.id in alerted:
+                continue
+            depuis = datetime.fromisoformat(breaches[rule.id])
+            if (date - depuis).total_seconds() >= rule.duree:
+                alerted.add(rule.id)
+                out.append(Breach(rule, date, valeur, depuis))
+    state["alerted"] = sorted(alerted)
+    return out
+
+
+def breach_message(breach, identifiant, immatriculation):
+    rule = breach.rule
+    if rule.cible == CibleRegle.BATTERIE.value:
+        mesure = f"Batterie a {breach.valeur:.0f}%"
+    else:
+        mesure = f"Valeur {breach.valeur:.1f}"
+    if rule.valeur_min is not None and breach.valeur < rule.valeur_min:
+        seuil = f"sous le seuil min {rule.valeur_min:g}"
+    else:
+        seuil = f"au-dessus du seuil max {rule.valeur_max:g}"
+    duree = ""
+    if rule.duree:
+        minutes = int((breach.date - breach.depuis).total_seconds() // 60)
+        duree = f" depuis {minutes} min"
+    return f"{mesure} {seuil}{duree} sur la ruche {immatriculation} (capteur {identifiant})."
@@ -0,0 +1,207 @@
+"""
+Historique des mesures en blocs compacts.
+
+Une ligne `mesures` coute plus de 100 octets par valeur (UUID, deux
+horodatages, index). Les mesures froides sont regroupees par capteur et
+par jour (UTC) dans `mesures_chunks`: horodatages en ecarts uint32 (ms)
+et valeurs en float32, compresses en zstd si le module `zstandard` est
+installe, zlib sinon. La lecture fusionne archives (core.archive),
+blocs et lignes recentes.
+"""
+import zlib
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+from core.models import CodecChunk, Mesure, MesureChunk
+
+try:
+    import zstandard
+except ImportError:  # optionnel
+    zstandard = None
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MS = timedelta(milliseconds=1)
+_HEADER_DTYPE = np.dtype("<i8")
+_DELTA_DTYPE = np.dtype("<u4")
+_VALUE_DTYPE = np.dtype("<f4")
+
+
+def default_codec():
+    configured = getattr(settings, "MESURES_CHUNK_CODEC", "") or ""
+    if configured:
+        return configured
+    return CodecChunk.ZSTD.value if zstandard is not None else CodecChunk.ZLIB.value
+
+
+def _compress(data, codec):
+    if codec == CodecChunk.ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed")
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == CodecChunk.ZLIB:
+        return zlib.compress(data, 6)
+    return data
+
+
+def _decompress(data, codec):
+    data = bytes(data)
+    if codec == CodecChunk.ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd chunks")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == CodecChunk.ZLIB:
+        return zlib.decompress(data)
+    return data
+
+
+def to_ms(date):
+    return (date - _EPOCH) // _MS
+
+
+def from_ms(ms):
+    return _EPOCH + timedelta(milliseconds=int(ms))
+
+
+def pack(ms, valeurs, codec=None):
+    """
+    Encode des horodatages (epoch ms, croissants) et valeurs.
+    Retourne (codec, timestamps, valeurs) prets pour MesureChunk.
+    """
+    codec = codec or default_codec()
+    ms = np.asarray(ms, dtype=np.int64)
+    deltas = np.diff(ms)
+    if deltas.size and (deltas.min() < 0 or deltas.max() > np.iinfo(_DELTA_DTYPE).max):
+        raise ValueError("timestamps must be sorted and less than ~49 days apart")
+    ts_blob = ms[:1].astype(_HEADER_DTYPE).tobytes() + deltas.astype(_DELTA_DTYPE).tobytes()
+    val_blob = np.asarray(valeurs, dtype=_VALUE_DTYPE).tobytes()
+    return codec, _compress(ts_blob, codec), _compress(val_blob, codec)
+
+
+def unpack(codec, timestamps, valeurs):
+    """Inverse de pack: (ms int64, valeurs float64)."""
+    ts_blob = _decompress(timestamps, codec)
+    values = np.frombuffer(_decompress(valeurs, codec), dtype=_VALUE_DTYPE).astype(np.float64)
+    if not ts_blob:
+        return np.empty(0, dtype=np.int64), values
+    first = np.frombuffer(ts_blob[:_HEADER_DTYPE.itemsize], dtype=_HEADER_DTYPE)
+    deltas = np.frombuffer(ts_blob[_HEADER_DTYPE.itemsize:], dtype=_DELTA_DTYPE).astype(np.int64)
+    ms = np.concatenate([first, first[0] + np.cumsum(deltas)]).astype(np.int64)
+    return ms, values
+
+
+def _day_bounds(jour):
+    start = datetime.combine(jour, time.min, tzinfo=dt_timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def _write_chunk(capteur_id, jour, points, codec):
+    """Remplace le bloc (capteur, jour) par `points` {ms: valeur}."""
+    ms = np.array(sorted(points), dtype=np.int64)
+    values = np.array([points[m] for m in ms.tolist()], dtype=np.float64)
+    codec, ts_blob, val_blob = pack(ms, values, codec)
+    MesureChunk.objects.update_or_create(
+        capteur_id=capteur_id,
+        jour=jour,
+        defaults={
+            "nbMesures": len(ms),
+            "dateDebut": from_ms(ms[0]),
+            "dateFin": from_ms(ms[-1]),
+            "valeurMin": float(values.min()),
+            "valeurMax": float(values.max()),
+            "codec": codec,
+            "timestamps": ts_blob,
+            "valeurs": val_blob,
+        },
+    )
+
+
+def _compact_day(capteur_id, jour, rows, codec):
+    with transaction.atomic():
+        points = {}
+        chunk = (
+            MesureChunk.objects.select_for_update()
+            .filter(capteur_id=capteur_id, jour=jour)
+            .first()
+        )
+        if chunk is not None:
+            ms, values = unpack(chunk.codec, chunk.timestamps, chunk.valeurs)
+            points.update(zip(ms.tolist(), values.tolist()))
+        # Une ligne brute arrivee apres compaction remplace la valeur du bloc.
+        points.update((to_ms(date), valeur) for _, date, valeur in rows)
+        _write_chunk(capteur_id, jour, points, codec)
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM mesures WHERE id = ANY(%s)", [[row[0] for row in rows]])
+
+
+def compact_capteur(capteur_id, before, codec=None):
+    """
+    Deplace dans mesures_chunks les mesures du capteur anterieures a `before`
+    (tronque au jour UTC), un jour par transaction.
+    Retourne (mesures compactees, jours ecrits).
+    """
+    codec = codec or default_codec()
+    cutoff, _ = _day_bounds(before.astimezone(dt_timezone.utc).date())
+    rows = (
+        Mesure.objects.filter(capteur_id=capteur_id, date__lt=cutoff)
+        .order_by("date")
+        .values_list("id", "date", "valeur")
+        .iterator(chunk_size=5000)
+    )
+    compacted = days = 0
+    current_day = None
+    pending = []
+    for row in rows:
+        jour = row[1].astimezone(dt_timezone.utc).date()
+        if jour != current_day and pending:
+            _compact_day(capteur_id, current_day, pending, codec)
+            compacted += len(pending)
+            days += 1
+            pending = []
+        current_day = jour
+        pending.append(row)
+    if pending:
+        _compact_day(capteur_id, current_day, pending, codec)
+        compacted += len(pending)
+        days += 1
+    return compacted, days
+
+
+def read_series(capteur_id, start=None, end=None):
+    """
+    Mesures du capteur dans [start, end], triees par date: archives,
+    blocs compactes et lignes brutes fusionnes (a date egale, la ligne
+    brute l'emporte sur le bloc, le bloc sur l'archive).
+    Retourne [(date, valeur)].
+    """
+    from core.archive import archives_for, read_points
+
+    chunks = MesureChunk.objects.filter(capteur_id=capteur_id).order_by("jour")
+    raw = Mesure.objects.filter(capteur_id=capteur_id)
+    if start is not None:
+        chunks = chunks.filter(dateFin__gte=start)
+        raw = raw.filter(date__gte=start)
+    if end is not None:
+        chunks = chunks.filter(dateDebut__lte=end)
+        raw = raw.filter(date__lte=end)
+
+    start_ms = to_ms(start) if start is not None else None
+    end_ms = to_ms(end) if end is not None else None
+    points = {}
+    for archive in archives_for(capteur_id, start, end):
+        ms, values = read_points(archive, start_ms, end_ms)
+        points.update(zip(ms.tolist(), values.tolist()))
+    for codec, ts_blob, val_blob in chunks.values_list("codec", "timestamps", "valeurs"):
+        ms, values = unpack(codec, ts_blob, val_blob)
+        mask = np.ones(ms.shape, dtype=bool)
+        if start_ms is not None:
+            mask &= ms >= start_ms
+        if end_ms is not None:
+            mask &= ms <= end_ms
+        points.update(zip(ms[mask].tolist(), values[mask].tolist()))
+
+    series = {from_ms(m): v for m, v in points.items()}
+    series.update(raw.values_list("date", "valeur"))
+    return sorted(series.items())
@@ -1,6 +1,11 @@
+import threading
+import time
+
 import requests
 from django.conf import settings
 
+from core.resilience import BulkheadFullError, CircuitOpenError, get_dependency
+
 
 class TraccarError(Exception):
     pass
@@ -32,10 +37,32 @@ def _headers():
     return {}
 
 
+def _is_server_error(response):
+    return getattr(response, "status_code", 0) >= 500
+
+
+def _request(method, url, **kwargs):
+    """
+    Appel HTTP vers Traccar via le disjoncteur et la cloison "traccar".
+
+    Circuit ouvert, cloison saturee et erreurs reseau sont convertis en
+    TraccarError pour que les appelants gardent une seule gestion d'erreur.
+    """
+    try:
+        return get_dependency("traccar").call(method, url, is_failure=_is_server_error, **kwargs)
+    except CircuitOpenError:
+        raise TraccarError("traccar_circuit_open")
+    except BulkheadFullError:
+        raise TraccarError("traccar_busy")
+    except requests.RequestException as e:
+        raise TraccarError(f"traccar_unavailable:{e.__class__.__name__}")
+
+
 def get_device_by_unique_id(unique_id, timeout=5):
     _ensure_configured()
     url = f"{_base_url()}/api/devices"
-    response = requests.get(
+    response = _request(
+        requests.get,
         url,
         params={"uniqueId": unique_id},
         auth=_auth() if not settings.TRACCAR_TOKEN else None,
@@ -54,7 +81,8 @@ def create_device(unique_id, name, timeout=5):
     _ensure_configured()
     url = f"{_base_url()}/api/devices"
     payload = {"uniqueId": unique_id, "name": name}
-    response = requests.post(
+    response = _request(
+        requests.post,
         url,
         json=payload,
         auth=_auth() if not settings.TRACCAR_TOKEN else None,
@@ -93,7 +121,8 @@ def update_device(unique_id, name=None, new_unique_id=None, timeout=5):
         "uniqueId": new_unique_id or existing.get("uniqueId"),
     }
     url = f"{_base_url()}/api/devices/{device_id}"
-    response = requests.put(
+    response = _request(
+        requests.put,
         url,
         json=payload,
         auth=_auth() if not settings.TRACCAR_TOKEN else None,
@@ -116,7 +145,8 @@ def delete_device(unique_id, timeout=5):
     if not device_id:
         raise TraccarError("traccar_device_invalid")
     url = f"{_base_url()}/api/devices/{device_id}"
-    response = requests.delete(
+    response = _request(
+        requests.delete,
         url,
         auth=_auth() if not settings.TRACCAR_TOKEN else None,
         headers=_headers(),
@@ -138,7 +168,8 @@ def get_latest_position(unique_id, timeout=5):
     if not device_id:
         return None
     url = f"{_base_url()}/api/positions"
-    response = requests.get(
+    response = _request(
+        requests.get,
         url,
         params={"deviceId": device_id, "limit": 1},
         auth=_auth() if not settings.TRACCAR_TOKEN else None,
@@ -159,3 +190,95 @@ def get_latest_position(unique_id, timeout=5):
         "longitude": position.get("longitude"),
         "fixTime": position.get("fixTime"),
     }
+
+
+class _InFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_POSITION_CACHE_MAX_ENTRIES = 4096
+_position_lock = threading.Lock()
+_position_cache = {}
+_position_inflight = {}
+_position_stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+
+def _position_cache_ttl():
+    return float(getattr(settings, "TRACCAR_POSITION_CACHE_TTL", 5) or 0)
+
+
+def get_latest_position_cached(unique_id, timeout=5, fetch=None):
+    """
+    get_latest_position avec cache court et coalescence des appels concurrents.
+
+    Les requetes simultanees pour un meme identifiant partagent un seul appel
+    Traccar; le resultat est conserve TRACCAR_POSITION_CACHE_TTL secondes.
+    Les erreurs ne sont pas mises en cache mais sont propagees a tous les
+    appelants en attente.
+    """
+    fetch = fetch or get_latest_position
+    ttl = _position_cache_ttl()
+    now = time.monotonic()
+
+    with _position_lock:
+        cached = _position_cache.get(unique_id)
+        if cached and cached[0] > now:
+            _position_stats["hits"] += 1
+            return cached[1]
+        flight = _position_inflight.get(unique_id)
+        leader = flight is None
+        if leader:
+            flight = _InFlight()
+            _position_inflight[unique_id] = flight
+            _position_stats["misses"] += 1
+        else:
+            _position_stats["coalesced"] += 1
+
+    if not leader:
+        flight.event.wait(timeout * 2 + 1)
+        if not flight.event.is_set():
+            raise TraccarError("traccar_position_timeout")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = fetch(unique_id, timeout=timeout)
+    except Exception as e:
+        flight.error = e
+        with _position_lock:
+            _position_stats["errors"] += 1
+        raise
+    else:
+        if ttl > 0:
+            with _position_lock:
+                now = time.monotonic()
+                if len(_position_cache) >= _POSITION_CACHE_MAX_ENTRIES:
+                    for key in [k for k, (expires, _) in _position_cache.items() if expires <= now]:
+                        del _position_cache[key]
+                _position_cache[unique_id] = (now + ttl, flight.result)
+        return flight.result
+    finally:
+        with _position_lock:
+            _position_inflight.pop(unique_id, None)
+        flight.event.set()
+
+
+def position_cache_stats():
+    with _position_lock:
+        now = time.monotonic()
+        stats = dict(_position_stats)
+        stats["entries"] = sum(1 for expires, _ in _position_cache.values() if expires > now)
+        stats["inFlight"] = len(_position_inflight)
+    stats["ttlSeconds"] = _position_cache_ttl()
+    return stats
+
+
+def clear_position_cache():
+    with _position_lock:
+        _position_cache.clear()
+        for key in _position_stats:
+            _position_stats[key] = 0
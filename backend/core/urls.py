@@ -1,6 +1,6 @@
 from django.urls import path
 
-from core import auth_views, entreprise_views, iot_views, notification_views
+from core import auth_views, entreprise_views, export_views, ingest_views, iot_views, map_views, metrics_views, notification_views, sante_views
 
 urlpatterns = [
     path('auth/register', auth_views.register, name='auth-register'),
@@ -20,11 +20,15 @@ urlpatterns = [
     path('entreprises/<uuid:entreprise_id>/offre', entreprise_views.update_entreprise_offre, name='entreprise-update-offre'),
     path('entreprises/<uuid:entreprise_id>/profiles', entreprise_views.update_entreprise_profiles, name='entreprise-update-profiles'),
     path('entreprises/<uuid:entreprise_id>/offre/status', entreprise_views.get_entreprise_offre_status, name='entreprise-offre-status'),
+    path('entreprises/<uuid:entreprise_id>/usage', entreprise_views.get_entreprise_usage, name='entreprise-usage'),
     path('profiles', entreprise_views.list_type_profiles, name='profiles-list'),
     path('stripe/webhook', entreprise_views.stripe_webhook, name='stripe-webhook'),
     path('capteurs/associate', iot_views.associate_capteur, name='capteurs-associate'),
     path('capteurs', iot_views.list_capteurs, name='capteurs-list'),
+    path('capteurs/states', iot_views.list_capteur_states, name='capteurs-states'),
+    path('capteurs/poids/previsions', iot_views.get_previsions_poids, name='capteurs-poids-previsions'),
     path('capteurs/<uuid:capteur_id>', iot_views.update_capteur, name='capteurs-update'),
+    path('capteurs/<uuid:capteur_id>/mesures', iot_views.get_capteur_mesures, name='capteurs-mesures'),
     path('capteurs/<uuid:capteur_id>/delete', iot_views.delete_capteur, name='capteurs-delete'),
     path('capteurs/<uuid:capteur_id>/gps-alert/activate', iot_views.activate_gps_alert, name='capteurs-gps-alert-activate'),
     path('capteurs/<uuid:capteur_id>/gps-alert/check', iot_views.check_gps_alert, name='capteurs-gps-alert-check'),
@@ -33,6 +37,14 @@ urlpatterns = [
     path('capteurs/<uuid:capteur_id>/gps-alert/clear', iot_views.clear_capteur_gps_alert, name='capteurs-gps-alert-clear'),
     path('capteurs/<uuid:capteur_id>/gps-position', iot_views.get_capteur_gps_position, name='capteurs-gps-position'),
     path('ruchers/<uuid:rucher_id>/gps-alert/status', iot_views.get_rucher_gps_alert_status, name='ruchers-gps-alert-status'),
+    path('ruches/sante', sante_views.list_ruches_sante, name='ruches-sante'),
+    path('mesures/ingest', ingest_views.ingest_mesures, name='mesures-ingest'),
+    path('mesures/ingest/binary', ingest_views.ingest_mesures_binary, name='mesures-ingest-binary'),
+    path('lorawan/uplink', ingest_views.lorawan_uplink, name='lorawan-uplink'),
+    path('mesures/export', export_views.export_mesures, name='mesures-export'),
+    path('map/clusters', map_views.get_map_clusters, name='map-clusters'),
     path('webhooks/intervention-created', notification_views.webhook_intervention_created, name='webhook-intervention-created'),
     path('webhooks/daily-notifications', notification_views.webhook_daily_notifications, name='webhook-daily-notifications'),
+    path('webhooks/refresh-dashboard', notification_views.webhook_refresh_dashboard, name='webhook-refresh-dashboard'),
+    path('metrics', metrics_views.get_metrics, name='metrics'),
 ]
@@ -0,0 +1,70 @@
+"""
+Usage des ressources par entreprise et limites d'offre.
+
+La table usage_entreprise compte les ruchers, capteurs et reines de chaque
+entreprise. Elle est tenue a jour par les triggers trigger_usage_entreprise
+(migration 0046), qui verifient aussi la limite de l'offre active a chaque
+insertion par un UPDATE conditionnel (n + 1 <= max); -1 signifie illimite.
+Les reines sont comptees mais pas limitees: les offres anterieures a
+nbReinesMax ont 0 par defaut.
+reconcile() recompte tout depuis les tables, par exemple apres une
+correction manuelle en base.
+"""
+from django.db import connection, transaction
+
+from core.models import Offre, UsageEntreprise
+
+RESSOURCES = (
+    ("ruchers", "nbRuchers", "nbRuchersMax"),
+    ("capteurs", "nbCapteurs", "nbCapteursMax"),
+    ("reines", "nbReines", None),
+)
+
+_RECONCILE_SQL = """
+    WITH comptes AS (
+        SELECT e.id AS entreprise_id,
+               (SELECT count(*) FROM ruchers r WHERE r.entreprise_id = e.id) AS ruchers,
+               (SELECT count(*) FROM capteurs c JOIN ruches ru ON c.ruche_id = ru.id
+                    JOIN ruchers r ON ru.rucher_id = r.id WHERE r.entreprise_id = e.id) AS capteurs,
+               (SELECT count(*) FROM reines q WHERE q.entreprise_id = e.id) AS reines
+        FROM entreprises e
+    )
+    INSERT INTO usage_entreprise AS u (entreprise_id, "nbRuchers", "nbCapteurs", "nbReines", created_at, updated_at)
+    SELECT entreprise_id, ruchers, capteurs, reines, now(), now() FROM comptes
+    ON CONFLICT (entreprise_id) DO UPDATE SET
+        "nbRuchers" = EXCLUDED."nbRuchers",
+        "nbCapteurs" = EXCLUDED."nbCapteurs",
+        "nbReines" = EXCLUDED."nbReines",
+        updated_at = now()
+    WHERE (u."nbRuchers", u."nbCapteurs", u."nbReines")
+        IS DISTINCT FROM (EXCLUDED."nbRuchers", EXCLUDED."nbCapteurs", EXCLUDED."nbReines")
+    RETURNING entreprise_id
+"""
+
+
+def reconcile():
+    """Recompte les ressources de toutes les entreprises; retourne les ids dont le compteur a change."""
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # Bloque les triggers (ROW EXCLUSIVE) le temps du recomptage: aucune
+            # insertion ne peut se glisser entre le COUNT et l'ecriture.
+            cursor.execute("LOCK TABLE usage_entreprise IN SHARE ROW EXCLUSIVE MODE")
+            cursor.execute(_RECONCILE_SQL)
+            return [row[0] for row in cursor.fetchall()]
+
+
+def usage(entreprise_id):
+    """{ressource: {utilises, max, restants}}; max -1 (ou sans offre active) = illimite, restants None."""
+    compteurs = UsageEntreprise.objects.filter(entreprise_id=entreprise_id).first()
+    offre = Offre.objects.filter(entreprise_id=entreprise_id, active=True).first()
+    data = {}
+    for ressource, champ, champ_max in RESSOURCES:
+        utilises = getattr(compteurs, champ) if compteurs else 0
+        maximum = getattr(offre, champ_max) if offre and champ_max else None
+        illimite = maximum is None or maximum < 0
+        data[ressource] = {
+            "utilises": utilises,
+            "max": maximum,
+            "restants": None if illimite else max(maximum - utilises, 0),
+        }
+    return data
@@ -0,0 +1,193 @@
+"""
+Controles de plausibilite des mesures a l'ingestion.
+
+Trois filtres, calcules par capteur sur des tableaux numpy:
+- plage physique du type de capteur (-127 degC, 65535...);
+- pic: ecart a la mediane des VALIDATION_WINDOW mesures precedentes
+  superieur a VALIDATION_MAD_THRESHOLD fois le MAD normalise, et a un
+  ecart minimal propre au type (un MAD nul ne rejette pas tout);
+- variation: ecart a la mesure acceptee precedente superieur a un saut
+  instantane plus une pente horaire.
+
+La fenetre du filtre de pic inclut les mesures recemment mises en
+quarantaine (pic, variation): apres un changement de niveau reel (pose ou
+retrait d'une hausse), la mediane finit par suivre. Un nouveau niveau est
+accepte des que VALIDATION_CONFIRMATION mesures consecutives concordent
+(ecart inferieur a l'ecart de pic du type), meme si la mediane est encore
+sur l'ancien niveau.
+
+Les mesures rejetees sont enregistrees dans mesures_quarantaine avec
+leur raison; le reste du lot est ecrit normalement.
+"""
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from core.models import MesureQuarantaine, RaisonQuarantaine, TypeCapteur
+
+Limites = namedtuple("Limites", ["min", "max", "ecart_pic", "saut", "pente_horaire"])
+
+# ecart_pic: ecart minimal a la mediane pour un pic; saut + pente_horaire * heures:
+# variation maximale depuis la mesure precedente (pose ou retrait d'une hausse, essaimage).
+LIMITES = {
+    TypeCapteur.POIDS.value: Limites(0.0, 250.0, 5.0, 30.0, 10.0),             # kg
+    TypeCapteur.TEMPERATURE.value: Limites(-40.0, 85.0, 5.0, 10.0, 30.0),      # degC
+    TypeCapteur.HUMIDITE.value: Limites(0.0, 100.0, 20.0, 40.0, 60.0),         # %
+    TypeCapteur.CO2.value: Limites(0.0, 50000.0, 2000.0, 10000.0, 20000.0),    # ppm
+    TypeCapteur.SON.value: Limites(0.0, 150.0, 25.0, 60.0, 200.0),             # dB
+    TypeCapteur.BATTERIE.value: Limites(0.0, 15.0, 0.5, 2.0, 2.0),             # V
+}
+
+# Historique minimal avant d'appliquer le filtre de pic.
+MIN_HISTORIQUE = 5
+_MAD_SCALE = 1.4826
+
+# Dernieres mesures anterieures au lot, par capteur (index (capteur, date)),
+# acceptees ou en quarantaine pour pic/variation.
+_HISTORY_SQL = """
+    SELECT v.capteur_id, c.type, m.date, m.valeur, m.acceptee
+    FROM (VALUES {values}) AS v(capteur_id, avant)
+    JOIN capteurs c ON c.id = v.capteur_id
+    LEFT JOIN LATERAL (
+        SELECT date, valeur, acceptee FROM (
+            (SELECT date, valeur, true AS acceptee FROM mesures
+             WHERE capteur_id = v.capteur_id AND date < v.avant
+             ORDER BY date DESC LIMIT %s)
+            UNION ALL
+            (SELECT date, valeur, false FROM mesures_quarantaine
+             WHERE capteur_id = v.capteur_id AND date < v.avant AND raison <> %s
+             ORDER BY date DESC LIMIT %s)
+        ) h
+        ORDER BY date DESC
+        LIMIT %s
+    ) m ON true
+"""
+
+
+def enabled():
+    return getattr(settings, "MESURES_VALIDATION_ENABLED", True)
+
+
+def _load_context(first_dates, window):
+    """{capteur_id: (type, [(date epoch s, valeur, acceptee)])} avec l'historique trie par date."""
+    items = sorted(first_dates.items())
+    params = []
+    for capteur_id, date in items:
+        params.extend([capteur_id, date])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _HISTORY_SQL.format(values=", ".join(["(%s::uuid, %s::timestamptz)"] * len(items))),
+            params + [window, RaisonQuarantaine.HORS_PLAGE.value, window, window],
+        )
+        rows = cursor.fetchall()
+    context = {}
+    for capteur_id, type_, date, valeur, acceptee in rows:
+        entry = context.setdefault(str(capteur_id), (type_, []))
+        if date is not None:
+            entry[1].append((date.timestamp(), valeur, acceptee))
+    return {capteur_id: (type_, history[::-1]) for capteur_id, (type_, history) in context.items()}
+
+
+def _median_mad(values):
+    median = np.median(values)
+    return median, np.median(np.abs(values - median))
+
+
+def _check_capteur(limites, history, t, v, window, threshold, confirmation):
+    """
+    Raison (ou None) et valeur de reference pour chaque mesure du capteur,
+    triee par date. `history`: [(date, valeur, acceptee)] anterieures au lot.
+    Parcours sequentiel: chaque mesure est comparee a la derniere mesure
+    acceptee, et la fenetre suit les mesures du lot deja examinees.
+    """
+    n = len(v)
+    raisons = np.full(n, None, dtype=object)
+    reference = np.full(n, np.nan)
+
+    fenetre = [valeur for _, valeur, _ in history][-window:]
+    acceptees = [(date, valeur) for date, valeur, acceptee in history if acceptee]
+    last_t, last_v = acceptees[-1] if acceptees else (None, None)
+
+    for i in range(n):
+        if not np.isfinite(v[i]) or v[i] < limites.min or v[i] > limites.max:
+            # Les valeurs hors plage ne comptent pas dans les fenetres suivantes.
+            raisons[i] = RaisonQuarantaine.HORS_PLAGE.value
+            continue
+
+        raison, ref = None, np.nan
+        if len(fenetre) >= MIN_HISTORIQUE:
+            median, mad = _median_mad(np.asarray(fenetre, dtype=np.float64))
+            if abs(v[i] - median) > max(threshold * _MAD_SCALE * mad, limites.ecart_pic):
+                raison, ref = RaisonQuarantaine.PIC.value, median
+        if raison is None and last_v is not None:
+            heures = max(t[i] - last_t, 0.0) / 3600.0
+            if abs(v[i] - last_v) > limites.saut + limites.pente_horaire * heures:
+                raison, ref = RaisonQuarantaine.VARIATION.value, last_v
+
+        # Nouveau niveau confirme: les mesures precedentes concordent avec celle-ci.
+        precedentes = fenetre[-(confirmation - 1):] if confirmation > 1 else []
+        if raison is not None and len(precedentes) == confirmation - 1 and all(
+            abs(p - v[i]) <= limites.ecart_pic for p in precedentes
+        ):
+            raison = None
+
+        if raison is None:
+            last_t, last_v = t[i], v[i]
+        else:
+            raisons[i] = raison
+            reference[i] = ref
+        fenetre = (fenetre + [v[i]])[-window:]
+    return raisons, reference
+
+
+def validate(rows):
+    """
+    Separe [(capteur_id, date, valeur, batterie)] en lignes acceptees et
+    rejets [(ligne, raison, reference)]. Une requete par lot pour les types
+    et l'historique des capteurs.
+    """
+    if not rows:
+        return rows, []
+    window = int(getattr(settings, "VALIDATION_WINDOW", 20))
+    threshold = float(getattr(settings, "VALIDATION_MAD_THRESHOLD", 6.0))
+    confirmation = int(getattr(settings, "VALIDATION_CONFIRMATION", 3))
+
+    by_capteur = {}
+    for index, row in enumerate(rows):
+        by_capteur.setdefault(str(row[0]), []).append(index)
+    first_dates = {capteur_id: min(rows[i][1] for i in indexes) for capteur_id, indexes in by_capteur.items()}
+    context = _load_context(first_dates, window)
+
+    rejected = {}
+    for capteur_id, indexes in by_capteur.items():
+        type_, history = context.get(capteur_id, (None, []))
+        limites = LIMITES.get(type_)
+        if limites is None:
+            continue
+        indexes = sorted(indexes, key=lambda i: rows[i][1])
+        t = np.array([rows[i][1].timestamp() for i in indexes], dtype=np.float64)
+        v = np.array([rows[i][2] for i in indexes], dtype=np.float64)
+        raisons, reference = _check_capteur(limites, history, t, v, window, threshold, confirmation)
+        for position in np.flatnonzero(raisons != None):  # noqa: E711 (tableau numpy)
+            ref = reference[position]
+            rejected[indexes[position]] = (raisons[position], None if np.isnan(ref) else float(ref))
+
+    accepted = [row for i, row in enumerate(rows) if i not in rejected]
+    rejects = [(rows[i], raison, ref) for i, (raison, ref) in sorted(rejected.items())]
+    return accepted, rejects
+
+
+def quarantine(rejects):
+    """Enregistre les rejets dans mesures_quarantaine."""
+    if not rejects:
+        return 0
+    MesureQuarantaine.objects.bulk_create(
+        [
+            MesureQuarantaine(capteur_id=row[0], date=row[1], valeur=row[2], raison=raison, reference=reference)
+            for row, raison, reference in rejects
+        ],
+        batch_size=1000,
+    )
+    return len(rejects)
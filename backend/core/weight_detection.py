@@ -0,0 +1,52 @@
+"""
+Detection des chutes de poids brutales (essaimage, vol, pillage).
+
+CUSUM unilateral bas sur les variations successives de poids d'un capteur:
+S_i = min(0, S_{i-1} + (w_i - w_{i-1}) + k). La tolerance k absorbe la
+consommation lente de la colonie; une alarme est levee quand la baisse
+cumulee depasse h (S_i < -h), puis la somme repart de zero.
+La recurrence est calculee sans boucle Python a l'aide de cumsum et
+maximum.accumulate (forme fermee de la recursion de Lindley).
+"""
+import numpy as np
+
+DETECTEUR_CHUTE_POIDS = "chute_poids"
+
+
+def lower_cusum(x, s0=0.0):
+    """S_i = min(0, S_{i-1} + x_i) pour tout i, avec S_0 = s0 (<= 0)."""
+    c = np.cumsum(x)
+    return np.minimum(c + min(0.0, s0), c - np.maximum.accumulate(np.maximum(c, 0.0)))
+
+
+def cusum_drops(values, previous=None, cusum=0.0, slack=0.2, threshold=2.0):
+    """
+    Cherche les chutes dans une serie de poids ordonnee par date.
+
+    `previous` et `cusum` reprennent l'etat de l'execution precedente.
+    Retourne (alarmes, cusum_final) ou alarmes = [(indice dans values, baisse cumulee kg)].
+    """
+    values = np.asarray(values, dtype=float)
+    if previous is None:
+        diffs = np.diff(values)
+        offset = 1
+    else:
+        diffs = np.diff(values, prepend=previous)
+        offset = 0
+    if diffs.size == 0:
+        return [], min(0.0, cusum)
+
+    x = diffs + slack
+    alarms = []
+    start = 0
+    s0 = cusum
+    while start < x.size:
+        s = lower_cusum(x[start:], s0)
+        hits = np.flatnonzero(s < -threshold)
+        if hits.size == 0:
+            return alarms, float(s[-1])
+        i = int(hits[0])
+        alarms.append((start + i + offset, float(-s[i])))
+        start += i + 1
+        s0 = 0.0
+    return alarms, 0.0
@@ -0,0 +1,255 @@
+"""
+Prevision de poids des ruches et detection de miellee.
+
+Les mesures des capteurs Poids d'une entreprise sont ramenees a une
+matrice (capteur x jour UTC) de poids medians journaliers, en une seule
+requete, sur les PREVISION_POIDS_JOURS derniers jours complets. Tous les
+calculs sont faits sur cette matrice, sans boucle par capteur:
+- tendance robuste (pente de Theil-Sen: mediane des pentes entre toutes
+  les paires de jours) sur les PREVISION_POIDS_TENDANCE_JOURS derniers
+  jours, extrapolee a PREVISION_POIDS_HORIZON_JOURS;
+- variations journalieres; une miellee est en cours quand les
+  MIELLEE_JOURS dernieres variations depassent MIELLEE_GAIN_JOURNALIER_KG;
+- pose de hausse conseillee pendant une miellee quand le poids prevu
+  depasse de HAUSSE_GAIN_KG celui de la derniere pose de hausse (ou du
+  debut de la fenetre).
+
+Seules les mesures non compactees sont lues: PREVISION_POIDS_JOURS doit
+rester inferieur a MESURES_COMPACTION_DAYS. Les resultats sont mis en
+cache jusqu'a l'arrivee de nouvelles mesures (capteur_state) ou d'une
+nouvelle pose de hausse.
+"""
+import warnings
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from core.models import Capteur, CapteurState, Intervention, TypeCapteur, TypeIntervention
+
+# Nombre minimal de jours renseignes pour une tendance.
+MIN_JOURS_TENDANCE = 3
+
+_DAILY_SQL = """
+    SELECT capteur_id, floor(extract(epoch FROM date) / 86400)::int AS jour,
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY valeur)
+    FROM mesures
+    WHERE capteur_id = ANY(%s::uuid[]) AND date >= %s AND date < %s
+    GROUP BY 1, 2
+"""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def daily_matrix(capteur_ids, first_day, n_days):
+    """Poids median par capteur (lignes, dans l'ordre de capteur_ids) et par jour UTC; NaN sans mesure."""
+    matrix = np.full((len(capteur_ids), n_days), np.nan)
+    if not capteur_ids or n_days <= 0:
+        return matrix
+    start = datetime.combine(first_day, time.min, tzinfo=dt_timezone.utc)
+    end = start + timedelta(days=n_days)
+    offset = (first_day - datetime(1970, 1, 1).date()).days
+    rows_by_id = {str(capteur_id): i for i, capteur_id in enumerate(capteur_ids)}
+    with connection.cursor() as cursor:
+        cursor.execute(_DAILY_SQL, [[str(c) for c in capteur_ids], start, end])
+        data = cursor.fetchall()
+    if data:
+        rows = np.array([rows_by_id[str(capteur_id)] for capteur_id, _, _ in data])
+        cols = np.array([jour for _, jour, _ in data]) - offset
+        matrix[rows, cols] = [valeur for _, _, valeur in data]
+    return matrix
+
+
+def robust_trend(matrix, min_points=MIN_JOURS_TENDANCE):
+    """
+    Pente (kg/jour) et ordonnee de Theil-Sen de chaque ligne, les colonnes
+    etant des jours consecutifs (0, 1, ...). NaN si moins de `min_points` jours.
+    """
+    matrix = np.atleast_2d(matrix)
+    n = matrix.shape[1]
+    x = np.arange(n, dtype=np.float64)
+    i, j = np.triu_indices(n, k=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # lignes sans paire valide
+        slope = np.nanmedian((matrix[:, j] - matrix[:, i]) / (j - i), axis=1)
+        intercept = np.nanmedian(matrix - slope[:, None] * x, axis=1)
+    too_few = np.count_nonzero(~np.isnan(matrix), axis=1) < min_points
+    slope[too_few] = np.nan
+    intercept[too_few] = np.nan
+    return slope, intercept
+
+
+def trailing_run(mask):
+    """Nombre de True consecutifs en fin de chaque ligne."""
+    mask = np.atleast_2d(mask)
+    return np.cumprod(mask[:, ::-1], axis=1).sum(axis=1)
+
+
+def _first_valid_from(matrix, start_cols):
+    """Premiere valeur non NaN de chaque ligne a partir de la colonne start_cols[ligne]."""
+    cols = np.arange(matrix.shape[1])
+    masked = np.where(cols >= start_cols[:, None], matrix, np.nan)
+    valid = ~np.isnan(masked)
+    first = np.argmax(valid, axis=1)
+    return np.where(valid.any(axis=1), masked[np.arange(matrix.shape[0]), first], np.nan)
+
+
+def analyse(matrix, pose_cols, horizon, tendance_jours, gain_journalier, jours_miellee, gain_hausse):
+    """
+    Calculs vectorises sur la matrice (capteur x jour). `pose_cols` donne
+    pour chaque ligne la colonne de la derniere pose de hausse (0 sinon).
+    Retourne un dict de tableaux numpy, une valeur par capteur.
+    """
+    n_capteurs, n_days = matrix.shape
+    recent = matrix[:, -tendance_jours:]
+    slope, intercept = robust_trend(recent)
+    prevu = intercept + slope * (recent.shape[1] - 1 + horizon)
+
+    deltas = np.diff(matrix, axis=1)
+    # NaN >= seuil vaut False: un jour sans mesure interrompt la miellee.
+    with np.errstate(invalid="ignore"):
+        run = trailing_run(deltas >= gain_journalier) if deltas.size else np.zeros(n_capteurs, dtype=int)
+    miellee = run >= jours_miellee
+    debut_col = n_days - 1 - run
+    rows = np.arange(n_capteurs)
+    dernier = matrix[:, -1]
+    gain_miellee = np.where(miellee, dernier - matrix[rows, debut_col], np.nan)
+
+    reference = _first_valid_from(matrix, np.asarray(pose_cols, dtype=int))
+    gain_hausse_prevu = prevu - reference
+    with np.errstate(invalid="ignore"):
+        conseil = miellee & (gain_hausse_prevu >= gain_hausse)
+    return {
+        "poids": dernier,
+        "pente": slope,
+        "prevu": prevu,
+        "deltas": deltas,
+        "miellee": miellee,
+        "debutCol": debut_col,
+        "gainMiellee": gain_miellee,
+        "gainHausse": gain_hausse_prevu,
+        "conseil": conseil,
+    }
+
+
+def _round(value, digits=2):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+def compute(entreprise_id, today=None):
+    """Previsions des capteurs Poids actifs d'une entreprise (sans cache)."""
+    today = today or timezone.now().date()
+    n_days = int(_setting("PREVISION_POIDS_JOURS", 21))
+    tendance_jours = min(int(_setting("PREVISION_POIDS_TENDANCE_JOURS", 7)), n_days)
+    horizon = int(_setting("PREVISION_POIDS_HORIZON_JOURS", 7))
+    first_day = today - timedelta(days=n_days)
+    jours = [first_day + timedelta(days=k) for k in range(n_days)]
+
+    capteurs = list(
+        Capteur.objects.filter(
+            actif=True, type=TypeCapteur.POIDS.value, ruche__rucher__entreprise_id=entreprise_id
+        )
+        .order_by("ruche__immatriculation", "identifiant")
+        .values_list("id", "identifiant", "ruche_id", "ruche__immatriculation")
+    )
+    poses = dict(
+        Intervention.objects.filter(
+            type=TypeIntervention.POSE_HAUSSE, ruche_id__in={c[2] for c in capteurs}
+        )
+        .values("ruche_id")
+        .annotate(last=Max("date"))
+        .values_list("ruche_id", "last")
+    )
+    pose_cols = [
+        min(max((poses[c[2]].date() - first_day).days, 0), n_days - 1) if c[2] in poses else 0
+        for c in capteurs
+    ]
+
+    matrix = daily_matrix([c[0] for c in capteurs], first_day, n_days)
+    result = analyse(
+        matrix,
+        pose_cols,
+        horizon=horizon,
+        tendance_jours=tendance_jours,
+        gain_journalier=float(_setting("MIELLEE_GAIN_JOURNALIER_KG", 0.5)),
+        jours_miellee=int(_setting("MIELLEE_JOURS", 3)),
+        gain_hausse=float(_setting("HAUSSE_GAIN_KG", 8.0)),
+    )
+
+    previsions = []
+    for i, (capteur_id, identifiant, ruche_id, immatriculation) in enumerate(capteurs):
+        miellee = bool(result["miellee"][i])
+        pose = poses.get(ruche_id)
+        previsions.append({
+            "capteurId": str(capteur_id),
+            "identifiant": identifiant,
+            "rucheId": str(ruche_id),
+            "immatriculation": immatriculation,
+            "poidsKg": _round(result["poids"][i]),
+            "tendanceKgJour": _round(result["pente"][i], 3),
+            "poidsPrevuKg": _round(result["prevu"][i]),
+            "variationsJournalieres": [_round(d) for d in result["deltas"][i, -tendance_jours:]],
+            "miellee": {
+                "active": miellee,
+                "depuis": jours[result["debutCol"][i]].isoformat() if miellee else None,
+                "gainKg": _round(result["gainMiellee"][i]),
+            },
+            "dernierePoseHausse": pose.isoformat() if pose else None,
+            "gainDepuisHausseKg": _round(result["gainHausse"][i]),
+            "poseHausseConseillee": bool(result["conseil"][i]),
+        })
+    return {
+        "jours": [d.isoformat() for d in jours[-tendance_jours:]],
+        "horizonJours": horizon,
+        "previsions": previsions,
+    }
+
+
+def _version(entreprise_id, today):
+    """Change des qu'une mesure Poids est ecrite ou qu'une pose de hausse est saisie."""
+    mesures = CapteurState.objects.filter(
+        entreprise_id=entreprise_id, capteur__type=TypeCapteur.POIDS.value
+    ).aggregate(n=Sum("nbMesures"), last=Max("updated_at"))
+    poses = Intervention.objects.filter(
+        type=TypeIntervention.POSE_HAUSSE, ruche__rucher__entreprise_id=entreprise_id
+    ).aggregate(n=Count("id"), last=Max("updated_at"))
+    parts = [
+        today.isoformat(),
+        mesures["n"] or 0,
+        mesures["last"].timestamp() if mesures["last"] else 0,
+        poses["n"],
+        poses["last"].timestamp() if poses["last"] else 0,
+    ]
+    return ":".join(str(p) for p in parts)
+
+
+def previsions(entreprise_id, today=None):
+    """compute() mis en cache jusqu'a la prochaine mesure ou pose de hausse."""
+    today = today or timezone.now().date()
+    cache_key = f"previsions_poids:{entreprise_id}:{_version(entreprise_id, today)}"
+    data = cache.get(cache_key)
+    if data is None:
+        data = compute(entreprise_id, today)
+        cache.set(cache_key, data, _setting("PREVISION_POIDS_CACHE_TTL", 3600))
+    return data
+
+
+def conseils_hausse(today=None):
+    """{ruche_id: prevision} des ruches pour lesquelles une pose de hausse est conseillee."""
+    entreprise_ids = (
+        Capteur.objects.filter(actif=True, type=TypeCapteur.POIDS.value, ruche__rucher__entreprise__isnull=False)
+        .values_list("ruche__rucher__entreprise_id", flat=True)
+        .distinct()
+    )
+    conseils = {}
+    for entreprise_id in entreprise_ids:
+        for prevision in previsions(entreprise_id, today)["previsions"]:
+            if prevision["poseHausseConseillee"]:
+                conseils.setdefault(prevision["rucheId"], prevision)
+    return conseils
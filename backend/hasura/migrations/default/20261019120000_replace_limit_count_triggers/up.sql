@@ -0,0 +1,12 @@
+-- ====================
+-- Limites d'offre: compteurs usage_entreprise au lieu de COUNT(...)
+-- ====================
+-- Les triggers trigger_usage_entreprise (migration Django core 0046)
+-- tiennent un compteur par entreprise et verifient la limite par un
+-- UPDATE conditionnel; les anciens triggers COUNT sont retires.
+
+DROP TRIGGER IF EXISTS trigger_check_capteurs_limit ON capteurs;
+DROP FUNCTION IF EXISTS check_capteurs_limit();
+
+DROP TRIGGER IF EXISTS trigger_check_ruchers_limit ON ruchers;
+DROP FUNCTION IF EXISTS check_ruchers_limit();